@@ -1,16 +1,31 @@
 # depends coz: To inject the service class (CameraService) automatically into routes
 # Defines all HTTP endpoints for cameras and feeds.
 # Converts service exceptions into HTTP errors.
+import ipaddress
 import logging  #importing logging
+import threading
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from app.api.projection import parse_fields, project, project_many
+from app.api.responses import TrustedJSONResponse, list_response, model_response
+from app.core.admission import INGEST, POINT_READ, SCAN, WRITE
+from app.core.clock import clock, to_ns
+from app.core.config import Config
 
 from app.core.exceptions import ConflictError, NotFoundError
-from app.models.schemas import (CameraDetails, CameraState, CameraUpdate,
-                                FeedUpdate, NewCameraData, VideoFeedInfo,
+from app.core.lanes import in_lane, lanes
+from app.core.query_cache import query_cache
+from app.core.singleflight import SingleFlight
+from app.models.schemas import (BulkResult, BulkUpdateResult, CameraDetails,
+                                CameraState, CameraUpdate, CameraUptime,
+                                FeedUpdate, FleetStats, FleetUptimeReport,
+                                NewCameraData, OfflineAnalytics, VideoFeedInfo,
                                 VideoFeedSetup)
-from app.repository.memory_repo import SimpleCameraMemoryStorage
+from app.repository.interface import CameraRepositoryInterface
+from app.repository.registry import build_repository
 from app.service.camera_service import CameraService
 
 logger = logging.getLogger(__name__)  # (ADDED COMMENT) creating logger for this file
@@ -22,19 +37,45 @@ router = APIRouter(prefix="/cameras", tags=["Camera Management"])
 
 # GLOBAL REPO + SERVICE CREATED ONLY ONCE
 # These SINGLE instances will be shared across ALL requests + tests.
-repo = SimpleCameraMemoryStorage()  # empty db
-# create a camera service object and connect with the repo onject
-service = CameraService(repo)  # service connected to repo
-# now service can call repo functions:
-# self.repo.add_camera()
-# self.repo.get_camera()
+# They are built LAZILY (first call of get_repo()/get_service(), normally from
+# the app's lifespan at startup), not when this module is imported.
+_repo: CameraRepositoryInterface | None = None
+_service: CameraService | None = None
+# sync routes run in a thread pool → lock; RLock because get_service() calls
+# get_repo() while holding it
+_init_lock = threading.RLock()
+
+
+def get_repo() -> CameraRepositoryInterface:
+    global _repo
+    if _repo is None:
+        with _init_lock:
+            if _repo is None:
+                # backend chosen by Config.REPOSITORY_BACKEND (default "memory")
+                _repo = build_repository(Config.REPOSITORY_BACKEND)  # empty db
+    return _repo
 
 
 # Dependency injection for service (FastAPI will inject this automatically)
 # FastAPI will automatically give (inject) an object/function
 # result into your route or class without you manually creating it each time.
-def get_service():
-    return service
+def get_service() -> CameraService:
+    global _service
+    if _service is None:
+        with _init_lock:
+            if _service is None:
+                # create a camera service object and connect with the repo object
+                _service = CameraService(get_repo())
+    return _service
+
+
+def __getattr__(name):
+    # Keeps `from app.api.camera_api import repo / service` working (built lazily).
+    if name == "repo":
+        return get_repo()
+    if name == "service":
+        return get_service()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 # When you write Depends(get_service),
@@ -43,8 +84,13 @@ def get_service():
 # The service is then injected into API functions
 
 
+# EXECUTION LANES: @in_lane(...) runs a route's body on the worker threads of
+# its route class (see app/core/lanes.py), so heartbeats never wait for scans.
+
+
 # 1. ADD THE CAMERA (POST)
 @router.post("/", response_model=CameraDetails)
+@in_lane(WRITE)
 def add_camera(data: NewCameraData, service: CameraService = Depends(get_service)):
     # data:expect a JSON body and convert it into a Pydantic model named NewCameraData
     # Depends(get_service) this return service that is : service = CameraService(repo)
@@ -56,7 +102,7 @@ def add_camera(data: NewCameraData, service: CameraService = Depends(get_service
         logger.info(
             f"API: Camera successfully added with ID={cam.camera_id}"
         )  
-        return cam
+        return model_response(cam)
     except ConflictError as e:
         logger.warning(
             f"API: Conflict while adding camera : {str(e)}"
@@ -70,16 +116,125 @@ def add_camera(data: NewCameraData, service: CameraService = Depends(get_service
         raise HTTPException(status_code=400, detail=str(e))
 
 
+# FLEET STATISTICS (GET)
+# NOTE: declared BEFORE "/{camera_id}", otherwise "stats" would be parsed as a camera id.
+@router.get("/stats", response_model=FleetStats)
+@in_lane(POINT_READ)
+def fleet_stats(service: CameraService = Depends(get_service)):
+    logger.info("API: Request for FLEET STATISTICS")
+    stats = service.fleet_stats()
+    logger.info(f"API: Returned statistics for {stats.total_cameras} cameras")
+    return model_response(stats)
+
+
+# FLEET UPTIME REPORT (GET)
+# NOTE: declared BEFORE "/{camera_id}" as well.
+# window: 3600 / 15m / 24h / 7d; sla: uptime fraction (default UPTIME_SLA_TARGET);
+# worst: how many of the lowest-uptime cameras to list.
+@router.get("/uptime", response_model=FleetUptimeReport)
+@in_lane(SCAN)
+def fleet_uptime(
+    window: str = "24h",
+    sla: float | None = None,
+    worst: int = Query(10, ge=0, le=1000),
+    service: CameraService = Depends(get_service),
+):
+    logger.info("API: Request for FLEET UPTIME report")
+    report = service.fleet_uptime(window=window, sla=sla, worst=worst)
+    logger.info(f"API: Uptime report, {report.below_sla} cameras below SLA")
+    return model_response(report)
+
+
+# OFFLINE ANALYTICS (GET, vectorized over the columnar snapshot)
+# NOTE: declared BEFORE "/{camera_id}" as well.
+# longer_than: 90 / 10m / 2h / 1d; group_by: model | feed_count;
+# model (substring, as in listing) and cidr narrow the fleet first.
+# Needs NumPy (501 without it).
+@router.get("/analytics/offline", response_model=OfflineAnalytics)
+@in_lane(SCAN)
+def offline_analytics(
+    longer_than: str = "10m",
+    group_by: str = "model",
+    model: str | None = None,
+    cidr: str | None = None,
+    service: CameraService = Depends(get_service),
+):
+    logger.info("API: Request for OFFLINE ANALYTICS")
+    report = service.offline_analytics(
+        longer_than=longer_than, group_by=group_by, model=model, cidr=cidr
+    )
+    logger.info(f"API: {report.offline} cameras offline longer than {longer_than}")
+    return model_response(report)
+
+
+# EXPORT ALL MATCHING CAMERAS (GET, streamed NDJSON)
+# NOTE: declared BEFORE "/{camera_id}" as well.
+# One JSON camera per line, written in chunks of Config.EXPORT_BATCH_SIZE cameras,
+# so the whole export is never held in memory as one string (and the
+# compression middleware can compress it chunk by chunk).
+@router.get("/export", response_class=StreamingResponse)
+@in_lane(SCAN)
+def export_cameras(
+    model: str | None = None,
+    ip_from: str | None = None,
+    ip_to: str | None = None,
+    online: bool | None = None,
+    name: str | None = None,
+    tags_any: list[str] | None = Query(None),
+    tags_all: list[str] | None = Query(None),
+    tags_none: list[str] | None = Query(None),
+    service: CameraService = Depends(get_service),
+):
+    logger.info("API: Request to EXPORT cameras")
+    cams = service.export_cameras(
+        model=model,
+        ip_from=ip_from,
+        ip_to=ip_to,
+        online=online,
+        name=name,
+        tags_any=tags_any,
+        tags_all=tags_all,
+        tags_none=tags_none,
+    )
+    logger.info(f"API: Exporting {len(cams)} cameras")
+    return StreamingResponse(
+        _ndjson_chunks(cams, Config.EXPORT_BATCH_SIZE),
+        media_type="application/x-ndjson",
+        headers={"X-Total-Count": str(len(cams))},
+    )
+
+
+async def _ndjson_chunks(cams, batch_size: int):
+    # Each batch is serialized on the SCAN lane (not anyio's shared pool).
+    for start in range(0, len(cams), batch_size):
+        yield await lanes.run(SCAN, _ndjson_batch, cams[start : start + batch_size])
+
+
+def _ndjson_batch(batch) -> bytes:
+    return "".join(cam.model_dump_json() + "\n" for cam in batch).encode()
+
+
 # 2. GET CAMERA BY ID (GET)
 @router.get("/{camera_id}", response_model=CameraDetails)
-def get_camera(camera_id: UUID, service: CameraService = Depends(get_service)):
+@in_lane(POINT_READ)
+def get_camera(
+    camera_id: UUID,
+    fields: str | None = None,
+    service: CameraService = Depends(get_service),
+):
     logger.info(f"API: Request to GET camera ID={camera_id}")  # (ADDED COMMENT)
+    # fields=a,b.c → only those fields, projected from the stored record
+    spec = parse_fields(fields, CameraDetails) if fields else None
     try:
         cam = service.get_camera(camera_id)
         logger.info(
             f"API: Successfully fetched camera ID={camera_id}"
         ) 
-        return cam
+        if spec is not None:
+            return JSONResponse(project(cam, spec))
+        # response_model stays in the decorator for the docs; the stored
+        # (already validated) model is serialized directly.
+        return model_response(cam)
     except NotFoundError as e:
         logger.warning(f"API: Camera ID={camera_id} not found")  # (ADDED COMMENT)
         raise HTTPException(status_code=404, detail=str(e))
@@ -87,6 +242,7 @@ def get_camera(camera_id: UUID, service: CameraService = Depends(get_service)):
 
 # 3. DELETE CAMERA (DELETE)
 @router.delete("/{camera_id}")
+@in_lane(WRITE)
 def delete_camera(camera_id: UUID, service: CameraService = Depends(get_service)):
     logger.info(f"API: Request to DELETE camera ID={camera_id}")  # (ADDED COMMENT)
     try:
@@ -102,32 +258,166 @@ def delete_camera(camera_id: UUID, service: CameraService = Depends(get_service)
         raise HTTPException(status_code=404, detail=str(e))
 
 
+# 3b. BULK DELETE (DELETE /cameras?cidr=...)
+# Decommissioning a site: every camera matching the filter is removed in ONE
+# repository pass. Same filters as the bulk PATCH; at least one is required.
+@router.delete("/", response_model=BulkResult)
+@in_lane(WRITE)
+def bulk_delete_cameras(
+    model: str | None = None,
+    ip_from: str | None = None,
+    ip_to: str | None = None,
+    cidr: str | None = None,
+    ids: list[UUID] | None = Query(None),
+    service: CameraService = Depends(get_service),
+):
+    logger.info("API: Request to BULK DELETE cameras")
+    result = service.bulk_remove_cameras(
+        model=model, ip_from=ip_from, ip_to=ip_to, cidr=cidr, camera_ids=ids
+    )
+    logger.info(f"API: Bulk delete outcomes {result.counts}")
+    return model_response(result)
+
+
+# Fields every heartbeat rewrites (record_checkin sets both)
+_CHECKIN_FIELDS = frozenset({"last_known_checkin", "last_updated_on"})
+
+
 # 4. LIST ALL CAMERAS (GET)
+# Tag filters take repeated params: ?tags_all=site:berlin&tags_all=floor:2
+#   tags_any → at least one, tags_all → every one, tags_none → none of them
 @router.get("/", response_model=list[CameraDetails])
-def list_cameras(
+async def list_cameras(
     model: str | None = None,
     ip_from: str | None = None,
     ip_to: str | None = None,
     online: bool | None = None,
     page: int = 1,
-    page_size: int = 20,
+    page_size: int = Query(20, ge=1),
+    name: str | None = None,
+    fields: str | None = None,
+    tags_any: list[str] | None = Query(None),
+    tags_all: list[str] | None = Query(None),
+    tags_none: list[str] | None = Query(None),
     service: CameraService = Depends(get_service),
 ):
     logger.info("API: Request to LIST cameras")  # (ADDED COMMENT)
-    cams = service.list_cameras(
+    key = _list_query_key(
+        model, ip_from, ip_to, online, name, page, page_size, fields,
+        tags_any, tags_all, tags_none,
+    )
+    # Results without the fields a heartbeat rewrites (fields=... without
+    # last_known_checkin / last_updated_on) stay valid across heartbeats;
+    # with an online filter only across heartbeats that do not change
+    # anyone's online status.
+    with_checkins = key[-1] is None or not _CHECKIN_FIELDS.isdisjoint(
+        key[-1].split(",")
+    )
+
+    # 1. QUERY CACHE: same query, no write since → served from memory
+    # 2. SINGLE-FLIGHT: identical concurrent queries share ONE computation
+    #    (run on the SCAN lane) and its serialized body
+    # The versions in the cache key are read on the SCAN lane too: with
+    # REPOSITORY_BACKEND=remote each one is a blocking socket round trip,
+    # which must not stall the event loop.
+    cache_key, cached = await lanes.run(
+        SCAN, _list_cache_lookup, service, key, with_checkins, online is not None
+    )
+    if cached is None:
+        cached = await _list_flight.do(
+            cache_key, lambda: lanes.run(SCAN, _cached_list_page, service, cache_key)
+        )
+    body, total = cached
+    # X-Total-Count: number of matches across ALL pages (for pagination UIs)
+    return TrustedJSONResponse(content=body, headers={"X-Total-Count": total})
+
+
+_list_flight = SingleFlight("list_cameras")
+
+
+def _list_cache_lookup(service, key, with_checkins, with_status):
+    cache_key = ("cameras", key, service.data_version(with_checkins, with_status))
+    return cache_key, query_cache.get(cache_key)
+
+
+def _cached_list_page(service, cache_key):
+    key = cache_key[1]
+    # ONE clock reading for the expiry, the count and the page
+    with clock.sampled():
+        # online filters also change when time passes → entry expires when
+        # the oldest online camera times out (taken BEFORE the query: conservative)
+        valid_until = None
+        if key[3] is not None:
+            expiry = service.online_filter_expiry()
+            valid_until = to_ns(expiry) if expiry is not None else None
+        result = _list_page(service, *key)
+    query_cache.put(cache_key, result, result[0], valid_until)
+    return result
+
+
+def _normalized_fields(fields):
+    # " a, b ," → "a,b" (order kept: it is the order of the output keys)
+    return ",".join(f.strip() for f in (fields or "").split(",") if f.strip()) or None
+
+
+def _list_query_key(
+    model, ip_from, ip_to, online, name, page, page_size, fields,
+    tags_any=None, tags_all=None, tags_none=None,
+):
+    # Normalized query: requests that return the same page get the same key
+    # (empty filters = no filter, canonical IP spelling, tags as a sorted
+    # tuple without repeats, page < 1 = page 1).
+    def ip(value):
+        try:
+            return str(ipaddress.ip_address(value)) if value else None
+        except ValueError:
+            return value  # invalid → the computation raises the usual error
+
+    def tags(values):
+        return tuple(sorted(set(values))) if values else None
+
+    return (
+        model or None,
+        ip(ip_from),
+        ip(ip_to),
+        online,
+        name or None,
+        tags(tags_any),
+        tags(tags_all),
+        tags(tags_none),
+        max(1, page),
+        page_size,
+        _normalized_fields(fields),
+    )
+
+
+def _list_page(
+    service, model, ip_from, ip_to, online, name, tags_any, tags_all, tags_none,
+    page, page_size, fields,
+):
+    # → (JSON body, X-Total-Count) of one page; runs on a SCAN lane thread
+    spec = parse_fields(fields, CameraDetails) if fields else None
+    filters = dict(
+        name=name,
         model=model,
         ip_from=ip_from,
         ip_to=ip_to,
         online=online,
-        page=page,
-        page_size=page_size,
+        tags_any=tags_any,
+        tags_all=tags_all,
+        tags_none=tags_none,
     )
+    total = str(service.count_cameras(**filters))
+    cams = service.list_cameras(page=page, page_size=page_size, **filters)
     logger.info(f"API: Returned {len(cams)} cameras in list")  # (ADDED COMMENT)
-    return cams
+    if spec is not None:
+        return JSONResponse(project_many(cams, spec)).body, total
+    return list_response(cams, CameraDetails).body, total
 
 
 # 5. UPDATE CAMERA (PATCH)
 @router.patch("/{camera_id}", response_model=CameraDetails)
+@in_lane(WRITE)
 def update_camera(
     camera_id: UUID,
     updates: CameraUpdate,
@@ -139,7 +429,7 @@ def update_camera(
         logger.info(
             f"API: Successfully updated camera ID={camera_id}"
         )  # (ADDED COMMENT)
-        return cam
+        return model_response(cam)
     except NotFoundError as e:
         logger.warning(
             f"API: Cannot update, camera ID={camera_id} not found"
@@ -147,8 +437,31 @@ def update_camera(
         raise HTTPException(status_code=404, detail=str(e))
 
 
+# 5b. BULK UPDATE (PATCH /cameras?model=...&cidr=...&ids=...)
+# Same CameraUpdate body as above, applied to every camera matching the
+# filter in ONE repository pass. At least one filter is required.
+@router.patch("/", response_model=BulkUpdateResult)
+@in_lane(WRITE)
+def bulk_update_cameras(
+    updates: CameraUpdate,
+    model: str | None = None,
+    ip_from: str | None = None,
+    ip_to: str | None = None,
+    cidr: str | None = None,
+    ids: list[UUID] | None = Query(None),
+    service: CameraService = Depends(get_service),
+):
+    logger.info("API: Request to BULK UPDATE cameras")
+    result = service.bulk_update_cameras(
+        updates, model=model, ip_from=ip_from, ip_to=ip_to, cidr=cidr, camera_ids=ids
+    )
+    logger.info(f"API: Bulk update changed {result.updated} of {result.matched} cameras")
+    return model_response(result)
+
+
 # 6. ADD FEED / STREAM TO CAMERA
 @router.post("/{camera_id}/feeds", response_model=dict)
+@in_lane(WRITE)
 def add_feed(
     camera_id: UUID,
     feed: VideoFeedSetup,
@@ -173,6 +486,7 @@ def add_feed(
 
 # 7. UPDATE FEED
 @router.patch("/{camera_id}/feeds/{feed_id}")
+@in_lane(WRITE)
 def update_feed(
     camera_id: UUID,
     feed_id: UUID,
@@ -193,6 +507,7 @@ def update_feed(
 
 # 8. DELETE FEED
 @router.delete("/{camera_id}/feeds/{feed_id}")
+@in_lane(WRITE)
 def delete_feed(
     camera_id: UUID, feed_id: UUID, service: CameraService = Depends(get_service)
 ):
@@ -210,19 +525,34 @@ def delete_feed(
 
 # 9. GET FEEDS (LIST)
 @router.get("/{camera_id}/feeds", response_model=list[VideoFeedInfo])
+@in_lane(POINT_READ)
 def get_camera_feeds(
     camera_id: UUID,
     protocol: str | None = None,
     port: int | None = None,
     q: str | None = None,
     page: int = 1,
-    page_size: int = 20,
+    page_size: int = Query(20, ge=1),
+    fields: str | None = None,
     service: CameraService = Depends(get_service),
 ):
     logger.info(
         f"API: Request to LIST FEEDS of camera ID={camera_id}"
     )  # (ADDED COMMENT)
+    fields = _normalized_fields(fields)
+    spec = parse_fields(fields, VideoFeedInfo) if fields else None
+    # QUERY CACHE (feeds carry no check-in times → heartbeats keep it valid)
+    protocol = protocol.lower() if protocol else None
+    query = (camera_id, protocol, port, q, page, page_size, fields)
+    cache_key = ("feeds", query, service.data_version(with_checkins=False))
+    cached = query_cache.get(cache_key)
+    if cached is not None:
+        body, total = cached
+        return TrustedJSONResponse(content=body, headers={"X-Total-Count": total})
     try:
+        total = str(
+            service.count_feeds(camera_id, protocol=protocol, port=port, q=q)
+        )
         feeds = service.list_feeds(
             camera_id=camera_id,
             protocol=protocol,
@@ -234,7 +564,12 @@ def get_camera_feeds(
         logger.info(
             f"API: Returned {len(feeds)} feeds for camera ID={camera_id}"
         )  # (ADDED COMMENT)
-        return feeds
+        if spec is not None:
+            body = JSONResponse(project_many(feeds, spec)).body
+        else:
+            body = list_response(feeds, VideoFeedInfo).body
+        query_cache.put(cache_key, (body, total), body)
+        return TrustedJSONResponse(content=body, headers={"X-Total-Count": total})
     except NotFoundError as e:
         logger.warning(f"API: Camera not found while listing feeds")  # (ADDED COMMENT)
         raise HTTPException(status_code=404, detail=str(e))
@@ -242,6 +577,7 @@ def get_camera_feeds(
 
 # 10. HEARTBEAT
 @router.post("/{camera_id}/heartbeat")
+@in_lane(INGEST)
 def heartbeat(camera_id: UUID, service: CameraService = Depends(get_service)):
     logger.info(f"API: HEARTBEAT received for camera ID={camera_id}")  # (ADDED COMMENT)
     try:
@@ -259,22 +595,26 @@ def heartbeat(camera_id: UUID, service: CameraService = Depends(get_service)):
 
 # 11. CAMERA STATUS
 @router.get("/{camera_id}/status", response_model=CameraState)
+@in_lane(POINT_READ)
 def camera_status(camera_id: UUID, service: CameraService = Depends(get_service)):
     logger.info(
         f"API: Request to GET STATUS of camera ID={camera_id}"
     )  # (ADDED COMMENT)
     try:
-        status_bool = service.is_online(camera_id)
+        state = service.camera_state(camera_id)
         cam = service.get_camera(camera_id)
 
         logger.info(
             f"API: Returned status for camera ID={camera_id}"
         )  # (ADDED COMMENT)
 
-        return CameraState(
-            camera_id=camera_id,
-            is_online=status_bool,
-            last_known_checkin=cam.last_known_checkin,
+        return model_response(
+            CameraState(
+                camera_id=camera_id,
+                is_online=state == "online",
+                last_known_checkin=cam.last_known_checkin,
+                state=state,
+            )
         )
 
     except NotFoundError as e:
@@ -282,3 +622,19 @@ def camera_status(camera_id: UUID, service: CameraService = Depends(get_service)
             f"API: Camera ID={camera_id} not found for status check"
         )  # (ADDED COMMENT)
         raise HTTPException(status_code=404, detail=str(e))
+
+
+# 12. CAMERA UPTIME (from the heartbeat history)
+@router.get("/{camera_id}/uptime", response_model=CameraUptime)
+@in_lane(POINT_READ)
+def camera_uptime(
+    camera_id: UUID,
+    window: str = "24h",
+    service: CameraService = Depends(get_service),
+):
+    logger.info(f"API: Request for UPTIME of camera ID={camera_id}")
+    try:
+        return model_response(service.camera_uptime(camera_id, window))
+    except NotFoundError as e:
+        logger.warning(f"API: Camera ID={camera_id} not found for uptime")
+        raise HTTPException(status_code=404, detail=str(e))
@@ -0,0 +1,76 @@
+# Fleet-wide feed endpoints (feeds of ALL cameras, not of one camera).
+# Example questions this answers in one call:
+#   "which cameras expose RTSP on port 8554?"  → GET /feeds?protocol=rtsp&port=8554
+#   "list all HTTP feeds"                       → GET /feeds?protocol=http
+#   "every feed whose path contains 'main'"     → GET /feeds?q=main
+# Fleet-wide feed CHANGES (one call for many cameras):
+#   "move every RTSP feed of 10.1.0.0/16 to port 8554"
+#       → POST /feeds/bulk?cidr=10.1.0.0/16
+#         {"action": "update", "feed_protocol": "rtsp", "updates": {"feed_port": 8554}}
+# Per-camera feed routes stay in camera_api.py under /cameras/{camera_id}/feeds.
+import logging
+from uuid import UUID
+
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import JSONResponse
+
+from app.api.camera_api import get_service
+from app.api.projection import parse_fields, project_many
+from app.api.responses import list_response, model_response
+from app.core.admission import SCAN, WRITE
+from app.core.lanes import in_lane
+from app.models.schemas import BulkFeedOperation, BulkResult, CameraFeedInfo
+from app.service.camera_service import CameraService
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/feeds", tags=["Feed Search"])
+
+
+# 1. SEARCH FEEDS ACROSS THE FLEET
+@router.get("/", response_model=list[CameraFeedInfo])
+@in_lane(SCAN)
+def search_feeds(
+    protocol: str | None = None,
+    port: int | None = None,
+    q: str | None = None,
+    page: int = 1,
+    page_size: int = Query(20, ge=1),
+    fields: str | None = None,
+    service: CameraService = Depends(get_service),
+):
+    logger.info(f"API: Request to SEARCH feeds protocol={protocol} port={port}")
+    spec = parse_fields(fields, CameraFeedInfo) if fields else None
+    # X-Total-Count: number of matches across ALL pages
+    total = str(service.count_search_feeds(protocol=protocol, port=port, q=q))
+    feeds = service.search_feeds(
+        protocol=protocol, port=port, q=q, page=page, page_size=page_size
+    )
+    logger.info(f"API: Returned {len(feeds)} feeds from fleet search")
+    headers = {"X-Total-Count": total}
+    if spec is not None:
+        return JSONResponse(project_many(feeds, spec), headers=headers)
+    return list_response(feeds, CameraFeedInfo, headers=headers)
+
+
+# 2. BULK ADD / UPDATE / REMOVE FEEDS ACROSS A CAMERA FILTER
+# Cameras: query string filter (model, ip_from/ip_to, cidr, ids; at least one).
+# Body: what to do (see BulkFeedOperation). Every camera is changed in ONE
+# repository pass; the result lists the outcome of every feed.
+@router.post("/bulk", response_model=BulkResult)
+@in_lane(WRITE)
+def bulk_feeds(
+    op: BulkFeedOperation,
+    model: str | None = None,
+    ip_from: str | None = None,
+    ip_to: str | None = None,
+    cidr: str | None = None,
+    ids: list[UUID] | None = Query(None),
+    service: CameraService = Depends(get_service),
+):
+    logger.info(f"API: Request for BULK FEED {op.action.upper()}")
+    result = service.bulk_feeds(
+        op, model=model, ip_from=ip_from, ip_to=ip_to, cidr=cidr, camera_ids=ids
+    )
+    logger.info(f"API: Bulk feed outcomes {result.counts}")
+    return model_response(result)
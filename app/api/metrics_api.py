@@ -0,0 +1,19 @@
+# Operational metrics endpoint.
+# Returns every counter / gauge recorded in app.core.metrics as one flat JSON
+# object, e.g. {"compression.bytes_in": 123456, "compression.ratio": 7.9, ...}
+import logging
+
+from fastapi import APIRouter
+
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/metrics", tags=["Metrics"])
+
+
+# 1. METRICS SNAPSHOT
+@router.get("/", response_model=dict[str, float])
+def get_metrics():
+    logger.info("API: Request for METRICS")
+    return metrics.snapshot()
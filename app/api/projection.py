@@ -0,0 +1,117 @@
+# SPARSE FIELD PROJECTION (?fields=...)
+#
+# Most list calls only need a few values (camera_id, camera_name, IP), but the
+# normal path serializes the WHOLE CameraDetails (image_settings, every feed ...)
+# and response_model validates all of it again.
+#
+# With ?fields= the route projects straight from the stored record instead:
+#   fields=camera_id,camera_name,network_setup.ip_address
+#       → {"camera_id": "...", "camera_name": "...",
+#          "network_setup": {"ip_address": "..."}}
+#
+# Rules:
+#   - comma separated field names, dotted names select inside nested models
+#     (also inside lists: available_feeds.feed_port)
+#   - a plain name selects the whole value (network_setup → full sub-object)
+#   - unknown names → ValidationError (400), checked ONCE per request
+#   - values are converted with the same JSON rules Pydantic uses
+#     (UUID / IP / datetime → string), so projected values look exactly
+#     like the ones in the full response.
+
+import typing
+from ipaddress import IPv4Address, IPv6Address
+from typing import Any, Dict, Iterable, List, Optional, Type
+
+from pydantic import BaseModel
+from pydantic_core import to_jsonable_python
+
+from app.core.exceptions import ValidationError
+
+# field name → nested spec (None = take the whole value)
+FieldSpec = Dict[str, Optional["FieldSpec"]]
+
+# Values of these types are already valid JSON → no conversion call needed.
+_PLAIN_TYPES = (str, int, float, bool, type(None))
+# to_jsonable_python falls back to a slow generic path for IP objects;
+# str() gives the same text, faster.
+_STR_TYPES = (IPv4Address, IPv6Address)
+
+
+def parse_fields(fields: str, model: Type[BaseModel]) -> FieldSpec:
+    """
+    Turn "a,b.c" into {"a": None, "b": {"c": None}} after checking every
+    name against `model`. Field order follows the query string.
+    """
+    spec: FieldSpec = {}
+    for raw in fields.split(","):
+        path = raw.strip()
+        if not path:
+            continue
+        _add_path(spec, path.split("."), model, path)
+
+    if not spec:
+        raise ValidationError("fields must name at least one field.")
+    return spec
+
+
+def project(obj: BaseModel, spec: FieldSpec) -> Dict[str, Any]:
+    """
+    JSON-ready dict with only the fields in `spec`, read from `obj` directly
+    (no intermediate model is built).
+    """
+    out: Dict[str, Any] = {}
+    for name, sub in spec.items():
+        value = getattr(obj, name)
+        if sub is None:
+            kind = type(value)
+            if kind in _PLAIN_TYPES:
+                out[name] = value
+            elif kind in _STR_TYPES:
+                out[name] = str(value)
+            else:
+                out[name] = to_jsonable_python(value)
+        elif isinstance(value, list):
+            out[name] = [project(item, sub) for item in value]
+        elif value is None:
+            out[name] = None
+        else:
+            out[name] = project(value, sub)
+    return out
+
+
+def project_many(objs: Iterable[BaseModel], spec: FieldSpec) -> List[Dict[str, Any]]:
+    return [project(obj, spec) for obj in objs]
+
+
+# HELPERS
+def _add_path(
+    spec: FieldSpec, parts: List[str], model: Type[BaseModel], full: str
+) -> None:
+    name = parts[0]
+    field = model.model_fields.get(name)
+    if field is None:
+        raise ValidationError(f"Unknown field '{full}'.")
+
+    if len(parts) == 1:
+        spec[name] = None  # whole value wins over earlier sub-selections
+        return
+
+    nested = _nested_model(field.annotation)
+    if nested is None:
+        raise ValidationError(f"Field '{full}' has no sub-fields.")
+
+    if name in spec and spec[name] is None:
+        return  # whole value already selected
+    sub = spec.setdefault(name, {})
+    _add_path(sub, parts[1:], nested, full)
+
+
+def _nested_model(annotation: Any) -> Optional[Type[BaseModel]]:
+    # CameraNetworkInfo, Optional[ImageQuality], List[VideoFeedInfo] → the model
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return annotation
+    for arg in typing.get_args(annotation):
+        found = _nested_model(arg)
+        if found is not None:
+            return found
+    return None
@@ -0,0 +1,54 @@
+# FAST JSON RESPONSES FOR TRUSTED REPOSITORY OBJECTS
+#
+# A route declared with response_model=CameraDetails (or list[CameraDetails])
+# makes FastAPI, for EVERY response:
+#   1. validate the returned objects against the response model again,
+#   2. dump them to Python dicts (mode="json") and run jsonable_encoder,
+#   3. json.dumps the result.
+# The repository already returns validated Pydantic models, so steps 1-3 only
+# repeat work. The helpers below serialize those objects straight to JSON
+# bytes with Pydantic's Rust serializer instead.
+#
+# When a route RETURNS a Response, FastAPI skips its response_model handling,
+# so routes keep `response_model=...` in the decorator (OpenAPI docs stay
+# exactly the same) and return `model_response(...)` / `list_response(...)`.
+#
+# Only use these for objects built by our own models (trusted data).
+
+from functools import lru_cache
+from typing import Dict, Optional, Sequence, Type
+
+from fastapi import Response
+from pydantic import BaseModel, TypeAdapter
+
+
+class TrustedJSONResponse(Response):
+    """
+    Response whose body is already JSON bytes (no json.dumps at render time).
+    """
+
+    media_type = "application/json"
+
+
+def model_response(
+    obj: BaseModel, headers: Optional[Dict[str, str]] = None
+) -> TrustedJSONResponse:
+    """One model → JSON bytes via model_dump_json()."""
+    return TrustedJSONResponse(content=obj.model_dump_json(), headers=headers)
+
+
+def list_response(
+    items: Sequence[BaseModel],
+    model: Type[BaseModel],
+    headers: Optional[Dict[str, str]] = None,
+) -> TrustedJSONResponse:
+    """A list of `model` objects → JSON bytes with one dump_json() call."""
+    return TrustedJSONResponse(
+        content=_list_adapter(model).dump_json(items), headers=headers
+    )
+
+
+@lru_cache(maxsize=None)
+def _list_adapter(model: Type[BaseModel]) -> TypeAdapter:
+    # Building a TypeAdapter compiles a serializer → do it once per model.
+    return TypeAdapter(list[model])
@@ -0,0 +1,239 @@
+# ADMISSION CONTROL + LOAD SHEDDING
+#
+# Problem:
+#   A burst of expensive scans (GET /cameras?online=...) fills the shared
+#   request thread pool. Heartbeats then wait behind them, arrive late, and
+#   cameras are marked OFFLINE although they are fine (a false outage).
+#
+# Solution (pure ASGI middleware, outermost in app/main.py):
+#   1. Every request gets a ROUTE CLASS (see classify_route):
+#        ingest      → POST /cameras/{id}/heartbeat            (never limited)
+#        point_read  → GET one camera / its status / feeds / uptime / stats
+#                                                                (never limited)
+#        scan        → GET /cameras, /cameras/export, /cameras/uptime,
+#                      /cameras/analytics/..., /feeds             (low priority)
+#        write       → other POST / PATCH / DELETE              (limited)
+#        other       → /, /docs, /openapi.json, /metrics        (never limited)
+#   2. Limited classes have a maximum number of requests IN FLIGHT. Extra
+#      requests wait in a queue; when the wait exceeds the class's budget the
+#      request is SHED with 503 + Retry-After instead of piling up.
+#      → scans can never occupy more than their share of the thread pool, so
+#        heartbeats and status checks keep their latency.
+#   3. Optional per-client TOKEN BUCKET (RATE_LIMIT_PER_SECOND > 0) for the
+#      limited classes → 429 + Retry-After when a client is over its rate.
+#   4. In-flight counts, queue wait, admitted / shed / rate-limited counters
+#      go to app.core.metrics as "admission.<class>.<what>".
+
+import asyncio
+import json
+import math
+import re
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.core.config import Config
+from app.core.metrics import metrics
+
+INGEST = "ingest"
+POINT_READ = "point_read"
+SCAN = "scan"
+WRITE = "write"
+OTHER = "other"
+
+_HEARTBEAT = re.compile(r"^/cameras/[^/]+/heartbeat/?$")
+_SCANS = re.compile(
+    r"^/(cameras/?|cameras/(export|uptime|analytics/[^/]+)/?|feeds/?)$"
+)
+_CAMERA_READS = re.compile(r"^/cameras/[^/]+(/status|/feeds|/uptime)?/?$")
+
+
+def classify_route(method: str, path: str) -> str:
+    """
+    Route class of a request (decides its limits and priority).
+    """
+    if method == "POST" and _HEARTBEAT.match(path):
+        return INGEST
+    if method in ("GET", "HEAD"):
+        if _SCANS.match(path):
+            return SCAN
+        if _CAMERA_READS.match(path):
+            return POINT_READ  # includes /cameras/stats (counter based, cheap)
+        return OTHER
+    if method in ("POST", "PATCH", "PUT", "DELETE"):
+        return WRITE
+    return OTHER
+
+
+class TokenBucket:
+    """
+    `rate` tokens per second, at most `burst` saved up. One token per request.
+    """
+
+    def __init__(self, rate: float, burst: float, now: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = now
+
+    def take(self, now: float) -> float:
+        """
+        Take one token. Returns 0 when allowed, otherwise the seconds until
+        the next token is available.
+        """
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class _ClassGate:
+    """
+    In-flight limit + bounded queue wait for ONE route class.
+    """
+
+    def __init__(self, name: str, max_inflight: int, queue_budget: float):
+        self.name = name
+        self.queue_budget = queue_budget
+        self._slots = asyncio.Semaphore(max_inflight)
+
+    async def acquire(self) -> bool:
+        """
+        Wait for a slot for at most queue_budget seconds. False → shed.
+        """
+        if not self._slots.locked():
+            await self._slots.acquire()  # free slot → no waiting, no timer
+            return True
+
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.queue_budget)
+        except asyncio.TimeoutError:
+            metrics.incr(f"admission.{self.name}.queue_wait_seconds", self.queue_budget)
+            return False
+        metrics.incr(
+            f"admission.{self.name}.queue_wait_seconds", time.perf_counter() - start
+        )
+        return True
+
+    def release(self) -> None:
+        self._slots.release()
+
+
+class AdmissionMiddleware:
+    def __init__(
+        self,
+        app: ASGIApp,
+        limits: Optional[Dict[str, tuple]] = None,
+        rate_per_second: Optional[float] = None,
+        burst: Optional[float] = None,
+        max_clients: int = 10000,
+    ):
+        """
+        limits: route class → (max in flight, max queue wait in seconds).
+        Classes without a limit are never queued or shed.
+        """
+        self.app = app
+        if limits is None:
+            limits = {
+                SCAN: (
+                    Config.ADMISSION_SCAN_MAX_INFLIGHT,
+                    Config.ADMISSION_SCAN_QUEUE_BUDGET_MS / 1000,
+                ),
+                WRITE: (
+                    Config.ADMISSION_WRITE_MAX_INFLIGHT,
+                    Config.ADMISSION_WRITE_QUEUE_BUDGET_MS / 1000,
+                ),
+            }
+        self.gates = {
+            name: _ClassGate(name, max_inflight, budget)
+            for name, (max_inflight, budget) in limits.items()
+        }
+        self.inflight: Dict[str, int] = {}
+        self.rate = (
+            Config.RATE_LIMIT_PER_SECOND if rate_per_second is None else rate_per_second
+        )
+        self.burst = Config.RATE_LIMIT_BURST if burst is None else burst
+        self.max_clients = max_clients
+        self._buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        route_class = classify_route(scope["method"], scope["path"])
+        gate = self.gates.get(route_class)
+
+        if gate is not None and self.rate > 0:
+            retry_after = self._rate_limit_wait(scope)
+            if retry_after:
+                metrics.incr(f"admission.{route_class}.rate_limited")
+                await _reject(send, scope, 429, "Too Many Requests", retry_after)
+                return
+
+        if gate is not None and not await gate.acquire():
+            metrics.incr(f"admission.{route_class}.shed")
+            await _reject(
+                send, scope, 503, "Service Unavailable", max(gate.queue_budget, 1)
+            )
+            return
+
+        metrics.incr(f"admission.{route_class}.admitted")
+        self._track(route_class, +1)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self._track(route_class, -1)
+            if gate is not None:
+                gate.release()
+
+    # HELPERS
+    def _track(self, route_class: str, delta: int) -> None:
+        count = self.inflight.get(route_class, 0) + delta
+        self.inflight[route_class] = count
+        metrics.set_gauge(f"admission.{route_class}.inflight", count)
+
+    def _rate_limit_wait(self, scope: Scope) -> float:
+        client = scope.get("client")
+        client_id = client[0] if client else "unknown"
+        now = time.monotonic()
+
+        bucket = self._buckets.get(client_id)
+        if bucket is None:
+            bucket = TokenBucket(self.rate, self.burst, now)
+            self._buckets[client_id] = bucket
+            if len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)  # forget the least recent client
+        else:
+            self._buckets.move_to_end(client_id)
+        return bucket.take(now)
+
+
+async def _reject(
+    send: Send, scope: Scope, status: int, error: str, retry_after: float
+) -> None:
+    # Same JSON shape as the global error handlers in core/exceptions.py
+    body = json.dumps(
+        {
+            "error": error,
+            "detail": "Server is busy, retry later.",
+            "path": scope["path"],
+        }
+    ).encode()
+    await send(
+        {
+            "type": "http.response.start",
+            "status": status,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(math.ceil(retry_after)).encode()),
+            ],
+        }
+    )
+    await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,132 @@
+# MONOTONIC, REQUEST-SCOPED CLOCK (integer nanoseconds)
+#
+# Problem:
+#   Status math called datetime.now(timezone.utc) again and again: a heartbeat
+#   read the clock twice (check-in + last_updated_on), one list request read it
+#   for the online filter and again for the cache expiry, and every check did
+#   timezone-aware datetime arithmetic. The wall clock can also jump (NTP), so
+#   "seconds since the last heartbeat" could even be negative.
+#
+# Solution:
+#   now_ns() → integer nanoseconds since the epoch, taken from
+#              time.monotonic_ns() and anchored to the wall clock ONCE (at
+#              startup). It never goes backwards; status math is int math.
+#   sampled() → the clock is read ONCE and every now_ns() inside the block
+#              (same request / same batch, also in worker threads started from
+#              it) returns that same value. RequestClockMiddleware opens one
+#              block per HTTP request, so one response never disagrees with
+#              itself.
+#   now()    → datetime for OUTPUT only (last_known_checkin, added_on, ...).
+#
+# Tests travel in time with the manual mode:
+#   clock.configure(start=datetime(...))  → time stands still at `start`
+#   clock.advance(90)                     → 90 seconds later
+#   clock.configure()                     → back to the system clock
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timedelta, timezone
+from typing import Iterator, Optional
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+NS_PER_SECOND = 1_000_000_000
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_ONE_MICROSECOND = timedelta(microseconds=1)
+
+# the reading shared by everything inside clock.sampled()
+_sampled_ns: ContextVar[Optional[int]] = ContextVar("sampled_ns", default=None)
+
+
+def seconds_to_ns(seconds: float) -> int:
+    return round(seconds * NS_PER_SECOND)
+
+
+def to_ns(when: datetime) -> int:
+    """
+    datetime → nanoseconds since the epoch (naive = local time, as timestamp()).
+    """
+    if when.tzinfo is None:
+        when = when.astimezone()
+    # integer arithmetic: no float rounding of 19-digit values
+    return (when - _EPOCH) // _ONE_MICROSECOND * 1000
+
+
+def to_datetime(ns: int) -> datetime:
+    """
+    nanoseconds since the epoch → UTC datetime (microsecond precision).
+    """
+    return _EPOCH + timedelta(microseconds=ns // 1000)
+
+
+class Clock:
+    def __init__(self):
+        self.configure()
+
+    def configure(self, start: Optional[datetime] = None) -> None:
+        """
+        start None → system clock (monotonic, anchored to the wall clock now).
+        start set  → manual clock standing still at `start` (tests).
+        """
+        self._manual_ns = None if start is None else to_ns(start)
+        self._wall_ns = time.time_ns()
+        self._mono_ns = time.monotonic_ns()
+
+    def advance(self, seconds: float) -> None:
+        """
+        Move the manual clock forward (configure(start=...) first).
+        """
+        if self._manual_ns is None:
+            raise RuntimeError("advance() needs a manual clock")
+        self._manual_ns += seconds_to_ns(seconds)
+
+    def read_ns(self) -> int:
+        # a FRESH reading (ignores sampled())
+        if self._manual_ns is not None:
+            return self._manual_ns
+        return self._wall_ns + time.monotonic_ns() - self._mono_ns
+
+    def now_ns(self) -> int:
+        sampled = _sampled_ns.get()
+        return self.read_ns() if sampled is None else sampled
+
+    def now(self) -> datetime:
+        return to_datetime(self.now_ns())
+
+    @contextmanager
+    def sampled(self) -> Iterator[int]:
+        """
+        Read the clock once; now_ns() returns that reading inside the block.
+        Nested blocks keep the outer reading.
+        """
+        if _sampled_ns.get() is not None:
+            yield _sampled_ns.get()
+            return
+        token = _sampled_ns.set(self.read_ns())
+        try:
+            yield _sampled_ns.get()
+        finally:
+            _sampled_ns.reset(token)
+
+
+# ONE clock for the whole process
+clock = Clock()
+
+
+class RequestClockMiddleware:
+    """
+    Every HTTP request runs inside clock.sampled(): one clock reading per
+    request (route body, service, repository, worker threads).
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        with clock.sampled():
+            await self.app(scope, receive, send)
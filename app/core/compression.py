@@ -0,0 +1,243 @@
+# RESPONSE COMPRESSION MIDDLEWARE (stdlib zlib, gzip / deflate)
+#
+# Full camera listings and exports are large, very repetitive JSON that travels
+# over a WAN, so compressing them saves most of the bytes.
+#
+# How it works (pure ASGI middleware, registered in app/main.py):
+#   1. NEGOTIATE: pick "gzip" or "deflate" from the request's Accept-Encoding
+#      (q-values respected, q=0 means "not allowed"). Nothing acceptable → the
+#      response passes through untouched.
+#   2. WHOLE RESPONSES (one body message):
+#        smaller than COMPRESSION_MIN_BYTES → sent as is (not worth the CPU)
+#        smaller than COMPRESSION_LARGE_BYTES → COMPRESSION_LEVEL_SMALL
+#        otherwise → COMPRESSION_LEVEL_LARGE (big payloads: favour speed)
+#   3. STREAMING RESPONSES (several body messages, e.g. GET /cameras/export):
+#        compressed INCREMENTALLY with one compressor per response. Every chunk
+#        is flushed with Z_SYNC_FLUSH so the client can decode it right away;
+#        nothing is buffered until the end.
+#   4. METRICS: bytes before/after, overall ratio and the CPU time spent in
+#      zlib are recorded in app.core.metrics (visible on GET /metrics).
+#
+# Responses that already have a Content-Encoding, or whose media type is not
+# text-like (JSON, NDJSON, text/*), are never touched.
+
+import time
+import zlib
+from typing import Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import Config
+from app.core.metrics import metrics
+
+# encoding → zlib wbits (31 = gzip container, 15 = zlib container = HTTP "deflate")
+ENCODINGS = {"gzip": 31, "deflate": 15}
+
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/")
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """
+    Best supported encoding for an Accept-Encoding header, or None.
+    On equal q-values gzip wins (order of ENCODINGS).
+    """
+    weights = {}
+    for part in accept_encoding.split(","):
+        token, _, params = part.strip().partition(";")
+        token = token.strip().lower()
+        if not token:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[token] = q
+
+    best, best_q = None, 0.0
+    for encoding in ENCODINGS:
+        q = weights.get(encoding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+class CompressionMiddleware:
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: Optional[int] = None,
+        large_size: Optional[int] = None,
+        level_small: Optional[int] = None,
+        level_large: Optional[int] = None,
+    ):
+        self.app = app
+        self.minimum_size = (
+            Config.COMPRESSION_MIN_BYTES if minimum_size is None else minimum_size
+        )
+        self.large_size = (
+            Config.COMPRESSION_LARGE_BYTES if large_size is None else large_size
+        )
+        self.level_small = (
+            Config.COMPRESSION_LEVEL_SMALL if level_small is None else level_small
+        )
+        self.level_large = (
+            Config.COMPRESSION_LEVEL_LARGE if level_large is None else level_large
+        )
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        responder = _CompressingResponder(self, encoding, send)
+        await self.app(scope, receive, responder.send)
+
+    def level_for(self, size: int) -> int:
+        return self.level_small if size < self.large_size else self.level_large
+
+
+class _CompressingResponder:
+    """
+    Wraps `send` for ONE response and compresses its body messages.
+    """
+
+    def __init__(self, middleware: CompressionMiddleware, encoding: str, send: Send):
+        self.middleware = middleware
+        self.encoding = encoding
+        self.send_downstream = send
+        self.start_message: Optional[Message] = None
+        self.mode: Optional[str] = None  # "passthrough" | "stream"
+        self.compressor = None
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.cpu_seconds = 0.0
+
+    async def send(self, message: Message) -> None:
+        kind = message["type"]
+
+        if kind == "http.response.start":
+            # Held back until the first body message tells us the body size.
+            self.start_message = message
+            return
+
+        if kind != "http.response.body":
+            await self.send_downstream(message)
+            return
+
+        if self.mode == "passthrough":
+            await self.send_downstream(message)
+            return
+        if self.mode == "stream":
+            await self._send_stream_chunk(message)
+            return
+
+        # FIRST BODY MESSAGE → decide what to do with this response
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        headers = MutableHeaders(scope=self.start_message)
+
+        if not self._compressible(headers):
+            await self._pass_through(message)
+            return
+
+        headers.add_vary_header("Accept-Encoding")
+
+        if not more_body:
+            await self._send_whole(headers, body)
+            return
+
+        # STREAMING (size unknown) → large payload level, incremental output
+        if (
+            "content-length" in headers
+            and int(headers["content-length"]) < self.middleware.minimum_size
+        ):
+            await self._pass_through(message)
+            return
+        self.mode = "stream"
+        self.compressor = self._new_compressor(self.middleware.level_large)
+        headers["Content-Encoding"] = self.encoding
+        del headers["Content-Length"]
+        await self.send_downstream(self.start_message)
+        await self._send_stream_chunk(message)
+
+    # HELPERS
+    def _compressible(self, headers: MutableHeaders) -> bool:
+        if "content-encoding" in headers:
+            return False
+        media_type = headers.get("content-type", "")
+        return media_type.startswith(COMPRESSIBLE_TYPES)
+
+    async def _pass_through(self, message: Message) -> None:
+        self.mode = "passthrough"
+        await self.send_downstream(self.start_message)
+        await self.send_downstream(message)
+
+    async def _send_whole(self, headers: MutableHeaders, body: bytes) -> None:
+        if len(body) < self.middleware.minimum_size:
+            metrics.incr("compression.skipped_small")
+            await self.send_downstream(self.start_message)
+            await self.send_downstream({"type": "http.response.body", "body": body})
+            return
+
+        compressor = self._new_compressor(self.middleware.level_for(len(body)))
+        compressed = self._timed(compressor.compress, body) + self._timed(
+            compressor.flush
+        )
+        self.bytes_in, self.bytes_out = len(body), len(compressed)
+
+        headers["Content-Encoding"] = self.encoding
+        headers["Content-Length"] = str(len(compressed))
+        await self.send_downstream(self.start_message)
+        await self.send_downstream({"type": "http.response.body", "body": compressed})
+        self._record()
+
+    async def _send_stream_chunk(self, message: Message) -> None:
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        self.bytes_in += len(body)
+        out = self._timed(self.compressor.compress, body)
+        if more_body:
+            # Z_SYNC_FLUSH: emit everything so far, keep the stream open
+            out += self._timed(self.compressor.flush, zlib.Z_SYNC_FLUSH)
+        else:
+            out += self._timed(self.compressor.flush)
+        self.bytes_out += len(out)
+
+        if out or not more_body:
+            await self.send_downstream(
+                {"type": "http.response.body", "body": out, "more_body": more_body}
+            )
+        if not more_body:
+            self._record()
+
+    def _new_compressor(self, level: int):
+        return zlib.compressobj(level, zlib.DEFLATED, ENCODINGS[self.encoding])
+
+    def _timed(self, fn, *args) -> bytes:
+        # thread_time → CPU time of THIS thread only (not other requests)
+        start = time.thread_time()
+        result = fn(*args)
+        self.cpu_seconds += time.thread_time() - start
+        return result
+
+    def _record(self) -> None:
+        metrics.incr("compression.responses")
+        metrics.incr(f"compression.responses.{self.encoding}")
+        metrics.incr("compression.bytes_in", self.bytes_in)
+        metrics.incr("compression.bytes_out", self.bytes_out)
+        metrics.incr("compression.cpu_seconds", self.cpu_seconds)
+        total_out = metrics.get("compression.bytes_out")
+        if total_out:
+            metrics.set_gauge(
+                "compression.ratio", metrics.get("compression.bytes_in") / total_out
+            )
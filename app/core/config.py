@@ -6,13 +6,58 @@
 #
 # We load values from a `.env` file using python-dotenv module.
 # If the value is not present in `.env`, we use the default fallback.
+#
+# LAZY LOADING (fast cold start):
+# Importing this module does NOT read `.env` any more. The file is loaded
+# on the FIRST read of any Config value (or explicitly by Config.load() in the
+# app's lifespan), and each value is parsed once: after its first read the
+# setting is replaced by a plain class attribute, so hot paths pay nothing.
 
 import os
+from typing import Callable, Dict
+
+_env_file_loaded = False
+
+
+def _load_env_file() -> None:
+    # Load the .env file into environment variables (only once per process).
+    global _env_file_loaded
+    if _env_file_loaded:
+        return
+    from dotenv import load_dotenv  # imported here: not needed until first use
 
-from dotenv import load_dotenv
+    load_dotenv()
+    _env_file_loaded = True
+
+
+class _EnvSetting:
+    """
+    One Config value read from the environment on first access.
+    """
 
-# Load the .env file into environment variables.
-load_dotenv()
+    def __init__(self, default, cast: Callable):
+        self.default = default
+        self.cast = cast
+        self.name = ""
+
+    def __set_name__(self, owner, name):
+        self.name = name
+        _SETTINGS[name] = self
+
+    def __get__(self, obj, owner):
+        _load_env_file()
+        value = self.cast(os.getenv(self.name, self.default))
+        setattr(owner, self.name, value)  # later reads: plain attribute
+        return value
+
+
+def _as_bool(value) -> bool:
+    # "1" / "true" / "yes" / "on" (any case) → True, anything else → False
+    return str(value).strip().lower() in ("1", "true", "yes", "on")
+
+
+# setting name → its lazy reader (used by Config.load() to re-read values)
+_SETTINGS: Dict[str, _EnvSetting] = {}
 
 
 class Config:
@@ -22,13 +67,130 @@ class Config:
 
     # HEARTBEAT TIMEOUT (SECONDS)
     # If a camera's heartbeat is older than this value → camera is considered OFFLINE.
-    HEARTBEAT_TIMEOUT: int = int(os.getenv("HEARTBEAT_TIMEOUT", 60))
+    HEARTBEAT_TIMEOUT: int = _EnvSetting(60, int)
 
     # Default ports for different stream types.
     # These are optional helpers (not used actively in core logic,
     # but useful for future enhancements).
-    DEFAULT_RTSP_HQ_PORT: int = int(os.getenv("DEFAULT_RTSP_HQ_PORT", 554))
+    DEFAULT_RTSP_HQ_PORT: int = _EnvSetting(554, int)
+
+    DEFAULT_RTSP_LQ_PORT: int = _EnvSetting(8554, int)
+
+    DEFAULT_HTTP_PORT: int = _EnvSetting(8080, int)
+
+    # STORAGE BACKEND (name registered in app/repository/registry.py)
+    REPOSITORY_BACKEND: str = _EnvSetting("memory", str)
+    # "sharded" backend: number of inner repositories (camera_id hash → shard);
+    # list / filter / export scans fan out over one thread per shard.
+    REPOSITORY_SHARDS: int = _EnvSetting(8, int)
+    # "remote" backend: the fleet lives in ONE storage server process
+    # (python -m app.repository.storage_server) listening on STORAGE_SOCKET, so
+    # every uvicorn worker shares it. Each worker keeps STORAGE_POOL_SIZE
+    # pipelined connections; a call without an answer after
+    # STORAGE_TIMEOUT_SECONDS fails with 503.
+    STORAGE_SOCKET: str = _EnvSetting("/tmp/camera-storage.sock", str)
+    STORAGE_POOL_SIZE: int = _EnvSetting(4, int)
+    STORAGE_TIMEOUT_SECONDS: float = _EnvSetting(5.0, float)
+
+    # REPLICATION (app/repository/replication.py, memory backend only)
+    # ROLE: "" (off) | "leader" | "follower". The leader listens on ADDRESS
+    # (host:port), followers connect to it and serve read-only routes.
+    # LOG_SIZE records are kept for followers that reconnect; one further
+    # behind gets a snapshot. The leader pings every PING_SECONDS when idle;
+    # a follower more than MAX_LAG_SECONDS behind answers reads with 503.
+    REPLICATION_ROLE: str = _EnvSetting("", str)
+    REPLICATION_ADDRESS: str = _EnvSetting("127.0.0.1:7400", str)
+    REPLICATION_LOG_SIZE: int = _EnvSetting(100000, int)
+    REPLICATION_PING_SECONDS: float = _EnvSetting(0.5, float)
+    REPLICATION_MAX_LAG_SECONDS: float = _EnvSetting(5.0, float)
+
+    # FLEET STATISTICS (GET /cameras/stats)
+    # Cameras are grouped "by subnet" using these prefix lengths.
+    STATS_SUBNET_PREFIX_V4: int = _EnvSetting(24, int)
+    STATS_SUBNET_PREFIX_V6: int = _EnvSetting(64, int)
+
+    # RESPONSE COMPRESSION (app/core/compression.py)
+    # Bodies smaller than COMPRESSION_MIN_BYTES are sent uncompressed.
+    # Bodies from COMPRESSION_LARGE_BYTES up use the cheaper LARGE level
+    # (streamed exports always do); smaller ones use the SMALL level.
+    COMPRESSION_MIN_BYTES: int = _EnvSetting(1024, int)
+    COMPRESSION_LARGE_BYTES: int = _EnvSetting(1048576, int)
+    COMPRESSION_LEVEL_SMALL: int = _EnvSetting(6, int)
+    COMPRESSION_LEVEL_LARGE: int = _EnvSetting(1, int)
+
+    # IDEMPOTENCY KEYS (app/core/idempotency.py)
+    # How many Idempotency-Key responses are remembered, and for how long.
+    IDEMPOTENCY_MAX_KEYS: int = _EnvSetting(10000, int)
+    IDEMPOTENCY_TTL_SECONDS: float = _EnvSetting(3600.0, float)
+
+    # ADMISSION CONTROL (app/core/admission.py)
+    # Scans (list / export / fleet feed search) and writes may only have this
+    # many requests in flight; extra requests wait at most *_QUEUE_BUDGET_MS
+    # and are then rejected with 503 + Retry-After. Heartbeats and point
+    # reads are never limited.
+    ADMISSION_SCAN_MAX_INFLIGHT: int = _EnvSetting(8, int)
+    ADMISSION_SCAN_QUEUE_BUDGET_MS: float = _EnvSetting(500.0, float)
+    ADMISSION_WRITE_MAX_INFLIGHT: int = _EnvSetting(16, int)
+    ADMISSION_WRITE_QUEUE_BUDGET_MS: float = _EnvSetting(2000.0, float)
+
+    # EXECUTION LANES (app/core/lanes.py)
+    # Worker threads per route class. Together they replace anyio's single
+    # shared pool of 40 threads, so a scan flood cannot use up the threads
+    # heartbeats need.
+    LANE_INGEST_THREADS: int = _EnvSetting(8, int)
+    LANE_POINT_READ_THREADS: int = _EnvSetting(12, int)
+    LANE_SCAN_THREADS: int = _EnvSetting(4, int)
+    LANE_WRITE_THREADS: int = _EnvSetting(12, int)
+
+    # QUERY RESULT CACHE (app/core/query_cache.py)
+    # Serialized results of GET /cameras/ and GET /cameras/{id}/feeds, keyed
+    # by (query, repository version), LRU-evicted above QUERY_CACHE_MAX_BYTES.
+    QUERY_CACHE_ENABLED: bool = _EnvSetting(True, _as_bool)
+    QUERY_CACHE_MAX_BYTES: int = _EnvSetting(32 * 1024 * 1024, int)
+
+    # PER-CLIENT RATE LIMIT for scans + writes (token bucket, 0 = disabled)
+    RATE_LIMIT_PER_SECOND: float = _EnvSetting(0.0, float)
+    RATE_LIMIT_BURST: float = _EnvSetting(20.0, float)
+
+    # HEARTBEAT HISTORY (app/repository/heartbeat_history.py)
+    # Heartbeats kept per camera (ring buffer, oldest overwritten) and the
+    # memory cap for all buffers together (8 bytes per heartbeat).
+    # Default: 24h of history at one heartbeat every 30 s.
+    HEARTBEAT_HISTORY_SIZE: int = _EnvSetting(2880, int)
+    HEARTBEAT_HISTORY_MAX_BYTES: int = _EnvSetting(64 * 1024 * 1024, int)
+    # GET /cameras/uptime: cameras below this uptime fraction miss the SLA
+    UPTIME_SLA_TARGET: float = _EnvSetting(0.99, float)
+
+    # STATUS HYSTERESIS + FLAP DETECTION (app/repository/status_tracker.py)
+    # offline after N missed HEARTBEAT_TIMEOUTs, online again after M heartbeats
+    # in a row; FLAP_THRESHOLD transitions within FLAP_WINDOW seconds → "flapping"
+    # (0 = no flap detection). 1 / 1 = the plain HEARTBEAT_TIMEOUT rule.
+    STATUS_OFFLINE_AFTER_MISSES: int = _EnvSetting(1, int)
+    STATUS_ONLINE_AFTER_HITS: int = _EnvSetting(1, int)
+    STATUS_FLAP_WINDOW: float = _EnvSetting(600.0, float)
+    STATUS_FLAP_THRESHOLD: int = _EnvSetting(6, int)
+
+    # EXPORT (GET /cameras/export): cameras written per streamed chunk
+    EXPORT_BATCH_SIZE: int = _EnvSetting(500, int)
+
+    # MICROBENCHMARK REGRESSION GATE
+    # A benchmarked method FAILS the `benchmark` pytest marker when its median time
+    # is slower than (stored baseline × this ratio). Example: 2.0 → "twice as slow".
+    BENCHMARK_REGRESSION_RATIO: float = _EnvSetting(2.0, float)
+    # ... plus this many MICROSECONDS: a few µs of scheduler / cache noise on a
+    # 2 µs median is not a regression, but would break a pure ratio.
+    BENCHMARK_REGRESSION_SLACK_US: float = _EnvSetting(5.0, float)
 
-    DEFAULT_RTSP_LQ_PORT: int = int(os.getenv("DEFAULT_RTSP_LQ_PORT", 8554))
+    # COLD START BUDGET (benchmarks/bench_startup.py)
+    # Median time from a fresh process to the first answered request.
+    STARTUP_BUDGET_MS: float = _EnvSetting(2000.0, float)
 
-    DEFAULT_HTTP_PORT: int = int(os.getenv("DEFAULT_HTTP_PORT", 8080))
+    @classmethod
+    def load(cls) -> None:
+        """
+        Load `.env` now and (re-)read every setting on its next access.
+        Called from the FastAPI lifespan at startup.
+        """
+        _load_env_file()
+        for name, setting in _SETTINGS.items():
+            setattr(cls, name, setting)
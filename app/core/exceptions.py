@@ -29,6 +29,18 @@ class ValidationError(Exception):
     pass
 
 
+class FeatureUnavailableError(Exception):
+    """Raised when a feature needs an optional dependency that is not installed."""
+
+    pass
+
+
+class StorageUnavailableError(Exception):
+    """Raised when the storage server cannot be reached (or does not answer in time)."""
+
+    pass
+
+
 # GLOBAL EXCEPTION HANDLERS FOR FASTAPI
 # These handlers automatically convert Python exceptions → JSON API responses.
 
@@ -79,6 +91,33 @@ def register_error_handlers(app: FastAPI):
             },
         )
 
+    # FeatureUnavailableError → 501
+    @app.exception_handler(FeatureUnavailableError)
+    async def unavailable_handler(request: Request, exc: FeatureUnavailableError):
+        return JSONResponse(
+            status_code=501,
+            content={
+                "error": "Not Implemented",
+                "detail": str(exc),
+                "path": str(request.url),
+            },
+        )
+
+    # StorageUnavailableError → 503 (the client may retry shortly)
+    @app.exception_handler(StorageUnavailableError)
+    async def storage_unavailable_handler(
+        request: Request, exc: StorageUnavailableError
+    ):
+        return JSONResponse(
+            status_code=503,
+            content={
+                "error": "Service Unavailable",
+                "detail": str(exc),
+                "path": str(request.url),
+            },
+            headers={"Retry-After": "1"},
+        )
+
     # Catch-all fallback → 500
     @app.exception_handler(Exception)
     async def generic_handler(request: Request, exc: Exception):
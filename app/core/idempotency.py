@@ -0,0 +1,227 @@
+# IDEMPOTENCY KEYS FOR POST ENDPOINTS
+#
+# Problem:
+#   Clients time out under load and RETRY POST /cameras or
+#   POST /cameras/{id}/feeds. The retry either creates a second feed or gets a
+#   409 that someone has to reconcile by hand.
+#
+# Solution (Idempotency-Key header, pure ASGI middleware):
+#   - The first request with a given key runs normally; its response
+#     (status, headers, body) is stored in a bounded TTL cache.
+#   - A retry with the same key gets the STORED response back
+#     (header "Idempotent-Replayed: true"). The route is not called at all:
+#     no validation, no duplicate scans, no insert.
+#   - A retry that arrives while the first request is still running WAITS for
+#     it and then gets the same stored response (it never runs twice).
+#   - Reusing a key with a DIFFERENT request body → 422.
+#   - 5xx responses are not stored, so the client can simply retry.
+#
+# Keys are scoped per (method, path): the same key on two endpoints is two
+# different entries. Requests without the header are untouched.
+
+import asyncio
+import hashlib
+import json
+import re
+import time
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import Config
+from app.core.metrics import metrics
+
+IDEMPOTENCY_HEADER = "idempotency-key"
+REPLAYED_HEADER = (b"idempotent-replayed", b"true")
+
+# POST routes that honour the header
+IDEMPOTENT_PATHS = (
+    re.compile(r"^/cameras/?$"),
+    re.compile(r"^/cameras/[^/]+/feeds/?$"),
+)
+
+CacheKey = Tuple[str, str, str]  # (method, path, idempotency key)
+
+
+class _Entry:
+    """
+    One idempotency key: pending until the first response is complete.
+    """
+
+    def __init__(self, fingerprint: bytes, expires_at: float):
+        self.fingerprint = fingerprint
+        self.expires_at = expires_at
+        self.done = asyncio.Event()
+        self.status: Optional[int] = None
+        self.headers: List[Tuple[bytes, bytes]] = []
+        self.body = b""
+
+
+class IdempotencyCache:
+    """
+    Bounded TTL cache of idempotency entries (oldest evicted first).
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[CacheKey, _Entry]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: CacheKey, now: float) -> Optional[_Entry]:
+        self._expire(now)
+        return self._entries.get(key)
+
+    def start(self, key: CacheKey, fingerprint: bytes, now: float) -> _Entry:
+        entry = _Entry(fingerprint, now + self.ttl_seconds)
+        self._entries[key] = entry
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)  # waiters keep their own reference
+        return entry
+
+    def discard(self, key: CacheKey, entry: _Entry) -> None:
+        if self._entries.get(key) is entry:
+            del self._entries[key]
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def _expire(self, now: float) -> None:
+        # Same TTL for every entry → insertion order is expiry order.
+        while self._entries:
+            oldest = next(iter(self._entries.values()))
+            if oldest.expires_at > now:
+                break
+            self._entries.popitem(last=False)
+
+
+class IdempotencyMiddleware:
+    def __init__(
+        self,
+        app: ASGIApp,
+        max_entries: Optional[int] = None,
+        ttl_seconds: Optional[float] = None,
+    ):
+        self.app = app
+        self.cache = IdempotencyCache(
+            Config.IDEMPOTENCY_MAX_KEYS if max_entries is None else max_entries,
+            Config.IDEMPOTENCY_TTL_SECONDS if ttl_seconds is None else ttl_seconds,
+        )
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] != "POST":
+            await self.app(scope, receive, send)
+            return
+
+        idem_key = Headers(scope=scope).get(IDEMPOTENCY_HEADER)
+        path = scope["path"]
+        if not idem_key or not any(p.match(path) for p in IDEMPOTENT_PATHS):
+            await self.app(scope, receive, send)
+            return
+
+        body = await _read_body(receive)
+        fingerprint = hashlib.sha256(body).digest()
+        key: CacheKey = ("POST", path, idem_key)
+
+        while True:
+            entry = self.cache.get(key, time.monotonic())
+            if entry is None:
+                break
+            if entry.fingerprint != fingerprint:
+                metrics.incr("idempotency.mismatch")
+                detail = "Idempotency-Key reused with a different request."
+                await _send_error(send, 422, detail, path)
+                return
+            if not entry.done.is_set():
+                # Same request still running → wait for ITS result.
+                metrics.incr("idempotency.waits")
+                await entry.done.wait()
+                if entry.status is None:
+                    continue  # first attempt failed (5xx) → look again / run
+            metrics.incr("idempotency.replays")
+            await _replay(send, entry)
+            return
+
+        entry = self.cache.start(key, fingerprint, time.monotonic())
+        await self._run_and_store(scope, body, receive, send, key, entry)
+
+    async def _run_and_store(self, scope, body, receive, send, key, entry) -> None:
+        body_sent = False
+
+        async def replay_receive() -> Message:
+            # The body was already read (for the fingerprint) → hand it over once.
+            nonlocal body_sent
+            if not body_sent:
+                body_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        status = None
+        headers: List[Tuple[bytes, bytes]] = []
+        chunks: List[bytes] = []
+
+        async def capture_send(message: Message) -> None:
+            nonlocal status, headers
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = list(message.get("headers", []))
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, replay_receive, capture_send)
+        finally:
+            if status is not None and status < 500:
+                entry.status = status
+                entry.headers = headers
+                entry.body = b"".join(chunks)
+                metrics.incr("idempotency.stored")
+            else:
+                self.cache.discard(key, entry)  # let a retry run for real
+            entry.done.set()
+
+
+async def _read_body(receive: Receive) -> bytes:
+    chunks = []
+    more_body = True
+    while more_body:
+        message = await receive()
+        if message["type"] != "http.request":
+            break  # client disconnected
+        chunks.append(message.get("body", b""))
+        more_body = message.get("more_body", False)
+    return b"".join(chunks)
+
+
+async def _replay(send: Send, entry: _Entry) -> None:
+    await send(
+        {
+            "type": "http.response.start",
+            "status": entry.status,
+            "headers": entry.headers + [REPLAYED_HEADER],
+        }
+    )
+    await send({"type": "http.response.body", "body": entry.body})
+
+
+async def _send_error(send: Send, status: int, detail: str, path: str) -> None:
+    # Same JSON shape as the global error handlers in core/exceptions.py
+    body = json.dumps(
+        {"error": "Unprocessable Entity", "detail": detail, "path": path}
+    ).encode()
+    await send(
+        {
+            "type": "http.response.start",
+            "status": status,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+            ],
+        }
+    )
+    await send({"type": "http.response.body", "body": body})
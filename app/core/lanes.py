@@ -0,0 +1,116 @@
+# EXECUTION LANES (separate worker-thread budgets per route class)
+#
+# Problem:
+#   Every sync route shares anyio's DEFAULT thread limiter (40 threads). A
+#   flood of scans (GET /cameras, /cameras/export, /feeds) can take all 40,
+#   and a heartbeat then waits for a scan to finish before it even starts.
+#   The heartbeat is late → the camera looks OFFLINE.
+#
+# Solution:
+#   Routes are decorated with @in_lane(<route class>). The decorated route is
+#   async; its sync body runs in a worker thread borrowed from the lane's OWN
+#   anyio CapacityLimiter:
+#        ingest      → heartbeats                      LANE_INGEST_THREADS
+#        point_read  → one camera / status / its feeds  LANE_POINT_READ_THREADS
+#        scan        → list / export / fleet feed search LANE_SCAN_THREADS
+#        write       → POST / PATCH / DELETE           LANE_WRITE_THREADS
+#   A full scan lane only makes OTHER scans wait; heartbeats always find a
+#   free thread in the ingest lane.
+#
+# Route classes are the same as in app/core/admission.py (admission decides
+# IF a request may run, the lane decides WHERE it runs).
+#
+# Metrics: "lanes.<lane>.calls", "lanes.<lane>.wait_seconds" (time spent
+# waiting for a thread of the lane), gauge "lanes.<lane>.busy".
+
+import functools
+import time
+from typing import Callable, Dict, Optional
+
+import anyio.to_thread
+from anyio import CapacityLimiter
+
+from app.core.admission import INGEST, POINT_READ, SCAN, WRITE
+from app.core.config import Config
+from app.core.metrics import metrics
+
+LANES = (INGEST, POINT_READ, SCAN, WRITE)
+
+
+def configured_sizes() -> Dict[str, int]:
+    """
+    Threads per lane from Config (read when the lanes are first used).
+    """
+    return {
+        INGEST: Config.LANE_INGEST_THREADS,
+        POINT_READ: Config.LANE_POINT_READ_THREADS,
+        SCAN: Config.LANE_SCAN_THREADS,
+        WRITE: Config.LANE_WRITE_THREADS,
+    }
+
+
+class ExecutionLanes:
+    def __init__(self, sizes: Optional[Dict[str, int]] = None):
+        self._sizes = sizes
+        self._limiters: Dict[str, CapacityLimiter] = {}
+
+    def configure(
+        self, sizes: Optional[Dict[str, int]] = None, shared: bool = False
+    ) -> None:
+        """
+        Replace the limiters (None → sizes from Config).
+        shared=True puts every lane on ONE limiter of sum(sizes) threads, which
+        is how the app behaved before lanes (used by the benchmark).
+        """
+        self._sizes = sizes
+        self._limiters = {}
+        if shared:
+            total = sum(self.sizes().values())
+            limiter = CapacityLimiter(total)
+            self._limiters = {lane: limiter for lane in LANES}
+
+    def sizes(self) -> Dict[str, int]:
+        return dict(self._sizes) if self._sizes is not None else configured_sizes()
+
+    def limiter(self, lane: str) -> CapacityLimiter:
+        limiter = self._limiters.get(lane)
+        if limiter is None:
+            limiter = CapacityLimiter(self.sizes()[lane])
+            self._limiters[lane] = limiter
+        return limiter
+
+    async def run(self, lane: str, fn: Callable, *args, **kwargs):
+        """
+        Run the sync `fn` in a worker thread of `lane`.
+        """
+        limiter = self.limiter(lane)
+        queued_at = time.perf_counter()
+
+        def call():
+            metrics.incr(f"lanes.{lane}.wait_seconds", time.perf_counter() - queued_at)
+            metrics.set_gauge(f"lanes.{lane}.busy", limiter.borrowed_tokens)
+            return fn(*args, **kwargs)
+
+        metrics.incr(f"lanes.{lane}.calls")
+        return await anyio.to_thread.run_sync(call, limiter=limiter)
+
+
+# ONE set of lanes for the whole process
+lanes = ExecutionLanes()
+
+
+def in_lane(lane: str):
+    """
+    Decorator for SYNC route functions: the route becomes async and its body
+    runs on `lane`. functools.wraps keeps the signature, so FastAPI still sees
+    the original parameters (path/query params, Depends(...)).
+    """
+
+    def decorator(fn: Callable) -> Callable:
+        @functools.wraps(fn)
+        async def route(*args, **kwargs):
+            return await lanes.run(lane, fn, *args, **kwargs)
+
+        return route
+
+    return decorator
@@ -24,14 +24,10 @@ from logging.handlers import RotatingFileHandler
 
 # Each time the log file reaches (for example) 5 MB, a new one is created. EX: app.log, app.log.1.
 
-# (ADDED) Ensure logs folder exists
-os.makedirs("logs", exist_ok=True)  # will create /logs folder
-
+LOG_DIR = "logs"
 LOG_FILE = "logs/app_logs.json"  # (ADDED COMMENT) log file inside /logs folder
-
-# (OPTIONAL) Delete old logs every time the app restarts
-if os.path.exists(LOG_FILE):
-    os.remove(LOG_FILE)
+# NOTE: nothing touches the disk at import time any more; the folder is
+# created (and the old log deleted) in setup_logging(), run at app startup.
 
 # Formatting and structure for all logs printed by the application.
 LOG_CONFIG = {
@@ -80,6 +76,13 @@ LOG_CONFIG = {
 def setup_logging():
     """
     Apply the above logging configuration globally.
-    This should be executed once inside main.py during application startup.
+    This should be executed once during application startup (lifespan in main.py).
     """
+    # (ADDED) Ensure logs folder exists
+    os.makedirs(LOG_DIR, exist_ok=True)  # will create /logs folder
+
+    # (OPTIONAL) Delete old logs every time the app restarts
+    if os.path.exists(LOG_FILE):
+        os.remove(LOG_FILE)
+
     dictConfig(LOG_CONFIG)
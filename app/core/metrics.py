@@ -0,0 +1,52 @@
+# IN-PROCESS METRICS
+#
+# A very small metrics registry shared by the whole app (middlewares, service
+# helpers, ...). It keeps two kinds of values:
+#   counters → only go up (bytes compressed, responses served, cache hits ...)
+#   gauges   → last value wins (current compression ratio, cache size ...)
+#
+# Everything is exposed as one flat JSON object by GET /metrics
+# (see app/api/metrics_api.py). Names use dots: "<area>.<what>".
+#
+# Updates take a lock because sync routes run in a thread pool.
+
+import threading
+from typing import Dict
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, float] = {}
+        self._gauges: Dict[str, float] = {}
+
+    def incr(self, name: str, value: float = 1) -> None:
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def set_gauge(self, name: str, value: float) -> None:
+        with self._lock:
+            self._gauges[name] = value
+
+    def get(self, name: str, default: float = 0) -> float:
+        with self._lock:
+            if name in self._counters:
+                return self._counters[name]
+            return self._gauges.get(name, default)
+
+    def snapshot(self) -> Dict[str, float]:
+        """
+        Copy of every counter and gauge (sorted by name).
+        """
+        with self._lock:
+            merged = {**self._counters, **self._gauges}
+        return dict(sorted(merged.items()))
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+
+
+# ONE registry for the whole process
+metrics = MetricsRegistry()
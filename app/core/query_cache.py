@@ -0,0 +1,149 @@
+# VERSIONED QUERY RESULT CACHE (LRU, bounded by bytes)
+#
+# Repeated list queries between two writes return the same bytes, so the
+# serialized result of GET /cameras/ and GET /cameras/{id}/feeds is kept here.
+#
+# KEY = (normalized query, repository version)
+#   The repository bumps its version on every write (see data_version() /
+#   checkin_version() in app/repository/interface.py). After a write, new
+#   requests build keys with the NEW version, so old entries are simply never
+#   found again (implicit invalidation) and age out of the LRU.
+#
+# TIME-DEPENDENT RESULTS (online=true/false filters)
+#   Whether a camera is online also changes when time passes without any
+#   write. Such entries get a `valid_until` time (the moment the oldest
+#   online camera times out, nanoseconds on app/core/clock.py); after that
+#   they are treated as a miss.
+#
+# EVICTION: least recently used entries go first once the cached bodies take
+#   more than `max_bytes`. max_bytes = 0 disables the cache
+#   (Config.QUERY_CACHE_ENABLED / Config.QUERY_CACHE_MAX_BYTES).
+#
+# Metrics ("query_cache.<what>"): hits, misses, expired, evictions and the
+# gauges entries, bytes, hit_rate.
+
+import sys
+import threading
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+from app.core.clock import clock
+from app.core.config import Config
+from app.core.metrics import metrics
+
+
+class _CacheEntry:
+    __slots__ = ("value", "size", "valid_until")
+
+    def __init__(self, value: Any, size: int, valid_until: Optional[int]):
+        self.value = value
+        self.size = size
+        self.valid_until = valid_until
+
+
+class QueryCache:
+    def __init__(self, max_bytes: Optional[int] = None):
+        """
+        max_bytes None → read from Config when first used.
+        """
+        self._max_bytes = max_bytes
+        self._entries: "OrderedDict[Hashable, _CacheEntry]" = OrderedDict()
+        self._bytes = 0
+        # sync routes run in a thread pool
+        self._lock = threading.Lock()
+
+    def configure(self, max_bytes: Optional[int] = None) -> None:
+        """
+        Drop every entry and set a new size limit (None → Config).
+        """
+        with self._lock:
+            self._max_bytes = max_bytes
+            self._entries.clear()
+            self._bytes = 0
+            self._publish()
+
+    @property
+    def max_bytes(self) -> int:
+        if self._max_bytes is None:
+            enabled = Config.QUERY_CACHE_ENABLED
+            self._max_bytes = Config.QUERY_CACHE_MAX_BYTES if enabled else 0
+        return self._max_bytes
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def size_bytes(self) -> int:
+        return self._bytes
+
+    def get(self, key: Hashable, now: Optional[int] = None) -> Any:
+        """
+        Cached value for `key`, or None (miss / expired / cache disabled).
+        """
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.valid_until is not None:
+                if (clock.now_ns() if now is None else now) >= entry.valid_until:
+                    self._drop(key)
+                    metrics.incr("query_cache.expired")
+                    entry = None
+            if entry is None:
+                metrics.incr("query_cache.misses")
+                self._publish()
+                return None
+            self._entries.move_to_end(key)
+            metrics.incr("query_cache.hits")
+            self._publish()
+            return entry.value
+
+    def put(
+        self,
+        key: Hashable,
+        value: Any,
+        body: bytes,
+        valid_until: Optional[int] = None,
+    ) -> None:
+        """
+        Store `value`; `body` (the serialized response) decides its size.
+        """
+        size = sys.getsizeof(body)
+        if not self.enabled or size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = _CacheEntry(value, size, valid_until)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._drop(oldest)
+                metrics.incr("query_cache.evictions")
+            self._publish()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self._publish()
+
+    # HELPERS (called with the lock held)
+    def _drop(self, key: Hashable) -> None:
+        self._bytes -= self._entries.pop(key).size
+
+    def _publish(self) -> None:
+        metrics.set_gauge("query_cache.entries", len(self._entries))
+        metrics.set_gauge("query_cache.bytes", self._bytes)
+        hits = metrics.get("query_cache.hits")
+        lookups = hits + metrics.get("query_cache.misses")
+        if lookups:
+            metrics.set_gauge("query_cache.hit_rate", hits / lookups)
+
+
+# ONE cache for the whole process
+query_cache = QueryCache()
@@ -0,0 +1,91 @@
+# READ-ONLY REPLICA GUARD
+#
+# A follower process (app/repository/replication.py) holds a COPY of the
+# leader's fleet that it receives over the replication stream. Pure ASGI
+# middleware that, on a follower only:
+#   - refuses writes and heartbeats (they belong on the leader) → 503
+#   - refuses reads while the copy is too old (replication lag above
+#     REPLICATION_MAX_LAG_SECONDS) → 503 + Retry-After, instead of serving
+#     data that may be minutes behind
+# /, /docs, /openapi.json and /metrics are always served (the lag is visible
+# in /metrics as "replication.lag_seconds").
+# On a leader or a standalone process it only forwards the request.
+
+import json
+import math
+from typing import Callable, Optional
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.core.admission import INGEST, OTHER, WRITE, classify_route
+from app.core.metrics import metrics
+
+
+class ReplicaState:
+    """
+    Whether this process is a follower, and how to read its current lag.
+    Set by the replication module when a follower starts.
+    """
+
+    def __init__(self):
+        self.lag_seconds: Optional[Callable[[], float]] = None
+        self.max_lag_seconds = math.inf
+
+    @property
+    def is_follower(self) -> bool:
+        return self.lag_seconds is not None
+
+    def follow(self, lag_seconds: Callable[[], float], max_lag_seconds: float) -> None:
+        self.lag_seconds = lag_seconds
+        self.max_lag_seconds = max_lag_seconds
+
+    def reset(self) -> None:
+        self.lag_seconds = None
+        self.max_lag_seconds = math.inf
+
+
+# ONE state for the whole process
+replica_state = ReplicaState()
+
+
+class ReplicaMiddleware:
+    def __init__(self, app: ASGIApp, state: Optional[ReplicaState] = None):
+        self.app = app
+        self.state = replica_state if state is None else state
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self.state.is_follower:
+            await self.app(scope, receive, send)
+            return
+
+        route_class = classify_route(scope["method"], scope["path"])
+        if route_class in (WRITE, INGEST):
+            metrics.incr("replication.rejected_writes")
+            await _reject(send, scope, "Read-only replica: send writes to the leader.")
+            return
+        if route_class != OTHER:
+            lag = self.state.lag_seconds()
+            if lag > self.state.max_lag_seconds:
+                metrics.incr("replication.rejected_stale_reads")
+                await _reject(
+                    send, scope, f"Replica is {lag:.1f} s behind the leader.", 1
+                )
+                return
+        await self.app(scope, receive, send)
+
+
+async def _reject(
+    send: Send, scope: Scope, detail: str, retry_after: Optional[float] = None
+) -> None:
+    # Same JSON shape as the global error handlers in core/exceptions.py
+    body = json.dumps(
+        {"error": "Service Unavailable", "detail": detail, "path": scope["path"]}
+    ).encode()
+    headers = [
+        (b"content-type", b"application/json"),
+        (b"content-length", str(len(body)).encode()),
+    ]
+    if retry_after is not None:
+        headers.append((b"retry-after", str(math.ceil(retry_after)).encode()))
+    await send({"type": "http.response.start", "status": 503, "headers": headers})
+    await send({"type": "http.response.body", "body": body})
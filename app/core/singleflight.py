@@ -0,0 +1,68 @@
+# SINGLE-FLIGHT REQUEST COALESCING
+#
+# Problem:
+#   Many dashboard tabs send the SAME list query at the same moment
+#   (GET /cameras/?model=X&online=true&page=1). Every one of them repeated the
+#   full scan and the JSON serialization.
+#
+# Solution:
+#   Identical requests are identified by a normalized KEY (built by the
+#   caller). The first request for a key (the LEADER) starts the computation;
+#   requests with the same key that arrive while it is still running
+#   (FOLLOWERS) do not compute anything, they wait for the leader's result
+#   and return it too (same serialized body). Once the computation finishes
+#   the key is forgotten: the next request computes again (caching results
+#   between requests is a separate concern).
+#
+#   The computation runs as its own task, so a leader whose client
+#   disconnects does not cancel it for the followers.
+#
+# Metrics ("singleflight.<name>.<what>"):
+#   executed   → computations started (leaders)
+#   coalesced  → requests served by another request's computation
+#   gauge coalesce_ratio → coalesced / all requests
+
+import asyncio
+from typing import Awaitable, Callable, Dict, Hashable
+
+from app.core.metrics import metrics
+
+
+class SingleFlight:
+    def __init__(self, name: str):
+        self.name = name
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+
+    def __len__(self) -> int:
+        return len(self._inflight)
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable]):
+        """
+        Result of `fn()`, shared with every concurrent call with the same key.
+        Exceptions are shared the same way.
+        """
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._forget(key, task))
+            self._record("executed")
+        else:
+            self._record("coalesced")
+
+        # shield: a cancelled caller must not cancel the shared computation
+        return await asyncio.shield(task)
+
+    # HELPERS
+    def _forget(self, key: Hashable, task: asyncio.Future) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            task.exception()  # mark as retrieved even if every caller went away
+
+    def _record(self, what: str) -> None:
+        prefix = f"singleflight.{self.name}"
+        metrics.incr(f"{prefix}.{what}")
+        executed = metrics.get(f"{prefix}.executed")
+        coalesced = metrics.get(f"{prefix}.coalesced")
+        metrics.set_gauge(f"{prefix}.coalesce_ratio", coalesced / (executed + coalesced))
@@ -2,32 +2,86 @@
 # When we run the server (uvicorn app.main:app), THIS file is executed.
 # This file is responsible for:
 #   1. Creating the FastAPI app instance
-#   2. Setting up global logging from core/logging.py
+#   2. Startup work (config, logging, repo/service, OpenAPI) in the lifespan
 #   3. Registering global error handlers from core/exceptions.py
 #   4. Including all routers (API endpoints)
+#   5. Adding middlewares (admission control, compression, idempotency,
+#      request clock, read-only replica guard)
 # No business logic or repository logic should be placed here.
 
+import logging
+import time
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 
-# import the camera router
+# import the camera router (+ the lazily built repo / service singletons)
+from app.api.camera_api import get_repo, get_service
 from app.api.camera_api import router as camera_router
+# import the fleet-wide feed search router
+from app.api.feed_api import router as feed_router
+# import the metrics router
+from app.api.metrics_api import router as metrics_router
+# import the admission control / load shedding middleware
+from app.core.admission import AdmissionMiddleware
+# import the one-clock-reading-per-request middleware
+from app.core.clock import RequestClockMiddleware
+# import the response compression middleware
+from app.core.compression import CompressionMiddleware
+# import the lazily loaded configuration
+from app.core.config import Config
 # import global error handlers
 from app.core.exceptions import register_error_handlers
+# import the Idempotency-Key middleware
+from app.core.idempotency import IdempotencyMiddleware
+# import the per-route-class worker thread lanes
+from app.core.lanes import lanes
+# import the versioned query result cache
+from app.core.query_cache import query_cache
 # import our centralized logging setup
 from app.core.logging import setup_logging
+# import the read-only replica guard (followers only)
+from app.core.replica import ReplicaMiddleware
+# import the leader / follower log shipping
+from app.repository.replication import replication
+
+logger = logging.getLogger(__name__)
+
+
+# 1. Startup (lifespan)
+# Importing this module only DEFINES the app; nothing touches .env, the disk or
+# the storage. All of that runs here, once, when the server starts:
+#   - load .env (Config.load)
+#   - size the execution lanes and the query cache from the (re)loaded Config
+#   - setup logging (creates logs/, resets the log file)
+#   - build the repository + service singletons
+#   - start the replication role (REPLICATION_ROLE: leader / follower / off)
+#   - pre-build the OpenAPI schema, so the first /docs or /openapi.json
+#     request does not pay for schema generation
+# On shutdown the replication threads and sockets are stopped.
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    start = time.perf_counter()
+    Config.load()
+    lanes.configure()
+    query_cache.configure()
+    setup_logging()
+    get_service()
+    replication.configure(get_repo())
+    app.openapi()
+    logger.info(f"Startup finished in {(time.perf_counter() - start) * 1000:.1f} ms")
+    yield
+    replication.stop()
+
 
-# 1. Create FastAPI application
+# 2. Create FastAPI application
 app = FastAPI(
     title="Camera Management Microservice",
     description="A modular FastAPI microservice for managing cameras, feeds, and status",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
-
-# 2. Setup Logging
-# This applies the global logging configuration defined in logging.py
-setup_logging()
-
 # 3. Register Global Exception Handlers
 register_error_handlers(app)
 
@@ -35,6 +89,29 @@ register_error_handlers(app)
 # 4. Include Routers
 # This attaches all /cameras/... endpoints to the main app.
 app.include_router(camera_router)
+# This attaches the fleet-wide /feeds search endpoint.
+app.include_router(feed_router)
+# This attaches GET /metrics.
+app.include_router(metrics_router)
+
+
+# 5. Middlewares
+# NOTE: the LAST added middleware is the OUTERMOST one.
+# Idempotency-Key replays for POST /cameras and POST /cameras/{id}/feeds
+# (inside compression → stored bodies are uncompressed, every replay is
+# compressed for the retrying client's own Accept-Encoding)
+app.add_middleware(IdempotencyMiddleware)
+# gzip / deflate compression of large JSON + streamed exports (see core/compression.py)
+app.add_middleware(CompressionMiddleware)
+# admission control OUTERMOST: a shed request costs nothing further down
+# (see core/admission.py)
+app.add_middleware(AdmissionMiddleware)
+# on a follower: refuse writes and too-stale reads before anything else runs
+# (see core/replica.py)
+app.add_middleware(ReplicaMiddleware)
+# one clock reading per request for every status check inside it
+# (see core/clock.py)
+app.add_middleware(RequestClockMiddleware)
 
 
 # OPTIONAL: Root endpoint (good for sanity tests)
@@ -27,7 +27,7 @@
 from __future__ import annotations
 
 from datetime import datetime
-from typing import List, Optional, Sequence
+from typing import Dict, List, Literal, Optional, Sequence
 from uuid import UUID
 
 from pydantic import BaseModel, Field, IPvAnyAddress
@@ -104,6 +104,13 @@ class VideoFeedInfo(VideoFeedSetup):
     feed_id: UUID
 
 
+# FEED SEARCH RESULT (fleet-wide GET /feeds)
+class CameraFeedInfo(VideoFeedInfo):
+    # Same as VideoFeedInfo, plus the camera that owns the feed.
+    # Returned by the fleet-wide feed search so the caller knows where each feed lives.
+    camera_id: UUID
+
+
 # NEW CAMERA DATA (REQUEST MODEL)
 class NewCameraData(BaseModel):
     # This is the model expected when the user adds a new camera.
@@ -138,6 +145,12 @@ class NewCameraData(BaseModel):
         description="List of initial feeds provided by the camera. Can be empty.",
     )
 
+    # tags group cameras by site / building / floor ... (GET /cameras?tags_all=...)
+    tags: List[str] = Field(
+        default_factory=list,
+        description="Free-form labels, matched exactly. Example: ['site:berlin', 'floor:2']",
+    )
+
 
 # FULL CAMERA DETAILS (RESPONSE MODEL)
 class CameraDetails(NewCameraData):
@@ -161,6 +174,22 @@ class CameraUpdate(BaseModel):
     camera_model: Optional[str] = None
     network_setup: Optional[CameraNetworkInfo] = None
     image_settings: Optional[ImageQuality] = None
+    tags: Optional[List[str]] = None  # replaces ALL tags of the camera
+
+
+# CAMERA FILTER (list / count queries)
+class CameraFilter(BaseModel):
+    # All filters optional; the ones that are set are combined with AND.
+
+    name: Optional[str] = None  # substring of camera_name (case-insensitive)
+    model: Optional[str] = None  # substring of camera_model (case-insensitive)
+    ip_from: Optional[IPvAnyAddress] = None  # inclusive lower bound
+    ip_to: Optional[IPvAnyAddress] = None  # inclusive upper bound
+    online: Optional[bool] = None
+    camera_ids: Optional[List[UUID]] = None  # only these cameras
+    tags_any: Optional[List[str]] = None  # at least one of these tags
+    tags_all: Optional[List[str]] = None  # every one of these tags
+    tags_none: Optional[List[str]] = None  # none of these tags
 
 
 # FEED UPDATE MODEL
@@ -185,3 +214,113 @@ class CameraState(BaseModel):
     camera_id: UUID
     is_online: bool
     last_known_checkin: Optional[datetime] = None
+    state: Literal["online", "offline", "flapping"] = Field(
+        "offline",
+        description="status after hysteresis; 'flapping' counts as offline",
+    )
+
+
+# UPTIME REPORT (GET /cameras/{id}/uptime, GET /cameras/uptime)
+class CameraUptime(BaseModel):
+    # A camera counts as UP for HEARTBEAT_TIMEOUT seconds after each heartbeat
+    # (same rule as the online status).
+    camera_id: UUID
+    window_seconds: float
+    observed_seconds: float = Field(
+        ...,
+        description="part of the window covered by the heartbeat history "
+        "(shorter for new cameras or when old heartbeats were overwritten)",
+    )
+    up_seconds: float
+    uptime: Optional[float] = Field(
+        None, description="up_seconds / observed_seconds (None → nothing observed)"
+    )
+    heartbeats: int = Field(..., description="heartbeats inside the window")
+
+
+class FleetUptimeReport(BaseModel):
+    window_seconds: float
+    sla_target: float
+    cameras: int
+    measured: int = Field(..., description="cameras with an uptime value")
+    mean_uptime: Optional[float] = None
+    below_sla: int = Field(..., description="measured cameras with uptime < sla_target")
+    worst: List[CameraUptime] = Field(
+        default_factory=list, description="lowest uptimes first"
+    )
+
+
+# OFFLINE ANALYTICS (GET /cameras/analytics/offline, columnar snapshot)
+class OfflineAnalytics(BaseModel):
+    # Offline = last check-in older than the offline threshold; offline for
+    # longer than X = last check-in older than threshold + X. Cameras that
+    # never checked in count as offline since forever.
+    offline_longer_than_seconds: float
+    group_by: Literal["model", "feed_count"]
+    cameras: int = Field(..., description="cameras matching the filters")
+    offline: int = Field(
+        ..., description="matching cameras offline for longer than the given time"
+    )
+    groups: Dict[str, int] = Field(
+        default_factory=dict, description="group → offline cameras in it"
+    )
+
+
+# FLEET STATISTICS RESPONSE (GET /cameras/stats)
+class FleetStats(BaseModel):
+    # Counters are maintained by the repository on every write/heartbeat,
+    # so building this response costs O(number of groups), not O(number of cameras).
+
+    total_cameras: int
+    total_feeds: int
+    online: int
+    offline: int
+    flapping: int = Field(0, description="offline cameras that keep flapping")
+    by_model: Dict[str, int] = Field(
+        default_factory=dict, description="camera_model → number of cameras"
+    )
+    by_protocol: Dict[str, int] = Field(
+        default_factory=dict, description="feed_protocol → number of feeds"
+    )
+    by_subnet: Dict[str, int] = Field(
+        default_factory=dict,
+        description="subnet (IPv4 /24, IPv6 /64 by default) → number of cameras",
+    )
+    by_tag: Dict[str, int] = Field(
+        default_factory=dict, description="tag → number of cameras"
+    )
+
+
+# BULK UPDATE RESULT (PATCH /cameras)
+class BulkUpdateResult(BaseModel):
+    matched: int = Field(..., description="cameras selected by the filter")
+    updated: int = Field(..., description="cameras whose settings actually changed")
+
+
+# BULK FEED OPERATION (POST /feeds/bulk, request body)
+class BulkFeedOperation(BaseModel):
+    # The cameras are chosen by the query string filter (model / cidr / ids ...).
+    action: Literal["add", "update", "remove"]
+    # update / remove: feeds with this protocol (and port, if given)
+    feed_protocol: Optional[str] = Field(None, pattern="^(rtsp|http)$")
+    feed_port: Optional[int] = Field(None, ge=1, le=65535)
+    feed: Optional[VideoFeedSetup] = None  # add: the feed to add
+    updates: Optional[FeedUpdate] = None  # update: the changes
+
+
+# BULK OPERATION RESULT (DELETE /cameras, POST /feeds/bulk)
+class BulkItemOutcome(BaseModel):
+    camera_id: UUID
+    feed_id: Optional[UUID] = None
+    outcome: str = Field(
+        ...,
+        description="deleted | added | updated | removed | conflict | not_found",
+    )
+
+
+class BulkResult(BaseModel):
+    matched: int = Field(..., description="cameras selected by the filter")
+    counts: Dict[str, int] = Field(
+        default_factory=dict, description="outcome → number of items"
+    )
+    items: List[BulkItemOutcome] = Field(default_factory=list)
@@ -0,0 +1,146 @@
+# DENSE-SLOT BITMAPS (camera tags, online set)
+#
+# Problem:
+#   "cameras tagged site:berlin AND floor:2 but NOT decommissioned, online"
+#   as set intersections of UUIDs builds and hashes big Python sets on every
+#   request, and a check per camera for every tag.
+#
+# Idea:
+#   Every camera gets a small integer SLOT (0, 1, 2, ... in creation order).
+#   A set of cameras is then a BITMAP: bit i is set ⇔ the camera in slot i is
+#   in the set. Combining sets is one C-level operation on Python ints:
+#       any-of  → a | b        all-of → a & b        none-of → live & ~a
+#   and counting the result is int.bit_count().
+#
+# Storage:
+#   A Python int is immutable, so setting ONE bit copies the whole int.
+#   Bitmaps are therefore kept as bytearrays (setting a bit is O(1)) and only
+#   turned into ints when a query needs them (int.from_bytes = one memcpy).
+#
+# The slots themselves (camera_id ↔ slot) are owned by the repository; this
+# module only knows slot numbers.
+
+import re
+from itertools import islice
+from typing import Dict, Iterable, Iterator, Optional
+
+# any non-zero byte (re scans for it in C, skipping empty stretches fast)
+_NONZERO = re.compile(rb"[^\x00]")
+
+
+class Bitmap:
+    """
+    Mutable set of slots, one bit per slot, with its size kept up to date.
+    """
+
+    __slots__ = ("_bytes", "_count")
+
+    def __init__(self, slots: Iterable[int] = ()):
+        self._bytes = bytearray()
+        self._count = 0
+        for slot in slots:
+            self.add(slot)
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __contains__(self, slot: int) -> bool:
+        byte = slot >> 3
+        return byte < len(self._bytes) and bool(self._bytes[byte] >> (slot & 7) & 1)
+
+    def add(self, slot: int) -> None:
+        byte, mask = slot >> 3, 1 << (slot & 7)
+        if byte >= len(self._bytes):
+            self._bytes.extend(bytes(byte + 1 - len(self._bytes)))
+        if not self._bytes[byte] & mask:
+            self._bytes[byte] |= mask
+            self._count += 1
+
+    def discard(self, slot: int) -> None:
+        byte, mask = slot >> 3, 1 << (slot & 7)
+        if byte < len(self._bytes) and self._bytes[byte] & mask:
+            self._bytes[byte] &= ~mask & 0xFF
+            self._count -= 1
+
+    def clear(self) -> None:
+        self._bytes = bytearray()
+        self._count = 0
+
+    def to_int(self) -> int:
+        return int.from_bytes(self._bytes, "little")
+
+
+def bits_of(slots: Iterable[int]) -> int:
+    """
+    Bitmap (as an int) of the given slots.
+    """
+    return Bitmap(slots).to_int()
+
+
+def iter_slots(bits: int, offset: int = 0, limit: Optional[int] = None) -> Iterator[int]:
+    """
+    Set slots of `bits` in ascending order (= creation order), skipping the
+    first `offset` and stopping after `limit`.
+    """
+    data = bits.to_bytes((bits.bit_length() + 7) // 8, "little")
+
+    def slots():
+        for match in _NONZERO.finditer(data):
+            base = match.start() << 3
+            byte = data[match.start()]
+            while byte:
+                low = byte & -byte
+                yield base + low.bit_length() - 1
+                byte ^= low
+
+    offset = max(0, offset)
+    stop = None if limit is None else offset + max(0, limit)
+    return islice(slots(), offset, stop)
+
+
+class TagIndex:
+    """
+    tag → Bitmap of the slots of the cameras that carry it.
+    Tags are matched exactly (no case folding).
+    """
+
+    def __init__(self):
+        self._bits: Dict[str, Bitmap] = {}
+
+    def add(self, slot: int, tags: Iterable[str]) -> None:
+        for tag in tags:
+            bitmap = self._bits.get(tag)
+            if bitmap is None:
+                bitmap = self._bits[tag] = Bitmap()
+            bitmap.add(slot)
+
+    def remove(self, slot: int, tags: Iterable[str]) -> None:
+        for tag in tags:
+            bitmap = self._bits.get(tag)
+            if bitmap is not None:
+                bitmap.discard(slot)
+                if not bitmap:
+                    del self._bits[tag]  # no camera left with this tag
+
+    def any_of(self, tags: Iterable[str]) -> int:
+        bits = 0
+        for tag in tags:
+            bitmap = self._bits.get(tag)
+            if bitmap is not None:
+                bits |= bitmap.to_int()
+        return bits
+
+    def all_of(self, tags: Iterable[str], bits: int) -> int:
+        # `bits` narrowed down to the slots that carry EVERY tag
+        for tag in tags:
+            bitmap = self._bits.get(tag)
+            if bitmap is None:
+                return 0
+            bits &= bitmap.to_int()
+        return bits
+
+    def counts(self) -> Dict[str, int]:
+        return {tag: len(bitmap) for tag, bitmap in self._bits.items()}
+
+    def clear(self) -> None:
+        self._bits.clear()
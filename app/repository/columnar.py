@@ -0,0 +1,218 @@
+# COLUMNAR FLEET SNAPSHOT (NumPy, optional)
+#
+# Problem:
+#   Analytic questions like "cameras offline for more than 10 minutes, grouped
+#   by model" walked every CameraDetails object in Python: ~1 s per 1M cameras.
+#
+# Solution:
+#   The fleet as a few NumPy arrays, one row per camera (creation order):
+#       checkin_ns   int64   last check-in, ns since the epoch (NEVER = none)
+#       ip_version   uint8   4 / 6
+#       ip_hi/ip_lo  uint64  the IP as a 128-bit number in two halves
+#       model_code   int32   index into `models` (dictionary encoding)
+#       feed_count   int32
+#   A filter is a boolean mask (one C loop per condition), a group-by is
+#   np.bincount over the dictionary codes.
+#
+# Freshness (see fleet_columns() in memory_repo.py):
+#   the check-in column is kept INCREMENTALLY by the repository (one array
+#   slot per camera, written on every check-in) and copied per snapshot; the
+#   other columns are rebuilt lazily when data_version changed (writes).
+#
+# NumPy is OPTIONAL: it is only imported when a snapshot is built. Without it,
+# columnar analytics raise FeatureUnavailableError (→ 501); nothing else in
+# the service needs it.
+
+from array import array
+from typing import Dict, Iterable, List, Tuple
+from uuid import UUID
+
+from app.core.exceptions import FeatureUnavailableError
+from app.repository.ngram_index import fold
+
+# check-in column value of a camera that never checked in
+NEVER = -(2**63)
+
+_LOW_64 = (1 << 64) - 1
+
+# (slot, (ip version, ip int), camera_model, feed count) of one camera
+ColumnRow = Tuple[int, Tuple[int, int], str, int]
+
+
+def numpy_module():
+    """
+    The numpy module, or FeatureUnavailableError if it is not installed.
+    """
+    try:
+        import numpy
+    except ImportError:
+        raise FeatureUnavailableError(
+            "Columnar analytics need NumPy (pip install numpy)."
+        )
+    return numpy
+
+
+def checkin_column() -> array:
+    """
+    Empty per-slot check-in column (array of int64, NEVER = no check-in).
+    Kept with the stdlib array module so the repository works without NumPy.
+    """
+    return array("q")
+
+
+class FleetColumns:
+    """
+    Read-only columnar snapshot of the fleet (see the header of this file).
+    """
+
+    def __init__(
+        self,
+        camera_ids: List[UUID],
+        slots,
+        ip_version,
+        ip_hi,
+        ip_lo,
+        model_code,
+        models: List[str],
+        feed_count,
+        checkin_ns=None,
+    ):
+        self.camera_ids = camera_ids
+        self.slots = slots  # row → slot in the repository's check-in column
+        self.ip_version = ip_version
+        self.ip_hi = ip_hi
+        self.ip_lo = ip_lo
+        self.model_code = model_code
+        self.models = models
+        self.feed_count = feed_count
+        self.checkin_ns = checkin_ns
+
+    def __len__(self) -> int:
+        return len(self.camera_ids)
+
+    @classmethod
+    def build(cls, rows: Iterable[Tuple[UUID, ColumnRow]]) -> "FleetColumns":
+        """
+        Structural columns from (camera_id, row) pairs. One Python pass; the
+        check-in column is attached per snapshot by with_checkins().
+        """
+        np = numpy_module()
+        ids: List[UUID] = []
+        slots: List[int] = []
+        versions: List[int] = []
+        ips: List[int] = []
+        codes: List[int] = []
+        feeds: List[int] = []
+        code_of: Dict[str, int] = {}
+        for camera_id, (slot, (version, ip_int), model, feed_count) in rows:
+            ids.append(camera_id)
+            slots.append(slot)
+            versions.append(version)
+            ips.append(ip_int)
+            code = code_of.get(model)
+            if code is None:
+                code = code_of[model] = len(code_of)
+            codes.append(code)
+            feeds.append(feed_count)
+        return cls(
+            ids,
+            np.array(slots, dtype=np.int64),
+            np.array(versions, dtype=np.uint8),
+            np.array([ip >> 64 for ip in ips], dtype=np.uint64),
+            np.array([ip & _LOW_64 for ip in ips], dtype=np.uint64),
+            np.array(codes, dtype=np.int32),
+            list(code_of),
+            np.array(feeds, dtype=np.int32),
+        )
+
+    def with_checkins(self, column: array) -> "FleetColumns":
+        """
+        Copy of this snapshot with the current check-in times attached.
+        """
+        np = numpy_module()
+        # tobytes() is one C call under the GIL: a consistent copy even while
+        # heartbeats keep writing the column
+        per_slot = np.frombuffer(column.tobytes(), dtype=np.int64)
+        return FleetColumns(
+            self.camera_ids,
+            self.slots,
+            self.ip_version,
+            self.ip_hi,
+            self.ip_lo,
+            self.model_code,
+            self.models,
+            self.feed_count,
+            per_slot[self.slots],
+        )
+
+    @classmethod
+    def concat(cls, parts: List["FleetColumns"]) -> "FleetColumns":
+        """
+        One snapshot from several (e.g. one per shard), rows in `parts` order.
+        The parts must already carry their check-ins; model codes are mapped
+        onto one merged dictionary.
+        """
+        np = numpy_module()
+        models: List[str] = []
+        code_of: Dict[str, int] = {}
+        codes = []
+        for part in parts:
+            remap = []
+            for model in part.models:
+                code = code_of.get(model)
+                if code is None:
+                    code = code_of[model] = len(models)
+                    models.append(model)
+                remap.append(code)
+            codes.append(np.array(remap, dtype=np.int32)[part.model_code])
+        return cls(
+            [camera_id for part in parts for camera_id in part.camera_ids],
+            None,  # rows no longer map to one check-in column
+            np.concatenate([p.ip_version for p in parts] or [np.zeros(0, np.uint8)]),
+            np.concatenate([p.ip_hi for p in parts] or [np.zeros(0, np.uint64)]),
+            np.concatenate([p.ip_lo for p in parts] or [np.zeros(0, np.uint64)]),
+            np.concatenate(codes or [np.zeros(0, np.int32)]),
+            models,
+            np.concatenate([p.feed_count for p in parts] or [np.zeros(0, np.int32)]),
+            np.concatenate([p.checkin_ns for p in parts] or [np.zeros(0, np.int64)]),
+        )
+
+    # MASKS (boolean arrays, one entry per row)
+    def checked_in_before(self, at_ns: int):
+        # cameras that never checked in are included (NEVER < any time)
+        return self.checkin_ns < at_ns
+
+    def model_matches(self, pattern: str):
+        # same rule as the list filter (case-folded substring), evaluated on
+        # the small dictionary and mapped to the rows with np.isin
+        np = numpy_module()
+        needle = fold(pattern)
+        codes = [i for i, model in enumerate(self.models) if needle in fold(model)]
+        return np.isin(self.model_code, codes)
+
+    def ip_between(self, version: int, low: int, high: int):
+        # low <= ip <= high, compared as 128-bit numbers (hi, lo)
+        low_hi, low_lo = low >> 64, low & _LOW_64
+        high_hi, high_lo = high >> 64, high & _LOW_64
+        above = (self.ip_hi > low_hi) | ((self.ip_hi == low_hi) & (self.ip_lo >= low_lo))
+        below = (self.ip_hi < high_hi) | ((self.ip_hi == high_hi) & (self.ip_lo <= high_lo))
+        return (self.ip_version == version) & above & below
+
+    # GROUP-BY
+    def count_by(self, group_by: str, mask=None) -> Dict[str, int]:
+        """
+        Rows (where `mask` is True) per "model" or per "feed_count".
+        """
+        np = numpy_module()
+        if group_by == "model":
+            codes, labels = self.model_code, self.models
+        else:
+            codes, labels = self.feed_count, None
+        selected = codes if mask is None else codes[mask]
+        counts = np.bincount(selected, minlength=len(labels) if labels else 0)
+        return {
+            (labels[code] if labels is not None else str(code)): int(n)
+            for code, n in enumerate(counts.tolist())
+            if n
+        }
+
@@ -0,0 +1,125 @@
+# PER-CAMERA HEARTBEAT HISTORY (fixed-size ring buffers)
+#
+# last_known_checkin only keeps the LATEST heartbeat, so "what was this
+# camera's uptime over the last 24h?" could not be answered. Here every
+# check-in is also appended to a per-camera ring buffer:
+#
+#   storage  → array('d') of epoch seconds (8 bytes per heartbeat, no objects)
+#   capacity → HEARTBEAT_HISTORY_SIZE heartbeats per camera; when a buffer is
+#              full the OLDEST heartbeat is overwritten
+#   memory   → all buffers together hold at most HEARTBEAT_HISTORY_MAX_BYTES of
+#              samples. Once the cap is reached a buffer stops growing and
+#              wraps at its current length (so it keeps a shorter history);
+#              the cap is never exceeded.
+#
+# Metrics: gauge "heartbeat_history.bytes" (in 8 KiB steps while buffers
+# grow, exact after a removal or once a buffer wraps), counters "heartbeat_history.capped"
+# (a buffer wrapped early because of the cap) and ".dropped" (no room at all).
+#
+# Buffers grow on demand (a camera that never checks in costs nothing).
+# snapshot() returns the samples oldest first together with the time from
+# which the history is COMPLETE (older heartbeats may have been overwritten),
+# so uptime is never computed over a period the buffer no longer covers.
+
+from array import array
+from typing import Dict, Hashable, NamedTuple, Optional
+
+from app.core.config import Config
+from app.core.metrics import metrics
+
+_SAMPLE_BYTES = array("d").itemsize
+_GAUGE_STEP_BYTES = 8192  # "heartbeat_history.bytes" is published every 8 KiB
+
+
+class CheckinHistory(NamedTuple):
+    complete_since: Optional[float]  # None → every heartbeat is still there
+    epochs: array  # check-in times, epoch seconds, oldest first
+
+
+class _Ring:
+    __slots__ = ("samples", "head", "wrapped")
+
+    def __init__(self):
+        self.samples = array("d")
+        self.head = 0  # next position to overwrite once the buffer wraps
+        self.wrapped = False
+
+
+class HeartbeatHistory:
+    def __init__(
+        self, size: Optional[int] = None, max_bytes: Optional[int] = None
+    ):
+        """
+        size / max_bytes None → read from Config when first used.
+        """
+        self._size = size
+        self._max_bytes = max_bytes
+        self._rings: Dict[Hashable, _Ring] = {}
+        self._bytes = 0
+
+    @property
+    def size(self) -> int:
+        if self._size is None:
+            self._size = Config.HEARTBEAT_HISTORY_SIZE
+        return self._size
+
+    @property
+    def max_bytes(self) -> int:
+        if self._max_bytes is None:
+            self._max_bytes = Config.HEARTBEAT_HISTORY_MAX_BYTES
+        return self._max_bytes
+
+    @property
+    def size_bytes(self) -> int:
+        return self._bytes
+
+    def record(self, key: Hashable, epoch: float) -> None:
+        ring = self._rings.get(key)
+        if ring is None:
+            ring = self._rings[key] = _Ring()
+        samples = ring.samples
+
+        if not ring.wrapped:
+            size = self._size if self._size is not None else self.size
+            if len(samples) < size and self._bytes + _SAMPLE_BYTES <= self.max_bytes:
+                samples.append(epoch)
+                self._bytes += _SAMPLE_BYTES
+                # only while buffers grow, and in _GAUGE_STEP_BYTES steps: the
+                # heartbeat path does not take the metrics lock every time
+                if not self._bytes % _GAUGE_STEP_BYTES:
+                    metrics.set_gauge("heartbeat_history.bytes", self._bytes)
+                return
+            if not samples:
+                metrics.incr("heartbeat_history.dropped")  # cap reached, no buffer yet
+                return
+            ring.wrapped = True
+            metrics.set_gauge("heartbeat_history.bytes", self._bytes)
+            if len(samples) < size:
+                metrics.incr("heartbeat_history.capped")
+
+        samples[ring.head] = epoch
+        ring.head = (ring.head + 1) % len(samples)
+
+    def snapshot(self, key: Hashable) -> Optional[CheckinHistory]:
+        """
+        Copy of the history of `key` (None → no heartbeat recorded).
+        """
+        ring = self._rings.get(key)
+        if ring is None or not ring.samples:
+            return None
+        if not ring.wrapped:
+            return CheckinHistory(None, array("d", ring.samples))
+        # rotate so the oldest sample comes first (two memcpy-style slices)
+        epochs = ring.samples[ring.head :] + ring.samples[: ring.head]
+        return CheckinHistory(epochs[0], epochs)
+
+    def remove(self, key: Hashable) -> None:
+        ring = self._rings.pop(key, None)
+        if ring is not None:
+            self._bytes -= len(ring.samples) * _SAMPLE_BYTES
+            metrics.set_gauge("heartbeat_history.bytes", self._bytes)
+
+    def clear(self) -> None:
+        self._rings.clear()
+        self._bytes = 0
+        metrics.set_gauge("heartbeat_history.bytes", 0)
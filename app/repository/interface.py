@@ -5,11 +5,27 @@
 # This is the "Dependency Inversion Principle" (D in SOLID).
 
 from abc import ABC, abstractmethod
-from typing import List, Optional
+from datetime import datetime
+from typing import Iterable, List, Optional, Tuple
 from uuid import UUID
 
-from app.models.schemas import (CameraDetails, CameraUpdate, FeedUpdate,
+from app.models.schemas import (CameraDetails, CameraFeedInfo, CameraFilter,
+                                CameraUpdate, FeedUpdate, FleetStats,
                                 NewCameraData, VideoFeedInfo, VideoFeedSetup)
+from app.repository.columnar import FleetColumns
+from app.repository.heartbeat_history import CheckinHistory
+from app.repository.status_tracker import CameraStatus
+
+# Per-item result of a bulk operation: (camera_id, feed_id or None, outcome)
+# outcome: "deleted" | "added" | "updated" | "removed" | "conflict" | "not_found"
+BulkOutcome = Tuple[UUID, Optional[UUID], str]
+
+# Uniqueness rules broken by a new camera (camera_conflict / add_unique_camera)
+IP_TAKEN = "A camera with this IP address already exists."
+NAME_TAKEN = "A camera with same name and model already exists."
+
+# (camera_id, added_on, check-in history or None) of one camera
+UptimeInput = Tuple[UUID, datetime, Optional[CheckinHistory]]
 
 
 class CameraRepositoryInterface(ABC):
@@ -23,9 +39,28 @@ class CameraRepositoryInterface(ABC):
     """
 
     @abstractmethod
-    def add_camera(self, data: NewCameraData) -> CameraDetails:
+    def add_camera(
+        self, data: NewCameraData, camera_id: UUID | None = None
+    ) -> CameraDetails:
         """
         Add a new camera and return the created CameraDetails object.
+        camera_id is normally generated here; a caller that must know the id
+        BEFORE the camera exists (e.g. to pick a shard) can pass it in.
+        """
+
+    @abstractmethod
+    def add_unique_camera(self, data: NewCameraData) -> CameraDetails:
+        """
+        add_camera() that first enforces the uniqueness rules (IP address;
+        camera_name + camera_model) → ConflictError. The check and the insert
+        are ONE atomic step: two concurrent calls cannot both add a duplicate.
+        """
+
+    @abstractmethod
+    def camera_conflict(self, data: NewCameraData) -> Optional[str]:
+        """
+        IP_TAKEN or NAME_TAKEN if adding `data` would break a uniqueness rule
+        (the IP rule is checked first), None otherwise. Read only.
         """
 
     @abstractmethod
@@ -50,6 +85,38 @@ class CameraRepositoryInterface(ABC):
         Return a list of ALL stored cameras.
         """
 
+    @abstractmethod
+    def search_cameras(
+        self, name: str | None = None, model: str | None = None
+    ) -> List[CameraDetails]:
+        """
+        Cameras whose name AND model contain the given substrings
+        (case-insensitive), in the same order as list_cameras().
+        A filter that is None is ignored.
+        """
+
+    @abstractmethod
+    def query_cameras(
+        self,
+        flt: CameraFilter,
+        online_since: datetime | None = None,
+        offset: int = 0,
+        limit: int | None = None,
+    ) -> List[CameraDetails]:
+        """
+        One page (offset / limit) of the cameras matching ALL set filters,
+        in list_cameras() order. A camera is online when its last check-in
+        is at or after `online_since`.
+        """
+
+    @abstractmethod
+    def count_cameras(
+        self, flt: CameraFilter, online_since: datetime | None = None
+    ) -> int:
+        """
+        Number of cameras query_cameras() would return without pagination.
+        """
+
     @abstractmethod
     def update_camera(
         self, camera_id: UUID, updates: CameraUpdate
@@ -59,6 +126,23 @@ class CameraRepositoryInterface(ABC):
         Returns the updated camera or None.
         """
 
+    @abstractmethod
+    def update_cameras(
+        self, camera_ids: Iterable[UUID], updates: CameraUpdate
+    ) -> int:
+        """
+        Apply the same update to many cameras in ONE pass (unknown ids are
+        skipped, fields that already have the value are left alone).
+        Returns the number of cameras that changed.
+        """
+
+    @abstractmethod
+    def remove_cameras(self, camera_ids: Iterable[UUID]) -> List[BulkOutcome]:
+        """
+        Remove many cameras (and their feeds) in ONE pass with one version
+        bump. One outcome per id: "deleted" or "not_found".
+        """
+
     @abstractmethod
     def add_feed(
         self, camera_id: UUID, feed: VideoFeedSetup
@@ -84,6 +168,38 @@ class CameraRepositoryInterface(ABC):
         Returns True if removed, False otherwise.
         """
 
+    @abstractmethod
+    def add_feeds(
+        self, camera_ids: Iterable[UUID], feed: VideoFeedSetup
+    ) -> List[BulkOutcome]:
+        """
+        Add a copy of `feed` to every camera in ONE pass. Cameras that already
+        have a feed with the same protocol + port get "conflict".
+        """
+
+    @abstractmethod
+    def update_feeds(
+        self,
+        camera_ids: Iterable[UUID],
+        protocol: str,
+        port: int | None,
+        updates: FeedUpdate,
+    ) -> List[BulkOutcome]:
+        """
+        Update every feed with this protocol (and port, if given) on the given
+        cameras in ONE pass. A feed whose new protocol + port is already used
+        on its camera is left alone ("conflict").
+        """
+
+    @abstractmethod
+    def remove_feeds(
+        self, camera_ids: Iterable[UUID], protocol: str, port: int | None
+    ) -> List[BulkOutcome]:
+        """
+        Remove every feed with this protocol (and port, if given) from the
+        given cameras in ONE pass.
+        """
+
     @abstractmethod
     def get_feed(self, camera_id: UUID, feed_id: UUID) -> Optional[VideoFeedInfo]:
         """
@@ -103,3 +219,137 @@ class CameraRepositoryInterface(ABC):
         """
         Return filtered + paginated list of feeds for a camera.
         """
+
+    @abstractmethod
+    def count_feeds(
+        self,
+        camera_id: UUID,
+        protocol: str | None = None,
+        port: int | None = None,
+        q: str | None = None,
+    ) -> int:
+        """
+        Number of feeds list_feeds() would return without pagination.
+        """
+
+    @abstractmethod
+    def feed_exists(self, camera_id: UUID, protocol: str, port: int) -> bool:
+        """
+        True if the camera already has a feed with this (protocol, port) pair.
+        Used by the service for the duplicate-feed rule without scanning feeds.
+        """
+
+    @abstractmethod
+    def search_feeds(
+        self,
+        protocol: str | None = None,
+        port: int | None = None,
+        q: str | None = None,
+        page: int = 1,
+        page_size: int = 20,
+        by_camera: bool = False,
+    ) -> List[CameraFeedInfo]:
+        """
+        Fleet-wide feed search: feeds of ALL cameras matching protocol, port
+        and/or a case-insensitive substring `q` of the feed path.
+        Returns one page of results (each result carries its camera_id).
+        by_camera=True orders the matches by camera (creation order), then by
+        feed, so pages of several repositories can be merged.
+        """
+
+    @abstractmethod
+    def count_search_feeds(
+        self,
+        protocol: str | None = None,
+        port: int | None = None,
+        q: str | None = None,
+    ) -> int:
+        """
+        Number of feeds search_feeds() would return without pagination.
+        """
+
+    @abstractmethod
+    def record_checkin(
+        self,
+        camera_id: UUID,
+        checkin: datetime,
+        updated_on: datetime | None = None,
+    ) -> Optional[CameraDetails]:
+        """
+        Store a heartbeat / check-in time for a camera (sets last_known_checkin,
+        and last_updated_on when `updated_on` is given).
+        Check-ins must be recorded through here (not by assigning the field)
+        so the online/offline counters stay correct.
+        Returns the camera or None if not found.
+        """
+
+    @abstractmethod
+    def camera_state(self, camera_id: UUID, now_ns: int) -> Optional[CameraStatus]:
+        """
+        "online" | "offline" | "flapping" at `now_ns` (nanoseconds since the
+        epoch, app/core/clock.py) with hysteresis + flap detection, see
+        status_tracker.py. None if the camera is unknown.
+        """
+
+    @abstractmethod
+    def checkin_history(self, camera_id: UUID) -> Optional[CheckinHistory]:
+        """
+        Recent check-in times of a camera (epoch seconds, oldest first) and
+        the time from which that history is complete.
+        None if the camera is unknown or has no recorded check-in.
+        """
+
+    @abstractmethod
+    def uptime_inputs(self) -> List[UptimeInput]:
+        """
+        (camera_id, added_on, checkin_history) of EVERY camera, in creation
+        order: all a fleet uptime report needs, in one call.
+        """
+
+    @abstractmethod
+    def fleet_columns(self) -> FleetColumns:
+        """
+        Columnar NumPy snapshot of the fleet with current check-in times
+        (see columnar.py). Raises FeatureUnavailableError without NumPy.
+        """
+
+    @abstractmethod
+    def data_version(self) -> int:
+        """
+        Counter that changes after EVERY write except check-ins (cameras,
+        feeds, clear). Never goes down: caches tag results with it.
+        """
+
+    @abstractmethod
+    def checkin_version(self) -> int:
+        """
+        Counter that changes after every recorded check-in (and clear).
+        """
+
+    @abstractmethod
+    def status_version(self) -> int:
+        """
+        Counter that changes when a check-in makes a camera online or takes
+        it out of the online set (and on clear). Repeated heartbeats of an
+        online camera do not change it.
+        """
+
+    @abstractmethod
+    def oldest_online_checkin(self, online_since: datetime) -> Optional[datetime]:
+        """
+        Oldest check-in that is still >= online_since (the next camera to go
+        offline), or None if no camera is online.
+        """
+
+    @abstractmethod
+    def fleet_stats(self, online_since: datetime) -> FleetStats:
+        """
+        Fleet-wide counters: totals, by model, by feed protocol, by subnet and
+        online/offline. A camera is online if last_known_checkin >= online_since.
+        """
+
+    @abstractmethod
+    def clear(self) -> None:
+        """
+        Remove ALL cameras and feeds (used by tests to reset the storage).
+        """
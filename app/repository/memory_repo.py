@@ -13,19 +13,42 @@
 # it depends on an interface, not on the service,
 # and the service depends on the same interface instead of this concrete implementation.
 
+import bisect
+import heapq
 import logging
-from datetime import datetime, timezone
-from typing import Dict, List, Optional
+import threading
+from collections import Counter, OrderedDict
+from datetime import datetime
+from itertools import count, islice
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
 from uuid import UUID, uuid4
 
+from app.core.clock import NS_PER_SECOND, clock, to_ns
+from app.core.config import Config
+from app.core.exceptions import ConflictError
 # Import Pydantic models
-from app.models.schemas import (CameraDetails, CameraUpdate, FeedUpdate,
+from app.models.schemas import (CameraDetails, CameraFeedInfo, CameraFilter,
+                                CameraUpdate, FeedUpdate, FleetStats,
                                 NewCameraData, VideoFeedInfo, VideoFeedSetup)
-from app.repository.interface import CameraRepositoryInterface
+from app.repository.bitmap_index import Bitmap, TagIndex, bits_of, iter_slots
+from app.repository.columnar import NEVER, FleetColumns, checkin_column
+from app.repository.heartbeat_history import CheckinHistory, HeartbeatHistory
+from app.repository.interface import (IP_TAKEN, NAME_TAKEN, BulkOutcome,
+                                      CameraRepositoryInterface, UptimeInput)
+from app.repository.status_tracker import CameraStatus, StatusTracker
+from app.repository.ngram_index import TrigramIndex, fold
 
 # Create a logger specific to this module.
 # __name__ → "app.repository.memory_repo"
 logger = logging.getLogger(__name__)
+
+# (camera_id, feed_id) → one entry of the fleet-wide feed index
+FeedRef = Tuple[UUID, UUID]
+# (ip version, ip as int) → sortable IP key (all IPv4 sort before all IPv6)
+IpKey = Tuple[int, int]
+# mutation log hook (replication.py): (op, camera_id, camera) after every write
+# op: "put" (camera changed or added) | "delete" | "checkin" | "clear"
+MutationHook = Callable[[str, Optional[UUID], Optional[CameraDetails]], None]
 # We do NOT configure logging here. That is done globally in logging.py.
 # Here we only use logger.info(), logger.debug(), logger.warning() to write logs.
 
@@ -44,12 +67,103 @@ class SimpleCameraMemoryStorage(CameraRepositoryInterface):
         # Value = CameraDetails object
         # _store : this is internal databse of mine
 
+        # PER-CAMERA FEED INDEX (kept next to cam.available_feeds)
+        # _feeds[camera_id]     = {feed_id: VideoFeedInfo}  → O(1) get/update/remove
+        #   (a dict keeps insertion order, so it is also the "ordered list" of feeds)
+        # _feed_keys[camera_id] = Counter{(protocol, port): count} → O(1) duplicate check
+        #   (a Counter and not a set: NewCameraData may contain the same pair twice)
+        self._feeds: Dict[UUID, Dict[UUID, VideoFeedInfo]] = {}
+        self._feed_keys: Dict[UUID, Counter] = {}
+
+        # FLEET-WIDE FEED INDEX (inverted index over ALL cameras)
+        # protocol          → {(camera_id, feed_id): None}
+        # port              → {(camera_id, feed_id): None}
+        # (protocol, port)  → {(camera_id, feed_id): None}
+        # A dict with None values is used as an ORDERED set, so pagination is stable.
+        # Answers "which cameras expose RTSP on 8554?" in O(k) for k matches.
+        self._feeds_by_protocol: Dict[str, Dict[FeedRef, None]] = {}
+        self._feeds_by_port: Dict[int, Dict[FeedRef, None]] = {}
+        self._feeds_by_key: Dict[Tuple[str, int], Dict[FeedRef, None]] = {}
+
+        # SUBSTRING (TRIGRAM) INDEXES over lowercase-folded text
+        # camera_name / camera_model → keyed by camera_id
+        # feed_path                  → keyed by (camera_id, feed_id)
+        self._name_index = TrigramIndex()
+        self._model_index = TrigramIndex()
+        self._path_index = TrigramIndex()
+
+        # INSERTION ORDER
+        # Index lookups return UNORDERED sets; these sequence numbers put the
+        # results back into "order of creation" (same order as list_cameras()).
+        self._seq_counter = count()
+        self._camera_seq: Dict[UUID, int] = {}
+        self._feed_seq: Dict[UUID, int] = {}
+
+        # SORTED IP INDEX (range filters + range counts with bisect)
+        # _ip_sorted holds (version, ip_int, camera_seq, camera_id), kept sorted.
+        # camera_seq makes every entry unique, so the UUID is never compared.
+        self._ip_of: Dict[UUID, IpKey] = {}
+        self._ip_sorted: List[Tuple[int, int, int, UUID]] = []
+
+        # DENSE SLOTS + BITMAPS (tag filters, see bitmap_index.py)
+        # Every camera gets the next slot number; slots are not reused, so
+        # ascending slots == creation order. _slot_ids[slot] is None once the
+        # camera is gone; _compact_slots() renumbers when too many are free.
+        # _live / _online_bits / _tags: bitmaps of existing / online / tagged
+        # cameras, combined with & | ~ when a query has a tag filter.
+        self._slot_of: Dict[UUID, int] = {}
+        self._slot_ids: List[Optional[UUID]] = []
+        self._live = Bitmap()
+        self._online_bits = Bitmap()
+        self._tags = TagIndex()
+
+        # COLUMNAR SNAPSHOT (analytics, see columnar.py)
+        # _checkins[slot] = last check-in in ns (NEVER = none), written on every
+        # check-in; the other columns are rebuilt when _data_version changed.
+        self._checkins = checkin_column()
+        self._columns: Optional[FleetColumns] = None
+        self._columns_version = -1
+
+        # FLEET STATISTICS COUNTERS (updated on every mutation, read in O(groups))
+        self._count_by_model: Counter = Counter()
+        self._count_by_protocol: Counter = Counter()
+        self._count_by_subnet: Counter = Counter()
+
+        # ONLINE TRACKING
+        # camera_id → last check-in, ordered OLDEST check-in first.
+        # A new check-in moves the camera to the END (O(1)), so cameras whose
+        # check-in got too old are always at the FRONT and can be expired
+        # lazily: each online → offline transition is processed exactly once.
+        # Only cameras the status tracker reports ONLINE are in here (it
+        # applies the hysteresis / flap rules on every check-in).
+        self._online: "OrderedDict[UUID, datetime]" = OrderedDict()
+        self._status = StatusTracker()
+        # every check-in, per camera (ring buffers for uptime reports)
+        self._history = HeartbeatHistory()
+
+        # VERSIONS (for caches above the repository)
+        # _data_version changes on EVERY write except check-ins, _checkin_version
+        # on every check-in. Both only ever go up (clear() included), so a
+        # cached result tagged with an old version can never look current.
+        self._data_version = 0
+        self._checkin_version = 0
+        # _status_version: only when a check-in changes the online set
+        self._status_version = 0
+
+        # MUTATION LOG (replication.py): None = no replication, no cost
+        self._mutation_log: Optional[MutationHook] = None
+
+        # add_unique_camera: uniqueness check + insert as ONE step
+        self._unique_lock = threading.Lock()
+
         logger.debug(
             "[REPO INIT] In-memory camera storage initialized."
         )  # (ADDED COMMENT)
 
     # ADD CAMERA (CREATE)
-    def add_camera(self, data: NewCameraData) -> CameraDetails:
+    def add_camera(
+        self, data: NewCameraData, camera_id: UUID | None = None
+    ) -> CameraDetails:
         """
         -> function tells it will return either cameradetails.
         IF IT WILL BE -> optional[cameradetails], then it will retuen none or cameradetails
@@ -58,8 +172,9 @@ class SimpleCameraMemoryStorage(CameraRepositoryInterface):
 
         logger.info("[REPO] Starting process to add new camera")  # (ADDED COMMENT)
 
-        camera_id = uuid4()  # generate a camera id
-        now = datetime.now(timezone.utc)
+        if camera_id is None:
+            camera_id = uuid4()  # generate a camera id
+        now = clock.now()
 
         # Build feed objects WITH feed_id
         feeds_with_ids: List[VideoFeedInfo] = []
@@ -90,24 +205,56 @@ class SimpleCameraMemoryStorage(CameraRepositoryInterface):
             network_setup=cam_dict["network_setup"],
             image_settings=cam_dict["image_settings"],
             available_feeds=feeds_with_ids,
+            tags=cam_dict["tags"],
             camera_id=camera_id,
             added_on=now,
             last_updated_on=now,
             last_known_checkin=None,
         )
 
-        # Save inside the dictionary
-        self._store[camera_id] = camera_record
-        
+        # Save inside the dictionary (+ every index)
+        self._insert_camera(camera_record)
+        self._data_version += 1
+        self._log_mutation("put", camera_id, camera_record)
+
         logger.info(
             f"[REPO][ADD_CAMERA] Added camera ID={camera_id}"
         )  # (ADDED COMMENT)
+        # %s, not an f-string: the record is only formatted when DEBUG is on
         logger.debug(
-            f"[REPO][ADD_CAMERA] Full record: {camera_record}"
+            "[REPO][ADD_CAMERA] Full record: %s", camera_record
         )  # (ADDED COMMENT)
 
         return camera_record
 
+    # ADD CAMERA WITH UNIQUENESS RULES (check + insert under one lock)
+    def add_unique_camera(self, data: NewCameraData) -> CameraDetails:
+        with self._unique_lock:
+            conflict = self.camera_conflict(data)
+            if conflict is not None:
+                logger.debug(f"[REPO][ADD_CAMERA] Rejected: {conflict}")
+                raise ConflictError(conflict)
+            return self.add_camera(data)
+
+    def camera_conflict(self, data: NewCameraData) -> Optional[str]:
+        # IP: one bisect in the sorted IP index (a slice never raises, even
+        # if a writer thread shrinks the list meanwhile)
+        key = _ip_key(data.network_setup.ip_address)
+        pos = bisect.bisect_left(self._ip_sorted, key)
+        found = self._ip_sorted[pos : pos + 1]
+        if found and found[0][:2] == key:
+            return IP_TAKEN
+        # name + model: exact match among the name index's substring hits
+        for camera_id in self._name_index.search(data.camera_name):
+            cam = self._store.get(camera_id)
+            if (
+                cam is not None
+                and cam.camera_name == data.camera_name
+                and cam.camera_model == data.camera_model
+            ):
+                return NAME_TAKEN
+        return None
+
     # REMOVE CAMERA (DELETE)
     def remove_camera(self, camera_id: UUID) -> bool:
         """
@@ -119,7 +266,11 @@ class SimpleCameraMemoryStorage(CameraRepositoryInterface):
         )  # (ADDED COMMENT)
 
         if camera_id in self._store:
-            del self._store[camera_id]
+            self._unindex_ip(camera_id)
+            self._drop_camera(camera_id)
+            self._compact_slots_if_sparse()
+            self._data_version += 1
+            self._log_mutation("delete", camera_id, None)
             logger.info(
                 f"[REPO][REMOVE_CAMERA] Removed camera ID={camera_id}"
             )  # (ADDED COMMENT)
@@ -176,32 +327,18 @@ class SimpleCameraMemoryStorage(CameraRepositoryInterface):
             )  # (ADDED COMMENT)
             return None
 
-        changed = False
-
-        if updates.camera_name is not None:
-            cam.camera_name = updates.camera_name
-            changed = True
-
-        if updates.camera_model is not None:
-            cam.camera_model = updates.camera_model
-            changed = True
-
-        if updates.network_setup is not None:
-            cam.network_setup = updates.network_setup
-            changed = True
-
-        if updates.image_settings is not None:
-            cam.image_settings = updates.image_settings
-            changed = True
+        changed = self._apply_update(camera_id, cam, updates)
 
         if changed:
-            cam.last_updated_on = datetime.now(timezone.utc)
+            cam.last_updated_on = clock.now()
             self._store[camera_id] = cam
+            self._data_version += 1
+            self._log_mutation("put", camera_id, cam)
             logger.info(
                 f"[REPO][UPDATE_CAMERA] Updated camera ID={camera_id}"
             )  # (ADDED COMMENT)
             logger.debug(
-                f"[REPO][UPDATE_CAMERA] Updated record: {cam}"
+                "[REPO][UPDATE_CAMERA] Updated record: %s", cam
             )  # (ADDED COMMENT)
         else:
             logger.debug(
@@ -234,8 +371,11 @@ class SimpleCameraMemoryStorage(CameraRepositoryInterface):
         )
 
         cam.available_feeds.append(new_feed)
-        cam.last_updated_on = datetime.now(timezone.utc)
+        self._insert_feed(camera_id, new_feed)
+        cam.last_updated_on = clock.now()
         self._store[camera_id] = cam
+        self._data_version += 1
+        self._log_mutation("put", camera_id, cam)
 
         logger.info(
             f"[REPO][ADD_FEED] Added feed ID={new_feed.feed_id} to camera ID={camera_id}"
@@ -258,38 +398,51 @@ class SimpleCameraMemoryStorage(CameraRepositoryInterface):
             )  # (ADDED COMMENT)
             return None
 
-        for idx, feed in enumerate(cam.available_feeds):
-            if feed.feed_id == feed_id:
-
-                if updates.feed_protocol is not None:
-                    feed.feed_protocol = updates.feed_protocol
-
-                if updates.feed_port is not None:
-                    feed.feed_port = updates.feed_port
-
-                if updates.feed_path is not None:
-                    feed.feed_path = updates.feed_path
-
-                cam.available_feeds[idx] = feed
-                cam.last_updated_on = datetime.now(timezone.utc)
-                self._store[camera_id] = cam
+        feed = self._feeds[camera_id].get(feed_id)
+        if feed is None:
+            logger.debug(
+                f"[REPO][UPDATE_FEED] Feed ID={feed_id} not found for camera ID={camera_id}"
+            )  # (ADDED COMMENT)
+            return None
 
-                logger.info(
-                    f"[REPO][UPDATE_FEED] Updated feed ID={feed_id} for camera ID={camera_id}"
-                )  # (ADDED COMMENT)
-                logger.debug(
-                    f"[REPO][UPDATE_FEED] Updated record: {feed}"
-                )  # (ADDED COMMENT)
-                return feed
+        # The feed object is shared by _feeds and cam.available_feeds,
+        # so updating it in place updates both (list order is untouched).
+        # The secondary indexes are keyed by VALUES, so the feed is taken out
+        # of them under its old values first and put back with the new ones,
+        # but only from the indexes whose value really changes (a path-only
+        # update leaves the protocol / port postings alone).
+        protocol = updates.feed_protocol
+        port = updates.feed_port
+        if (protocol is not None and protocol != feed.feed_protocol) or (
+            port is not None and port != feed.feed_port
+        ):
+            self._unindex_feed_key(camera_id, feed)
+            if protocol is not None:
+                feed.feed_protocol = protocol
+            if port is not None:
+                feed.feed_port = port
+            self._index_feed_key(camera_id, feed)
+
+        if updates.feed_path is not None and updates.feed_path != feed.feed_path:
+            feed.feed_path = updates.feed_path
+            self._path_index.update((camera_id, feed.feed_id), feed.feed_path)
+        cam.last_updated_on = clock.now()
+        self._log_mutation("put", camera_id, cam)
 
-        logger.debug(
-            f"[REPO][UPDATE_FEED] Feed ID={feed_id} not found for camera ID={camera_id}"
+        logger.info(
+            f"[REPO][UPDATE_FEED] Updated feed ID={feed_id} for camera ID={camera_id}"
         )  # (ADDED COMMENT)
-        return None
+        logger.debug("[REPO][UPDATE_FEED] Updated record: %s", feed)  # (ADDED COMMENT)
+        self._data_version += 1
+        return feed
 
     # REMOVE FEED
     def remove_feed(self, camera_id: UUID, feed_id: UUID) -> bool:
-
+        """
+        Finding the feed and updating the indexes is O(1), but rebuilding
+        cam.available_feeds is O(feeds of the camera). A Python list cannot
+        drop a middle item in O(1).
+        """
         logger.info(
             f"[REPO] Removing feed ID={feed_id} from camera ID={camera_id}"
         )  # (ADDED COMMENT)
@@ -301,22 +454,29 @@ class SimpleCameraMemoryStorage(CameraRepositoryInterface):
             )  # (ADDED COMMENT)
             return False
 
-        for idx, feed in enumerate(cam.available_feeds):
-            if feed.feed_id == feed_id:
-
-                cam.available_feeds.pop(idx)
-                cam.last_updated_on = datetime.now(timezone.utc)
-                self._store[camera_id] = cam
+        feeds = self._feeds[camera_id]
+        feed = feeds.get(feed_id)  # O(1) instead of scanning + list.pop(idx)
+        if feed is None:
+            logger.debug(
+                f"[REPO][REMOVE_FEED] Feed ID={feed_id} not found for camera ID={camera_id}"
+            )  # (ADDED COMMENT)
+            return False
 
-                logger.info(
-                    f"[REPO][REMOVE_FEED] Removed feed ID={feed_id} from camera ID={camera_id}"
-                )  # (ADDED COMMENT)
-                return True
+        del feeds[feed_id]
+        del self._feed_seq[feed_id]
+        self._unindex_feed(camera_id, feed)
+        # Re-materialize the ordered list from the (ordered) index with one C-level
+        # copy, so the API still returns feeds in the order they were added.
+        # This copy is the O(feeds of the camera) part of a removal.
+        cam.available_feeds = list(feeds.values())
+        cam.last_updated_on = clock.now()
+        self._data_version += 1
+        self._log_mutation("put", camera_id, cam)
 
-        logger.debug(
-            f"[REPO][REMOVE_FEED] Feed ID={feed_id} not found for camera ID={camera_id}"
+        logger.info(
+            f"[REPO][REMOVE_FEED] Removed feed ID={feed_id} from camera ID={camera_id}"
         )  # (ADDED COMMENT)
-        return False
+        return True
 
     # GET FEED
     def get_feed(self, camera_id: UUID, feed_id: UUID) -> Optional[VideoFeedInfo]:
@@ -332,16 +492,14 @@ class SimpleCameraMemoryStorage(CameraRepositoryInterface):
             )  # (ADDED COMMENT)
             return None
 
-        for feed in cam.available_feeds:
-            if feed.feed_id == feed_id:
-                return feed
-
-        logger.debug(
-            f"[REPO][GET_FEED] Feed ID={feed_id} not found for camera ID={camera_id}"
-        )  # (ADDED COMMENT)
-        return None
+        feed = self._feeds[camera_id].get(feed_id)
+        if feed is None:
+            logger.debug(
+                f"[REPO][GET_FEED] Feed ID={feed_id} not found for camera ID={camera_id}"
+            )  # (ADDED COMMENT)
+        return feed
 
-    # LIST FEEDS (RAW - NO FILTERS, NO PAGINATION)
+    # LIST FEEDS (FILTERED + PAGINATED, ONE CAMERA)
     def list_feeds(
         self,
         camera_id: UUID,
@@ -354,10 +512,953 @@ class SimpleCameraMemoryStorage(CameraRepositoryInterface):
 
         logger.info(f"[REPO] Listing feeds for camera ID={camera_id}")
 
-        cam = self._store.get(camera_id)
-        if cam is None:
+        if camera_id not in self._feeds:
             logger.debug(f"[REPO][LIST_FEEDS] Camera ID={camera_id} not found.")
             return []
 
-        # RETURN ALL FEEDS — no filtering, no pagination
-        return list(cam.available_feeds)
+        start = max(0, (page - 1) * page_size)
+        matched = self._iter_feeds(camera_id, protocol, port, q)
+        return list(islice(matched, start, start + max(0, page_size)))
+
+    # COUNT FEEDS (same filters as list_feeds, no pagination)
+    def count_feeds(
+        self,
+        camera_id: UUID,
+        protocol: str | None = None,
+        port: int | None = None,
+        q: str | None = None,
+    ) -> int:
+        feeds = self._feeds.get(camera_id)
+        if feeds is None:
+            return 0
+
+        # Answered from index sizes when possible ...
+        if not q and protocol is None and port is None:
+            return len(feeds)
+        if not q and protocol is not None and port is not None:
+            return self._feed_keys[camera_id][(protocol, port)]
+
+        # ... otherwise a counting pass (no list is built)
+        return sum(1 for _ in self._iter_feeds(camera_id, protocol, port, q))
+
+    # SUBSTRING SEARCH ON CAMERA NAME / MODEL (trigram indexes)
+    def search_cameras(
+        self, name: str | None = None, model: str | None = None
+    ) -> List[CameraDetails]:
+
+        logger.info(f"[REPO] Searching cameras name={name} model={model}")
+        return self.query_cameras(CameraFilter(name=name, model=model))
+
+    # FILTERED + PAGINATED CAMERA QUERY
+    def query_cameras(
+        self,
+        flt: CameraFilter,
+        online_since: datetime | None = None,
+        offset: int = 0,
+        limit: int | None = None,
+    ) -> List[CameraDetails]:
+
+        logger.info(f"[REPO] Querying cameras filter={flt}")
+
+        if _has_tag_filter(flt):
+            # every filter as a bitmap → ONE combined bitmap, page read from it
+            # (slot list read first: a compaction on another thread replaces
+            # it with a shorter one, never shrinks this one)
+            slot_ids = self._slot_ids
+            bits = self._filter_bits(flt, online_since)
+            return self._cameras_of(
+                slot_ids[slot] if slot < len(slot_ids) else None
+                for slot in iter_slots(bits, max(0, offset), limit)
+            )
+
+        # Scans read a list COPY of the store (one C-level pass, atomic under
+        # the GIL): an add / remove on another lane thread cannot change the
+        # dict while the filters below loop over it.
+        ids = self._indexed_ids(flt)
+        cams: Iterable[CameraDetails] = (
+            list(self._store.values()) if ids is None else self._cameras_in_order(ids)
+        )
+        if flt.online is not None:
+            cams = self._online_filter(cams, online_since, flt.online)
+
+        # Only the requested page of the filtered cameras is collected.
+        # a negative offset / limit is clamped: islice rejects negative values
+        start = max(0, offset)
+        stop = None if limit is None else start + max(0, limit)
+        return list(islice(cams, start, stop))
+
+    # COUNT CAMERAS (same filters as query_cameras, no pagination)
+    def count_cameras(
+        self, flt: CameraFilter, online_since: datetime | None = None
+    ) -> int:
+
+        if _has_tag_filter(flt):
+            return self._filter_bits(flt, online_since).bit_count()
+
+        # an id list is a candidate set, like the text filters
+        has_text = bool(flt.name or flt.model) or flt.camera_ids is not None
+        has_ip = flt.ip_from is not None or flt.ip_to is not None
+
+        if flt.online is None:
+            # INDEX CARDINALITIES
+            if not has_text and not has_ip:
+                return len(self._store)
+            if not has_text:
+                lo, hi = self._ip_bounds(flt)
+                return hi - lo
+            return len(self._indexed_ids(flt) or ())
+
+        if not has_text and not has_ip and online_since is not None:
+            # online tracker size (after expiring stale check-ins)
+            self._expire_online(online_since)
+            online = len(self._online)
+            return online if flt.online else len(self._store) - online
+
+        # COUNTING PASS over candidates (no Pydantic objects, no result list);
+        # over a copy of the store, like query_cameras
+        ids = self._indexed_ids(flt)
+        cams = list(self._store.values()) if ids is None else self._cameras_of(ids)
+        return sum(1 for _ in self._online_filter(cams, online_since, flt.online))
+
+    # FEED DUPLICATE CHECK (protocol + port)
+    def feed_exists(self, camera_id: UUID, protocol: str, port: int) -> bool:
+        keys = self._feed_keys.get(camera_id)
+        return keys is not None and keys[(protocol, port)] > 0
+
+    # FLEET-WIDE FEED SEARCH
+    def search_feeds(
+        self,
+        protocol: str | None = None,
+        port: int | None = None,
+        q: str | None = None,
+        page: int = 1,
+        page_size: int = 20,
+        by_camera: bool = False,
+    ) -> List[CameraFeedInfo]:
+
+        logger.info(
+            f"[REPO] Searching feeds protocol={protocol} port={port} q={q}"
+        )
+
+        refs = self._search_feed_refs(protocol, port, q)
+
+        # Only the requested page is turned into response objects.
+        start = max(0, (page - 1) * page_size)
+        stop = start + max(0, page_size)
+        if by_camera:
+            # posting lists follow feed insertion: pick the first `stop`
+            # matches in camera order without sorting all of them
+            refs = heapq.nsmallest(stop, refs, key=self._feed_ref_order)
+        result = []
+        for camera_id, feed_id in islice(refs, start, stop):
+            feed = self._feeds.get(camera_id, {}).get(feed_id)
+            if feed is None:
+                continue  # removed by another thread since the refs were copied
+            result.append(
+                CameraFeedInfo(camera_id=camera_id, **feed.model_dump())
+            )
+
+        logger.debug(f"[REPO][SEARCH_FEEDS] Returning {len(result)} feeds")
+        return result
+
+    # COUNT FLEET-WIDE FEED SEARCH RESULTS
+    def count_search_feeds(
+        self,
+        protocol: str | None = None,
+        port: int | None = None,
+        q: str | None = None,
+    ) -> int:
+        if not q:
+            if protocol is None and port is None:
+                return len(self._feed_seq)
+            return len(self._feed_posting(protocol, port))  # posting size
+        path_matches = self._path_index.search(q)
+        if protocol is None and port is None:
+            return len(path_matches)
+        return sum(
+            1 for ref in self._matching_feed_refs(protocol, port) if ref in path_matches
+        )
+
+    # HEARTBEAT / CHECK-IN
+    def record_checkin(
+        self,
+        camera_id: UUID,
+        checkin: datetime,
+        updated_on: datetime | None = None,
+    ) -> Optional[CameraDetails]:
+
+        cam = self._store.get(camera_id)
+        if cam is None:
+            logger.debug(f"[REPO][CHECKIN] Camera ID={camera_id} not found.")
+            return None
+
+        # HOT PATH (every heartbeat): plain __dict__ writes (the values are
+        # already datetimes) and online-set / bitmap work only on a change
+        fields = cam.__dict__
+        fields["last_known_checkin"] = checkin
+        if updated_on is not None:
+            fields["last_updated_on"] = updated_on
+        slot = self._slot_of[camera_id]
+        at_ns = to_ns(checkin)
+        self._checkins[slot] = at_ns
+        self._history.record(camera_id, at_ns / NS_PER_SECOND)
+        online = self._online
+        if self._status.record(camera_id, at_ns):
+            # Check-ins arrive with the current time, so appending at the end
+            # keeps _online ordered by check-in time.
+            try:
+                online.move_to_end(camera_id)
+            except KeyError:  # offline → online
+                self._online_bits.add(slot)
+                self._status_version += 1
+            online[camera_id] = checkin
+        elif camera_id in online:
+            # checked in, but not (yet / any more) online: too few heartbeats
+            # in a row after an outage, or flapping
+            del online[camera_id]
+            self._online_bits.discard(slot)
+            self._status_version += 1
+        self._checkin_version += 1
+        if self._mutation_log is not None:
+            self._log_mutation("checkin", camera_id, cam)
+        return cam
+
+    def camera_state(self, camera_id: UUID, now_ns: int) -> Optional[CameraStatus]:
+        if camera_id not in self._store:
+            return None
+        return self._status.state(camera_id, now_ns)
+
+    def checkin_history(self, camera_id: UUID) -> Optional[CheckinHistory]:
+        return self._history.snapshot(camera_id)
+
+    def uptime_inputs(self) -> List[UptimeInput]:
+        snapshot = self._history.snapshot
+        return [
+            (camera_id, cam.added_on, snapshot(camera_id))
+            for camera_id, cam in list(self._store.items())  # creation order
+        ]
+
+    def fleet_columns(self) -> FleetColumns:
+        if self._columns is None or self._columns_version != self._data_version:
+            self._columns = FleetColumns.build(
+                (
+                    camera_id,
+                    (
+                        self._slot_of[camera_id],
+                        self._ip_of[camera_id],
+                        cam.camera_model,
+                        len(self._feeds[camera_id]),
+                    ),
+                )
+                for camera_id, cam in list(self._store.items())  # creation order
+            )
+            self._columns_version = self._data_version
+        return self._columns.with_checkins(self._checkins)
+
+    # VERSIONS + ONLINE EXPIRY (used by the query result cache)
+    def data_version(self) -> int:
+        return self._data_version
+
+    def checkin_version(self) -> int:
+        return self._checkin_version
+
+    def status_version(self) -> int:
+        return self._status_version
+
+    def oldest_online_checkin(self, online_since: datetime) -> Optional[datetime]:
+        self._expire_online(online_since)
+        if not self._online:
+            return None
+        return next(iter(self._online.values()))
+
+    # FLEET STATISTICS
+    def fleet_stats(self, online_since: datetime) -> FleetStats:
+        logger.info("[REPO] Reading fleet statistics")
+
+        self._expire_online(online_since)
+        online = len(self._online)
+
+        return FleetStats(
+            total_cameras=len(self._store),
+            total_feeds=len(self._feed_seq),
+            online=online,
+            offline=len(self._store) - online,
+            by_model=dict(self._count_by_model),
+            by_protocol=dict(self._count_by_protocol),
+            by_subnet=dict(self._count_by_subnet),
+            by_tag=self._tags.counts(),
+            flapping=self._status.flapping(clock.now_ns()),
+        )
+
+    # RESET (used by tests to start from an empty storage)
+    def clear(self) -> None:
+        self._store.clear()
+        self._feeds.clear()
+        self._feed_keys.clear()
+        self._feeds_by_protocol.clear()
+        self._feeds_by_port.clear()
+        self._feeds_by_key.clear()
+        self._name_index.clear()
+        self._model_index.clear()
+        self._path_index.clear()
+        self._camera_seq.clear()
+        self._feed_seq.clear()
+        self._count_by_model.clear()
+        self._count_by_protocol.clear()
+        self._count_by_subnet.clear()
+        self._online.clear()
+        self._history.clear()
+        self._status.clear()
+        self._ip_of.clear()
+        self._ip_sorted.clear()
+        self._slot_of.clear()
+        self._slot_ids.clear()
+        self._live.clear()
+        self._online_bits.clear()
+        self._tags.clear()
+        self._checkins = checkin_column()
+        self._columns = None
+        self._data_version += 1
+        self._checkin_version += 1
+        self._status_version += 1
+        self._log_mutation("clear", None, None)
+
+    # BULK UPDATE (PATCH /cameras): one pass, ONE version bump, no per-camera logs
+    def update_cameras(
+        self, camera_ids: Iterable[UUID], updates: CameraUpdate
+    ) -> int:
+
+        now = clock.now()
+        updated = 0
+        model_changed: List[UUID] = []
+        for camera_id in camera_ids:
+            cam = self._store.get(camera_id)
+            if cam is not None and self._apply_update(
+                camera_id, cam, updates, bulk_model_ids=model_changed
+            ):
+                cam.__dict__["last_updated_on"] = now
+                updated += 1
+                self._log_mutation("put", camera_id, cam)
+
+        # model index: ONE bulk update instead of one per camera
+        if model_changed:
+            self._model_index.update_many(model_changed, updates.camera_model)
+        if updated:
+            self._data_version += 1
+        logger.info(f"[REPO][BULK_UPDATE] Updated {updated} cameras")
+        return updated
+
+    # BULK REMOVE (DELETE /cameras?cidr=...): one pass, ONE version bump
+    def remove_cameras(self, camera_ids: Iterable[UUID]) -> List[BulkOutcome]:
+
+        outcomes: List[BulkOutcome] = []
+        removed: Set[UUID] = set()
+        for camera_id in camera_ids:
+            if camera_id in self._store and camera_id not in removed:
+                self._drop_camera(camera_id)
+                removed.add(camera_id)
+                outcomes.append((camera_id, None, "deleted"))
+            else:
+                outcomes.append((camera_id, None, "not_found"))
+
+        if removed:
+            # Sorted IP index: ONE filtering pass instead of a list deletion
+            # (O(n) memmove) per camera.
+            self._ip_sorted = [e for e in self._ip_sorted if e[3] not in removed]
+            for camera_id in removed:
+                del self._ip_of[camera_id]
+                self._log_mutation("delete", camera_id, None)
+            self._compact_slots_if_sparse()
+            self._data_version += 1
+        logger.info(f"[REPO][BULK_REMOVE] Removed {len(removed)} cameras")
+        return outcomes
+
+    # BULK FEED OPERATIONS (POST /feeds/bulk): one pass, ONE version bump each
+    def add_feeds(
+        self, camera_ids: Iterable[UUID], feed: VideoFeedSetup
+    ) -> List[BulkOutcome]:
+
+        key = (feed.feed_protocol, feed.feed_port)
+        now = clock.now()
+        outcomes: List[BulkOutcome] = []
+        for camera_id in camera_ids:
+            cam = self._store.get(camera_id)
+            if cam is None:
+                outcomes.append((camera_id, None, "not_found"))
+                continue
+            if self._feed_keys[camera_id][key]:
+                outcomes.append((camera_id, None, "conflict"))  # protocol+port taken
+                continue
+            new_feed = VideoFeedInfo.model_construct(
+                feed_protocol=feed.feed_protocol,
+                feed_port=feed.feed_port,
+                feed_path=feed.feed_path,
+                feed_id=uuid4(),
+            )
+            cam.available_feeds.append(new_feed)
+            self._insert_feed(camera_id, new_feed)
+            cam.__dict__["last_updated_on"] = now
+            outcomes.append((camera_id, new_feed.feed_id, "added"))
+
+        self._bump_if_any(outcomes, "added")
+        return outcomes
+
+    def update_feeds(
+        self,
+        camera_ids: Iterable[UUID],
+        protocol: str,
+        port: int | None,
+        updates: FeedUpdate,
+    ) -> List[BulkOutcome]:
+
+        now = clock.now()
+        outcomes: List[BulkOutcome] = []
+        for camera_id in camera_ids:
+            if camera_id not in self._store:
+                outcomes.append((camera_id, None, "not_found"))
+                continue
+            keys = self._feed_keys[camera_id]
+            for feed in list(self._feeds[camera_id].values()):
+                if not _feed_matches(feed, protocol, port):
+                    continue
+                old_key = (feed.feed_protocol, feed.feed_port)
+                new_key = (
+                    updates.feed_protocol or feed.feed_protocol,
+                    feed.feed_port if updates.feed_port is None else updates.feed_port,
+                )
+                if new_key != old_key and keys[new_key]:
+                    outcomes.append((camera_id, feed.feed_id, "conflict"))
+                    continue
+                # same steps as update_feed(): out of the value indexes, change
+                # in place, back in
+                self._unindex_feed(camera_id, feed)
+                fields = feed.__dict__
+                fields["feed_protocol"], fields["feed_port"] = new_key
+                if updates.feed_path is not None:
+                    fields["feed_path"] = updates.feed_path
+                self._index_feed(camera_id, feed)
+                self._store[camera_id].__dict__["last_updated_on"] = now
+                outcomes.append((camera_id, feed.feed_id, "updated"))
+
+        self._bump_if_any(outcomes, "updated")
+        return outcomes
+
+    def remove_feeds(
+        self, camera_ids: Iterable[UUID], protocol: str, port: int | None
+    ) -> List[BulkOutcome]:
+
+        now = clock.now()
+        outcomes: List[BulkOutcome] = []
+        for camera_id in camera_ids:
+            cam = self._store.get(camera_id)
+            if cam is None:
+                outcomes.append((camera_id, None, "not_found"))
+                continue
+            feeds = self._feeds[camera_id]
+            doomed = [f for f in feeds.values() if _feed_matches(f, protocol, port)]
+            for feed in doomed:
+                del feeds[feed.feed_id]
+                del self._feed_seq[feed.feed_id]
+                self._unindex_feed(camera_id, feed)
+                outcomes.append((camera_id, feed.feed_id, "removed"))
+            if doomed:
+                cam.available_feeds = list(feeds.values())  # once per camera
+                cam.__dict__["last_updated_on"] = now
+
+        self._bump_if_any(outcomes, "removed")
+        return outcomes
+
+    # REPLICATION (see replication.py)
+    def set_mutation_log(self, hook: Optional[MutationHook]) -> None:
+        """
+        Call `hook(op, camera_id, camera)` after every write (None = stop).
+        """
+        self._mutation_log = hook
+
+    def apply_camera(self, record: CameraDetails) -> None:
+        """
+        Insert or replace a camera with the exact state shipped by a leader
+        (same camera / feed ids and timestamps), keeping every index in step.
+        last_known_checkin is NOT taken from the record: check-ins arrive
+        through record_checkin(), so status and history follow them.
+        """
+        camera_id = record.camera_id
+        cam = self._store.get(camera_id)
+        if cam is None:
+            record.__dict__["last_known_checkin"] = None
+            self._insert_camera(record)
+        else:
+            # bulk mode: only fields with a different value touch the indexes
+            model_changed: List[UUID] = []
+            self._apply_update(
+                camera_id,
+                cam,
+                CameraUpdate.model_construct(
+                    camera_name=record.camera_name,
+                    camera_model=record.camera_model,
+                    network_setup=record.network_setup,
+                    image_settings=record.image_settings,
+                    tags=record.tags,
+                ),
+                bulk_model_ids=model_changed,
+            )
+            if model_changed:
+                self._model_index.update_many(model_changed, record.camera_model)
+            self._sync_feeds(camera_id, cam, record.available_feeds)
+            cam.__dict__["added_on"] = record.added_on
+            cam.__dict__["last_updated_on"] = record.last_updated_on
+        self._data_version += 1
+
+    def apply_checkin(
+        self, camera_id: UUID, checkin: datetime, updated_on: datetime
+    ) -> None:
+        """
+        A check-in shipped by a leader (with the camera's last_updated_on).
+        Skipped when the camera already has this check-in or a newer one:
+        records can arrive twice (snapshot + stream, see replication.py).
+        """
+        cam = self._store.get(camera_id)
+        if cam is None or (
+            cam.last_known_checkin is not None and cam.last_known_checkin >= checkin
+        ):
+            return
+        self.record_checkin(camera_id, checkin, updated_on)
+
+    # INTERNAL HELPERS
+    def _insert_camera(self, cam: CameraDetails) -> None:
+        # Put a new camera (with its feeds) into the store and every index.
+        camera_id = cam.camera_id
+        self._store[camera_id] = cam
+        self._camera_seq[camera_id] = next(self._seq_counter)
+        self._name_index.add(camera_id, cam.camera_name)
+        self._model_index.add(camera_id, cam.camera_model)
+        self._count_by_model[cam.camera_model] += 1
+        self._count_by_subnet[self._subnet_of(cam)] += 1
+        self._index_ip(camera_id, cam)
+        self._assign_slot(camera_id, cam)
+        self._feeds[camera_id] = {}
+        self._feed_keys[camera_id] = Counter()
+        for f in cam.available_feeds:
+            self._insert_feed(camera_id, f)
+
+    def _sync_feeds(
+        self, camera_id: UUID, cam: CameraDetails, feeds: List[VideoFeedInfo]
+    ) -> None:
+        # Make the camera's feeds equal to `feeds` (same ids): gone feeds are
+        # removed, changed ones re-indexed in place, new ones appended.
+        current = self._feeds[camera_id]
+        wanted = {feed.feed_id for feed in feeds}
+        for feed_id in [fid for fid in current if fid not in wanted]:
+            del self._feed_seq[feed_id]
+            self._unindex_feed(camera_id, current.pop(feed_id))
+        for feed in feeds:
+            old = current.get(feed.feed_id)
+            if old is None:
+                self._insert_feed(camera_id, feed)
+            elif not _same(old, feed):
+                self._unindex_feed(camera_id, old)
+                old.__dict__.update(feed.__dict__)
+                self._index_feed(camera_id, old)
+        cam.__dict__["available_feeds"] = list(current.values())
+
+    def _log_mutation(
+        self, op: str, camera_id: Optional[UUID], cam: Optional[CameraDetails]
+    ) -> None:
+        if self._mutation_log is not None:
+            self._mutation_log(op, camera_id, cam)
+
+    def _drop_camera(self, camera_id: UUID) -> None:
+        # Remove a camera from the store and every index EXCEPT the sorted IP
+        # index (single removals bisect it, bulk removals rebuild it once).
+        cam = self._store.pop(camera_id)
+        _decrement(self._count_by_model, cam.camera_model)
+        _decrement(self._count_by_subnet, self._subnet_of(cam))
+        self._online.pop(camera_id, None)
+        self._history.remove(camera_id)
+        self._status.remove(camera_id)
+        slot = self._slot_of.pop(camera_id)
+        self._slot_ids[slot] = None
+        self._live.discard(slot)
+        self._online_bits.discard(slot)
+        self._tags.remove(slot, cam.tags)
+        del self._camera_seq[camera_id]
+        self._name_index.remove(camera_id)
+        self._model_index.remove(camera_id)
+        for feed in self._feeds[camera_id].values():
+            self._unindex_feed(camera_id, feed)
+            del self._feed_seq[feed.feed_id]
+        del self._feeds[camera_id]
+        del self._feed_keys[camera_id]
+
+    def _bump_if_any(self, outcomes: List[BulkOutcome], done: str) -> None:
+        changed = sum(1 for outcome in outcomes if outcome[2] == done)
+        if changed:
+            self._data_version += 1
+            if self._mutation_log is not None:
+                # one "put" per changed camera (dict: unique, in order)
+                for camera_id in dict.fromkeys(o[0] for o in outcomes if o[2] == done):
+                    self._log_mutation("put", camera_id, self._store[camera_id])
+        logger.info(f"[REPO][BULK_FEEDS] {done} {changed} feeds")
+
+    def _apply_update(
+        self,
+        camera_id: UUID,
+        cam: CameraDetails,
+        updates: CameraUpdate,
+        bulk_model_ids: Optional[List[UUID]] = None,
+    ) -> bool:
+        # Apply the set fields of `updates` to `cam` and keep every index in
+        # step. Fields that already have the new value are skipped; returns
+        # True if a field actually changed.
+        # BULK MODE (bulk_model_ids given): cameras whose model changes are
+        # collected in bulk_model_ids instead of updating the model index one
+        # by one.
+        # Values are written straight into cam.__dict__: CameraUpdate already
+        # validated them, and this skips Pydantic's per-assignment hook.
+        # NOTE: a bulk update gives every camera the SAME image_settings /
+        # network_setup / tags object; fields are always replaced, never mutated.
+        bulk = bulk_model_ids is not None
+        fields = cam.__dict__
+        changed = False
+
+        name = updates.camera_name
+        if name is not None and name != cam.camera_name:
+            fields["camera_name"] = name
+            self._name_index.update(camera_id, name)
+            changed = True
+
+        model = updates.camera_model
+        if model is not None and model != cam.camera_model:
+            _decrement(self._count_by_model, cam.camera_model)
+            fields["camera_model"] = model
+            self._count_by_model[model] += 1
+            if bulk:
+                bulk_model_ids.append(camera_id)
+            else:
+                self._model_index.update(camera_id, model)
+            changed = True
+
+        network = updates.network_setup
+        if network is not None and not _same(network, cam.network_setup):
+            _decrement(self._count_by_subnet, self._subnet_of(cam))
+            self._unindex_ip(camera_id)
+            fields["network_setup"] = network
+            self._count_by_subnet[self._subnet_of(cam)] += 1
+            self._index_ip(camera_id, cam)
+            changed = True
+
+        image = updates.image_settings
+        if image is not None and not _same(image, cam.image_settings):
+            fields["image_settings"] = image
+            changed = True
+
+        tags = updates.tags
+        if tags is not None and tags != cam.tags:
+            slot = self._slot_of[camera_id]
+            self._tags.remove(slot, cam.tags)
+            fields["tags"] = tags
+            self._tags.add(slot, tags)
+            changed = True
+
+        return changed
+
+    # _feeds[camera_id] (the ordered per-camera map) is changed ONLY by
+    # _insert_feed and remove_feed, so an update never changes feed order.
+    # Every value-keyed index goes through _index_feed / _unindex_feed (or
+    # their (protocol, port) half, _index_feed_key / _unindex_feed_key, plus
+    # _path_index.update in update_feed), so the per-camera and fleet-wide
+    # indexes never drift apart.
+    def _insert_feed(self, camera_id: UUID, feed: VideoFeedInfo) -> None:
+        self._feeds[camera_id][feed.feed_id] = feed
+        self._feed_seq[feed.feed_id] = next(self._seq_counter)
+        self._index_feed(camera_id, feed)
+
+    def _index_feed(self, camera_id: UUID, feed: VideoFeedInfo) -> None:
+        self._index_feed_key(camera_id, feed)
+        self._path_index.add((camera_id, feed.feed_id), feed.feed_path)
+
+    def _unindex_feed(self, camera_id: UUID, feed: VideoFeedInfo) -> None:
+        self._unindex_feed_key(camera_id, feed)
+        self._path_index.remove((camera_id, feed.feed_id))
+
+    # the (protocol, port)-keyed half of _index_feed / _unindex_feed
+    def _index_feed_key(self, camera_id: UUID, feed: VideoFeedInfo) -> None:
+        key = (feed.feed_protocol, feed.feed_port)
+        ref = (camera_id, feed.feed_id)
+
+        self._feed_keys[camera_id][key] += 1
+        self._count_by_protocol[feed.feed_protocol] += 1
+
+        self._feeds_by_protocol.setdefault(feed.feed_protocol, {})[ref] = None
+        self._feeds_by_port.setdefault(feed.feed_port, {})[ref] = None
+        self._feeds_by_key.setdefault(key, {})[ref] = None
+
+    def _unindex_feed_key(self, camera_id: UUID, feed: VideoFeedInfo) -> None:
+        key = (feed.feed_protocol, feed.feed_port)
+        ref = (camera_id, feed.feed_id)
+
+        _decrement(self._feed_keys[camera_id], key)
+        _decrement(self._count_by_protocol, feed.feed_protocol)
+
+        for index, value in (
+            (self._feeds_by_protocol, feed.feed_protocol),
+            (self._feeds_by_port, feed.feed_port),
+            (self._feeds_by_key, key),
+        ):
+            posting = index.get(value)
+            if posting is not None:
+                posting.pop(ref, None)
+                if not posting:
+                    del index[value]  # drop empty posting lists
+
+    def _online_filter(
+        self,
+        cams: Iterable[CameraDetails],
+        online_since: datetime | None,
+        online: bool,
+    ) -> Iterable[CameraDetails]:
+        # Online = checked in at or after online_since AND online for the
+        # status tracker; inlined (no call per camera) for the online scans.
+        if online_since is None:
+            return cams if not online else iter(())
+        tracked = self._online
+        return (
+            c
+            for c in cams
+            if (
+                (t := c.last_known_checkin) is not None
+                and t >= online_since
+                and c.camera_id in tracked
+            )
+            == online
+        )
+
+    def _expire_online(self, online_since: datetime) -> None:
+        # Pop cameras from the FRONT while their check-in is too old.
+        # Amortized O(1): every camera is popped at most once per check-in.
+        while self._online:
+            camera_id, checkin = next(iter(self._online.items()))
+            if checkin >= online_since:
+                break
+            del self._online[camera_id]
+            self._online_bits.discard(self._slot_of[camera_id])
+
+    @staticmethod
+    def _subnet_of(cam: CameraDetails) -> str:
+        ip = cam.network_setup.ip_address
+        prefix = (
+            Config.STATS_SUBNET_PREFIX_V4
+            if ip.version == 4
+            else Config.STATS_SUBNET_PREFIX_V6
+        )
+        # mask the address as an int: same text as str(ip_network(...)),
+        # without formatting and re-parsing "ip/prefix" (add / remove path)
+        host_bits = ip.max_prefixlen - prefix
+        return f"{type(ip)(int(ip) >> host_bits << host_bits)}/{prefix}"
+
+    def _cameras_in_order(self, ids: Set[UUID]) -> List[CameraDetails]:
+        # Few matches → sort them by creation sequence (k log k).
+        # Many matches → one ordered pass over a copy of the store is cheaper.
+        if len(ids) * 4 < len(self._store):
+            seq = self._camera_seq.get
+            return self._cameras_of(sorted(ids, key=lambda cid: seq(cid, -1)))
+        return [cam for cid, cam in list(self._store.items()) if cid in ids]
+
+    def _cameras_of(self, ids: Iterable[Optional[UUID]]) -> List[CameraDetails]:
+        # Cameras of `ids` still in the store: one removed by another thread
+        # since `ids` was read (or a freed slot, None) is skipped instead of
+        # raising KeyError.
+        get = self._store.get
+        return [cam for cam in map(get, ids) if cam is not None]
+
+    def _iter_feeds(
+        self,
+        camera_id: UUID,
+        protocol: str | None,
+        port: int | None,
+        q: str | None,
+    ) -> Iterable[VideoFeedInfo]:
+        # q is folded ONCE; feed paths are already stored folded in _path_index.
+        # The camera's feeds are copied first: add_feed / remove_feed on
+        # another lane thread must not change the dict under the loop.
+        q_folded = fold(q) if q else None
+        for feed_id, f in list(self._feeds.get(camera_id, {}).items()):
+            if protocol is not None and f.feed_protocol != protocol:
+                continue
+            if port is not None and f.feed_port != port:
+                continue
+            if q_folded and q_folded not in self._path_index.folded_text(
+                (camera_id, feed_id)
+            ):
+                continue
+            yield f
+
+    def _search_feed_refs(
+        self, protocol: str | None, port: int | None, q: str | None
+    ) -> Iterable[FeedRef]:
+        if q and protocol is None and port is None:
+            # Only a path filter → trigram candidates, put back in creation order
+            return sorted(self._path_index.search(q), key=self._feed_ref_order)
+        if q:
+            path_matches = self._path_index.search(q)
+            return (
+                ref
+                for ref in self._matching_feed_refs(protocol, port)
+                if ref in path_matches
+            )
+        return self._matching_feed_refs(protocol, port)
+
+    def _feed_ref_order(self, ref: FeedRef) -> Tuple[int, int]:
+        # (camera creation order, feed creation order); -1 for a ref removed
+        # by another thread meanwhile (search_feeds then skips it)
+        return self._camera_seq.get(ref[0], -1), self._feed_seq.get(ref[1], -1)
+
+    def _index_ip(self, camera_id: UUID, cam: CameraDetails) -> None:
+        key = _ip_key(cam.network_setup.ip_address)
+        self._ip_of[camera_id] = key
+        bisect.insort(
+            self._ip_sorted, (key[0], key[1], self._camera_seq[camera_id], camera_id)
+        )
+
+    def _unindex_ip(self, camera_id: UUID) -> None:
+        version, ip_int = self._ip_of.pop(camera_id)
+        entry = (version, ip_int, self._camera_seq[camera_id], camera_id)
+        pos = bisect.bisect_left(self._ip_sorted, entry)
+        del self._ip_sorted[pos]
+
+    def _ip_bounds(self, flt: CameraFilter) -> Tuple[int, int]:
+        # [lo, hi) positions in _ip_sorted for ip_from <= ip <= ip_to
+        lo = 0
+        hi = len(self._ip_sorted)
+        if flt.ip_from is not None:
+            lo = bisect.bisect_left(self._ip_sorted, _ip_key(flt.ip_from))
+        if flt.ip_to is not None:
+            # (version, ip + 1) sorts right after every entry of ip itself
+            version, ip_int = _ip_key(flt.ip_to)
+            hi = bisect.bisect_left(self._ip_sorted, (version, ip_int + 1))
+        return lo, max(lo, hi)
+
+    def _indexed_ids(self, flt: CameraFilter) -> Optional[Set[UUID]]:
+        # Candidate ids from the name/model/IP indexes (None = no indexed filter).
+        ids: Optional[Set[UUID]] = None
+        if flt.camera_ids is not None:
+            ids = {cid for cid in flt.camera_ids if cid in self._store}
+        if flt.name:
+            found = self._name_index.search(flt.name)
+            ids = found if ids is None else ids & found
+        if flt.model:
+            found = self._model_index.search(flt.model)
+            ids = found if ids is None else ids & found
+
+        if flt.ip_from is not None or flt.ip_to is not None:
+            lo, hi = self._ip_bounds(flt)
+            if ids is None:
+                ids = {entry[3] for entry in self._ip_sorted[lo:hi]}
+            elif hi - lo < len(ids):
+                ids = {entry[3] for entry in self._ip_sorted[lo:hi] if entry[3] in ids}
+            else:
+                low = _ip_key(flt.ip_from) if flt.ip_from is not None else None
+                high = _ip_key(flt.ip_to) if flt.ip_to is not None else None
+                ids = {
+                    cid
+                    for cid in ids
+                    if (low is None or self._ip_of[cid] >= low)
+                    and (high is None or self._ip_of[cid] <= high)
+                }
+        return ids
+
+    def _assign_slot(self, camera_id: UUID, cam: CameraDetails) -> None:
+        slot = len(self._slot_ids)
+        self._slot_ids.append(camera_id)
+        self._slot_of[camera_id] = slot
+        self._live.add(slot)
+        self._tags.add(slot, cam.tags)
+        checkin = cam.last_known_checkin
+        self._checkins.append(NEVER if checkin is None else to_ns(checkin))
+
+    def _compact_slots_if_sparse(self) -> None:
+        # Renumber once more than half of the slots are free: O(n), but only
+        # after n/2 removals, so amortized O(1) per removal.
+        if len(self._slot_ids) <= 2 * len(self._store) + 64:
+            return
+        self._slot_ids = []
+        self._slot_of = {}
+        self._live = Bitmap()
+        self._tags = TagIndex()
+        self._checkins = checkin_column()
+        for camera_id, cam in self._store.items():  # creation order
+            self._assign_slot(camera_id, cam)
+        self._online_bits = Bitmap(self._slot_of[cid] for cid in self._online)
+
+    def _filter_bits(self, flt: CameraFilter, online_since: datetime | None) -> int:
+        # Bitmap of the cameras matching ALL set filters.
+        bits = self._live.to_int()
+        if flt.tags_all:
+            bits = self._tags.all_of(flt.tags_all, bits)
+        if flt.tags_any:
+            bits &= self._tags.any_of(flt.tags_any)
+        if flt.tags_none:
+            bits &= ~self._tags.any_of(flt.tags_none)
+
+        # name / model / IP / id candidates → one bitmap
+        ids = self._indexed_ids(flt)
+        if ids is not None:
+            bits &= bits_of(self._slot_of[cid] for cid in ids)
+
+        if flt.online is not None:
+            online = 0
+            if online_since is not None:
+                self._expire_online(online_since)
+                online = self._online_bits.to_int()
+            bits = bits & online if flt.online else bits & ~online
+        return bits
+
+    def _matching_feed_refs(
+        self, protocol: str | None, port: int | None
+    ) -> List[FeedRef]:
+        # A list COPY of the matching refs: add_feed / remove_feed on another
+        # lane thread change the posting dicts while a search paginates.
+        if protocol is None and port is None:
+            # No filter → every feed of every camera (cameras in insertion order)
+            return [
+                (camera_id, feed_id)
+                for camera_id, feeds in list(self._feeds.items())
+                for feed_id in list(feeds)
+            ]
+        return list(self._feed_posting(protocol, port))
+
+    def _feed_posting(
+        self, protocol: str | None, port: int | None
+    ) -> Dict[FeedRef, None]:
+        # The most specific (live) posting list for the given filters; at
+        # least one of protocol / port is set. Callers only copy or size it.
+        if protocol is not None and port is not None:
+            return self._feeds_by_key.get((protocol, port), {})
+        if protocol is not None:
+            return self._feeds_by_protocol.get(protocol, {})
+        return self._feeds_by_port.get(port, {})
+
+
+def _has_tag_filter(flt: CameraFilter) -> bool:
+    return bool(flt.tags_any or flt.tags_all or flt.tags_none)
+
+
+def _feed_matches(feed: VideoFeedInfo, protocol: str, port: int | None) -> bool:
+    return feed.feed_protocol == protocol and (port is None or feed.feed_port == port)
+
+
+def _same(a, b) -> bool:
+    # Equal field values of two models of the same type (plain dict compare:
+    # much cheaper than BaseModel.__eq__ when called for every camera).
+    return a is b or (type(a) is type(b) and a.__dict__ == b.__dict__)
+
+
+def _decrement(counter: Counter, key) -> None:
+    # Counter minus one; drop the key at zero so "groups" never list empty entries.
+    counter[key] -= 1
+    if counter[key] <= 0:
+        del counter[key]
+
+
+def _ip_key(ip) -> IpKey:
+    return (ip.version, int(ip))
@@ -0,0 +1,161 @@
+# N-GRAM (TRIGRAM) INDEX FOR FAST SUBSTRING SEARCH
+#
+# Problem:
+#   "model contains 'ds-2cd'" used to mean: for EVERY camera, lowercase the model
+#   and run `pattern in text`. That is O(number of cameras) on every request.
+#
+# Idea:
+#   Split every (lowercased) text into overlapping 3-letter pieces ("trigrams"):
+#       "axis p32" → "axi", "xis", "is ", "s p", " p3", "p32"
+#   and remember which keys contain each trigram (a "posting list").
+#   A substring of length >= 3 can only occur in a text that contains ALL of its
+#   trigrams, so intersecting the posting lists gives a small candidate set.
+#   Candidates are then VERIFIED with `pattern in text` (trigrams may be present
+#   but not next to each other).
+#
+#   Patterns shorter than 3 letters have no trigram, so they fall back to a scan
+#   over the already-lowercased texts (still no .lower() per candidate).
+#
+# The index is maintained incrementally: add / update / remove per key
+# (update_many for bulk updates that give many keys the same text).
+
+from typing import Dict, Hashable, Iterable, Set
+
+NGRAM_SIZE = 3
+
+
+def fold(text: str) -> str:
+    """
+    Case folding used for BOTH stored texts and search patterns.
+    (lower() keeps the old `model.lower() in camera_model.lower()` semantics)
+    """
+    return text.lower()
+
+
+def ngrams(folded: str, n: int = NGRAM_SIZE) -> Set[str]:
+    """
+    All distinct n-grams of an already folded string.
+    """
+    return {folded[i : i + n] for i in range(len(folded) - n + 1)}
+
+
+class TrigramIndex:
+    """
+    Substring index: key → text, searchable by case-insensitive substring.
+    Keys can be any hashable value (camera_id, (camera_id, feed_id), ...).
+    """
+
+    def __init__(self):
+        # trigram → set of keys whose text contains that trigram
+        self._postings: Dict[str, Set[Hashable]] = {}
+        # key → folded text (used for verification and short-pattern scans)
+        self._texts: Dict[Hashable, str] = {}
+
+    def __len__(self) -> int:
+        return len(self._texts)
+
+    # MAINTENANCE
+    # add / remove go through a one-key set: `posting |= single` and
+    # `posting -= single` reuse the hash stored in `single`, so the key is
+    # hashed ONCE instead of once per trigram (UUID and tuple keys hash in
+    # Python code, which made that the main cost of a camera removal).
+    def add(self, key: Hashable, text: str) -> None:
+        folded = fold(text)
+        self._texts[key] = folded
+        single = {key}
+        postings = self._postings
+        for gram in ngrams(folded):
+            posting = postings.get(gram)
+            if posting is None:
+                postings[gram] = single.copy()
+            else:
+                posting |= single
+
+    def remove(self, key: Hashable) -> None:
+        folded = self._texts.pop(key, None)
+        if folded is None:
+            return
+        single = {key}
+        postings = self._postings
+        for gram in ngrams(folded):
+            posting = postings.get(gram)
+            if posting is not None:
+                posting -= single
+                if not posting:
+                    del postings[gram]  # keep the index small
+
+    def update(self, key: Hashable, text: str) -> None:
+        # Only touch the posting lists when the folded text really changed.
+        if self._texts.get(key) == fold(text):
+            return
+        self.remove(key)
+        self.add(key, text)
+
+    def update_many(self, keys: Iterable[Hashable], text: str) -> None:
+        """
+        Give MANY keys the same text (bulk updates). Posting lists change with
+        one C-level set operation per trigram instead of one per key.
+        """
+        folded = fold(text)
+        changed: Set[Hashable] = set()
+        by_old_text: Dict[str, Set[Hashable]] = {}
+        for key in keys:
+            old = self._texts.get(key)
+            if old == folded:
+                continue
+            changed.add(key)
+            if old is not None:
+                by_old_text.setdefault(old, set()).add(key)
+        if not changed:
+            return
+
+        for old, group in by_old_text.items():
+            for gram in ngrams(old):
+                posting = self._postings.get(gram)
+                if posting is not None:
+                    posting -= group
+                    if not posting:
+                        del self._postings[gram]
+        self._texts.update(dict.fromkeys(changed, folded))
+        for gram in ngrams(folded):
+            self._postings.setdefault(gram, set()).update(changed)
+
+    def clear(self) -> None:
+        self._postings.clear()
+        self._texts.clear()
+
+    # QUERIES
+    def folded_text(self, key: Hashable) -> str:
+        """
+        The stored (already lowercased) text of `key`, or "" if unknown.
+        Lets callers test `fold(pattern) in text` without folding per candidate.
+        """
+        return self._texts.get(key, "")
+
+    def search(self, pattern: str) -> Set[Hashable]:
+        """
+        All keys whose text contains `pattern` (case-insensitive). Unordered.
+        """
+        folded = fold(pattern)
+
+        # SHORT PATTERN → verified scan over the pre-folded texts
+        if len(folded) < NGRAM_SIZE:
+            # (over a copy: a writer thread may add / remove texts meanwhile)
+            return {key for key, text in list(self._texts.items()) if folded in text}
+
+        # LONG PATTERN → intersect posting lists, smallest first
+        postings = []
+        for gram in ngrams(folded):
+            posting = self._postings.get(gram)
+            if not posting:
+                return set()  # one trigram never occurs → no match at all
+            postings.append(posting)
+        postings.sort(key=len)
+
+        # set.intersection runs in C and always loops over the smaller side
+        candidates = postings[0].intersection(*postings[1:])
+
+        # VERIFY (trigrams present ≠ substring present); a key removed by a
+        # writer thread since the postings were read has no text any more
+        texts = self._texts
+        return {key for key in candidates if folded in texts.get(key, "")}
@@ -0,0 +1,36 @@
+# This file keeps a REGISTRY of every concrete repository implementation.
+# Why a registry?
+# → Tools that must exercise "every storage backend" (benchmarks, contract tests)
+#   can loop over this dictionary instead of hard-coding class names.
+# → Adding a new storage (SQL, Redis, ...) only needs ONE new line here.
+#
+# Key   = short backend name (used in benchmark output and config)
+# Value = a zero-argument factory that returns a fresh, empty repository
+
+from typing import Callable, Dict
+
+from app.repository.interface import CameraRepositoryInterface
+from app.repository.memory_repo import SimpleCameraMemoryStorage
+from app.repository.remote_repo import RemoteCameraStorage
+from app.repository.sharded_repo import ShardedCameraStorage
+
+REPOSITORY_REGISTRY: Dict[str, Callable[[], CameraRepositoryInterface]] = {
+    "memory": SimpleCameraMemoryStorage,
+    "sharded": ShardedCameraStorage,  # Config.REPOSITORY_SHARDS memory shards
+    "remote": RemoteCameraStorage,  # storage server at Config.STORAGE_SOCKET
+}
+
+
+def build_repository(name: str = "memory") -> CameraRepositoryInterface:
+    """
+    Create a fresh repository for the given backend name.
+    Raises KeyError if the backend is not registered.
+    """
+    try:
+        factory = REPOSITORY_REGISTRY[name]
+    except KeyError:
+        raise KeyError(
+            f"Unknown repository backend '{name}'. "
+            f"Registered: {', '.join(sorted(REPOSITORY_REGISTRY))}"
+        )
+    return factory()
@@ -0,0 +1,391 @@
+# REMOTE REPOSITORY (client of the storage server)
+#
+# Problem:
+#   With several uvicorn workers, each worker needs the SAME fleet, but an
+#   in-memory repository only lives inside one process.
+#
+# Solution:
+#   RemoteCameraStorage implements CameraRepositoryInterface by forwarding
+#   every call to the storage server (storage_server.py) over its Unix domain
+#   socket, using the binary frames of wire.py.
+#
+#   - CONNECTION POOL: each worker opens up to STORAGE_POOL_SIZE connections
+#     (lazily) and spreads calls over them round-robin.
+#   - PIPELINING: a connection is never reserved for one call. Any thread
+#     sends its request right away (tagged with a request id) and waits on a
+#     Future; one reader thread per connection hands each answer to the
+#     matching Future. submit() exposes this directly: send many calls, then
+#     collect the results.
+#   - Errors raised by the server's repository (ValueError, ...) are raised
+#     again here. A server that cannot be reached, drops the connection or
+#     does not answer within STORAGE_TIMEOUT_SECONDS → StorageUnavailableError
+#     (HTTP 503). A broken connection is replaced on its next use.
+#
+# Objects returned by this repository are COPIES: changing one does not
+# change the stored camera (use update_camera / record_checkin).
+
+import logging
+import socket
+import threading
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from datetime import datetime
+from itertools import count
+from typing import Dict, Iterable, List, Optional
+from uuid import UUID
+
+from app.core.config import Config
+from app.core.exceptions import (ConflictError, FeatureUnavailableError,
+                                 StorageUnavailableError)
+from app.core.metrics import metrics
+from app.models.schemas import (CameraDetails, CameraFeedInfo, CameraFilter,
+                                CameraUpdate, FeedUpdate, FleetStats,
+                                NewCameraData, VideoFeedInfo, VideoFeedSetup)
+from app.repository.columnar import FleetColumns
+from app.repository.heartbeat_history import CheckinHistory
+from app.repository.interface import (BulkOutcome, CameraRepositoryInterface,
+                                      UptimeInput)
+from app.repository.status_tracker import CameraStatus
+from app.repository.wire import (ERROR, METHOD_INDEX, decode, encode_frame,
+                                 read_frame)
+
+logger = logging.getLogger(__name__)
+
+# server-side errors raised again as the same type
+_REMOTE_ERRORS = {
+    cls.__name__: cls
+    for cls in (
+        ConflictError,
+        FeatureUnavailableError,
+        KeyError,
+        TypeError,
+        ValueError,
+    )
+}
+
+
+class _Connection:
+    """
+    One socket to the storage server, shared by any number of threads.
+    """
+
+    def __init__(self, path: str):
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            self._sock.connect(path)
+        except OSError:
+            self._sock.close()
+            raise
+        # RLock: a failed send calls _fail() while holding it
+        self._send_lock = threading.RLock()
+        self._ids = count(1)
+        self._pending: Dict[int, Future] = {}
+        self.closed = False
+        threading.Thread(
+            target=self._read_loop, name="storage-client", daemon=True
+        ).start()
+
+    def submit(self, method: int, args: tuple) -> Future:
+        future: Future = Future()
+        with self._send_lock:
+            if self.closed:
+                raise StorageUnavailableError("Storage server connection is closed.")
+            request_id = next(self._ids) & 0xFFFFFFFF
+            self._pending[request_id] = future
+            try:
+                self._sock.sendall(encode_frame(request_id, method, args))
+            except OSError as exc:
+                self._pending.pop(request_id, None)
+                self._fail(exc)
+                raise StorageUnavailableError(f"Storage server unreachable: {exc}")
+        return future
+
+    def close(self) -> None:
+        self._fail(ConnectionError("Connection closed by the client."))
+
+    def _read_loop(self) -> None:
+        stream = self._sock.makefile("rb")
+        try:
+            while True:
+                request_id, status, body = read_frame(stream)
+                future = self._pending.pop(request_id, None)
+                if future is None:
+                    continue
+                try:
+                    value = decode(body)
+                except Exception as exc:
+                    future.set_exception(exc)
+                    continue
+                if status == ERROR:
+                    name, message = value
+                    error = _REMOTE_ERRORS.get(name)
+                    future.set_exception(
+                        error(message)
+                        if error is not None
+                        else RuntimeError(f"Storage server error {name}: {message}")
+                    )
+                else:
+                    future.set_result(value)
+        except (OSError, ConnectionError) as exc:
+            self._fail(exc)
+
+    def _fail(self, exc: Exception) -> None:
+        # every call still waiting on this connection fails; the pool
+        # replaces the connection on its next use. Under the send lock: no
+        # call can be added after the pending ones are failed.
+        with self._send_lock:
+            if not self.closed:
+                self.closed = True
+                try:
+                    self._sock.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+                self._sock.close()
+            while self._pending:
+                _, future = self._pending.popitem()
+                if not future.done():
+                    future.set_exception(
+                        StorageUnavailableError(
+                            f"Storage server connection lost: {exc}"
+                        )
+                    )
+
+
+class RemoteCameraStorage(CameraRepositoryInterface):
+    """
+    Repository living in a storage server process (see the header of this
+    file). Defaults come from Config.STORAGE_*.
+    """
+
+    def __init__(
+        self,
+        socket_path: Optional[str] = None,
+        pool_size: Optional[int] = None,
+        timeout: Optional[float] = None,
+    ):
+        self.socket_path = Config.STORAGE_SOCKET if socket_path is None else socket_path
+        size = Config.STORAGE_POOL_SIZE if pool_size is None else pool_size
+        if size < 1:
+            raise ValueError("A remote repository needs at least one connection.")
+        self._timeout = Config.STORAGE_TIMEOUT_SECONDS if timeout is None else timeout
+        self._pool: List[Optional[_Connection]] = [None] * size
+        self._pool_lock = threading.Lock()
+        self._turn = count()
+
+        logger.debug(
+            f"[REPO INIT] Remote camera storage at {self.socket_path} "
+            f"({size} connections)."
+        )
+
+    # CONNECTION POOL + PIPELINING
+    def submit(self, method: str, *args) -> Future:
+        """
+        Send one repository call without waiting for its answer.
+        Calls sent one after another on the pool are pipelined.
+        """
+        return self._connection().submit(METHOD_INDEX[method], args)
+
+    def close(self) -> None:
+        with self._pool_lock:
+            for conn in self._pool:
+                if conn is not None:
+                    conn.close()
+            self._pool = [None] * len(self._pool)
+
+    def _connection(self) -> _Connection:
+        slot = next(self._turn) % len(self._pool)
+        conn = self._pool[slot]
+        if conn is None or conn.closed:
+            with self._pool_lock:
+                conn = self._pool[slot]
+                if conn is None or conn.closed:
+                    if conn is not None:
+                        metrics.incr("storage.reconnects")
+                    try:
+                        conn = self._pool[slot] = _Connection(self.socket_path)
+                    except OSError as exc:
+                        raise StorageUnavailableError(
+                            f"Storage server unreachable at {self.socket_path}: {exc}"
+                        )
+        return conn
+
+    def _call(self, method: str, *args):
+        try:
+            return self.submit(method, *args).result(self._timeout)
+        except FutureTimeoutError:
+            raise StorageUnavailableError(
+                f"Storage server did not answer {method} within {self._timeout} s."
+            )
+
+    # CAMERAS
+    def add_camera(
+        self, data: NewCameraData, camera_id: UUID | None = None
+    ) -> CameraDetails:
+        return self._call("add_camera", data, camera_id)
+
+    def add_unique_camera(self, data: NewCameraData) -> CameraDetails:
+        # atomic on the server: every call there runs under its lock
+        return self._call("add_unique_camera", data)
+
+    def camera_conflict(self, data: NewCameraData) -> Optional[str]:
+        return self._call("camera_conflict", data)
+
+    def remove_camera(self, camera_id: UUID) -> bool:
+        return self._call("remove_camera", camera_id)
+
+    def get_camera(self, camera_id: UUID) -> Optional[CameraDetails]:
+        return self._call("get_camera", camera_id)
+
+    def list_cameras(self) -> List[CameraDetails]:
+        return self._call("list_cameras")
+
+    def search_cameras(
+        self, name: str | None = None, model: str | None = None
+    ) -> List[CameraDetails]:
+        return self._call("search_cameras", name, model)
+
+    def query_cameras(
+        self,
+        flt: CameraFilter,
+        online_since: datetime | None = None,
+        offset: int = 0,
+        limit: int | None = None,
+    ) -> List[CameraDetails]:
+        return self._call("query_cameras", flt, online_since, offset, limit)
+
+    def count_cameras(
+        self, flt: CameraFilter, online_since: datetime | None = None
+    ) -> int:
+        return self._call("count_cameras", flt, online_since)
+
+    def update_camera(
+        self, camera_id: UUID, updates: CameraUpdate
+    ) -> Optional[CameraDetails]:
+        return self._call("update_camera", camera_id, updates)
+
+    # BULK CAMERA OPERATIONS (ids sent as one list)
+    def update_cameras(self, camera_ids: Iterable[UUID], updates: CameraUpdate) -> int:
+        return self._call("update_cameras", list(camera_ids), updates)
+
+    def remove_cameras(self, camera_ids: Iterable[UUID]) -> List[BulkOutcome]:
+        return self._call("remove_cameras", list(camera_ids))
+
+    # FEEDS
+    def add_feed(
+        self, camera_id: UUID, feed: VideoFeedSetup
+    ) -> Optional[VideoFeedInfo]:
+        return self._call("add_feed", camera_id, feed)
+
+    def update_feed(
+        self, camera_id: UUID, feed_id: UUID, updates: FeedUpdate
+    ) -> Optional[VideoFeedInfo]:
+        return self._call("update_feed", camera_id, feed_id, updates)
+
+    def remove_feed(self, camera_id: UUID, feed_id: UUID) -> bool:
+        return self._call("remove_feed", camera_id, feed_id)
+
+    def add_feeds(
+        self, camera_ids: Iterable[UUID], feed: VideoFeedSetup
+    ) -> List[BulkOutcome]:
+        return self._call("add_feeds", list(camera_ids), feed)
+
+    def update_feeds(
+        self,
+        camera_ids: Iterable[UUID],
+        protocol: str,
+        port: int | None,
+        updates: FeedUpdate,
+    ) -> List[BulkOutcome]:
+        return self._call("update_feeds", list(camera_ids), protocol, port, updates)
+
+    def remove_feeds(
+        self, camera_ids: Iterable[UUID], protocol: str, port: int | None
+    ) -> List[BulkOutcome]:
+        return self._call("remove_feeds", list(camera_ids), protocol, port)
+
+    def get_feed(self, camera_id: UUID, feed_id: UUID) -> Optional[VideoFeedInfo]:
+        return self._call("get_feed", camera_id, feed_id)
+
+    def list_feeds(
+        self,
+        camera_id: UUID,
+        protocol: str | None = None,
+        port: int | None = None,
+        q: str | None = None,
+        page: int = 1,
+        page_size: int = 20,
+    ) -> List[VideoFeedInfo]:
+        return self._call("list_feeds", camera_id, protocol, port, q, page, page_size)
+
+    def count_feeds(
+        self,
+        camera_id: UUID,
+        protocol: str | None = None,
+        port: int | None = None,
+        q: str | None = None,
+    ) -> int:
+        return self._call("count_feeds", camera_id, protocol, port, q)
+
+    def feed_exists(self, camera_id: UUID, protocol: str, port: int) -> bool:
+        return self._call("feed_exists", camera_id, protocol, port)
+
+    def search_feeds(
+        self,
+        protocol: str | None = None,
+        port: int | None = None,
+        q: str | None = None,
+        page: int = 1,
+        page_size: int = 20,
+        by_camera: bool = False,
+    ) -> List[CameraFeedInfo]:
+        return self._call(
+            "search_feeds", protocol, port, q, page, page_size, by_camera
+        )
+
+    def count_search_feeds(
+        self,
+        protocol: str | None = None,
+        port: int | None = None,
+        q: str | None = None,
+    ) -> int:
+        return self._call("count_search_feeds", protocol, port, q)
+
+    # HEARTBEAT / STATUS
+    def record_checkin(
+        self,
+        camera_id: UUID,
+        checkin: datetime,
+        updated_on: datetime | None = None,
+    ) -> Optional[CameraDetails]:
+        return self._call("record_checkin", camera_id, checkin, updated_on)
+
+    def camera_state(self, camera_id: UUID, now_ns: int) -> Optional[CameraStatus]:
+        return self._call("camera_state", camera_id, now_ns)
+
+    def checkin_history(self, camera_id: UUID) -> Optional[CheckinHistory]:
+        return self._call("checkin_history", camera_id)
+
+    def uptime_inputs(self) -> List[UptimeInput]:
+        return self._call("uptime_inputs")
+
+    # FLEET-WIDE READS
+    def fleet_columns(self) -> FleetColumns:
+        return self._call("fleet_columns")
+
+    def data_version(self) -> int:
+        return self._call("data_version")
+
+    def checkin_version(self) -> int:
+        return self._call("checkin_version")
+
+    def status_version(self) -> int:
+        return self._call("status_version")
+
+    def oldest_online_checkin(self, online_since: datetime) -> Optional[datetime]:
+        return self._call("oldest_online_checkin", online_since)
+
+    def fleet_stats(self, online_since: datetime) -> FleetStats:
+        return self._call("fleet_stats", online_since)
+
+    def clear(self) -> None:
+        self._call("clear")
@@ -0,0 +1,416 @@
+# LOG-SHIPPING REPLICATION (leader process → follower processes)
+#
+# Problem:
+#   One process holds the fleet. Reads cannot be spread over more processes,
+#   and when that process dies there is no warm copy to take over.
+#
+# Solution:
+#   LEADER: SimpleCameraMemoryStorage calls a mutation hook after every write
+#   (set_mutation_log). ReplicationLeader turns each call into ONE numbered
+#   record holding the camera's resulting STATE, not the operation:
+#       put      → the whole camera as JSON (camera / feed ids, timestamps)
+#       delete   → camera_id
+#       checkin  → camera_id, check-in time (ns), last_updated_on
+#       clear
+#   The last REPLICATION_LOG_SIZE records are kept in memory and streamed over
+#   a TCP socket (localhost) to every connected follower, in seq order.
+#   FOLLOWER: connects, says which seq it already has, and applies the records
+#   to its own SimpleCameraMemoryStorage (apply_camera / remove_camera /
+#   apply_checkin / clear). A new follower, one that is further behind than
+#   the log reaches, or one coming from another leader (epoch) first gets a
+#   SNAPSHOT (every camera + its last check-in), then the stream.
+#
+# Why state records?
+#   Applying one twice is harmless: a put overwrites, deleting a missing camera
+#   does nothing, an older check-in is skipped. A write that lands in a
+#   snapshot AND in the stream after it cannot make the copies drift apart.
+#   Records are numbered and built under ONE lock from the live camera, so the
+#   last record of a camera always carries its final state.
+#
+# Lag (measurable + bounded):
+#   Every record carries the leader's wall-clock time; when there are no
+#   writes the leader sends a ping (head seq + time) every
+#   REPLICATION_PING_SECONDS. Having applied seq s, the follower holds the
+#   leader's state at that record's time T, so
+#       lag = now - T          (leader and follower share the host clock)
+#   The ReplicaMiddleware (app/core/replica.py) refuses reads once the lag is
+#   above REPLICATION_MAX_LAG_SECONDS and refuses every write on a follower.
+#   Metrics: "replication.lag_seconds", "replication.applied_seq",
+#   "replication.head_seq", "replication.followers", "replication.snapshots_*".
+#
+# Wire format: frames of [4-byte big-endian length][one JSON object].
+# NOTE: only the memory backend can replicate (it owns the mutation hook).
+
+import json
+import logging
+import math
+import socket
+import struct
+import threading
+import time
+from datetime import datetime
+from typing import BinaryIO, List, Optional, Tuple
+from uuid import UUID, uuid4
+
+from app.core.clock import NS_PER_SECOND, to_datetime, to_ns
+from app.core.config import Config
+from app.core.metrics import metrics
+from app.core.replica import replica_state
+from app.models.schemas import CameraDetails
+from app.repository.memory_repo import SimpleCameraMemoryStorage
+
+logger = logging.getLogger(__name__)
+
+Address = Tuple[str, int]
+
+_LENGTH = struct.Struct(">I")
+
+
+def parse_address(value: str) -> Address:
+    """
+    "host:port" → (host, port).
+    """
+    host, _, port = value.rpartition(":")
+    if not host or not port.isdigit():
+        raise ValueError(f"Replication address must be host:port, got '{value}'.")
+    return host, int(port)
+
+
+def encode_frame(payload: bytes) -> bytes:
+    return _LENGTH.pack(len(payload)) + payload
+
+
+def read_frame(stream: BinaryIO) -> dict:
+    """
+    Next frame from a buffered socket reader, as a dict.
+    """
+    header = stream.read(_LENGTH.size)
+    if len(header) < _LENGTH.size:
+        raise ConnectionError("Replication peer closed the connection.")
+    (size,) = _LENGTH.unpack(header)
+    payload = stream.read(size)
+    if len(payload) < size:
+        raise ConnectionError("Replication peer closed the connection.")
+    return json.loads(payload)
+
+
+def _record(
+    seq: Optional[int], op: str, camera_id: Optional[UUID], cam: Optional[CameraDetails]
+) -> bytes:
+    # One record as JSON bytes. Snapshot records have no seq / ts: they only
+    # count as applied together, at "snapshot_end".
+    head = f'{{"op":"{op}"'
+    if seq is not None:
+        head += f',"seq":{seq},"ts":{time.time_ns()}'
+    if op == "put":
+        return f'{head},"camera":{cam.model_dump_json()}}}'.encode()
+    if op == "checkin":
+        return (
+            f'{head},"id":"{camera_id}","at":{to_ns(cam.last_known_checkin)},'
+            f'"updated":"{cam.last_updated_on.isoformat()}"}}'
+        ).encode()
+    if op == "delete":
+        return f'{head},"id":"{camera_id}"}}'.encode()
+    return f"{head}}}".encode()  # clear
+
+
+class ReplicationLeader:
+    """
+    Numbered mutation log of one repository + a TCP server that streams it
+    to followers (see the header of this file).
+    """
+
+    def __init__(
+        self,
+        repo: SimpleCameraMemoryStorage,
+        address: Address = ("127.0.0.1", 0),
+        log_size: Optional[int] = None,
+        ping_seconds: Optional[float] = None,
+    ):
+        self._repo = repo
+        self._bind = address
+        self._log_size = Config.REPLICATION_LOG_SIZE if log_size is None else log_size
+        self._ping_seconds = (
+            Config.REPLICATION_PING_SECONDS if ping_seconds is None else ping_seconds
+        )
+        # a restarted leader starts a NEW log: followers of the old one resync
+        self._epoch = uuid4().hex
+        # _records[i] = frame of record _first_seq + i; _seq = last record
+        self._cond = threading.Condition()
+        self._seq = 0
+        self._first_seq = 1
+        self._records: List[bytes] = []
+        self._server: Optional[socket.socket] = None
+        self._conns: set = set()
+        self._stopped = threading.Event()
+
+    @property
+    def head(self) -> int:
+        """Seq of the newest record."""
+        return self._seq
+
+    @property
+    def address(self) -> Address:
+        return self._server.getsockname()[:2]
+
+    def start(self) -> Address:
+        """
+        Start logging writes and accepting followers. Returns the bound address.
+        """
+        self._server = socket.create_server(self._bind)
+        self._repo.set_mutation_log(self.record)
+        threading.Thread(
+            target=self._accept_loop, name="replication-leader", daemon=True
+        ).start()
+        logger.info(f"[REPLICATION] Leader listening on {self.address}")
+        return self.address
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self._repo.set_mutation_log(None)
+        if self._server is not None:
+            self._server.close()
+        with self._cond:
+            for conn in self._conns:
+                _close(conn)
+            self._cond.notify_all()
+
+    # MUTATION LOG (called by the repository after every write)
+    def record(
+        self, op: str, camera_id: Optional[UUID], cam: Optional[CameraDetails]
+    ) -> None:
+        with self._cond:
+            self._seq += 1
+            self._records.append(encode_frame(_record(self._seq, op, camera_id, cam)))
+            if len(self._records) > 2 * self._log_size:
+                # trim in big steps: amortized O(1) per record
+                drop = len(self._records) - self._log_size
+                del self._records[:drop]
+                self._first_seq += drop
+            self._cond.notify_all()
+
+    # STREAMING
+    def _accept_loop(self) -> None:
+        while not self._stopped.is_set():
+            try:
+                conn, peer = self._server.accept()
+            except OSError:
+                return  # server socket closed by stop()
+            threading.Thread(
+                target=self._serve,
+                args=(conn, peer),
+                name=f"replication-{peer[1]}",
+                daemon=True,
+            ).start()
+
+    def _serve(self, conn: socket.socket, peer) -> None:
+        conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        with self._cond:
+            self._conns.add(conn)
+            metrics.set_gauge("replication.followers", len(self._conns))
+        logger.info(f"[REPLICATION] Follower connected from {peer}")
+        try:
+            hello = read_frame(conn.makefile("rb"))
+            sent = hello.get("from", -1) if hello.get("epoch") == self._epoch else -1
+            while not self._stopped.is_set():
+                frames, sent = self._next_frames(sent)
+                conn.sendall(b"".join(frames))
+        except (OSError, ValueError) as exc:
+            logger.info(f"[REPLICATION] Follower {peer} disconnected: {exc}")
+        finally:
+            with self._cond:
+                self._conns.discard(conn)
+                metrics.set_gauge("replication.followers", len(self._conns))
+            _close(conn)
+
+    def _next_frames(self, sent: int) -> Tuple[List[bytes], int]:
+        # Records after `sent`; a snapshot when they are no longer in the log;
+        # a ping when nothing was written for ping_seconds.
+        with self._cond:
+            if sent == self._seq:
+                self._cond.wait(self._ping_seconds)
+            metrics.set_gauge("replication.head_seq", self._seq)
+            if not self._first_seq - 1 <= sent <= self._seq:
+                return self._snapshot_frames(), self._seq
+            frames = self._records[sent + 1 - self._first_seq :]
+            if not frames:
+                ping = {"op": "ping", "seq": self._seq, "ts": time.time_ns()}
+                frames = [encode_frame(json.dumps(ping).encode())]
+            return frames, self._seq
+
+    def _snapshot_frames(self) -> List[bytes]:
+        # Every camera + its last check-in, between "snapshot" and
+        # "snapshot_end" (= the seq the follower then holds). Built under the
+        # log lock: writes wait until the snapshot is taken.
+        now = time.time_ns()
+        start = {"op": "snapshot", "epoch": self._epoch}
+        frames = [encode_frame(json.dumps(start).encode())]
+        for cam in self._repo.list_cameras():
+            frames.append(encode_frame(_record(None, "put", cam.camera_id, cam)))
+            if cam.last_known_checkin is not None:
+                frames.append(encode_frame(_record(None, "checkin", cam.camera_id, cam)))
+        end = {"op": "snapshot_end", "seq": self._seq, "ts": now}
+        frames.append(encode_frame(json.dumps(end).encode()))
+        metrics.incr("replication.snapshots_sent")
+        return frames
+
+
+class ReplicationFollower:
+    """
+    Keeps a local repository in step with a leader's stream (reconnecting
+    when the connection drops) and measures how far behind it is.
+    """
+
+    def __init__(
+        self,
+        repo: SimpleCameraMemoryStorage,
+        address: Address,
+        retry_seconds: float = 0.5,
+        read_timeout: Optional[float] = None,
+    ):
+        self._repo = repo
+        self._address = address
+        self._retry_seconds = retry_seconds
+        # no frame (not even a ping) for this long → reconnect
+        self._read_timeout = (
+            max(2.0, 10 * Config.REPLICATION_PING_SECONDS)
+            if read_timeout is None
+            else read_timeout
+        )
+        self.applied_seq = -1  # nothing yet → the first connection gets a snapshot
+        self._epoch: Optional[str] = None
+        # leader time of the state held here (None = no state yet)
+        self._caught_up_ns: Optional[int] = None
+        self._progress = threading.Condition()
+        self._sock: Optional[socket.socket] = None
+        self._stopped = threading.Event()
+
+    def start(self) -> None:
+        threading.Thread(
+            target=self._run, name="replication-follower", daemon=True
+        ).start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._sock is not None:
+            _close(self._sock)
+
+    def lag_seconds(self) -> float:
+        """
+        How old the replicated state is (inf before the first snapshot).
+        """
+        if self._caught_up_ns is None:
+            return math.inf
+        return max(0.0, (time.time_ns() - self._caught_up_ns) / NS_PER_SECOND)
+
+    def wait_for(self, seq: int, timeout: float) -> bool:
+        """
+        Block until record `seq` is applied. False on timeout.
+        """
+        with self._progress:
+            return self._progress.wait_for(lambda: self.applied_seq >= seq, timeout)
+
+    # STREAM
+    def _run(self) -> None:
+        while not self._stopped.is_set():
+            try:
+                with socket.create_connection(
+                    self._address, timeout=self._read_timeout
+                ) as sock:
+                    self._sock = sock
+                    hello = {"from": self.applied_seq, "epoch": self._epoch}
+                    sock.sendall(encode_frame(json.dumps(hello).encode()))
+                    stream = sock.makefile("rb")
+                    while not self._stopped.is_set():
+                        self._apply(read_frame(stream))
+            except (OSError, ValueError) as exc:
+                if self._stopped.is_set():
+                    return
+                logger.warning(
+                    f"[REPLICATION] Lost leader {self._address}: {exc}; retrying"
+                )
+                self._stopped.wait(self._retry_seconds)
+
+    def _apply(self, msg: dict) -> None:
+        op = msg["op"]
+        if op == "put":
+            self._repo.apply_camera(CameraDetails.model_validate(msg["camera"]))
+        elif op == "checkin":
+            self._repo.apply_checkin(
+                UUID(msg["id"]),
+                to_datetime(msg["at"]),
+                datetime.fromisoformat(msg["updated"]),
+            )
+        elif op == "delete":
+            self._repo.remove_camera(UUID(msg["id"]))
+        elif op in ("clear", "snapshot"):
+            self._repo.clear()
+            if op == "snapshot":
+                self._epoch = msg["epoch"]
+                metrics.incr("replication.snapshots_applied")
+
+        # records, pings and snapshot_end say which leader state we now hold
+        seq = msg.get("seq")
+        if seq is not None:
+            with self._progress:
+                self.applied_seq = seq
+                self._caught_up_ns = msg["ts"]
+                self._progress.notify_all()
+            metrics.set_gauge("replication.applied_seq", seq)
+            metrics.set_gauge("replication.lag_seconds", self.lag_seconds())
+
+
+class Replication:
+    """
+    This process's replication role, started from Config by the FastAPI
+    lifespan (REPLICATION_ROLE = "" | "leader" | "follower").
+    """
+
+    def __init__(self):
+        self.leader: Optional[ReplicationLeader] = None
+        self.follower: Optional[ReplicationFollower] = None
+
+    def configure(self, repo) -> None:
+        self.stop()
+        role = Config.REPLICATION_ROLE.strip().lower()
+        if not role:
+            return
+        if role not in ("leader", "follower"):
+            raise ValueError(
+                f"REPLICATION_ROLE must be 'leader' or 'follower', got '{role}'."
+            )
+        if not isinstance(repo, SimpleCameraMemoryStorage):
+            raise ValueError("Replication needs the 'memory' repository backend.")
+
+        address = parse_address(Config.REPLICATION_ADDRESS)
+        if role == "leader":
+            self.leader = ReplicationLeader(repo, address)
+            self.leader.start()
+        else:
+            self.follower = ReplicationFollower(repo, address)
+            self.follower.start()
+            replica_state.follow(
+                self.follower.lag_seconds, Config.REPLICATION_MAX_LAG_SECONDS
+            )
+
+    def stop(self) -> None:
+        if self.leader is not None:
+            self.leader.stop()
+            self.leader = None
+        if self.follower is not None:
+            self.follower.stop()
+            self.follower = None
+            replica_state.reset()
+
+
+# ONE replication role per process
+replication = Replication()
+
+
+def _close(sock: socket.socket) -> None:
+    # wake up a thread blocked in recv / sendall on this socket, then close it
+    try:
+        sock.shutdown(socket.SHUT_RDWR)
+    except OSError:
+        pass
+    sock.close()
@@ -0,0 +1,417 @@
+# HASH-SHARDED REPOSITORY
+#
+# Problem:
+#   One SimpleCameraMemoryStorage keeps the whole fleet in ONE _store dict:
+#   every scan walks all of it, and every request touches the same structures.
+#
+# Solution:
+#   ShardedCameraStorage wraps N inner repositories behind the same
+#   CameraRepositoryInterface. A camera lives in shard camera_id.int % N:
+#     point operations (get / update / feeds / heartbeat)  → ONE shard
+#     list / filter / count / search / stats / export     → EVERY shard, fanned
+#                                                           out over a thread
+#                                                           pool, then merged
+#     bulk operations                                     → ids grouped per
+#                                                           shard, one call each
+#
+# Deterministic order:
+#   The wrapper numbers cameras in creation order (_seq). Every shard already
+#   returns its cameras in ITS creation order, so a k-way heapq.merge on _seq
+#   gives exactly the order of a single repository; a page (offset / limit)
+#   only needs the first offset + limit cameras of each shard.
+#   Fleet-wide feed search is ordered by camera (creation order), then by
+#   feed: each shard returns its first matches in that order (by_camera=True)
+#   and the same merge on _seq gives the page.
+#
+# Uniqueness:
+#   IP and name + model uniqueness span the shards: add_unique_camera asks
+#   EVERY shard (camera_conflict) and inserts into the owning shard under ONE
+#   wrapper lock, so two concurrent adds that land on different shards cannot
+#   both pass the check. Feed (protocol, port) uniqueness is per camera, i.e.
+#   inside one shard.
+#
+# Versions:
+#   data / checkin / status versions are the SUM of the shard counters: each
+#   shard counter only goes up, so the sum only goes up and changes whenever
+#   any shard changes.
+
+import heapq
+import logging
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from itertools import chain, count, islice
+from operator import attrgetter, itemgetter
+from typing import Callable, Dict, Iterable, List, Optional, TypeVar
+from uuid import UUID, uuid4
+
+from app.core.config import Config
+from app.core.exceptions import ConflictError
+from app.models.schemas import (CameraDetails, CameraFeedInfo, CameraFilter,
+                                CameraUpdate, FeedUpdate, FleetStats,
+                                NewCameraData, VideoFeedInfo, VideoFeedSetup)
+from app.repository.columnar import FleetColumns
+from app.repository.heartbeat_history import CheckinHistory
+from app.repository.interface import (IP_TAKEN, NAME_TAKEN, BulkOutcome,
+                                      CameraRepositoryInterface, UptimeInput)
+from app.repository.memory_repo import SimpleCameraMemoryStorage
+from app.repository.status_tracker import CameraStatus
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+# results that carry the camera they belong to (see _merge)
+Owned = TypeVar("Owned", CameraDetails, CameraFeedInfo)
+
+
+class ShardedCameraStorage(CameraRepositoryInterface):
+    """
+    N inner repositories partitioned by camera_id hash (see the header of
+    this file). The default shard count is Config.REPOSITORY_SHARDS.
+    """
+
+    def __init__(
+        self,
+        shards: int | None = None,
+        factory: Callable[[], CameraRepositoryInterface] = SimpleCameraMemoryStorage,
+    ):
+        n_shards = Config.REPOSITORY_SHARDS if shards is None else shards
+        if n_shards < 1:
+            raise ValueError("A sharded repository needs at least one shard.")
+        self._shards: List[CameraRepositoryInterface] = [
+            factory() for _ in range(n_shards)
+        ]
+        # one worker per shard: a fan-out never waits for a free thread
+        self._pool = ThreadPoolExecutor(
+            max_workers=n_shards, thread_name_prefix="repo-shard"
+        )
+        # camera_id → creation sequence (merge key of every fan-out)
+        self._seq_counter = count()
+        self._seq: Dict[UUID, int] = {}
+        # add_unique_camera: the cross-shard check + insert as ONE step
+        self._unique_lock = threading.Lock()
+
+        logger.debug(f"[REPO INIT] Sharded camera storage with {n_shards} shards.")
+
+    # ROUTING
+    def shard_of(self, camera_id: UUID) -> int:
+        """
+        Index of the shard that owns `camera_id`.
+        """
+        return camera_id.int % len(self._shards)
+
+    def _shard(self, camera_id: UUID) -> CameraRepositoryInterface:
+        return self._shards[camera_id.int % len(self._shards)]
+
+    # CAMERAS (one shard)
+    def add_camera(
+        self, data: NewCameraData, camera_id: UUID | None = None
+    ) -> CameraDetails:
+        # the id is chosen HERE so the shard is known before the camera exists
+        if camera_id is None:
+            camera_id = uuid4()
+        self._seq[camera_id] = next(self._seq_counter)
+        return self._shard(camera_id).add_camera(data, camera_id)
+
+    # UNIQUENESS RULES (span the shards: checked on every shard, under ONE
+    # wrapper lock together with the insert)
+    def add_unique_camera(self, data: NewCameraData) -> CameraDetails:
+        with self._unique_lock:
+            conflict = self.camera_conflict(data)
+            if conflict is not None:
+                raise ConflictError(conflict)
+            return self.add_camera(data)
+
+    def camera_conflict(self, data: NewCameraData) -> Optional[str]:
+        found = set(self._fan_out(lambda shard: shard.camera_conflict(data)))
+        # the IP rule first, whichever shard broke which rule
+        return next((rule for rule in (IP_TAKEN, NAME_TAKEN) if rule in found), None)
+
+    def remove_camera(self, camera_id: UUID) -> bool:
+        removed = self._shard(camera_id).remove_camera(camera_id)
+        if removed:
+            self._seq.pop(camera_id, None)
+        return removed
+
+    def get_camera(self, camera_id: UUID) -> Optional[CameraDetails]:
+        return self._shard(camera_id).get_camera(camera_id)
+
+    def update_camera(
+        self, camera_id: UUID, updates: CameraUpdate
+    ) -> Optional[CameraDetails]:
+        return self._shard(camera_id).update_camera(camera_id, updates)
+
+    # CAMERA SCANS (every shard, merged in creation order)
+    def list_cameras(self) -> List[CameraDetails]:
+        logger.info("[REPO][SHARDED] Listing all cameras")
+        return list(self._merge(self._fan_out(lambda shard: shard.list_cameras())))
+
+    def search_cameras(
+        self, name: str | None = None, model: str | None = None
+    ) -> List[CameraDetails]:
+        return list(
+            self._merge(self._fan_out(lambda shard: shard.search_cameras(name, model)))
+        )
+
+    def query_cameras(
+        self,
+        flt: CameraFilter,
+        online_since: datetime | None = None,
+        offset: int = 0,
+        limit: int | None = None,
+    ) -> List[CameraDetails]:
+        # the page can only contain the first offset + limit cameras of a shard
+        start = max(0, offset)
+        stop = None if limit is None else start + max(0, limit)
+        pages = self._fan_out(
+            lambda shard: shard.query_cameras(flt, online_since, 0, stop)
+        )
+        return list(islice(self._merge(pages), start, stop))
+
+    def count_cameras(
+        self, flt: CameraFilter, online_since: datetime | None = None
+    ) -> int:
+        return sum(self._fan_out(lambda shard: shard.count_cameras(flt, online_since)))
+
+    # BULK CAMERA OPERATIONS (ids grouped per shard)
+    def update_cameras(self, camera_ids: Iterable[UUID], updates: CameraUpdate) -> int:
+        groups = self._group(camera_ids)
+        return sum(
+            self._fan_out_groups(
+                groups, lambda shard, ids: shard.update_cameras(ids, updates)
+            )
+        )
+
+    def remove_cameras(self, camera_ids: Iterable[UUID]) -> List[BulkOutcome]:
+        outcomes = self._bulk(camera_ids, lambda shard, ids: shard.remove_cameras(ids))
+        for camera_id, _, outcome in outcomes:
+            if outcome == "deleted":
+                self._seq.pop(camera_id, None)
+        return outcomes
+
+    # FEEDS OF ONE CAMERA (one shard)
+    def add_feed(
+        self, camera_id: UUID, feed: VideoFeedSetup
+    ) -> Optional[VideoFeedInfo]:
+        return self._shard(camera_id).add_feed(camera_id, feed)
+
+    def update_feed(
+        self, camera_id: UUID, feed_id: UUID, updates: FeedUpdate
+    ) -> Optional[VideoFeedInfo]:
+        return self._shard(camera_id).update_feed(camera_id, feed_id, updates)
+
+    def remove_feed(self, camera_id: UUID, feed_id: UUID) -> bool:
+        return self._shard(camera_id).remove_feed(camera_id, feed_id)
+
+    def get_feed(self, camera_id: UUID, feed_id: UUID) -> Optional[VideoFeedInfo]:
+        return self._shard(camera_id).get_feed(camera_id, feed_id)
+
+    def list_feeds(
+        self,
+        camera_id: UUID,
+        protocol: str | None = None,
+        port: int | None = None,
+        q: str | None = None,
+        page: int = 1,
+        page_size: int = 20,
+    ) -> List[VideoFeedInfo]:
+        return self._shard(camera_id).list_feeds(
+            camera_id, protocol, port, q, page, page_size
+        )
+
+    def count_feeds(
+        self,
+        camera_id: UUID,
+        protocol: str | None = None,
+        port: int | None = None,
+        q: str | None = None,
+    ) -> int:
+        return self._shard(camera_id).count_feeds(camera_id, protocol, port, q)
+
+    def feed_exists(self, camera_id: UUID, protocol: str, port: int) -> bool:
+        return self._shard(camera_id).feed_exists(camera_id, protocol, port)
+
+    # BULK FEED OPERATIONS (ids grouped per shard)
+    def add_feeds(
+        self, camera_ids: Iterable[UUID], feed: VideoFeedSetup
+    ) -> List[BulkOutcome]:
+        return self._bulk(camera_ids, lambda shard, ids: shard.add_feeds(ids, feed))
+
+    def update_feeds(
+        self,
+        camera_ids: Iterable[UUID],
+        protocol: str,
+        port: int | None,
+        updates: FeedUpdate,
+    ) -> List[BulkOutcome]:
+        return self._bulk(
+            camera_ids,
+            lambda shard, ids: shard.update_feeds(ids, protocol, port, updates),
+        )
+
+    def remove_feeds(
+        self, camera_ids: Iterable[UUID], protocol: str, port: int | None
+    ) -> List[BulkOutcome]:
+        return self._bulk(
+            camera_ids, lambda shard, ids: shard.remove_feeds(ids, protocol, port)
+        )
+
+    # FLEET-WIDE FEED SEARCH (every shard)
+    def search_feeds(
+        self,
+        protocol: str | None = None,
+        port: int | None = None,
+        q: str | None = None,
+        page: int = 1,
+        page_size: int = 20,
+        by_camera: bool = False,
+    ) -> List[CameraFeedInfo]:
+        # always in camera order: each shard returns its first start +
+        # page_size matches by camera, and the merge keeps a camera's feeds
+        # in its shard's order (a camera lives in one shard)
+        start = max(0, (page - 1) * page_size)
+        stop = start + max(0, page_size)
+        if not stop:
+            return []
+        pages = self._fan_out(
+            lambda shard: shard.search_feeds(protocol, port, q, 1, stop, True)
+        )
+        return list(islice(self._merge(pages), start, stop))
+
+    def count_search_feeds(
+        self,
+        protocol: str | None = None,
+        port: int | None = None,
+        q: str | None = None,
+    ) -> int:
+        return sum(
+            self._fan_out(lambda shard: shard.count_search_feeds(protocol, port, q))
+        )
+
+    # HEARTBEAT / STATUS (one shard)
+    def record_checkin(
+        self,
+        camera_id: UUID,
+        checkin: datetime,
+        updated_on: datetime | None = None,
+    ) -> Optional[CameraDetails]:
+        return self._shard(camera_id).record_checkin(camera_id, checkin, updated_on)
+
+    def camera_state(self, camera_id: UUID, now_ns: int) -> Optional[CameraStatus]:
+        return self._shard(camera_id).camera_state(camera_id, now_ns)
+
+    def checkin_history(self, camera_id: UUID) -> Optional[CheckinHistory]:
+        return self._shard(camera_id).checkin_history(camera_id)
+
+    def uptime_inputs(self) -> List[UptimeInput]:
+        parts = self._fan_out(lambda shard: shard.uptime_inputs())
+        return list(self._merge_by(parts, itemgetter(0)))
+
+    # FLEET-WIDE READS (every shard, combined)
+    def fleet_columns(self) -> FleetColumns:
+        return FleetColumns.concat(self._fan_out(lambda shard: shard.fleet_columns()))
+
+    def data_version(self) -> int:
+        return sum(shard.data_version() for shard in self._shards)
+
+    def checkin_version(self) -> int:
+        return sum(shard.checkin_version() for shard in self._shards)
+
+    def status_version(self) -> int:
+        return sum(shard.status_version() for shard in self._shards)
+
+    def oldest_online_checkin(self, online_since: datetime) -> Optional[datetime]:
+        oldest = [
+            checkin
+            for checkin in (
+                shard.oldest_online_checkin(online_since) for shard in self._shards
+            )
+            if checkin is not None
+        ]
+        return min(oldest, default=None)
+
+    def fleet_stats(self, online_since: datetime) -> FleetStats:
+        logger.info("[REPO][SHARDED] Reading fleet statistics")
+
+        parts = self._fan_out(lambda shard: shard.fleet_stats(online_since))
+        groups: Dict[str, Counter] = {
+            name: Counter()
+            for name in ("by_model", "by_protocol", "by_subnet", "by_tag")
+        }
+        for part in parts:
+            for name, counter in groups.items():
+                counter.update(getattr(part, name))
+        return FleetStats(
+            total_cameras=sum(p.total_cameras for p in parts),
+            total_feeds=sum(p.total_feeds for p in parts),
+            online=sum(p.online for p in parts),
+            offline=sum(p.offline for p in parts),
+            flapping=sum(p.flapping for p in parts),
+            **{name: dict(counter) for name, counter in groups.items()},
+        )
+
+    def clear(self) -> None:
+        for shard in self._shards:
+            shard.clear()
+        self._seq.clear()
+
+    # INTERNAL HELPERS
+    def _fan_out(self, call: Callable[[CameraRepositoryInterface], T]) -> List[T]:
+        # `call` on every shard, in parallel; results in shard order
+        if len(self._shards) == 1:
+            return [call(self._shards[0])]
+        return list(self._pool.map(call, self._shards))
+
+    def _fan_out_groups(
+        self,
+        groups: Dict[int, List[UUID]],
+        call: Callable[[CameraRepositoryInterface, List[UUID]], T],
+    ) -> List[T]:
+        # `call(shard, ids)` on the shards that own some of the ids only
+        if len(groups) <= 1:
+            return [call(self._shards[index], ids) for index, ids in groups.items()]
+        return list(
+            self._pool.map(
+                lambda item: call(self._shards[item[0]], item[1]), groups.items()
+            )
+        )
+
+    def _group(self, camera_ids: Iterable[UUID]) -> Dict[int, List[UUID]]:
+        # shard index → its ids, in input order
+        groups: Dict[int, List[UUID]] = {}
+        for camera_id in camera_ids:
+            groups.setdefault(self.shard_of(camera_id), []).append(camera_id)
+        return groups
+
+    def _bulk(
+        self,
+        camera_ids: Iterable[UUID],
+        call: Callable[[CameraRepositoryInterface, List[UUID]], List[BulkOutcome]],
+    ) -> List[BulkOutcome]:
+        # Outcomes back in INPUT order of the cameras (stable sort: the order of
+        # the outcomes of one camera, e.g. several feeds, is the shard's).
+        ids = list(camera_ids)
+        position: Dict[UUID, int] = {}
+        for i, camera_id in enumerate(ids):
+            position.setdefault(camera_id, i)
+        parts = self._fan_out_groups(self._group(ids), call)
+        return sorted(chain.from_iterable(parts), key=lambda o: position[o[0]])
+
+    def _merge(self, parts: List[List[Owned]]) -> Iterable[Owned]:
+        # k-way merge of per-shard lists that are each in camera creation order
+        return self._merge_by(parts, attrgetter("camera_id"))
+
+    def _merge_by(
+        self, parts: List[List[T]], camera_of: Callable[[T], UUID]
+    ) -> Iterable[T]:
+        # _merge for any per-camera result. A remove_camera that runs during
+        # the fan-out drops the camera's seq after its shard answered: such
+        # results are skipped (the camera is gone) instead of raising
+        # KeyError or breaking the merge order.
+        seq = self._seq.get
+        keyed = []
+        for part in parts:
+            pairs = ((seq(camera_of(item)), item) for item in part)
+            keyed.append([(pos, item) for pos, item in pairs if pos is not None])
+        return (item for _, item in heapq.merge(*keyed, key=itemgetter(0)))
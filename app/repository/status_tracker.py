@@ -0,0 +1,155 @@
+# ONLINE / OFFLINE STATUS WITH HYSTERESIS + FLAP DETECTION
+#
+# Problem:
+#   With HEARTBEAT_TIMEOUT as one hard threshold, a camera on a lossy link
+#   flips online → offline → online every minute: downstream consumers get
+#   a flood of transitions and cached online lists are invalidated all the time.
+#
+# Rules (per camera, updated on EVERY heartbeat, nothing recomputed at read):
+#   MISS        → HEARTBEAT_TIMEOUT seconds without a heartbeat.
+#   online → offline after STATUS_OFFLINE_AFTER_MISSES misses in a row,
+#                    i.e. silent for more than timeout × misses (offline_after())
+#   offline → online after STATUS_ONLINE_AFTER_HITS heartbeats in a row, each
+#                    within HEARTBEAT_TIMEOUT of the previous one
+#   FLAPPING    → STATUS_FLAP_THRESHOLD transitions within STATUS_FLAP_WINDOW
+#                 seconds. A flapping camera is reported "flapping" (and counts
+#                 as offline) and does not change status any more until it has
+#                 had no transition for STATUS_FLAP_WINDOW seconds; the next
+#                 heartbeat after that quiet period ends the flap.
+#   With the defaults (1 miss, 1 hit) a camera is online exactly while its last
+#   heartbeat is at most HEARTBEAT_TIMEOUT old, as before.
+#
+# An online → offline transition happens while NO heartbeat arrives, so it is
+# booked by the next heartbeat (at the time it actually happened:
+# last heartbeat + offline_after()). Reads only compare "now" with the last
+# heartbeat (O(1)).
+#
+# Times are integer nanoseconds since the epoch (app/core/clock.py), so the
+# per-heartbeat math is int math. Metrics: "status.transitions",
+# "status.flapping_detected".
+
+from collections import deque
+from typing import Dict, Final, Hashable, Literal, Optional, Set
+
+from app.core.clock import NS_PER_SECOND, seconds_to_ns
+from app.core.config import Config
+from app.core.metrics import metrics
+
+# the states (CameraState.state in the API); Final keeps their literal types
+CameraStatus = Literal["online", "offline", "flapping"]
+ONLINE: Final = "online"
+OFFLINE: Final = "offline"
+FLAPPING: Final = "flapping"
+
+
+def offline_after() -> float:
+    """
+    Seconds of silence after which an online camera is offline.
+    """
+    return Config.HEARTBEAT_TIMEOUT * Config.STATUS_OFFLINE_AFTER_MISSES
+
+
+def offline_after_ns() -> int:
+    return seconds_to_ns(offline_after())
+
+
+class _Status:
+    __slots__ = ("last", "hits", "online", "flapping", "transitions")
+
+    def __init__(self):
+        self.last: Optional[int] = None  # last heartbeat
+        self.hits = 0  # heartbeats in a row, each within the timeout
+        self.online = False  # status after hysteresis (before flap damping)
+        self.flapping = False
+        self.transitions: deque = deque()  # times of recent transitions
+
+
+class StatusTracker:
+    def __init__(self):
+        self._status: Dict[Hashable, _Status] = {}
+        self._flapping: Set[Hashable] = set()
+
+    def record(self, key: Hashable, at_ns: int) -> bool:
+        """
+        Heartbeat of `key` at `at_ns`. Returns True if the camera is reported
+        ONLINE afterwards.
+        """
+        st = self._status.get(key)
+        timeout = Config.HEARTBEAT_TIMEOUT * NS_PER_SECOND
+        if st is None:
+            st = self._status[key] = _Status()
+        elif st.online and not st.flapping and 0 <= at_ns - st.last <= timeout:
+            # FAST PATH (almost every heartbeat): online, not flapping and on
+            # time → no miss (timeout <= offline_after), no transition, no
+            # flap to end; only the counters move.
+            st.hits += 1
+            st.last = at_ns
+            return True
+
+        if st.last is None:
+            st.hits = 1
+        else:
+            gap = at_ns - st.last
+            limit = offline_after_ns()
+            if st.online and gap > limit:
+                # went offline while silent: book it when it happened
+                st.online = False
+                self._transition(key, st, st.last + limit)
+            st.hits = st.hits + 1 if gap <= timeout else 1
+        st.last = at_ns
+
+        if not st.online and st.hits >= Config.STATUS_ONLINE_AFTER_HITS:
+            st.online = True
+            self._transition(key, st, at_ns)
+
+        # a flap ends with the first heartbeat after a quiet period
+        if st.flapping and at_ns - st.transitions[-1] >= _flap_window_ns():
+            st.flapping = False
+            self._flapping.discard(key)
+        return st.online and not st.flapping
+
+    def state(self, key: Hashable, now_ns: int) -> CameraStatus:
+        """
+        "online" | "offline" | "flapping" at time `now_ns`.
+        """
+        st = self._status.get(key)
+        if st is None or st.last is None:
+            return OFFLINE
+        if st.flapping:
+            # quiet for a whole window but no heartbeat since → just offline
+            quiet = now_ns - st.transitions[-1] >= _flap_window_ns()
+            return OFFLINE if quiet else FLAPPING
+        if st.online and now_ns - st.last <= offline_after_ns():
+            return ONLINE
+        return OFFLINE
+
+    def flapping(self, now_ns: int) -> int:
+        """
+        Number of cameras reported "flapping" at `now_ns`.
+        """
+        return sum(1 for key in self._flapping if self.state(key, now_ns) == FLAPPING)
+
+    def remove(self, key: Hashable) -> None:
+        self._status.pop(key, None)
+        self._flapping.discard(key)
+
+    def clear(self) -> None:
+        self._status.clear()
+        self._flapping.clear()
+
+    # HELPERS
+    def _transition(self, key: Hashable, st: _Status, at_ns: int) -> None:
+        metrics.incr("status.transitions")
+        st.transitions.append(at_ns)
+        while st.transitions[0] < at_ns - _flap_window_ns():
+            st.transitions.popleft()
+
+        threshold = Config.STATUS_FLAP_THRESHOLD
+        if threshold and len(st.transitions) >= threshold and not st.flapping:
+            st.flapping = True
+            self._flapping.add(key)
+            metrics.incr("status.flapping_detected")
+
+
+def _flap_window_ns() -> int:
+    return seconds_to_ns(Config.STATUS_FLAP_WINDOW)
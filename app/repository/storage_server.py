@@ -0,0 +1,186 @@
+# LOCAL STORAGE SERVER (one process owns the fleet)
+#
+# Problem:
+#   `uvicorn --workers N` starts N processes, and every process builds its own
+#   in-memory repository: a camera added through one worker does not exist in
+#   the others, and heartbeats land in whichever fleet served the request.
+#
+# Solution:
+#   ONE storage server process holds the repository (memory or sharded) and
+#   serves every CameraRepositoryInterface method over a Unix domain socket.
+#   The API workers use RemoteCameraStorage (remote_repo.py) as their
+#   repository, so all of them read and write the SAME fleet while request
+#   parsing, validation and JSON rendering scale across cores.
+#
+#   - Protocol: compact binary frames (wire.py), one per call / answer.
+#   - One thread per connection; calls arriving on one connection are
+#     answered in order, so a client can PIPELINE many calls on it.
+#   - Every call runs under ONE lock: each repository call is atomic, and
+#     every worker sees the writes of the others as soon as they return.
+#
+# Run:
+#   python -m app.repository.storage_server [--socket PATH] [--backend memory]
+#   REPOSITORY_BACKEND=remote uvicorn app.main:app --workers 4
+
+import argparse
+import logging
+import os
+import signal
+import socket
+import stat
+import threading
+from typing import Optional
+
+from app.core.config import Config
+from app.core.exceptions import ConflictError
+from app.repository.interface import CameraRepositoryInterface
+from app.repository.registry import build_repository
+from app.repository.wire import (ERROR, METHODS, OK, decode, encode_frame,
+                                 read_frame)
+
+logger = logging.getLogger(__name__)
+
+
+class StorageServer:
+    """
+    Serves one repository to RemoteCameraStorage clients over a Unix domain
+    socket (see the header of this file).
+    """
+
+    def __init__(
+        self,
+        repo: Optional[CameraRepositoryInterface] = None,
+        path: Optional[str] = None,
+    ):
+        self.repo = build_repository("memory") if repo is None else repo
+        self.path = Config.STORAGE_SOCKET if path is None else path
+        self._lock = threading.Lock()  # one repository call at a time
+        self._server: Optional[socket.socket] = None
+        self._conns: set = set()
+        self._conns_lock = threading.Lock()
+        self._stopped = threading.Event()
+
+    def start(self) -> str:
+        """
+        Bind the socket and start accepting clients. Returns the socket path.
+        """
+        _remove_stale_socket(self.path)
+        self._server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._server.bind(self.path)
+        self._server.listen()
+        threading.Thread(
+            target=self._accept_loop, name="storage-server", daemon=True
+        ).start()
+        logger.info(f"[STORAGE] Server listening on {self.path}")
+        return self.path
+
+    def serve_forever(self) -> None:
+        self.start()
+        self._stopped.wait()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._server is not None:
+            self._server.close()
+            self._server = None
+            if os.path.exists(self.path):
+                os.unlink(self.path)
+        with self._conns_lock:
+            for conn in self._conns:
+                _close(conn)
+
+    # CONNECTIONS
+    def _accept_loop(self) -> None:
+        while not self._stopped.is_set():
+            try:
+                conn, _ = self._server.accept()
+            except OSError:
+                return  # server socket closed by stop()
+            threading.Thread(
+                target=self._serve, args=(conn,), name="storage-conn", daemon=True
+            ).start()
+
+    def _serve(self, conn: socket.socket) -> None:
+        with self._conns_lock:
+            self._conns.add(conn)
+        stream = conn.makefile("rb")
+        try:
+            while not self._stopped.is_set():
+                request_id, method, body = read_frame(stream)
+                conn.sendall(self._call(request_id, method, body))
+        except (OSError, ConnectionError) as exc:
+            logger.debug(f"[STORAGE] Client disconnected: {exc}")
+        finally:
+            with self._conns_lock:
+                self._conns.discard(conn)
+            _close(conn)
+
+    def _call(self, request_id: int, method: int, body: bytes) -> bytes:
+        # One call → its answer frame. Errors go back to the client (which
+        # re-raises them) instead of closing the connection.
+        try:
+            name = METHODS[method]
+            args = decode(body)
+            with self._lock:
+                result = getattr(self.repo, name)(*args)
+            return encode_frame(request_id, OK, result)
+        except Exception as exc:
+            if not isinstance(exc, (ConflictError, KeyError, TypeError, ValueError)):
+                logger.exception(f"[STORAGE] Call {method} failed")
+            return encode_frame(request_id, ERROR, (type(exc).__name__, str(exc)))
+
+
+def _remove_stale_socket(path: str) -> None:
+    # a socket file left by a previous server would make bind() fail; one
+    # that still answers belongs to a running server and is kept
+    try:
+        if not stat.S_ISSOCK(os.stat(path).st_mode):
+            return
+    except FileNotFoundError:
+        return
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(path)
+    except OSError:
+        os.unlink(path)
+    else:
+        raise OSError(f"A storage server is already listening on {path}.")
+    finally:
+        probe.close()
+
+
+def _close(sock: socket.socket) -> None:
+    # wake up a thread blocked in recv / sendall on this socket, then close it
+    try:
+        sock.shutdown(socket.SHUT_RDWR)
+    except OSError:
+        pass
+    sock.close()
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Storage server shared by the API workers (REPOSITORY_BACKEND=remote)."
+    )
+    parser.add_argument("--socket", default=None, help="default: STORAGE_SOCKET")
+    parser.add_argument(
+        "--backend", default="memory", help="repository held by the server"
+    )
+    args = parser.parse_args(argv)
+    if args.backend == "remote":
+        parser.error("the storage server cannot use the 'remote' backend itself")
+
+    logging.basicConfig(level=logging.INFO)
+    server = StorageServer(build_repository(args.backend), args.socket)
+    # SIGTERM (process managers, `kill`) stops the server cleanly like Ctrl+C
+    signal.signal(signal.SIGTERM, lambda *_: server.stop())
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
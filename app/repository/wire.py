@@ -0,0 +1,314 @@
+# COMPACT BINARY PROTOCOL (storage server ↔ RemoteCameraStorage)
+#
+# One FRAME per request / response on the Unix domain socket:
+#     request   [u32 body length][u32 request id][u8 method][args]
+#     response  [u32 body length][u32 request id][u8 status][result]
+#   method  → index into METHODS (the repository interface, sorted by name)
+#   status  → OK (result follows) or ERROR (exception class name + message)
+#   The request id lets one connection carry many requests at once
+#   (PIPELINING): the client does not wait for a response before sending the
+#   next request, and matches responses by id.
+#
+# VALUES are tagged: one tag byte, then a fixed-size or length-prefixed body.
+#     N / T / F        None / True / False
+#     i  int64         I  big int (length + signed bytes, e.g. IPv6 as int)
+#     d  float64       s  str (utf-8)       b  bytes
+#     l  list          t  tuple             m  dict
+#     u  UUID (16 bytes)
+#     D  datetime (int64 µs since the epoch + i32 UTC offset in seconds)
+#     M  Pydantic model (schema name + its JSON from Pydantic's Rust encoder)
+#     a  array.array   A  numpy array (1-D)   H  CheckinHistory   C  FleetColumns
+# No pickle: a frame can only ever decode into these types and the models
+# listed in MODELS.
+
+import ipaddress
+import struct
+from array import array
+from datetime import datetime, timedelta, timezone
+from typing import Any, BinaryIO, Callable, Dict, List, Tuple
+from uuid import UUID
+
+from app.models import schemas
+from app.repository.columnar import FleetColumns, numpy_module
+from app.repository.heartbeat_history import CheckinHistory
+from app.repository.interface import CameraRepositoryInterface
+
+# every repository method, by index (both sides build the same tuple)
+METHODS: Tuple[str, ...] = tuple(sorted(CameraRepositoryInterface.__abstractmethods__))
+METHOD_INDEX: Dict[str, int] = {name: i for i, name in enumerate(METHODS)}
+
+OK = 0
+ERROR = 1
+
+HEADER = struct.Struct(">IIB")  # body length, request id, method / status
+
+# Pydantic models that may cross the socket
+MODELS: Dict[str, type] = {
+    name: getattr(schemas, name)
+    for name in (
+        "CameraDetails",
+        "CameraFeedInfo",
+        "CameraFilter",
+        "CameraUpdate",
+        "FeedUpdate",
+        "FleetStats",
+        "NewCameraData",
+        "VideoFeedInfo",
+        "VideoFeedSetup",
+    )
+}
+
+_U32 = struct.Struct(">I")
+_I64 = struct.Struct(">q")
+_F64 = struct.Struct(">d")
+_DATETIME = struct.Struct(">qi")
+_NAIVE = -(2**31)  # offset value of a datetime without tzinfo
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_NAIVE_EPOCH = datetime(1970, 1, 1)
+_ONE_MICROSECOND = timedelta(microseconds=1)
+
+
+def encode_frame(request_id: int, code: int, value: Any) -> bytes:
+    """
+    One frame: header + encoded value.
+    """
+    out = bytearray(HEADER.size)
+    _encode(value, out)
+    HEADER.pack_into(out, 0, len(out) - HEADER.size, request_id, code)
+    return bytes(out)
+
+
+def read_frame(stream: BinaryIO) -> Tuple[int, int, bytes]:
+    """
+    Next frame from a buffered socket reader: (request id, method / status, body).
+    """
+    header = stream.read(HEADER.size)
+    if len(header) < HEADER.size:
+        raise ConnectionError("Storage peer closed the connection.")
+    size, request_id, code = HEADER.unpack(header)
+    body = stream.read(size)
+    if len(body) < size:
+        raise ConnectionError("Storage peer closed the connection.")
+    return request_id, code, body
+
+
+def decode(body: bytes) -> Any:
+    """
+    The value encoded in a frame body.
+    """
+    value, _ = _decode(memoryview(body), 0)
+    return value
+
+
+# ENCODING
+def _encode(value: Any, out: bytearray) -> None:
+    if value is None:
+        out += b"N"
+    elif value is True:
+        out += b"T"
+    elif value is False:
+        out += b"F"
+    elif isinstance(value, int):
+        if -(2**63) <= value < 2**63:
+            out += b"i"
+            out += _I64.pack(value)
+        else:
+            raw = value.to_bytes((value.bit_length() + 8) // 8, "big", signed=True)
+            _encode_sized(b"I", raw, out)
+    elif isinstance(value, float):
+        out += b"d"
+        out += _F64.pack(value)
+    elif isinstance(value, str):
+        _encode_sized(b"s", value.encode(), out)
+    elif isinstance(value, (bytes, bytearray)):
+        _encode_sized(b"b", value, out)
+    elif isinstance(value, UUID):
+        out += b"u"
+        out += value.bytes
+    elif isinstance(value, datetime):
+        offset = value.utcoffset()
+        if offset is None:
+            micros = (value - _NAIVE_EPOCH) // _ONE_MICROSECOND
+            seconds = _NAIVE
+        else:
+            micros = (value - _EPOCH) // _ONE_MICROSECOND
+            seconds = int(offset.total_seconds())
+        out += b"D"
+        out += _DATETIME.pack(micros, seconds)
+    elif isinstance(value, schemas.BaseModel):
+        out += b"M"
+        _encode_sized(b"s", type(value).__name__.encode(), out)
+        _encode_sized(b"b", value.__pydantic_serializer__.to_json(value), out)
+    elif isinstance(value, CheckinHistory):  # a tuple: before the tuple case
+        out += b"H"
+        _encode(value.complete_since, out)
+        _encode(value.epochs, out)
+    elif isinstance(value, (list, tuple)):
+        out += b"l" if isinstance(value, list) else b"t"
+        out += _U32.pack(len(value))
+        for item in value:
+            _encode(item, out)
+    elif isinstance(value, dict):
+        out += b"m"
+        out += _U32.pack(len(value))
+        for key, item in value.items():
+            _encode(key, out)
+            _encode(item, out)
+    elif isinstance(value, array):
+        out += b"a"
+        _encode_sized(b"s", value.typecode.encode(), out)
+        _encode_sized(b"b", value.tobytes(), out)
+    elif isinstance(value, FleetColumns):
+        out += b"C"
+        _encode(
+            [
+                value.camera_ids,
+                value.ip_version,
+                value.ip_hi,
+                value.ip_lo,
+                value.model_code,
+                value.models,
+                value.feed_count,
+                value.checkin_ns,
+            ],
+            out,
+        )
+    elif isinstance(value, (ipaddress.IPv4Address, ipaddress.IPv6Address)):
+        _encode(str(value), out)
+    elif type(value).__module__ == "numpy" and hasattr(value, "dtype"):
+        out += b"A"
+        _encode_sized(b"s", value.dtype.str.encode(), out)
+        _encode_sized(b"b", value.tobytes(), out)
+    else:
+        raise TypeError(f"Cannot encode {type(value).__name__} for the storage server.")
+
+
+def _encode_sized(tag: bytes, raw: bytes, out: bytearray) -> None:
+    out += tag
+    out += _U32.pack(len(raw))
+    out += raw
+
+
+# DECODING: tag → reader(buffer, position after the tag) → (value, next position)
+def _read_sized(buf: memoryview, pos: int) -> Tuple[memoryview, int]:
+    (size,) = _U32.unpack_from(buf, pos)
+    start = pos + _U32.size
+    return buf[start : start + size], start + size
+
+
+def _read_str(buf: memoryview, pos: int) -> Tuple[str, int]:
+    raw, pos = _read_sized(buf, pos + 1)  # skip the nested "s" tag
+    return str(raw, "utf-8"), pos
+
+
+def _read_bytes(buf: memoryview, pos: int) -> Tuple[bytes, int]:
+    raw, pos = _read_sized(buf, pos + 1)  # skip the nested "b" tag
+    return bytes(raw), pos
+
+
+def _read_items(buf: memoryview, pos: int) -> Tuple[List[Any], int]:
+    (count,) = _U32.unpack_from(buf, pos)
+    pos += _U32.size
+    items = []
+    for _ in range(count):
+        item, pos = _decode(buf, pos)
+        items.append(item)
+    return items, pos
+
+
+def _read_dict(buf: memoryview, pos: int) -> Tuple[Dict[Any, Any], int]:
+    (count,) = _U32.unpack_from(buf, pos)
+    pos += _U32.size
+    result = {}
+    for _ in range(count):
+        key, pos = _decode(buf, pos)
+        result[key], pos = _decode(buf, pos)
+    return result, pos
+
+
+def _read_datetime(buf: memoryview, pos: int) -> Tuple[datetime, int]:
+    micros, seconds = _DATETIME.unpack_from(buf, pos)
+    pos += _DATETIME.size
+    if seconds == _NAIVE:
+        return _NAIVE_EPOCH + micros * _ONE_MICROSECOND, pos
+    value = _EPOCH + micros * _ONE_MICROSECOND
+    if seconds:
+        value = value.astimezone(timezone(timedelta(seconds=seconds)))
+    return value, pos
+
+
+def _read_model(buf: memoryview, pos: int) -> Tuple[Any, int]:
+    name, pos = _read_str(buf, pos)
+    raw, pos = _read_bytes(buf, pos)
+    try:
+        model = MODELS[name]
+    except KeyError:
+        raise ValueError(f"Unknown model '{name}' in storage frame.")
+    return model.model_validate_json(raw), pos
+
+
+def _read_big_int(buf: memoryview, pos: int) -> Tuple[int, int]:
+    raw, pos = _read_sized(buf, pos)
+    return int.from_bytes(raw, "big", signed=True), pos
+
+
+def _read_array(buf: memoryview, pos: int) -> Tuple[array, int]:
+    typecode, pos = _read_str(buf, pos)
+    raw, pos = _read_bytes(buf, pos)
+    return array(typecode, raw), pos
+
+
+def _read_ndarray(buf: memoryview, pos: int):
+    np = numpy_module()
+    dtype, pos = _read_str(buf, pos)
+    raw, pos = _read_bytes(buf, pos)
+    return np.frombuffer(raw, dtype=np.dtype(dtype)), pos
+
+
+def _read_history(buf: memoryview, pos: int) -> Tuple[CheckinHistory, int]:
+    complete_since, pos = _decode(buf, pos)
+    epochs, pos = _decode(buf, pos)
+    return CheckinHistory(complete_since, epochs), pos
+
+
+def _read_columns(buf: memoryview, pos: int) -> Tuple[FleetColumns, int]:
+    fields, pos = _decode(buf, pos)
+    ids, version, hi, lo, codes, models, feeds, checkins = fields
+    return FleetColumns(ids, None, version, hi, lo, codes, models, feeds, checkins), pos
+
+
+def _fixed(unpacker: struct.Struct, convert: Callable = lambda v: v) -> Callable:
+    def read(buf: memoryview, pos: int):
+        return convert(unpacker.unpack_from(buf, pos)[0]), pos + unpacker.size
+
+    return read
+
+
+_READERS: Dict[int, Callable] = {
+    ord("N"): lambda buf, pos: (None, pos),
+    ord("T"): lambda buf, pos: (True, pos),
+    ord("F"): lambda buf, pos: (False, pos),
+    ord("i"): _fixed(_I64),
+    ord("I"): _read_big_int,
+    ord("d"): _fixed(_F64),
+    ord("s"): lambda buf, pos: _read_str(buf, pos - 1),
+    ord("b"): lambda buf, pos: _read_bytes(buf, pos - 1),
+    ord("u"): lambda buf, pos: (UUID(bytes=bytes(buf[pos : pos + 16])), pos + 16),
+    ord("D"): _read_datetime,
+    ord("M"): _read_model,
+    ord("l"): _read_items,
+    ord("t"): lambda buf, pos: (lambda r: (tuple(r[0]), r[1]))(_read_items(buf, pos)),
+    ord("m"): _read_dict,
+    ord("a"): _read_array,
+    ord("A"): _read_ndarray,
+    ord("H"): _read_history,
+    ord("C"): _read_columns,
+}
+
+
+def _decode(buf: memoryview, pos: int) -> Tuple[Any, int]:
+    reader = _READERS.get(buf[pos])
+    if reader is None:
+        raise ValueError(f"Unknown tag {buf[pos]!r} in storage frame.")
+    return reader(buf, pos + 1)
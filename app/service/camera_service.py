@@ -9,15 +9,35 @@
 # Service depends on the Interface not directly on the memeory_repo.py.
 
 
+import bisect
+import heapq
 import logging
-from datetime import datetime, timezone
+import re
+from array import array
+from collections import Counter
+from datetime import datetime
+from itertools import repeat
+from operator import sub
+from typing import List, Optional, Tuple
 from uuid import UUID
 
+from app.core.clock import (NS_PER_SECOND, clock, seconds_to_ns, to_datetime,
+                            to_ns)
 from app.core.config import Config
-from app.core.exceptions import ConflictError, NotFoundError
-from app.models.schemas import (CameraDetails, CameraUpdate, FeedUpdate,
-                                NewCameraData, VideoFeedInfo, VideoFeedSetup)
-from app.repository.interface import CameraRepositoryInterface
+from app.core.exceptions import (ConflictError, FeatureUnavailableError,
+                                 NotFoundError, ValidationError)
+from app.models.schemas import (BulkFeedOperation, BulkItemOutcome,
+                                BulkResult, BulkUpdateResult, CameraDetails,
+                                CameraFeedInfo, CameraFilter, CameraUpdate,
+                                CameraUptime, FeedUpdate, FleetStats,
+                                FleetUptimeReport, NewCameraData,
+                                OfflineAnalytics, VideoFeedInfo,
+                                VideoFeedSetup)
+from app.repository.columnar import numpy_module
+from app.repository.heartbeat_history import CheckinHistory
+from app.repository.interface import BulkOutcome, CameraRepositoryInterface
+from app.repository.status_tracker import (ONLINE, CameraStatus,
+                                           offline_after_ns)
 
 # It creates a logger specific to the current file.
 logger = logging.getLogger(__name__)
@@ -33,29 +53,26 @@ class CameraService:
         logger.info("[SERVICE] Adding new camera")  # (ADDED COMMENT)
 
         # RULE 1: Prevent duplicate camera IP addresses
-        for cam in self.repo.list_cameras():
-            if cam.network_setup.ip_address == data.network_setup.ip_address:
-                # data is automatically created by FastAPI + Pydantic, based on the request body.
-                logger.warning(
-                    f"[ADD CAMERA] Duplicate IP rejected: {data.network_setup.ip_address}"
-                )
-                raise ConflictError("A camera with this IP address already exists.")
-
         # RULE 2: Prevent duplicate (camera_name + camera_model) combo
-        for cam in self.repo.list_cameras():
-            if (
-                cam.camera_name == data.camera_name
-                and cam.camera_model == data.camera_model
-            ):
-                logger.warning(
-                    f"[ADD CAMERA] Duplicate name+model rejected: {data.camera_name} | {data.camera_model}"
-                )
-                raise ConflictError("A camera with same name and model already exists.")
-
-        cam = self.repo.add_camera(data)
-
-        cam.last_known_checkin = datetime.now(timezone.utc)  # (ADDED HEARTBEAT HERE)
-        cam.last_updated_on = datetime.now(timezone.utc)  # (ADDED HEARTBEAT HERE)
+        # Both are checked by the repository together with the insert, in ONE
+        # atomic step: two concurrent requests cannot both add a duplicate,
+        # and the fleet is not read (or sent over the storage socket) here.
+        try:
+            cam = self.repo.add_unique_camera(data)
+        except ConflictError as exc:
+            # data is automatically created by FastAPI + Pydantic, based on the request body.
+            logger.warning(
+                f"[ADD CAMERA] Rejected {data.camera_name} | {data.camera_model} "
+                f"| {data.network_setup.ip_address}: {exc}"
+            )
+            raise
+
+        # (ADDED HEARTBEAT HERE) → through the repo so online counters stay correct
+        # ONE clock reading for the check-in and last_updated_on
+        # (last_updated_on is set by the repo too: the returned object may be
+        # a copy, e.g. from a remote storage server)
+        now = clock.now()
+        cam = self.repo.record_checkin(cam.camera_id, now, updated_on=now)
 
         logger.info(
             f"[ADD CAMERA] Camera created with ID={cam.camera_id}"
@@ -94,64 +111,130 @@ class CameraService:
         online: bool | None = None,
         page: int = 1,
         page_size: int = 20,
+        name: str | None = None,
+        tags_any: List[str] | None = None,
+        tags_all: List[str] | None = None,
+        tags_none: List[str] | None = None,
     ):
 
         logger.info("[SERVICE] Listing cameras with filters")
 
+        # Filtering (model / name trigram indexes, sorted IP index, tag
+        # bitmaps, online) and pagination both happen in the repository,
+        # which only builds the requested page.
+        flt, online_since = self._camera_filter(
+            model, ip_from, ip_to, online, name, tags_any, tags_all, tags_none
+        )
+        cameras = self.repo.query_cameras(
+            flt,
+            online_since=online_since,
+            offset=max(0, (page - 1) * page_size),
+            limit=page_size,
+        )
+
+        logger.info(f"[SERVICE] Returning {len(cameras)} cameras")
+        return cameras
+
+    # DATA VERSION (cache keys for list results)
+    def data_version(self, with_checkins: bool = True, with_status: bool = False) -> tuple:
+        """
+        Changes after every write; with_checkins=False ignores heartbeats
+        (for results that do not contain check-in times). with_status=True
+        (only used with with_checkins=False) still follows heartbeats that
+        change a camera's online status, not every heartbeat.
+        """
+        if with_checkins:
+            return (self.repo.data_version(), self.repo.checkin_version())
+        if with_status:
+            return (self.repo.data_version(), self.repo.status_version())
+        return (self.repo.data_version(),)
+
+    # WHEN CAN AN ONLINE / OFFLINE FILTER CHANGE WITHOUT A WRITE?
+    def online_filter_expiry(self) -> datetime | None:
+        """
+        The moment the oldest online camera times out (the next time an
+        online=true/false result changes by itself). None → no camera online,
+        so only a check-in (= a new version) can change it.
+        """
+        now_ns = clock.now_ns()
+        limit_ns = offline_after_ns()
+        oldest = self.repo.oldest_online_checkin(to_datetime(now_ns - limit_ns))
+        return None if oldest is None else to_datetime(to_ns(oldest) + limit_ns)
+
+    # COUNT CAMERAS (total behind list_cameras, for X-Total-Count)
+    def count_cameras(
+        self,
+        model: str | None = None,
+        ip_from: str | None = None,
+        ip_to: str | None = None,
+        online: bool | None = None,
+        name: str | None = None,
+        tags_any: List[str] | None = None,
+        tags_all: List[str] | None = None,
+        tags_none: List[str] | None = None,
+    ) -> int:
+        flt, online_since = self._camera_filter(
+            model, ip_from, ip_to, online, name, tags_any, tags_all, tags_none
+        )
+        return self.repo.count_cameras(flt, online_since=online_since)
+
+    # EXPORT CAMERAS (every match, no pagination; streamed by the API)
+    def export_cameras(
+        self,
+        model: str | None = None,
+        ip_from: str | None = None,
+        ip_to: str | None = None,
+        online: bool | None = None,
+        name: str | None = None,
+        tags_any: List[str] | None = None,
+        tags_all: List[str] | None = None,
+        tags_none: List[str] | None = None,
+    ) -> List[CameraDetails]:
+        logger.info("[SERVICE] Exporting cameras")
+        flt, online_since = self._camera_filter(
+            model, ip_from, ip_to, online, name, tags_any, tags_all, tags_none
+        )
+        return self.repo.query_cameras(flt, online_since=online_since)
+
+    def _camera_filter(
+        self,
+        model: str | None,
+        ip_from: str | None,
+        ip_to: str | None,
+        online: bool | None,
+        name: str | None,
+        tags_any: List[str] | None = None,
+        tags_all: List[str] | None = None,
+        tags_none: List[str] | None = None,
+    ):
+        # Validate the raw query values ONCE and turn them into a CameraFilter.
         import ipaddress
 
-        cameras = self.repo.list_cameras()
+        try:
+            ip_from_v = ipaddress.ip_address(ip_from) if ip_from else None
+            ip_to_v = ipaddress.ip_address(ip_to) if ip_to else None
+        except ValueError:
+            raise ConflictError("Invalid IP format.")
 
-        # FILTER 1 : model substring
-        if model:
-            filtered = []
-            for c in cameras:
-                if model.lower() in c.camera_model.lower():
-                    filtered.append(c)
-            cameras = filtered
-
-        # FILTER 2 : IP RANGE
-        if ip_from or ip_to:
-            try:
-                ip_from_v = ipaddress.ip_address(ip_from) if ip_from else None
-                #Convert user's ip_from into an IP object.
-                ip_to_v = ipaddress.ip_address(ip_to) if ip_to else None
-            except ValueError:
-                raise ConflictError("Invalid IP format.")
-
-            def in_range(ip):
-                ip_obj = ipaddress.ip_address(ip)
-                #(Where ip = c.network_setup.ip_address) stored cameras ip.
-                if ip_from_v and ip_obj < ip_from_v:
-                #If the user provided a lower-bound IP (ip_from),and the camera's IP is less than that lower bound,then this camera is not in range.
-                #lower : camera_ip >= ip_from_v
-                #greater : camera_ip <= ip_to_v
-                   return False
-                if ip_to_v and ip_obj > ip_to_v:
-                    return False
-                return True
-
-            #loop through all the cameras
-            filtered = []
-            for c in cameras:
-                if in_range(c.network_setup.ip_address):
-                    filtered.append(c)
-            cameras = filtered
-
-        # FILTER 3 → online/offline
+        # Same rule as is_online(): online while (now - checkin) <= offline_after()
+        # (and online for the status tracker, checked by the repository)
+        online_since = None
         if online is not None:
-            filtered = []
-            for c in cameras:
-                if self.is_online(c.camera_id) == online:
-                    filtered.append(c)
-            cameras = filtered
-
-        # PAGINATION
-        start = (page - 1) * page_size
-        end = start + page_size
-
-        logger.info(f"[SERVICE] Returning {len(cameras[start:end])} cameras")
-        return cameras[start:end]
+            online_since = _online_since()
+
+        # model_construct: the values are already validated above, so the
+        # per-request Pydantic validation pass is skipped.
+        flt = CameraFilter.model_construct(
+            name=name or None,
+            model=model or None,
+            ip_from=ip_from_v,
+            ip_to=ip_to_v,
+            online=online,
+            tags_any=tags_any or None,
+            tags_all=tags_all or None,
+            tags_none=tags_none or None,
+        )
+        return flt, online_since
 
     # UPDATE CAMERA
     def update_camera(self, camera_id: UUID, updates: CameraUpdate) -> CameraDetails:
@@ -164,9 +247,150 @@ class CameraService:
             )  # (ADDED COMMENT)
             raise NotFoundError("Camera not found.")
 
-        cam.last_known_checkin = datetime.now(timezone.utc)  # (ADDED HEARTBEAT HERE)
+        # (ADDED HEARTBEAT HERE)
+        self.repo.record_checkin(camera_id, clock.now())
         return cam
 
+    # BULK UPDATE (PATCH /cameras)
+    def bulk_update_cameras(
+        self,
+        updates: CameraUpdate,
+        model: str | None = None,
+        ip_from: str | None = None,
+        ip_to: str | None = None,
+        cidr: str | None = None,
+        camera_ids: List[UUID] | None = None,
+    ) -> BulkUpdateResult:
+        """
+        Apply `updates` to every camera matching the filter, in one repository
+        pass. Unlike a single PATCH this does NOT count as a heartbeat.
+        """
+        logger.info("[SERVICE] Bulk update of cameras")
+
+        flt = self._bulk_filter(model, ip_from, ip_to, cidr, camera_ids)
+        matched = self.repo.query_cameras(flt)
+
+        # RULE 1: IP addresses are unique → cannot give one IP to many cameras
+        # (same for the name: together with the model it must stay unique)
+        if len(matched) > 1 and (
+            updates.network_setup is not None or updates.camera_name is not None
+        ):
+            raise ConflictError(
+                "camera_name and network_setup cannot be set on several cameras at once."
+            )
+
+        # RULE 2: (camera_name + camera_model) must stay unique after the update
+        if updates.camera_model is not None:
+            self._check_names_unique(matched, updates.camera_model)
+
+        updated = self.repo.update_cameras(
+            [cam.camera_id for cam in matched], updates
+        )
+        logger.info(f"[SERVICE] Bulk update: {updated} of {len(matched)} cameras changed")
+        return BulkUpdateResult(matched=len(matched), updated=updated)
+
+    # BULK DELETE (DELETE /cameras?cidr=...)
+    def bulk_remove_cameras(
+        self,
+        model: str | None = None,
+        ip_from: str | None = None,
+        ip_to: str | None = None,
+        cidr: str | None = None,
+        camera_ids: List[UUID] | None = None,
+    ) -> BulkResult:
+        """
+        Delete every camera matching the filter in one repository pass.
+        Requested ids that were not selected are reported as "not_found".
+        """
+        logger.info("[SERVICE] Bulk delete of cameras")
+
+        flt = self._bulk_filter(model, ip_from, ip_to, cidr, camera_ids)
+        ids = [cam.camera_id for cam in self.repo.query_cameras(flt)]
+        outcomes = self.repo.remove_cameras(ids) + _not_selected(camera_ids, ids)
+        return _bulk_result(len(ids), outcomes)
+
+    # BULK FEED OPERATION (POST /feeds/bulk)
+    def bulk_feeds(
+        self,
+        op: BulkFeedOperation,
+        model: str | None = None,
+        ip_from: str | None = None,
+        ip_to: str | None = None,
+        cidr: str | None = None,
+        camera_ids: List[UUID] | None = None,
+    ) -> BulkResult:
+        """
+        Add / update / remove feeds on every camera matching the filter, in
+        one repository pass. One outcome per feed (or per camera for "add").
+        """
+        logger.info(f"[SERVICE] Bulk feed operation: {op.action}")
+
+        # RULE: say WHAT to add / which feeds to change (never "all feeds")
+        if op.action == "add" and op.feed is None:
+            raise ValidationError("action 'add' needs a 'feed'.")
+        if op.action != "add" and op.feed_protocol is None:
+            raise ValidationError(f"action '{op.action}' needs 'feed_protocol'.")
+        if op.action == "update" and op.updates is None:
+            raise ValidationError("action 'update' needs 'updates'.")
+
+        flt = self._bulk_filter(model, ip_from, ip_to, cidr, camera_ids)
+        ids = [cam.camera_id for cam in self.repo.query_cameras(flt)]
+
+        # Protocols are stored in lowercase (schema only allows 'rtsp' / 'http').
+        protocol = op.feed_protocol.lower() if op.feed_protocol else None
+        if op.action == "add":
+            outcomes = self.repo.add_feeds(ids, op.feed)
+        elif op.action == "update":
+            outcomes = self.repo.update_feeds(ids, protocol, op.feed_port, op.updates)
+        else:
+            outcomes = self.repo.remove_feeds(ids, protocol, op.feed_port)
+        return _bulk_result(len(ids), outcomes + _not_selected(camera_ids, ids))
+
+    def _bulk_filter(
+        self,
+        model: str | None,
+        ip_from: str | None,
+        ip_to: str | None,
+        cidr: str | None,
+        camera_ids: List[UUID] | None,
+    ) -> CameraFilter:
+        # Filter of a bulk operation: at least ONE filter is required, so a
+        # missing query parameter can never change the whole fleet.
+        import ipaddress
+
+        if not (model or ip_from or ip_to or cidr or camera_ids):
+            raise ValidationError(
+                "A bulk operation needs a filter: model, ip_from/ip_to, cidr or ids."
+            )
+        if cidr:
+            if ip_from or ip_to:
+                raise ValidationError("Use either cidr or ip_from/ip_to, not both.")
+            try:
+                network = ipaddress.ip_network(cidr, strict=False)
+            except ValueError:
+                raise ValidationError("Invalid CIDR.")
+            ip_from = str(network.network_address)
+            ip_to = str(network.broadcast_address)
+
+        flt, _ = self._camera_filter(model, ip_from, ip_to, None, None)
+        flt.camera_ids = camera_ids or None
+        return flt
+
+    def _check_names_unique(self, matched: List[CameraDetails], model: str) -> None:
+        moved = {cam.camera_id for cam in matched}
+        # only cameras whose model contains `model` (index lookup), not the fleet
+        taken = {
+            cam.camera_name
+            for cam in self.repo.search_cameras(model=model)
+            if cam.camera_model == model and cam.camera_id not in moved
+        }
+        for cam in matched:
+            if cam.camera_name in taken:
+                raise ConflictError(
+                    f"A camera named '{cam.camera_name}' with model '{model}' already exists."
+                )
+            taken.add(cam.camera_name)
+
     # ADD FEED
     def add_feed(self, camera_id: UUID, feed_data: VideoFeedSetup) -> VideoFeedInfo:
         logger.info(f"[SERVICE] Adding feed to camera ID={camera_id}")
@@ -177,21 +401,20 @@ class CameraService:
             raise NotFoundError("Camera not found.")
 
         # RULE: Prevent duplicate (protocol + port)
-        for f in cam.available_feeds:
-            if (
-                f.feed_protocol == feed_data.feed_protocol
-                and f.feed_port == feed_data.feed_port
-            ):
-                logger.warning("[SERVICE] Feed duplicate protocol+port")
-                raise ConflictError(
-                    "A feed with same protocol and port already exists for this camera."
-                )
+        # O(1) lookup in the repository's per-camera (protocol, port) index.
+        if self.repo.feed_exists(
+            camera_id, feed_data.feed_protocol, feed_data.feed_port
+        ):
+            logger.warning("[SERVICE] Feed duplicate protocol+port")
+            raise ConflictError(
+                "A feed with same protocol and port already exists for this camera."
+            )
 
         new_feed = self.repo.add_feed(camera_id, feed_data)
         if new_feed is None:
             raise NotFoundError("Camera not found while adding feed.")
 
-        cam.last_known_checkin = datetime.now(timezone.utc)
+        self.repo.record_checkin(camera_id, clock.now())
 
         return new_feed
 
@@ -212,7 +435,7 @@ class CameraService:
         if cam is None:
             raise NotFoundError("Camera not found.")  # safety
 
-        cam.last_known_checkin = datetime.now(timezone.utc)
+        self.repo.record_checkin(camera_id, clock.now())
 
         return updated
 
@@ -231,7 +454,7 @@ class CameraService:
         if cam is None:
             raise NotFoundError("Camera not found.")
 
-        cam.last_known_checkin = datetime.now(timezone.utc)
+        self.repo.record_checkin(camera_id, clock.now())
 
         return True
 
@@ -252,35 +475,78 @@ class CameraService:
             logger.warning("[SERVICE] Cannot list feeds — camera not found")
             raise NotFoundError("Camera not found.")
 
-        feeds = list(cam.available_feeds)
+        # Protocols are stored in lowercase (schema only allows 'rtsp' / 'http').
+        # Filtering + pagination happen in the repository, which keeps the
+        # feed paths pre-lowercased for the `q` substring test.
+        feeds = self.repo.list_feeds(
+            camera_id,
+            protocol=protocol.lower() if protocol else None,
+            port=port,
+            q=q,
+            page=page,
+            page_size=page_size,
+        )
+
+        logger.info(f"[SERVICE] Returning {len(feeds)} feeds")
+        return feeds
+
+    # COUNT FEEDS OF ONE CAMERA (total behind list_feeds)
+    def count_feeds(
+        self,
+        camera_id: UUID,
+        protocol: str | None = None,
+        port: int | None = None,
+        q: str | None = None,
+    ) -> int:
+        if self.repo.get_camera(camera_id) is None:
+            raise NotFoundError("Camera not found.")
+        return self.repo.count_feeds(
+            camera_id,
+            protocol=protocol.lower() if protocol else None,
+            port=port,
+            q=q,
+        )
+
+    # SEARCH FEEDS ACROSS THE WHOLE FLEET
+    def search_feeds(
+        self,
+        protocol: str | None = None,
+        port: int | None = None,
+        q: str | None = None,
+        page: int = 1,
+        page_size: int = 20,
+    ) -> List[CameraFeedInfo]:
+        logger.info(
+            f"[SERVICE] Searching fleet feeds protocol={protocol} port={port} q={q}"
+        )
 
+        # Protocols are stored in lowercase (schema only allows 'rtsp' / 'http').
         if protocol:
-            filtered = []
-            for f in feeds:
-                if f.feed_protocol.lower() == protocol.lower():
-                    filtered.append(f)
-            feeds = filtered
-
-        if port is not None:
-            filtered = []
-            for f in feeds:
-                if f.feed_port == port:
-                    filtered.append(f)
-            feeds = filtered
-
-        if q:
-            q_lower = q.lower()
-            filtered = []
-            for f in feeds:
-                if q_lower in f.feed_path.lower():
-                    filtered.append(f)
-            feeds = filtered
-
-        start = (page - 1) * page_size
-        end = start + page_size
-
-        logger.info(f"[SERVICE] Returning {len(feeds[start:end])} feeds")
-        return feeds[start:end]
+            protocol = protocol.lower()
+
+        feeds = self.repo.search_feeds(
+            protocol=protocol or None,
+            port=port,
+            q=q or None,
+            page=page,
+            page_size=page_size,
+        )
+
+        logger.info(f"[SERVICE] Returning {len(feeds)} fleet feeds")
+        return feeds
+
+    # COUNT FLEET FEED SEARCH RESULTS (total behind search_feeds)
+    def count_search_feeds(
+        self,
+        protocol: str | None = None,
+        port: int | None = None,
+        q: str | None = None,
+    ) -> int:
+        return self.repo.count_search_feeds(
+            protocol=protocol.lower() if protocol else None,
+            port=port,
+            q=q or None,
+        )
 
     # HEARTBEAT
     def heartbeat(self, camera_id: UUID):
@@ -295,39 +561,296 @@ class CameraService:
             )  # (ADDED COMMENT)
             raise NotFoundError("Camera not found.")
 
-        cam.last_known_checkin = datetime.now(timezone.utc)
-        cam.last_updated_on = datetime.now(timezone.utc)
+        now = clock.now()
+        self.repo.record_checkin(camera_id, now, updated_on=now)
 
         logger.info("[SERVICE] Heartbeat updated")  # (ADDED COMMENT)
         return {"message": "Heartbeat updated"}
 
+    # FLEET STATISTICS
+    def fleet_stats(self) -> FleetStats:
+        logger.info("[SERVICE] Computing fleet statistics")
+
+        # A camera is online while its last check-in is within offline_after(),
+        # i.e. last_known_checkin >= online_since (same rule as is_online()).
+        return self.repo.fleet_stats(_online_since())
+
+    # UPTIME (GET /cameras/{id}/uptime)
+    def camera_uptime(self, camera_id: UUID, window: str = "24h") -> CameraUptime:
+        logger.info(f"[SERVICE] Uptime of camera ID={camera_id} window={window}")
+
+        cam = self.repo.get_camera(camera_id)
+        if cam is None:
+            raise NotFoundError("Camera not found.")
+        seconds = parse_window(window)
+        now = clock.now_ns() / NS_PER_SECOND
+        return self._uptime_of(cam, seconds, now)
+
+    # FLEET UPTIME REPORT (GET /cameras/uptime)
+    def fleet_uptime(
+        self, window: str = "24h", sla: float | None = None, worst: int = 10
+    ) -> FleetUptimeReport:
+        logger.info(f"[SERVICE] Fleet uptime report window={window}")
+
+        seconds = parse_window(window)
+        target = Config.UPTIME_SLA_TARGET if sla is None else sla
+        if not 0 <= target <= 1:
+            raise ValidationError("sla must be between 0 and 1.")
+        # ONE clock reading for the whole report
+        now = clock.now_ns() / NS_PER_SECOND
+
+        # ONE repository call for ids, creation times and heartbeat histories
+        inputs = self.repo.uptime_inputs()
+        windows = [
+            _uptime_window(added_on, history, seconds, now)
+            for _, added_on, history in inputs
+        ]
+        timeout = Config.HEARTBEAT_TIMEOUT
+        try:
+            # every camera at once: one NumPy pass over all heartbeats
+            covered = zip(*_fleet_up_seconds(windows, now, timeout))
+        except FeatureUnavailableError:
+            covered = (
+                _up_seconds(epochs, start, now, timeout) if epochs else (0.0, 0)
+                for start, epochs in windows
+            )
+        uptimes = (
+            _camera_uptime(camera_id, seconds, now, start, up, count)
+            for (camera_id, _, _), (start, _), (up, count) in zip(
+                inputs, windows, covered
+            )
+        )
+        measured = [u for u in uptimes if u.uptime is not None]
+        return FleetUptimeReport(
+            window_seconds=seconds,
+            sla_target=target,
+            cameras=len(inputs),
+            measured=len(measured),
+            mean_uptime=(
+                sum(u.uptime for u in measured) / len(measured) if measured else None
+            ),
+            below_sla=sum(1 for u in measured if u.uptime < target),
+            worst=heapq.nsmallest(max(0, worst), measured, key=lambda u: u.uptime),
+        )
+
+    def _uptime_of(self, cam: CameraDetails, seconds: float, now: float) -> CameraUptime:
+        history = self.repo.checkin_history(cam.camera_id)
+        start, epochs = _uptime_window(cam.added_on, history, seconds, now)
+        up, count = 0.0, 0
+        if epochs is not None:
+            up, count = _up_seconds(epochs, start, now, Config.HEARTBEAT_TIMEOUT)
+        return _camera_uptime(cam.camera_id, seconds, now, start, up, count)
+
+    # OFFLINE ANALYTICS (GET /cameras/analytics/offline)
+    def offline_analytics(
+        self,
+        longer_than: str = "10m",
+        group_by: str = "model",
+        model: str | None = None,
+        cidr: str | None = None,
+    ) -> OfflineAnalytics:
+        """
+        Cameras offline for longer than `longer_than`, grouped by model or
+        feed count. Evaluated on the columnar snapshot (repository
+        fleet_columns()): every filter is a vectorized mask, the group-by a
+        bincount. Offline is judged by the last check-in alone (like the
+        uptime report), not by the hysteresis / flap rules.
+        """
+        import ipaddress
+
+        logger.info(f"[SERVICE] Offline analytics longer_than={longer_than}")
+
+        seconds = parse_window(longer_than)
+        if group_by not in ("model", "feed_count"):
+            raise ValidationError("group_by must be 'model' or 'feed_count'.")
+        network = None
+        if cidr:
+            try:
+                network = ipaddress.ip_network(cidr, strict=False)
+            except ValueError:
+                raise ValidationError("Invalid CIDR.")
+
+        columns = self.repo.fleet_columns()
+        selected = None
+        if model:
+            selected = columns.model_matches(model)
+        if network is not None:
+            in_network = columns.ip_between(
+                network.version,
+                int(network.network_address),
+                int(network.broadcast_address),
+            )
+            selected = in_network if selected is None else selected & in_network
+
+        cutoff = clock.now_ns() - offline_after_ns() - seconds_to_ns(seconds)
+        offline = columns.checked_in_before(cutoff)
+        if selected is not None:
+            offline &= selected
+        return OfflineAnalytics(
+            offline_longer_than_seconds=seconds,
+            group_by=group_by,
+            cameras=len(columns) if selected is None else int(selected.sum()),
+            offline=int(offline.sum()),
+            groups=columns.count_by(group_by, offline),
+        )
+
     # ONLINE STATUS
     def is_online(self, camera_id: UUID) -> bool:
+        return self.camera_state(camera_id) == ONLINE
+
+    def camera_state(self, camera_id: UUID) -> CameraStatus:
+        """
+        "online" | "offline" | "flapping". The hysteresis and flap rules are
+        applied by the repository on every heartbeat (status_tracker.py);
+        here only the time since the last heartbeat is checked.
+        """
         logger.info(
             f"[SERVICE] Checking online status for camera ID={camera_id}"
         )  # (ADDED COMMENT)
 
-        cam = self.repo.get_camera(camera_id)
-        if cam is None:
+        state = self.repo.camera_state(camera_id, clock.now_ns())
+        if state is None:
             logger.warning(
                 "[SERVICE] Cannot check status — camera not found"
             )  # (ADDED COMMENT)
             raise NotFoundError("Camera not found.")
 
-        if cam.last_known_checkin is None:
-            logger.info(
-                "[SERVICE] Camera offline — no heartbeat yet"
-            )  # (ADDED COMMENT)
-            return False
-
-        now = datetime.now(timezone.utc)
-        diff = now - cam.last_known_checkin
-
-        if diff.total_seconds() > Config.HEARTBEAT_TIMEOUT:
-            logger.info(
-                "[SERVICE] Camera offline — heartbeat timeout"
-            )  # (ADDED COMMENT)
-            return False
-        else:
-            logger.info("[SERVICE] Camera online — heartbeat OK")  # (ADDED COMMENT)
-            return True
+        logger.info(f"[SERVICE] Camera is {state}")  # (ADDED COMMENT)
+        return state
+
+
+def _online_since() -> datetime:
+    # check-ins at or after this moment are recent enough to be online
+    # (int math on the request's clock reading; the datetime is only the
+    # boundary the repository compares check-ins with)
+    return to_datetime(clock.now_ns() - offline_after_ns())
+
+
+# UPTIME HELPERS
+_WINDOW = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*([smhd]?)\s*$")
+_WINDOW_UNITS = {"": 1, "s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+def parse_window(window: str) -> float:
+    """
+    "90" / "90s" / "15m" / "24h" / "7d" → seconds.
+    """
+    match = _WINDOW.match(str(window))
+    if match is None or float(match.group(1)) <= 0:
+        raise ValidationError("window must be a positive duration like 3600, 15m, 24h, 7d.")
+    return float(match.group(1)) * _WINDOW_UNITS[match.group(2)]
+
+
+def _up_seconds(epochs, start: float, end: float, timeout: float):
+    # → (seconds in [start, end] covered by [h, h + timeout] of some
+    #    heartbeat h, heartbeats inside [start, end])
+    # With heartbeats sorted, each one covers min(gap to the next one, timeout);
+    # the gaps are computed with map() over array slices (C loops, no
+    # per-heartbeat Python code).
+    lo = bisect.bisect_left(epochs, start)
+    hi = bisect.bisect_right(epochs, end)
+    inside = epochs[lo:hi]
+
+    up = 0.0
+    if lo:  # the last heartbeat BEFORE the window may cover its beginning
+        first = inside[0] if inside else end
+        up += max(0.0, min(epochs[lo - 1] + timeout, first) - start)
+    if inside:
+        following = inside[1:]
+        following.append(end)
+        up += sum(map(min, map(sub, following, inside), repeat(timeout)))
+    return up, len(inside)
+
+
+def _fleet_up_seconds(
+    windows: List[Tuple[float, Optional[array]]], end: float, timeout: float
+) -> Tuple[List[float], List[int]]:
+    # Vectorized _up_seconds for a whole fleet: windows[i] = (start, epochs)
+    # of camera i, all ending at `end`. → (up seconds per camera, heartbeats
+    # inside the window per camera). FeatureUnavailableError without NumPy.
+    #
+    # All histories are concatenated into one array. Each heartbeat h is
+    # paired with nxt = min(next heartbeat of the same camera, end), where the
+    # last heartbeat of a camera gets `end`. A heartbeat inside [start, end]
+    # covers min(nxt - h, timeout). The last heartbeat before start (the one
+    # whose next heartbeat is >= start) covers min(h + timeout, nxt) - start.
+    # Per-camera sums come from one bincount.
+    np = numpy_module()
+    n = len(windows)
+    lengths = np.fromiter(
+        (0 if epochs is None else len(epochs) for _, epochs in windows),
+        dtype=np.int64,
+        count=n,
+    )
+    if not lengths.sum():
+        return [0.0] * n, [0] * n
+    flat = np.concatenate(
+        [np.frombuffer(epochs, dtype=np.float64) for _, epochs in windows if epochs]
+    )
+    camera = np.repeat(np.arange(n), lengths)
+    start = np.fromiter((s for s, _ in windows), dtype=np.float64, count=n)[camera]
+
+    last = np.cumsum(lengths)[lengths > 0] - 1  # last heartbeat of each camera
+    following = np.empty_like(flat)
+    following[:-1] = flat[1:]
+    following[last] = end
+    nxt = np.minimum(following, end)
+
+    inside = (flat >= start) & (flat <= end)
+    before = (flat < start) & (following >= start)
+    lead_in = np.maximum(0.0, np.minimum(flat + timeout, nxt) - start)
+    covered = np.where(
+        inside, np.minimum(nxt - flat, timeout), np.where(before, lead_in, 0.0)
+    )
+    up = np.bincount(camera, weights=covered, minlength=n)
+    count = np.bincount(camera, weights=inside, minlength=n).astype(np.int64)
+    return up.tolist(), count.tolist()
+
+
+def _uptime_window(
+    added_on: datetime, history: Optional[CheckinHistory], seconds: float, now: float
+) -> Tuple[float, Optional[array]]:
+    # → (start of the observed window, heartbeat epochs or None)
+    # Observed part of the window: not before the camera existed, not
+    # before the oldest heartbeat still in the history buffer.
+    start = max(now - seconds, added_on.timestamp())
+    if history is None:
+        return now, None  # no heartbeat history → nothing observed
+    if history.complete_since is not None:
+        start = max(start, history.complete_since)
+    return start, history.epochs
+
+
+def _camera_uptime(
+    camera_id: UUID, seconds: float, now: float, start: float, up: float, count: int
+) -> CameraUptime:
+    observed = max(0.0, now - start)
+    return CameraUptime.model_construct(
+        camera_id=camera_id,
+        window_seconds=seconds,
+        observed_seconds=observed,
+        up_seconds=up,
+        uptime=min(1.0, up / observed) if observed > 0 else None,
+        heartbeats=count,
+    )
+
+
+# BULK RESULT HELPERS
+def _not_selected(
+    requested: List[UUID] | None, selected: List[UUID]
+) -> List[BulkOutcome]:
+    # ids the client asked for that the filter did not select
+    if not requested:
+        return []
+    chosen = set(selected)
+    return [(cid, None, "not_found") for cid in requested if cid not in chosen]
+
+
+def _bulk_result(matched: int, outcomes: List[BulkOutcome]) -> BulkResult:
+    counts = Counter(outcome for _, _, outcome in outcomes)
+    # model_construct: the values come from the repository, already valid
+    items = [
+        BulkItemOutcome.model_construct(camera_id=cid, feed_id=fid, outcome=outcome)
+        for cid, fid, outcome in outcomes
+    ]
+    return BulkResult(matched=matched, counts=dict(counts), items=items)
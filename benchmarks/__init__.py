@@ -0,0 +1,2 @@
+# Performance benchmarks (NOT part of the normal unit test run).
+# See benchmarks/microbench.py for usage.
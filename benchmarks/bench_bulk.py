@@ -0,0 +1,62 @@
+# BULK UPDATE: one PATCH /cameras vs one PATCH /cameras/{id} per camera
+#
+# Rolls an image setting out to a whole fleet (default 100 000 cameras):
+#   per camera → service.update_camera() once per camera (what clients did)
+#   bulk       → service.bulk_update_cameras() with a CIDR filter that
+#                matches every camera (one repository pass, one version bump)
+#   bulk model → same, but changing camera_model (model index + counters)
+# Building a large fleet takes a while; only the updates are timed.
+#
+# Usage:
+#   python -m benchmarks.bench_bulk
+#   python -m benchmarks.bench_bulk --size 20000
+
+import argparse
+import logging
+import time
+
+from app.models.schemas import CameraUpdate, ImageQuality
+from app.repository.memory_repo import SimpleCameraMemoryStorage
+from app.service.camera_service import CameraService
+from benchmarks.microbench import build_fleet
+
+
+def _timed(fn) -> float:
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk update benchmark")
+    parser.add_argument("--size", type=int, default=100_000)
+    args = parser.parse_args(argv)
+
+    logging.disable(logging.INFO)  # per-camera INFO logs are not what we measure
+    repo = SimpleCameraMemoryStorage()
+    fleet = build_fleet(repo, args.size)
+    service = CameraService(repo)
+
+    per_camera_update = CameraUpdate(image_settings=ImageQuality(brightness=60))
+    per_camera = _timed(
+        lambda: [service.update_camera(c.camera_id, per_camera_update) for c in fleet]
+    )
+    bulk = _timed(
+        lambda: service.bulk_update_cameras(
+            CameraUpdate(image_settings=ImageQuality(brightness=70)), cidr="0.0.0.0/0"
+        )
+    )
+    bulk_model = _timed(
+        lambda: service.bulk_update_cameras(
+            CameraUpdate(camera_model="RolledOutModel"), cidr="0.0.0.0/0"
+        )
+    )
+
+    print(f"{args.size} cameras")
+    print(f"{'per camera':<14}{per_camera * 1e3:>10.1f} ms")
+    print(f"{'bulk':<14}{bulk * 1e3:>10.1f} ms")
+    print(f"{'bulk model':<14}{bulk_model * 1e3:>10.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+# OFFLINE ANALYTICS: columnar NumPy snapshot vs a Python loop
+#
+# A fleet of N cameras (default 1 000 000, 10 models). Every 4th camera last
+# checked in an hour ago, the others just now. Query:
+#     cameras offline for longer than 10 minutes, grouped by model
+#   loop     → walk every CameraDetails object (what a report without the
+#              columnar view does)
+#   columnar → service.offline_analytics() on a warm snapshot (the structural
+#              columns are already built, only the check-in column is copied)
+#   rebuild  → same, right after a write (structural columns rebuilt first)
+# Building a large fleet takes a while; only the queries are timed.
+# Needs NumPy.
+#
+# Usage:
+#   python -m benchmarks.bench_columnar
+#   python -m benchmarks.bench_columnar --size 100000
+
+import argparse
+import logging
+import time
+from collections import Counter
+from datetime import timedelta
+
+from app.core.clock import clock
+from app.models.schemas import CameraUpdate, ImageQuality
+from app.repository.memory_repo import SimpleCameraMemoryStorage
+from app.repository.status_tracker import offline_after
+from app.service.camera_service import CameraService
+from benchmarks.microbench import build_fleet
+
+REPEAT = 5
+
+
+def _timed(fn, repeat: int = REPEAT) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Columnar analytics benchmark")
+    parser.add_argument("--size", type=int, default=1_000_000)
+    args = parser.parse_args(argv)
+
+    logging.disable(logging.INFO)
+    repo = SimpleCameraMemoryStorage()
+    now = clock.now()
+    for i, cam in enumerate(build_fleet(repo, args.size)):
+        checkin = now - timedelta(hours=1) if i % 4 == 0 else now
+        repo.record_checkin(cam.camera_id, checkin)
+    service = CameraService(repo)
+    first_id = repo.list_cameras()[0].camera_id
+    touch = CameraUpdate(image_settings=ImageQuality(brightness=55))
+
+    def loop():
+        cutoff = clock.now() - timedelta(seconds=offline_after() + 600)
+        return Counter(
+            cam.camera_model
+            for cam in repo.list_cameras()
+            if cam.last_known_checkin is None or cam.last_known_checkin < cutoff
+        )
+
+    def columnar():
+        return service.offline_analytics(longer_than="10m").groups
+
+    def rebuild():
+        repo.update_camera(first_id, touch)  # a write → new data_version
+        return columnar()
+
+    assert dict(loop()) == columnar()
+
+    print(f"{args.size} cameras, {sum(columnar().values())} offline > 10 min")
+    print(f"{'loop':<10}{_timed(loop) * 1e3:>10.1f} ms")
+    print(f"{'columnar':<10}{_timed(columnar) * 1e3:>10.1f} ms")
+    print(f"{'rebuild':<10}{_timed(rebuild, 1) * 1e3:>10.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+# HEARTBEAT LATENCY UNDER A SCAN FLOOD (execution lanes vs one shared pool)
+#
+# Setup: a fleet of N cameras (default 5000) and `--scanners` clients that
+# request GET /cameras/?page_size=1000 in a loop, as fast as they can. While
+# they run, one client sends heartbeats one after another and we record the
+# latency of every heartbeat.
+#
+# Two modes, same total number of worker threads:
+#   shared → every route on ONE limiter (how the app ran before lanes)
+#   lanes  → each route class on its own limiter (app/core/lanes.py)
+# In shared mode the scans hold every thread and a heartbeat waits for a scan
+# to finish; with lanes it only competes for the CPU.
+#
+# Only the routers are mounted (no admission middleware), so no scan is shed
+# and the difference comes from the lanes alone. The query cache is switched
+# off and every scanner asks for a different page size: otherwise the cache and
+# single-flight collapse the flood into one scan per heartbeat.
+#
+# Usage:
+#   python -m benchmarks.bench_lanes
+#   python -m benchmarks.bench_lanes --scanners 64 --heartbeats 300
+
+import argparse
+import asyncio
+import time
+from typing import Dict
+
+import httpx
+from fastapi import FastAPI
+
+from app.api.camera_api import get_repo
+from app.api.camera_api import router as camera_router
+from app.api.feed_api import router as feed_router
+from app.core.lanes import lanes
+from app.core.query_cache import query_cache
+from benchmarks.harness import percentile
+from benchmarks.microbench import build_fleet
+
+
+def _app() -> FastAPI:
+    app = FastAPI()
+    app.include_router(camera_router)
+    app.include_router(feed_router)
+    return app
+
+
+async def _heartbeat_latencies(
+    shared: bool, scanners: int, heartbeats: int, camera_id
+) -> Dict[str, float]:
+    lanes.configure(shared=shared)
+    transport = httpx.ASGITransport(app=_app())
+    stop = asyncio.Event()
+    scans = 0
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+
+        async def scanner(page_size: int):
+            nonlocal scans
+            while not stop.is_set():
+                await client.get("/cameras/", params={"page_size": page_size})
+                scans += 1
+
+        tasks = [asyncio.ensure_future(scanner(1000 - i)) for i in range(scanners)]
+        await asyncio.sleep(0.5)  # let the flood build up
+
+        latencies = []
+        for _ in range(heartbeats):
+            start = time.perf_counter()
+            resp = await client.post(f"/cameras/{camera_id}/heartbeat")
+            latencies.append(time.perf_counter() - start)
+            assert resp.status_code == 200
+            await asyncio.sleep(0.005)
+
+        stop.set()
+        await asyncio.gather(*tasks)
+
+    lanes.configure()
+    return {
+        "p50": percentile(latencies, 50),
+        "p99": percentile(latencies, 99),
+        "max": max(latencies),
+        "scans": scans,
+    }
+
+
+def measure(fleet: int, scanners: int, heartbeats: int) -> Dict[str, Dict[str, float]]:
+    """
+    Heartbeat latency (seconds) under the scan flood, per mode.
+    """
+    repo = get_repo()
+    repo.clear()
+    camera_id = build_fleet(repo, fleet)[0].camera_id
+    query_cache.configure(max_bytes=0)
+    try:
+        return {
+            mode: asyncio.run(
+                _heartbeat_latencies(mode == "shared", scanners, heartbeats, camera_id)
+            )
+            for mode in ("shared", "lanes")
+        }
+    finally:
+        query_cache.configure()
+        repo.clear()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Heartbeat p99 under scan load")
+    parser.add_argument("--fleet", type=int, default=5000)
+    parser.add_argument("--scanners", type=int, default=64)
+    parser.add_argument("--heartbeats", type=int, default=200)
+    args = parser.parse_args(argv)
+
+    results = measure(args.fleet, args.scanners, args.heartbeats)
+    print(f"threads per lane: {lanes.sizes()}")
+    print(f"{'mode':<10}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}{'scans':>8}")
+    for mode, stats in results.items():
+        print(
+            f"{mode:<10}{stats['p50'] * 1e3:>10.1f}{stats['p99'] * 1e3:>10.1f}"
+            f"{stats['max'] * 1e3:>10.1f}{stats['scans']:>8}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+# SPARSE FIELDS: full CameraDetails response vs ?fields= projection
+#
+# Measures, for one page of N cameras (default 1000):
+#   full      → what response_model=list[CameraDetails] does: validate the
+#               objects again, dump them to JSON-ready data, json.dumps
+#   projected → app.api.projection.project_many(...) + json.dumps
+# and prints the payload size (bytes) and the encode time of each.
+#
+# Usage:
+#   python -m benchmarks.bench_projection
+#   python -m benchmarks.bench_projection --size 5000 --fields camera_id,camera_name
+
+import argparse
+import json
+
+from pydantic import TypeAdapter
+
+from app.api.projection import parse_fields, project_many
+from app.models.schemas import CameraDetails
+from app.repository.memory_repo import SimpleCameraMemoryStorage
+from benchmarks.harness import run_benchmark
+from benchmarks.microbench import build_fleet
+
+DEFAULT_FIELDS = "camera_id,camera_name,network_setup.ip_address"
+
+
+def encode_full(adapter: TypeAdapter, cams) -> bytes:
+    validated = adapter.validate_python(cams, from_attributes=True)
+    return json.dumps(adapter.dump_python(validated, mode="json")).encode()
+
+
+def encode_projected(spec, cams) -> bytes:
+    return json.dumps(project_many(cams, spec)).encode()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sparse field projection benchmark")
+    parser.add_argument("--size", type=int, default=1000)
+    parser.add_argument("--fields", default=DEFAULT_FIELDS)
+    args = parser.parse_args(argv)
+
+    repo = SimpleCameraMemoryStorage()
+    build_fleet(repo, args.size)
+    cams = repo.list_cameras()
+
+    adapter = TypeAdapter(list[CameraDetails])
+    spec = parse_fields(args.fields, CameraDetails)
+
+    full = run_benchmark(
+        "full", lambda: encode_full(adapter, cams), warmup=1, repeat=7, number=3
+    )
+    projected = run_benchmark(
+        "projected", lambda: encode_projected(spec, cams), warmup=1, repeat=7, number=3
+    )
+    full_bytes = len(encode_full(adapter, cams))
+    projected_bytes = len(encode_projected(spec, cams))
+
+    print(f"{args.size} cameras, fields={args.fields}")
+    print(f"{'variant':<12}{'bytes':>12}{'encode ms':>12}")
+    print(f"{'full':<12}{full_bytes:>12}{full.median * 1e3:>12.2f}")
+    print(f"{'projected':<12}{projected_bytes:>12}{projected.median * 1e3:>12.2f}")
+    print(
+        f"payload {full_bytes / projected_bytes:.1f}x smaller, "
+        f"encode {full.median / projected.median:.1f}x faster"
+    )
+
+
+if __name__ == "__main__":
+    main()
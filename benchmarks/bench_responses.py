@@ -0,0 +1,84 @@
+# RESPONSE ENCODING: FastAPI response_model path vs app/api/responses.py
+#
+# For a list of N cameras (default 1000) this compares:
+#   response_model → what FastAPI does for `response_model=list[CameraDetails]`:
+#                    validate the list again, serialize it (mode="json"),
+#                    jsonable_encoder, then JSONResponse renders with json.dumps
+#   fast           → list_response(): one cached TypeAdapter.dump_json() call
+# Both produce the same JSON document (checked before timing).
+#
+# Usage:
+#   python -m benchmarks.bench_responses
+#   python -m benchmarks.bench_responses --size 5000
+
+import argparse
+import asyncio
+import json
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute, serialize_response
+
+from app.api.responses import list_response
+from app.main import app
+from app.models.schemas import CameraDetails
+from app.repository.memory_repo import SimpleCameraMemoryStorage
+from benchmarks.harness import run_benchmark
+from benchmarks.microbench import build_fleet
+
+
+def _list_cameras_field():
+    # The response field FastAPI built for GET /cameras/ (response_model).
+    for route in app.routes:
+        if isinstance(route, APIRoute) and route.name == "list_cameras":
+            return route.response_field
+    raise LookupError("GET /cameras/ route not found")
+
+
+# One event loop for all calls (asyncio.run would add loop setup to every sample)
+_LOOP = asyncio.new_event_loop()
+
+
+def encode_response_model(field, cams) -> bytes:
+    content = _LOOP.run_until_complete(
+        serialize_response(field=field, response_content=cams, is_coroutine=True)
+    )
+    return JSONResponse(content).body
+
+
+def encode_fast(cams) -> bytes:
+    return list_response(cams, CameraDetails).body
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Response encoding benchmark")
+    parser.add_argument("--size", type=int, default=1000)
+    args = parser.parse_args(argv)
+
+    repo = SimpleCameraMemoryStorage()
+    build_fleet(repo, args.size)
+    cams = repo.list_cameras()
+    field = _list_cameras_field()
+
+    if json.loads(encode_response_model(field, cams)) != json.loads(encode_fast(cams)):
+        raise SystemExit("fast path output differs from the response_model path")
+
+    slow = run_benchmark(
+        "response_model",
+        lambda: encode_response_model(field, cams),
+        warmup=1,
+        repeat=7,
+        number=3,
+    )
+    fast = run_benchmark(
+        "fast", lambda: encode_fast(cams), warmup=1, repeat=7, number=3
+    )
+
+    print(f"{args.size} cameras, {len(encode_fast(cams))} bytes")
+    print(f"{'path':<16}{'median ms':>12}{'p95 ms':>12}")
+    for stats in (slow, fast):
+        print(f"{stats.name:<16}{stats.median * 1e3:>12.2f}{stats.p95 * 1e3:>12.2f}")
+    print(f"fast path {slow.median / fast.median:.1f}x faster")
+
+
+if __name__ == "__main__":
+    main()
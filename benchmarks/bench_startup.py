@@ -0,0 +1,97 @@
+# COLD START: import time + time-to-first-request
+#
+# Every sample runs in a FRESH Python process (a warm process would hide the
+# import cost) and measures:
+#   import      → `import app.main`
+#   startup     → lifespan startup (Config.load, logging, repo/service, OpenAPI)
+#   first req   → import + startup + the first GET /cameras/ answered
+# The child runs in a temporary directory so setup_logging() never touches
+# this checkout's logs/ folder.
+#
+# Usage:
+#   python -m benchmarks.bench_startup
+#   python -m benchmarks.bench_startup --runs 10 --budget-ms 1500
+# Exit code 1 when the median time-to-first-request is over the budget
+# (default: Config.STARTUP_BUDGET_MS).
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from typing import Dict, List
+
+from app.core.config import Config
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = r"""
+import json, time
+t0 = time.perf_counter()
+from app.main import app
+t1 = time.perf_counter()
+from fastapi.testclient import TestClient
+with TestClient(app) as client:          # runs the lifespan startup
+    t2 = time.perf_counter()
+    assert client.get("/cameras/").status_code == 200
+    t3 = time.perf_counter()
+print(json.dumps({"import": t1 - t0, "startup": t2 - t1, "first_request": t3 - t0}))
+"""
+
+
+def measure_once() -> Dict[str, float]:
+    env = dict(os.environ, PYTHONPATH=REPO_ROOT)
+    with tempfile.TemporaryDirectory() as workdir:
+        out = subprocess.run(
+            [sys.executable, "-c", CHILD],
+            cwd=workdir,
+            env=env,
+            capture_output=True,
+            text=True,
+            check=True,
+            timeout=120,
+        ).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def measure(runs: int) -> Dict[str, Dict[str, float]]:
+    """
+    Median / min / max seconds of every phase over `runs` fresh processes.
+    """
+    samples: List[Dict[str, float]] = [measure_once() for _ in range(runs)]
+    summary = {}
+    for phase in ("import", "startup", "first_request"):
+        values = [s[phase] for s in samples]
+        summary[phase] = {
+            "median": statistics.median(values),
+            "min": min(values),
+            "max": max(values),
+        }
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Cold start benchmark")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=Config.STARTUP_BUDGET_MS)
+    args = parser.parse_args(argv)
+
+    summary = measure(args.runs)
+    print(f"{'phase':<16}{'median ms':>12}{'min ms':>12}{'max ms':>12}")
+    for phase, stats in summary.items():
+        print(
+            f"{phase:<16}{stats['median'] * 1e3:>12.1f}{stats['min'] * 1e3:>12.1f}"
+            f"{stats['max'] * 1e3:>12.1f}"
+        )
+
+    first = summary["first_request"]["median"] * 1e3
+    if first > args.budget_ms:
+        print(f"OVER BUDGET: {first:.1f} ms > {args.budget_ms:.1f} ms")
+        sys.exit(1)
+    print(f"within budget ({first:.1f} ms <= {args.budget_ms:.1f} ms)")
+
+
+if __name__ == "__main__":
+    main()
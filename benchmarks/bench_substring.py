@@ -0,0 +1,64 @@
+# SUBSTRING SEARCH: trigram index vs. the old "lower() + in" scan
+#
+# Builds N synthetic camera models (default 500k) and compares, per query:
+#   scan  → [k for k, m in models if pattern.lower() in m.lower()]   (old list_cameras)
+#   index → TrigramIndex.search(pattern)                               (new)
+#
+# Usage:
+#   python -m benchmarks.bench_substring
+#   python -m benchmarks.bench_substring --size 100000
+
+import argparse
+import random
+import time
+
+from app.repository.ngram_index import TrigramIndex
+from benchmarks.harness import run_benchmark
+
+VENDORS = ["Axis", "Hikvision", "Dahua", "Hanwha", "Bosch", "Sony", "Vivotek", "Uniview"]
+SERIES = ["P", "Q", "M", "DS-2CD", "IPC-HDW", "XNO", "FLEXIDOME", "SNC"]
+
+QUERIES = ["ds-2cd21", "axis p3", "flexidome7", "xno8", "ipc", "q1"]
+
+
+def make_models(size: int, seed: int = 7):
+    rnd = random.Random(seed)
+    return [
+        f"{rnd.choice(VENDORS)} {rnd.choice(SERIES)}{rnd.randint(1000, 9999)}-{rnd.choice('ABCDLV')}"
+        for _ in range(size)
+    ]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Trigram index vs scan benchmark")
+    parser.add_argument("--size", type=int, default=500_000)
+    args = parser.parse_args(argv)
+
+    models = make_models(args.size)
+
+    start = time.perf_counter()
+    index = TrigramIndex()
+    for key, model in enumerate(models):
+        index.add(key, model)
+    print(f"built index for {args.size} models in {time.perf_counter() - start:.2f}s")
+
+    print(f"{'query':<14}{'matches':>10}{'scan ms':>12}{'index ms':>12}{'speedup':>10}")
+    for query in QUERIES:
+        scan = run_benchmark(
+            "scan",
+            lambda: [k for k, m in enumerate(models) if query.lower() in m.lower()],
+            warmup=1,
+            repeat=3,
+            number=1,
+        )
+        indexed = run_benchmark(
+            "index", lambda: index.search(query), warmup=1, repeat=5, number=1
+        )
+        print(
+            f"{query:<14}{len(index.search(query)):>10}{scan.median * 1e3:>12.2f}"
+            f"{indexed.median * 1e3:>12.2f}{scan.median / indexed.median:>9.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+# TAG FILTERS: bitmaps vs a per-camera check
+#
+# A fleet of N cameras (default 100 000) spread over 20 sites, 10 floors and a
+# "retired" tag on every 7th camera. Query:
+#     tags_all=[site:s3] + tags_any=[floor:3, floor:4] + tags_none=[retired]
+#     + online=true, first page of 50 and the total count
+#   loop   → check every camera's tag list in Python (what a filter without
+#            an index does)
+#   bitmap → repo.query_cameras + repo.count_cameras (bitmap AND/OR/ANDNOT)
+#
+# Usage:
+#   python -m benchmarks.bench_tags
+#   python -m benchmarks.bench_tags --size 20000
+
+import argparse
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+
+from app.models.schemas import CameraFilter
+from app.repository.memory_repo import SimpleCameraMemoryStorage
+from benchmarks.microbench import make_camera_data
+
+REPEAT = 20
+
+
+def _timed(fn) -> float:
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        fn()
+    return (time.perf_counter() - start) / REPEAT
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Tag filter benchmark")
+    parser.add_argument("--size", type=int, default=100_000)
+    args = parser.parse_args(argv)
+
+    logging.disable(logging.INFO)
+    repo = SimpleCameraMemoryStorage()
+    now = datetime.now(timezone.utc)
+    for i in range(args.size):
+        data = make_camera_data(i)
+        data.tags = [f"site:s{i % 20}", f"floor:{i % 10}"]
+        if i % 7 == 0:
+            data.tags.append("retired")
+        cam = repo.add_camera(data)
+        if i % 3:
+            repo.record_checkin(cam.camera_id, now)
+    since = now - timedelta(minutes=1)
+
+    flt = CameraFilter(
+        tags_all=["site:s3"],
+        tags_any=["floor:3", "floor:4"],
+        tags_none=["retired"],
+        online=True,
+    )
+
+    def loop():
+        matches = [
+            c
+            for c in repo.list_cameras()
+            if all(t in c.tags for t in flt.tags_all)
+            and any(t in c.tags for t in flt.tags_any)
+            and not any(t in c.tags for t in flt.tags_none)
+            and c.last_known_checkin is not None
+            and c.last_known_checkin >= since
+        ]
+        return matches[:50], len(matches)
+
+    def bitmap():
+        page = repo.query_cameras(flt, online_since=since, limit=50)
+        return page, repo.count_cameras(flt, online_since=since)
+
+    assert [c.camera_id for c in loop()[0]] == [c.camera_id for c in bitmap()[0]]
+    assert loop()[1] == bitmap()[1]
+
+    print(f"{args.size} cameras, {bitmap()[1]} matches")
+    print(f"{'loop':<10}{_timed(loop) * 1e3:>10.2f} ms")
+    print(f"{'bitmap':<10}{_timed(bitmap) * 1e3:>10.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
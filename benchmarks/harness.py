@@ -0,0 +1,102 @@
+# Small timing harness shared by every benchmark in this folder.
+#
+# Why not just time.time() around a loop?
+# → The first calls are slower (imports, caches, allocator warm-up), so we run
+#   WARMUP rounds that are thrown away.
+# → One run is noisy, so we REPEAT the measurement and keep statistics
+#   (min / median / mean / stdev / p95) instead of a single number.
+# → The garbage collector is paused while timing (same idea as `timeit`),
+#   so a random GC pause does not land inside one sample.
+
+import gc
+import statistics
+import time
+from dataclasses import asdict, dataclass
+from typing import Callable, Dict, List
+
+
+@dataclass
+class BenchmarkStats:
+    """
+    Summary of one benchmark. All times are SECONDS PER CALL.
+    """
+
+    name: str
+    runs: int  # how many timed repeats
+    number: int  # calls per repeat
+    min: float
+    median: float
+    mean: float
+    stdev: float
+    p95: float
+
+    def to_dict(self) -> Dict[str, float]:
+        return asdict(self)
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """
+    Nearest-rank percentile (pct between 0 and 100).
+    """
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    rank = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def run_benchmark(
+    name: str,
+    fn: Callable[[], object],
+    *,
+    warmup: int = 3,
+    repeat: int = 15,
+    number: int = 50,
+) -> BenchmarkStats:
+    """
+    Call `fn` (number × repeat) times after `warmup` untimed rounds.
+    Each repeat produces ONE sample = elapsed / number.
+    """
+
+    # WARMUP (not measured)
+    for _ in range(warmup * number):
+        fn()
+
+    samples: List[float] = []
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for _ in range(number):
+                fn()
+            samples.append((time.perf_counter() - start) / number)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+    return BenchmarkStats(
+        name=name,
+        runs=repeat,
+        number=number,
+        min=min(samples),
+        median=statistics.median(samples),
+        mean=statistics.fmean(samples),
+        stdev=statistics.stdev(samples) if len(samples) > 1 else 0.0,
+        p95=percentile(samples, 95),
+    )
+
+
+def format_table(results: List[BenchmarkStats]) -> str:
+    """
+    Human readable table (microseconds per call).
+    """
+    lines = [
+        f"{'benchmark':<45}{'median µs':>12}{'min µs':>12}{'p95 µs':>12}{'stdev µs':>12}"
+    ]
+    for r in results:
+        lines.append(
+            f"{r.name:<45}{r.median * 1e6:>12.2f}{r.min * 1e6:>12.2f}"
+            f"{r.p95 * 1e6:>12.2f}{r.stdev * 1e6:>12.2f}"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,450 @@
+# MICROBENCHMARKS FOR THE REPOSITORY AND SERVICE LAYERS
+#
+# These benchmarks call CameraRepositoryInterface and CameraService methods
+# DIRECTLY (no HTTP, no FastAPI, no TestClient). They answer:
+#   "How long does ONE call of this method take with a fleet of N cameras?"
+#
+# Every benchmark runs against EVERY repository backend listed in
+# app/repository/registry.py, so a new storage implementation is measured
+# automatically.
+#
+# Usage:
+#   python -m benchmarks.microbench                       # all backends, print table
+#   python -m benchmarks.microbench --repo memory         # one backend
+#   python -m benchmarks.microbench --update-baseline     # rewrite baseline.json
+#
+# The regression gate lives in tests/test_benchmarks.py (pytest marker `benchmark`).
+
+import argparse
+import ipaddress
+import itertools
+import json
+import logging
+import os
+import tempfile
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, Iterator, List, Optional
+
+from app.models.schemas import (CameraNetworkInfo, CameraUpdate, FeedUpdate,
+                                ImageQuality, NewCameraData, VideoFeedSetup)
+from app.repository.interface import CameraRepositoryInterface
+from app.repository.registry import REPOSITORY_REGISTRY, build_repository
+from app.repository.remote_repo import RemoteCameraStorage
+from app.repository.storage_server import StorageServer
+from app.service.camera_service import CameraService
+from benchmarks.harness import BenchmarkStats, format_table, run_benchmark
+
+BASELINE_FILE = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+DEFAULT_FLEET_SIZE = 1000
+WARMUP = 3
+REPEAT = 15
+NUMBER = 50
+
+# Every case gets this many calls in total (warmup + timed), so cases that
+# consume a fresh argument per call (remove_camera, remove_feed, ...) can
+# prepare exactly enough data up-front.
+TOTAL_CALLS = (WARMUP + REPEAT) * NUMBER
+
+
+# FLEET BUILDERS
+def make_camera_data(i: int, prefix: str = "Bench") -> NewCameraData:
+    # 10.0.0.0 + i → every camera gets a unique IP address
+    return NewCameraData(
+        camera_name=f"{prefix}Cam{i}",
+        camera_model=f"{prefix}Model{i % 10}",
+        network_setup=CameraNetworkInfo(
+            ip_address=ipaddress.IPv4Address(0x0A000000 + i)
+        ),
+        available_feeds=[
+            VideoFeedSetup(feed_protocol="rtsp", feed_port=554, feed_path="/main"),
+            VideoFeedSetup(feed_protocol="http", feed_port=8080, feed_path="/snap"),
+        ],
+    )
+
+
+def build_fleet(repo: CameraRepositoryInterface, size: int) -> List:
+    # Cameras are added through the repository on purpose:
+    # service.add_camera() runs the duplicate checks and would make setup slow.
+    return [repo.add_camera(make_camera_data(i)) for i in range(size)]
+
+
+# BENCHMARK CASES
+# Each case receives a freshly populated repository + service and returns a
+# zero-argument callable. The harness calls it TOTAL_CALLS times.
+Case = Callable[[CameraRepositoryInterface, CameraService, List], Callable[[], object]]
+
+
+def _fresh_cameras(repo, start: int):
+    # Extra cameras (outside the fleet IP range) used by destructive cases.
+    return [
+        repo.add_camera(make_camera_data(start + i, prefix="Extra"))
+        for i in range(TOTAL_CALLS)
+    ]
+
+
+def _new_data_iter(start: int):
+    return iter([make_camera_data(start + i, prefix="New") for i in range(TOTAL_CALLS)])
+
+
+def _feed_pairs(fleet):
+    return [(c.camera_id, f.feed_id) for c in fleet for f in c.available_feeds]
+
+
+def _new_feed_args(fleet):
+    # Unique (protocol, port) per call so the service duplicate rule never fires.
+    ports = itertools.count(10000)
+    cams = itertools.cycle(fleet)
+    return iter(
+        [
+            (
+                next(cams).camera_id,
+                VideoFeedSetup(
+                    feed_protocol="rtsp", feed_port=next(ports), feed_path="/b"
+                ),
+            )
+            for _ in range(TOTAL_CALLS)
+        ]
+    )
+
+
+def _added_feeds(repo, fleet):
+    args = _new_feed_args(fleet)
+    return iter([(cid, repo.add_feed(cid, feed).feed_id) for cid, feed in args])
+
+
+# --- repository layer ---
+def repo_add_camera(repo, service, fleet):
+    data = _new_data_iter(len(fleet) + TOTAL_CALLS)
+    return lambda: repo.add_camera(next(data))
+
+
+def repo_get_camera(repo, service, fleet):
+    ids = itertools.cycle([c.camera_id for c in fleet])
+    return lambda: repo.get_camera(next(ids))
+
+
+def repo_remove_camera(repo, service, fleet):
+    ids = iter([c.camera_id for c in _fresh_cameras(repo, len(fleet))])
+    return lambda: repo.remove_camera(next(ids))
+
+
+def repo_list_cameras(repo, service, fleet):
+    return repo.list_cameras
+
+
+def repo_update_camera(repo, service, fleet):
+    ids = itertools.cycle([c.camera_id for c in fleet])
+    names = (f"Renamed{i}" for i in itertools.count())
+    return lambda: repo.update_camera(next(ids), CameraUpdate(camera_name=next(names)))
+
+
+def repo_add_feed(repo, service, fleet):
+    args = _new_feed_args(fleet)
+    return lambda: repo.add_feed(*next(args))
+
+
+def repo_update_feed(repo, service, fleet):
+    pairs = itertools.cycle(_feed_pairs(fleet))
+    update = FeedUpdate(feed_path="/updated")
+    return lambda: repo.update_feed(*next(pairs), update)
+
+
+def repo_remove_feed(repo, service, fleet):
+    pairs = _added_feeds(repo, fleet)
+    return lambda: repo.remove_feed(*next(pairs))
+
+
+def repo_get_feed(repo, service, fleet):
+    pairs = itertools.cycle(_feed_pairs(fleet))
+    return lambda: repo.get_feed(*next(pairs))
+
+
+def repo_list_feeds(repo, service, fleet):
+    ids = itertools.cycle([c.camera_id for c in fleet])
+    return lambda: repo.list_feeds(next(ids))
+
+
+def repo_feed_exists(repo, service, fleet):
+    ids = itertools.cycle([c.camera_id for c in fleet])
+    return lambda: repo.feed_exists(next(ids), "rtsp", 554)
+
+
+def repo_search_cameras(repo, service, fleet):
+    return lambda: repo.search_cameras(model="model3")
+
+
+def repo_search_feeds(repo, service, fleet):
+    return lambda: repo.search_feeds(protocol="rtsp", port=554, page=3)
+
+
+def repo_record_checkin(repo, service, fleet):
+    ids = itertools.cycle([c.camera_id for c in fleet])
+    return lambda: repo.record_checkin(next(ids), datetime.now(timezone.utc))
+
+
+def repo_fleet_stats(repo, service, fleet):
+    since = datetime.now(timezone.utc) - timedelta(seconds=60)
+    return lambda: repo.fleet_stats(since)
+
+
+# --- service layer ---
+def service_add_camera(repo, service, fleet):
+    data = _new_data_iter(len(fleet) + TOTAL_CALLS)
+    return lambda: service.add_camera(next(data))
+
+
+def service_get_camera(repo, service, fleet):
+    ids = itertools.cycle([c.camera_id for c in fleet])
+    return lambda: service.get_camera(next(ids))
+
+
+def service_remove_camera(repo, service, fleet):
+    ids = iter([c.camera_id for c in _fresh_cameras(repo, len(fleet))])
+    return lambda: service.remove_camera(next(ids))
+
+
+def service_list_cameras(repo, service, fleet):
+    return lambda: service.list_cameras(page=1, page_size=20)
+
+
+def service_list_cameras_model(repo, service, fleet):
+    return lambda: service.list_cameras(model="model3", page=1, page_size=20)
+
+
+def service_list_cameras_ip_range(repo, service, fleet):
+    return lambda: service.list_cameras(ip_from="10.0.0.100", ip_to="10.0.1.0")
+
+
+def service_list_cameras_online(repo, service, fleet):
+    return lambda: service.list_cameras(online=True)
+
+
+def service_count_cameras_ip_range(repo, service, fleet):
+    return lambda: service.count_cameras(ip_from="10.0.0.100", ip_to="10.0.1.0")
+
+
+def service_count_cameras_online(repo, service, fleet):
+    return lambda: service.count_cameras(online=True)
+
+
+def service_count_search_feeds(repo, service, fleet):
+    return lambda: service.count_search_feeds(protocol="rtsp", port=554)
+
+
+def service_update_camera(repo, service, fleet):
+    ids = itertools.cycle([c.camera_id for c in fleet])
+    update = CameraUpdate(image_settings=ImageQuality(brightness=70))
+    return lambda: service.update_camera(next(ids), update)
+
+
+def service_bulk_update_cameras(repo, service, fleet):
+    # alternate two values so every call really changes the matched cameras
+    updates = itertools.cycle(
+        [
+            CameraUpdate(image_settings=ImageQuality(brightness=70)),
+            CameraUpdate(image_settings=ImageQuality(brightness=30)),
+        ]
+    )
+    return lambda: service.bulk_update_cameras(next(updates), model="model3")
+
+
+def service_add_feed(repo, service, fleet):
+    args = _new_feed_args(fleet)
+    return lambda: service.add_feed(*next(args))
+
+
+def service_update_feed(repo, service, fleet):
+    pairs = itertools.cycle(_feed_pairs(fleet))
+    update = FeedUpdate(feed_path="/updated")
+    return lambda: service.update_feed(*next(pairs), update)
+
+
+def service_remove_feed(repo, service, fleet):
+    pairs = _added_feeds(repo, fleet)
+    return lambda: service.remove_feed(*next(pairs))
+
+
+def service_list_feeds(repo, service, fleet):
+    ids = itertools.cycle([c.camera_id for c in fleet])
+    return lambda: service.list_feeds(next(ids), protocol="rtsp", q="main")
+
+
+def service_search_feeds(repo, service, fleet):
+    return lambda: service.search_feeds(protocol="http", q="snap")
+
+
+def service_fleet_stats(repo, service, fleet):
+    return service.fleet_stats
+
+
+def service_heartbeat(repo, service, fleet):
+    ids = itertools.cycle([c.camera_id for c in fleet])
+    return lambda: service.heartbeat(next(ids))
+
+
+def service_is_online(repo, service, fleet):
+    ids = itertools.cycle([c.camera_id for c in fleet])
+    return lambda: service.is_online(next(ids))
+
+
+CASES: Dict[str, Case] = {
+    "repo.add_camera": repo_add_camera,
+    "repo.get_camera": repo_get_camera,
+    "repo.remove_camera": repo_remove_camera,
+    "repo.list_cameras": repo_list_cameras,
+    "repo.update_camera": repo_update_camera,
+    "repo.add_feed": repo_add_feed,
+    "repo.update_feed": repo_update_feed,
+    "repo.remove_feed": repo_remove_feed,
+    "repo.get_feed": repo_get_feed,
+    "repo.list_feeds": repo_list_feeds,
+    "repo.feed_exists": repo_feed_exists,
+    "repo.search_cameras": repo_search_cameras,
+    "repo.search_feeds": repo_search_feeds,
+    "repo.record_checkin": repo_record_checkin,
+    "repo.fleet_stats": repo_fleet_stats,
+    "service.add_camera": service_add_camera,
+    "service.get_camera": service_get_camera,
+    "service.remove_camera": service_remove_camera,
+    "service.list_cameras": service_list_cameras,
+    "service.list_cameras[model]": service_list_cameras_model,
+    "service.list_cameras[ip_range]": service_list_cameras_ip_range,
+    "service.list_cameras[online]": service_list_cameras_online,
+    "service.count_cameras[ip_range]": service_count_cameras_ip_range,
+    "service.count_cameras[online]": service_count_cameras_online,
+    "service.count_search_feeds": service_count_search_feeds,
+    "service.update_camera": service_update_camera,
+    "service.bulk_update_cameras[model]": service_bulk_update_cameras,
+    "service.add_feed": service_add_feed,
+    "service.update_feed": service_update_feed,
+    "service.remove_feed": service_remove_feed,
+    "service.list_feeds": service_list_feeds,
+    "service.search_feeds": service_search_feeds,
+    "service.fleet_stats": service_fleet_stats,
+    "service.heartbeat": service_heartbeat,
+    "service.is_online": service_is_online,
+}
+
+
+# RUNNERS
+@contextmanager
+def open_repository(backend: str) -> Iterator[CameraRepositoryInterface]:
+    """
+    A fresh repository of `backend`. "remote" gets its own storage server,
+    run in this process on a temporary socket.
+    """
+    if backend != "remote":
+        yield build_repository(backend)
+        return
+    with tempfile.TemporaryDirectory() as tmp:
+        server = StorageServer(path=os.path.join(tmp, "storage.sock"))
+        server.start()
+        repo = RemoteCameraStorage(server.path)
+        try:
+            yield repo
+        finally:
+            repo.close()
+            server.stop()
+
+
+def run_case(
+    backend: str, case_name: str, fleet_size: int = DEFAULT_FLEET_SIZE
+) -> BenchmarkStats:
+    """
+    Build a fresh fleet on `backend` and benchmark one case.
+    Logging is switched off while measuring: whether app.main already configured
+    the console/file handlers (it does under pytest) must not change the numbers.
+    """
+    logging.disable(logging.CRITICAL)
+    try:
+        with open_repository(backend) as repo:
+            service = CameraService(repo)
+            fleet = build_fleet(repo, fleet_size)
+            fn = CASES[case_name](repo, service, fleet)
+            return run_benchmark(
+                f"{backend}:{case_name}",
+                fn,
+                warmup=WARMUP,
+                repeat=REPEAT,
+                number=NUMBER,
+            )
+    finally:
+        logging.disable(logging.NOTSET)
+
+
+def run_suite(
+    backend: str, fleet_size: int = DEFAULT_FLEET_SIZE
+) -> List[BenchmarkStats]:
+    return [run_case(backend, name, fleet_size) for name in CASES]
+
+
+def load_baseline(path: str = BASELINE_FILE) -> Optional[dict]:
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as fh:
+        return json.load(fh)
+
+
+def write_baseline(
+    results: Dict[str, List[BenchmarkStats]],
+    fleet_size: int,
+    path: str = BASELINE_FILE,
+):
+    # Only the MEDIAN is stored: it is the most stable statistic between runs.
+    # Backends not run this time keep their stored medians (same fleet size).
+    payload = {"fleet_size": fleet_size, "results": {}}
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as fh:
+            stored = json.load(fh)
+        if stored.get("fleet_size") == fleet_size:
+            payload["results"] = stored.get("results", {})
+    for backend, stats in results.items():
+        payload["results"][backend] = {
+            r.name.split(":", 1)[1]: r.median for r in stats
+        }
+    with open(path, "w", encoding="utf-8") as fh:
+        json.dump(payload, fh, indent=2, sort_keys=True)
+        fh.write("\n")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Repository/service microbenchmarks")
+    parser.add_argument(
+        "--repo",
+        action="append",
+        choices=sorted(REPOSITORY_REGISTRY),
+        help="backend to benchmark (repeatable, default: all registered)",
+    )
+    parser.add_argument("--fleet-size", type=int, default=DEFAULT_FLEET_SIZE)
+    parser.add_argument("--json", help="write full statistics to this file")
+    parser.add_argument(
+        "--update-baseline",
+        action="store_true",
+        help=f"store medians as the new baseline ({BASELINE_FILE})",
+    )
+    args = parser.parse_args(argv)
+
+    backends = args.repo or sorted(REPOSITORY_REGISTRY)
+    results: Dict[str, List[BenchmarkStats]] = {}
+    for backend in backends:
+        results[backend] = run_suite(backend, args.fleet_size)
+        print(format_table(results[backend]))
+        print()
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as fh:
+            json.dump(
+                {b: [r.to_dict() for r in rs] for b, rs in results.items()},
+                fh,
+                indent=2,
+            )
+
+    if args.update_baseline:
+        write_baseline(results, args.fleet_size)
+        print(f"Baseline written to {BASELINE_FILE}")
+
+
+if __name__ == "__main__":
+    main()
@@ -19,13 +19,40 @@ from app.repository.memory_repo import SimpleCameraMemoryStorage
 from app.service.camera_service import CameraService
 
 
+# BENCHMARK MARKER
+# Tests marked @pytest.mark.benchmark are slow and machine dependent,
+# so they only run when --run-benchmarks is passed.
+def pytest_addoption(parser):
+    parser.addoption(
+        "--run-benchmarks",
+        action="store_true",
+        default=False,
+        help="run tests marked `benchmark` (regression gate against benchmarks/baseline.json)",
+    )
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers", "benchmark: microbenchmark regression gate (needs --run-benchmarks)"
+    )
+
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption("--run-benchmarks"):
+        return
+    skip_bench = pytest.mark.skip(reason="needs --run-benchmarks")
+    for item in items:
+        if "benchmark" in item.keywords:
+            item.add_marker(skip_bench)
+
+
 # test client fixture
 @pytest.fixture
 def client():
     # ensure API uses a clean repo before every test
-    from app.api.camera_api import repo
+    from app.api.camera_api import get_repo
 
-    repo._store.clear()  # reset dictionary
+    get_repo().clear()  # reset storage + its indexes
     return TestClient(app)
 
 
@@ -41,6 +68,29 @@ def service(repo):
     return CameraService(repo)
 
 
+# Storage server on a temporary Unix socket (clients: RemoteCameraStorage(path))
+@pytest.fixture
+def storage_server(tmp_path):
+    from app.repository.storage_server import StorageServer
+
+    server = StorageServer(path=str(tmp_path / "storage.sock"))
+    server.start()
+    yield server
+    server.stop()
+
+
+# Manual clock: time stands still until the test calls clock.advance(seconds)
+@pytest.fixture
+def manual_clock():
+    from datetime import datetime, timezone
+
+    from app.core.clock import clock
+
+    clock.configure(start=datetime(2025, 1, 1, tzinfo=timezone.utc))
+    yield clock
+    clock.configure()  # back to the system clock
+
+
 # Base Pydantic model payload
 @pytest.fixture
 def camera_payload_model():
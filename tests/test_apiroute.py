@@ -1,4 +1,4 @@
-from uuid import uuid4
+from uuid import UUID, uuid4
 
 from fastapi.encoders import jsonable_encoder
 
@@ -240,6 +240,15 @@ def test_list_feeds_pagination_api(client, camera_payload_json):
     assert len(page2) == 2
 
 
+def test_non_positive_page_size_is_rejected(client, camera_payload_json):
+    cid = client.post("/cameras/", json=camera_payload_json).json()["camera_id"]
+
+    for url in ("/cameras/", f"/cameras/{cid}/feeds"):
+        assert client.get(f"{url}?page_size=-1").status_code == 422
+        assert client.get(f"{url}?page_size=0").status_code == 422
+        assert client.get(f"{url}?page=-3&page_size=5").status_code == 200
+
+
 # HEARTBEAT AND STATUS
 def test_heartbeat_and_status_api(client, camera_payload_json):
     created = client.post("/cameras/", json=camera_payload_json).json()
@@ -251,3 +260,993 @@ def test_heartbeat_and_status_api(client, camera_payload_json):
     status = client.get(f"/cameras/{cid}/status")
     assert status.status_code == 200
     assert "is_online" in status.json()
+
+
+# FLEET-WIDE FEED SEARCH
+def test_search_feeds_api(client, camera_payload_json):
+    created = client.post("/cameras/", json=camera_payload_json).json()
+
+    resp = client.get("/feeds/?protocol=rtsp&port=554")
+    assert resp.status_code == 200
+
+    feeds = resp.json()
+    assert len(feeds) == 1
+    assert feeds[0]["camera_id"] == created["camera_id"]
+
+    assert client.get("/feeds/?protocol=http").json() == []
+
+
+def test_list_cameras_filter_name_api(client, camera_payload_json):
+    client.post("/cameras/", json=camera_payload_json)
+
+    assert len(client.get("/cameras/?name=testc").json()) == 1
+    assert client.get("/cameras/?name=nomatch").json() == []
+
+
+def test_search_feeds_by_path_api(client, camera_payload_json):
+    client.post("/cameras/", json=camera_payload_json)  # feed path "/main"
+
+    assert len(client.get("/feeds/?q=MAI").json()) == 1
+    assert client.get("/feeds/?q=main&protocol=http").json() == []
+    assert client.get("/feeds/?page_size=-1").status_code == 422
+
+
+# FLEET STATISTICS
+def test_fleet_stats_api(client, camera_payload_json):
+    client.post("/cameras/", json=camera_payload_json)
+
+    resp = client.get("/cameras/stats")
+    assert resp.status_code == 200
+
+    stats = resp.json()
+    assert stats["total_cameras"] == 1
+    assert stats["online"] == 1  # adding a camera counts as a check-in
+    assert stats["by_model"] == {camera_payload_json["camera_model"]: 1}
+
+
+# TOTAL COUNT HEADER
+def test_total_count_headers_api(client, camera_payload_json):
+    created = client.post("/cameras/", json=camera_payload_json).json()
+
+    resp = client.get("/cameras/?page=5")
+    assert resp.json() == []
+    assert resp.headers["X-Total-Count"] == "1"
+
+    resp = client.get(f"/cameras/{created['camera_id']}/feeds?protocol=http")
+    assert resp.headers["X-Total-Count"] == "0"
+
+    assert client.get("/feeds/?q=main").headers["X-Total-Count"] == "1"
+
+
+# SPARSE FIELDS
+def test_list_cameras_fields_projection_api(client, camera_payload_json):
+    created = client.post("/cameras/", json=camera_payload_json).json()
+
+    fields = "camera_id,camera_name,network_setup.ip_address"
+    resp = client.get(f"/cameras/?fields={fields}")
+    assert resp.status_code == 200
+    assert resp.headers["X-Total-Count"] == "1"
+    assert resp.json() == [
+        {
+            "camera_id": created["camera_id"],
+            "camera_name": created["camera_name"],
+            "network_setup": {"ip_address": created["network_setup"]["ip_address"]},
+        }
+    ]
+
+    one = client.get(
+        f"/cameras/{created['camera_id']}?fields=added_on,available_feeds.feed_port"
+    )
+    ports = [{"feed_port": f["feed_port"]} for f in created["available_feeds"]]
+    assert one.json() == {"added_on": created["added_on"], "available_feeds": ports}
+
+
+def test_feeds_fields_projection_api(client, camera_payload_json):
+    created = client.post("/cameras/", json=camera_payload_json).json()
+
+    url = f"/cameras/{created['camera_id']}/feeds?fields=feed_port"
+    ports = [{"feed_port": f["feed_port"]} for f in created["available_feeds"]]
+    assert client.get(url).json() == ports
+
+    fleet = client.get("/feeds/?fields=camera_id").json()
+    assert fleet == [{"camera_id": created["camera_id"]}]
+
+
+def test_fields_unknown_name_rejected_api(client):
+    assert client.get("/cameras/?fields=camera_id,password").status_code == 400
+    assert client.get("/cameras/?fields=camera_name.x").status_code == 400
+
+
+# FAST RESPONSE ENCODING
+def test_fast_responses_match_response_model_api(client, camera_payload_json):
+    from app.api.camera_api import get_service
+    from app.models.schemas import CameraDetails
+
+    created = client.post("/cameras/", json=camera_payload_json).json()
+    cam = get_service().get_camera(UUID(created["camera_id"]))
+    expected = CameraDetails.model_validate(cam).model_dump(mode="json")
+
+    assert created == expected
+    resp = client.get(f"/cameras/{created['camera_id']}")
+    assert resp.headers["content-type"] == "application/json"
+    assert resp.json() == expected
+    assert client.get("/cameras/").json() == [expected]
+
+
+def test_openapi_keeps_response_models_api(client):
+    paths = client.get("/openapi.json").json()["paths"]
+    schema = paths["/cameras/"]["get"]["responses"]["200"]["content"]
+    assert schema["application/json"]["schema"]["items"]["$ref"].endswith(
+        "/CameraDetails"
+    )
+
+
+# RESPONSE COMPRESSION
+def _add_cameras_api(client, camera_payload_json, count):
+    for i in range(count):
+        payload = dict(camera_payload_json)
+        payload["camera_name"] = f"Cam{i}"
+        payload["network_setup"] = {"ip_address": f"10.1.0.{i + 1}"}
+        assert client.post("/cameras/", json=payload).status_code == 200
+
+
+def test_large_list_is_gzip_compressed_api(client, camera_payload_json):
+    from app.core.metrics import metrics
+
+    _add_cameras_api(client, camera_payload_json, 20)
+    before = metrics.get("compression.bytes_in")
+
+    resp = client.get("/cameras/", headers={"Accept-Encoding": "gzip"})
+    assert resp.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in resp.headers["vary"]
+    assert len(resp.json()) == 20  # httpx decompresses transparently
+    assert metrics.get("compression.bytes_in") > before
+    assert metrics.get("compression.ratio") > 1
+
+
+def test_compression_negotiation_api(client, camera_payload_json):
+    _add_cameras_api(client, camera_payload_json, 20)
+
+    deflate = client.get("/cameras/", headers={"Accept-Encoding": "gzip;q=0, deflate"})
+    assert deflate.headers["content-encoding"] == "deflate"
+    assert len(deflate.json()) == 20
+
+    plain = client.get("/cameras/", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in plain.headers
+
+    # below COMPRESSION_MIN_BYTES → not worth compressing
+    small = client.get("/cameras/?page_size=1", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in small.headers
+
+
+def test_export_streams_compressed_ndjson_api(client, camera_payload_json):
+    import json
+
+    _add_cameras_api(client, camera_payload_json, 12)
+
+    resp = client.get("/cameras/export", headers={"Accept-Encoding": "gzip"})
+    assert resp.status_code == 200
+    assert resp.headers["content-encoding"] == "gzip"
+    assert resp.headers["X-Total-Count"] == "12"
+
+    lines = resp.text.splitlines()
+    assert [json.loads(line)["camera_name"] for line in lines] == [
+        f"Cam{i}" for i in range(12)
+    ]
+
+    filtered = client.get("/cameras/export?name=cam1")  # Cam1, Cam10, Cam11
+    assert len(filtered.text.splitlines()) == 3
+
+
+def test_negotiate_encoding():
+    from app.core.compression import negotiate_encoding
+
+    assert negotiate_encoding("gzip, deflate, br") == "gzip"
+    assert negotiate_encoding("deflate;q=1.0, gzip;q=0.5") == "deflate"
+    assert negotiate_encoding("*") == "gzip"
+    assert negotiate_encoding("br, identity") is None
+    assert negotiate_encoding("") is None
+
+
+def test_streaming_compression_is_incremental():
+    import asyncio
+    import zlib
+
+    from app.core.compression import CompressionMiddleware
+
+    chunks = [b'{"n": %d}\n' % i * 200 for i in range(3)]
+
+    async def streaming_app(scope, receive, send):
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [(b"content-type", b"application/x-ndjson")],
+            }
+        )
+        for chunk in chunks:
+            await send({"type": "http.response.body", "body": chunk, "more_body": True})
+        await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+    sent = []
+
+    async def capture(message):
+        sent.append(message)
+
+    scope = {"type": "http", "headers": [(b"accept-encoding", b"gzip")]}
+    asyncio.run(CompressionMiddleware(streaming_app)(scope, None, capture))
+
+    bodies = [m for m in sent if m["type"] == "http.response.body"]
+    decoder = zlib.decompressobj(31)
+    # every chunk can be decoded as soon as it arrives (Z_SYNC_FLUSH)
+    for chunk, message in zip(chunks, bodies):
+        assert decoder.decompress(message["body"]) == chunk
+    assert bodies[-1]["more_body"] is False
+
+
+# STARTUP (lifespan + lazy initialization)
+def test_import_has_no_side_effects(tmp_path):
+    import os
+    import subprocess
+    import sys
+
+    code = (
+        "import os, app.main, app.api.camera_api as api; "
+        "assert api._repo is None and api._service is None; "
+        "assert not os.path.exists('logs')"
+    )
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=tmp_path,
+        env=dict(os.environ, PYTHONPATH=root),
+        check=True,
+        timeout=60,
+    )
+
+
+def test_lifespan_builds_singletons_and_openapi(monkeypatch):
+    import app.main as main
+    from fastapi.testclient import TestClient
+
+    monkeypatch.setattr(main, "setup_logging", lambda: None)  # keep logs/ untouched
+    main.app.openapi_schema = None
+
+    with TestClient(main.app) as started:
+        assert main.app.openapi_schema is not None  # pre-warmed
+        assert started.get("/cameras/").status_code == 200
+
+
+def test_config_reads_environment_lazily(monkeypatch):
+    from app.core.config import Config
+
+    monkeypatch.setenv("EXPORT_BATCH_SIZE", "7")
+    Config.load()
+    try:
+        assert Config.EXPORT_BATCH_SIZE == 7
+    finally:
+        monkeypatch.delenv("EXPORT_BATCH_SIZE")
+        Config.load()
+    assert Config.EXPORT_BATCH_SIZE == 500
+
+
+# IDEMPOTENCY KEYS
+def test_idempotent_camera_post_replays_api(client, camera_payload_json):
+    headers = {"Idempotency-Key": "add-cam-1"}
+
+    first = client.post("/cameras/", json=camera_payload_json, headers=headers)
+    retry = client.post("/cameras/", json=camera_payload_json, headers=headers)
+
+    assert first.status_code == retry.status_code == 200
+    assert retry.json()["camera_id"] == first.json()["camera_id"]
+    assert retry.headers["idempotent-replayed"] == "true"
+    assert len(client.get("/cameras/").json()) == 1  # inserted only once
+
+    # a NEW key is a new request → normal duplicate rule (409)
+    other = client.post(
+        "/cameras/", json=camera_payload_json, headers={"Idempotency-Key": "add-cam-2"}
+    )
+    assert other.status_code == 409
+
+
+def test_idempotent_feed_post_and_key_mismatch_api(client, camera_payload_json):
+    cam = client.post("/cameras/", json=camera_payload_json).json()
+    url = f"/cameras/{cam['camera_id']}/feeds"
+    feed = {"feed_protocol": "http", "feed_port": 8080, "feed_path": "/snap"}
+    headers = {"Idempotency-Key": "feed-1"}
+
+    first = client.post(url, json=feed, headers=headers)
+    retry = client.post(url, json=feed, headers=headers)
+    assert first.status_code == retry.status_code == 200
+    assert retry.json() == first.json()
+    assert len(client.get(url).json()) == 2  # original feed + one new feed
+
+    changed = client.post(url, json={**feed, "feed_port": 9090}, headers=headers)
+    assert changed.status_code == 422
+
+
+def test_idempotency_concurrent_duplicates_run_once():
+    import asyncio
+
+    from app.core.idempotency import IdempotencyMiddleware
+
+    calls = []
+
+    async def slow_app(scope, receive, send):
+        await receive()
+        calls.append(scope["path"])
+        await asyncio.sleep(0.01)  # the duplicate arrives while this runs
+        await send({"type": "http.response.start", "status": 201, "headers": []})
+        await send({"type": "http.response.body", "body": b'{"id": 1}'})
+
+    middleware = IdempotencyMiddleware(slow_app, max_entries=10, ttl_seconds=60)
+    scope = {
+        "type": "http",
+        "method": "POST",
+        "path": "/cameras/",
+        "headers": [(b"idempotency-key", b"k1")],
+    }
+
+    async def one_request():
+        sent = []
+
+        async def receive():
+            return {"type": "http.request", "body": b"{}", "more_body": False}
+
+        async def send(message):
+            sent.append(message)
+
+        await middleware(scope, receive, send)
+        return sent
+
+    async def both():
+        return await asyncio.gather(one_request(), one_request())
+
+    first, second = asyncio.run(both())
+    assert calls == ["/cameras/"]  # the route ran ONCE
+    assert first[0]["status"] == second[0]["status"] == 201
+    assert first[1]["body"] == second[1]["body"] == b'{"id": 1}'
+
+
+def test_idempotency_cache_is_bounded_and_expires():
+    from app.core.idempotency import IdempotencyCache
+
+    cache = IdempotencyCache(max_entries=2, ttl_seconds=10)
+    for i in range(3):
+        cache.start(("POST", "/cameras/", f"k{i}"), b"fp", now=0)
+
+    assert len(cache) == 2  # oldest key evicted
+    assert cache.get(("POST", "/cameras/", "k0"), now=1) is None
+    assert cache.get(("POST", "/cameras/", "k2"), now=1) is not None
+    assert cache.get(("POST", "/cameras/", "k2"), now=10) is None  # TTL passed
+
+
+# ADMISSION CONTROL
+def test_classify_route():
+    from app.core.admission import classify_route
+
+    cid = "/cameras/5d0c0a5e-1111-2222-3333-444455556666"
+    assert classify_route("POST", f"{cid}/heartbeat") == "ingest"
+    assert classify_route("GET", f"{cid}/status") == "point_read"
+    assert classify_route("GET", cid) == "point_read"
+    assert classify_route("GET", "/cameras/stats") == "point_read"
+    assert classify_route("GET", "/cameras/") == "scan"
+    assert classify_route("GET", "/cameras/export") == "scan"
+    assert classify_route("GET", "/cameras/analytics/offline") == "scan"
+    assert classify_route("GET", "/feeds/") == "scan"
+    assert classify_route("PATCH", cid) == "write"
+    assert classify_route("GET", "/metrics/") == "other"
+
+
+def _run_requests(middleware, requests):
+    # requests: list of (method, path); returns the response status of each
+    import asyncio
+
+    async def one(method, path):
+        sent = []
+
+        async def receive():
+            return {"type": "http.request", "body": b"", "more_body": False}
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {
+            "type": "http",
+            "method": method,
+            "path": path,
+            "headers": [],
+            "client": ("10.0.0.1", 1234),
+        }
+        await middleware(scope, receive, send)
+        return sent[0]
+
+    async def run_all():
+        return await asyncio.gather(*(one(m, p) for m, p in requests))
+
+    return asyncio.run(run_all())
+
+
+def _slow_app():
+    import asyncio
+
+    async def app(scope, receive, send):
+        await asyncio.sleep(0.05)
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"{}"})
+
+    return app
+
+
+def test_scans_over_budget_are_shed_but_heartbeats_pass():
+    from app.core.admission import AdmissionMiddleware
+
+    middleware = AdmissionMiddleware(
+        _slow_app(), limits={"scan": (1, 0.01)}, rate_per_second=0
+    )
+    starts = _run_requests(
+        middleware,
+        [("GET", "/cameras/"), ("GET", "/cameras/"), ("POST", "/cameras/x/heartbeat")],
+    )
+
+    assert starts[0]["status"] == 200
+    assert starts[1]["status"] == 503  # waited longer than 10 ms for the one slot
+    assert (b"retry-after", b"1") in starts[1]["headers"]
+    assert starts[2]["status"] == 200  # ingest is never queued behind scans
+
+
+def test_per_client_token_bucket():
+    from app.core.admission import AdmissionMiddleware, TokenBucket
+
+    middleware = AdmissionMiddleware(
+        _slow_app(), limits={"scan": (10, 1.0)}, rate_per_second=1, burst=2
+    )
+    starts = _run_requests(middleware, [("GET", "/cameras/")] * 3)
+    assert [s["status"] for s in starts] == [200, 200, 429]
+
+    bucket = TokenBucket(rate=2, burst=1, now=0)
+    assert bucket.take(0) == 0
+    assert bucket.take(0) == 0.5  # next token in half a second
+    assert bucket.take(0.5) == 0
+
+
+# -------------------------------------------------------------
+# EXECUTION LANES
+# -------------------------------------------------------------
+def test_full_scan_lane_does_not_block_ingest_lane():
+    import asyncio
+    import threading
+
+    from app.core.lanes import ExecutionLanes
+
+    lanes = ExecutionLanes({"ingest": 1, "point_read": 1, "scan": 1, "write": 1})
+    release = threading.Event()
+
+    async def scenario():
+        # the only scan thread is busy until `release` is set
+        scan = asyncio.ensure_future(lanes.run("scan", release.wait, 5))
+        await asyncio.sleep(0.05)
+        assert lanes.limiter("scan").borrowed_tokens == 1
+
+        heartbeat = await asyncio.wait_for(lanes.run("ingest", lambda: "ok"), 1)
+        release.set()
+        return heartbeat, await scan
+
+    assert asyncio.run(scenario()) == ("ok", True)
+
+
+def test_shared_lanes_use_one_limiter():
+    from app.core.lanes import ExecutionLanes
+
+    lanes = ExecutionLanes({"ingest": 1, "point_read": 2, "scan": 3, "write": 4})
+    assert lanes.limiter("scan").total_tokens == 3
+    lanes.configure({"ingest": 1, "point_read": 2, "scan": 3, "write": 4}, shared=True)
+    assert lanes.limiter("scan") is lanes.limiter("ingest")
+    assert lanes.limiter("scan").total_tokens == 10
+
+
+def test_lane_routes_keep_their_signature(client, camera_payload_json):
+    import inspect
+
+    from app.api import camera_api
+
+    # async wrapper, but FastAPI still sees the original parameters
+    assert inspect.iscoroutinefunction(camera_api.heartbeat)
+    assert list(inspect.signature(camera_api.heartbeat).parameters) == [
+        "camera_id",
+        "service",
+    ]
+
+    cam_id = client.post("/cameras/", json=camera_payload_json).json()["camera_id"]
+    assert client.post(f"/cameras/{cam_id}/heartbeat").status_code == 200
+    assert client.get(f"/cameras/{cam_id}/status").json()["is_online"] is True
+    assert client.get("/cameras/export").status_code == 200
+
+
+# -------------------------------------------------------------
+# SINGLE-FLIGHT LIST QUERIES
+# -------------------------------------------------------------
+def test_single_flight_shares_one_computation():
+    import asyncio
+
+    from app.core.metrics import metrics
+    from app.core.singleflight import SingleFlight
+
+    metrics.reset()
+    flight = SingleFlight("test")
+    calls = []
+
+    async def compute(value):
+        calls.append(value)
+        await asyncio.sleep(0.05)
+        if value == "bad":
+            raise ValueError("boom")
+        return value.upper()
+
+    async def scenario():
+        results = await asyncio.gather(
+            flight.do("a", lambda: compute("a")),
+            flight.do("a", lambda: compute("a")),
+            flight.do("b", lambda: compute("b")),
+            flight.do("bad", lambda: compute("bad")),
+            flight.do("bad", lambda: compute("bad")),
+            return_exceptions=True,
+        )
+        assert len(flight) == 0  # finished keys are forgotten
+        again = await flight.do("a", lambda: compute("a"))
+        return results, again
+
+    results, again = asyncio.run(scenario())
+    assert results[:3] == ["A", "A", "B"]
+    assert all(isinstance(r, ValueError) for r in results[3:])
+    assert again == "A"
+    assert calls == ["a", "b", "bad", "a"]
+    assert metrics.get("singleflight.test.executed") == 4
+    assert metrics.get("singleflight.test.coalesced") == 2
+
+
+def test_identical_concurrent_list_requests_are_coalesced(client, monkeypatch):
+    import asyncio
+    import time
+
+    import httpx
+
+    from app.api import camera_api
+    from app.main import app
+
+    calls = []
+    real_list_page = camera_api._list_page
+
+    def slow_list_page(service, *key):
+        calls.append(key)
+        time.sleep(0.1)
+        return real_list_page(service, *key)
+
+    monkeypatch.setattr(camera_api, "_list_page", slow_list_page)
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://t") as c:
+            return await asyncio.gather(
+                c.get("/cameras/", params={"model": "X", "online": "true"}),
+                c.get("/cameras/?online=true&model=X&page=1"),
+                c.get("/cameras/", params={"model": "X", "online": "true", "page": 0}),
+                c.get("/cameras/", params={"model": "Y"}),
+            )
+
+    responses = asyncio.run(scenario())
+    assert [r.status_code for r in responses] == [200, 200, 200, 200]
+    assert len(calls) == 2  # the three "model=X&online=true" requests ran once
+    assert responses[0].content == responses[1].content == responses[2].content
+    assert responses[0].headers["x-total-count"] == "0"
+
+
+def test_list_cameras_reads_versions_off_the_event_loop(client, monkeypatch):
+    import asyncio
+
+    from app.api.camera_api import get_service
+
+    service = get_service()
+    real_data_version = service.data_version
+    loops = []
+
+    def data_version(*args, **kwargs):
+        try:
+            loops.append(asyncio.get_running_loop())
+        except RuntimeError:
+            loops.append(None)  # worker thread: no event loop here
+        return real_data_version(*args, **kwargs)
+
+    monkeypatch.setattr(service, "data_version", data_version)
+
+    assert client.get("/cameras/").status_code == 200
+    assert client.get("/cameras/?online=true").status_code == 200
+    assert loops and loops == [None] * len(loops)
+
+
+def test_list_query_key_is_normalized():
+    from app.api.camera_api import _list_query_key
+
+    # empty filters = no filter, page 0 = page 1, spaces in `fields` ignored
+    assert _list_query_key(
+        "", "10.0.0.1", None, None, "", 0, 20, " camera_id, model "
+    ) == _list_query_key(None, "10.0.0.1", None, None, None, 1, 20, "camera_id,model")
+    # two spellings of the same IPv6 address
+    assert _list_query_key(
+        None, "::ffff:0:1", None, None, None, 1, 20, None
+    ) == _list_query_key(None, "0:0:0:0:0:ffff:0:1", None, None, None, 1, 20, None)
+    # a different page is a different query
+    assert _list_query_key(None, None, None, None, None, 2, 20, None) != (
+        _list_query_key(None, None, None, None, None, 1, 20, None)
+    )
+
+
+# -------------------------------------------------------------
+# QUERY RESULT CACHE
+# -------------------------------------------------------------
+def test_list_results_are_cached_until_the_next_write(client, camera_payload_json):
+    from app.core.metrics import metrics
+
+    cam_id = client.post("/cameras/", json=camera_payload_json).json()["camera_id"]
+    metrics.reset()
+
+    first = client.get("/cameras/")
+    second = client.get("/cameras/")
+    assert first.content == second.content
+    assert metrics.get("query_cache.misses") == 1
+    assert metrics.get("query_cache.hits") == 1
+    assert metrics.get("query_cache.hit_rate") == 0.5
+    assert metrics.get("query_cache.bytes") > len(first.content)
+
+    # a write → new repository version → the old entry is never used again
+    client.patch(f"/cameras/{cam_id}", json={"camera_name": "Renamed"})
+    assert client.get("/cameras/").json()[0]["camera_name"] == "Renamed"
+
+    # a heartbeat changes last_known_checkin → full camera lists are recomputed
+    client.post(f"/cameras/{cam_id}/heartbeat")
+    checkin = client.get(f"/cameras/{cam_id}").json()["last_known_checkin"]
+    assert client.get("/cameras/").json()[0]["last_known_checkin"] == checkin
+
+    # ... but a projection without check-in times survives heartbeats
+    client.get("/cameras/", params={"fields": "camera_name"})
+    hits = metrics.get("query_cache.hits")
+    client.post(f"/cameras/{cam_id}/heartbeat")
+    client.get("/cameras/", params={"fields": "camera_name"})
+    assert metrics.get("query_cache.hits") == hits + 1
+
+
+def test_feed_lists_are_cached_across_heartbeats(client, camera_payload_json):
+    from app.core.metrics import metrics
+
+    cam_id = client.post("/cameras/", json=camera_payload_json).json()["camera_id"]
+    metrics.reset()
+
+    first = client.get(f"/cameras/{cam_id}/feeds")
+    client.post(f"/cameras/{cam_id}/heartbeat")
+    second = client.get(f"/cameras/{cam_id}/feeds")
+    assert first.content == second.content
+    assert second.headers["x-total-count"] == "1"
+    assert metrics.get("query_cache.hits") == 1
+
+    client.post(
+        f"/cameras/{cam_id}/feeds",
+        json={"feed_protocol": "http", "feed_port": 8080, "feed_path": "/snap"},
+    )
+    assert client.get(f"/cameras/{cam_id}/feeds").headers["x-total-count"] == "2"
+    assert client.get(f"/cameras/{uuid4()}/feeds").status_code == 404
+
+
+def test_query_cache_lru_by_size_and_expiry():
+    from app.core.query_cache import QueryCache
+
+    body = b"x" * 1000
+    cache = QueryCache(max_bytes=3 * len(body) + 200)
+    for key in ("a", "b", "c"):
+        cache.put(key, key.upper(), body)
+    assert cache.get("a") == "A"  # "a" is now the most recently used
+    cache.put("d", "D", body)  # over the limit → least recently used goes
+    assert cache.get("b") is None
+    assert [cache.get(k) for k in ("a", "c", "d")] == ["A", "C", "D"]
+    assert cache.size_bytes <= cache.max_bytes
+
+    # time-dependent entries (online filters) expire on their own
+    cache.put("online", "ON", body, valid_until=100.0)
+    assert cache.get("online", now=99.0) == "ON"
+    assert cache.get("online", now=100.0) is None
+
+    disabled = QueryCache(max_bytes=0)
+    disabled.put("a", "A", body)
+    assert not disabled.enabled and disabled.get("a") is None
+
+
+def test_query_cache_can_be_disabled_from_config(monkeypatch):
+    from app.core.config import Config
+    from app.core.query_cache import QueryCache
+
+    monkeypatch.setattr(Config, "QUERY_CACHE_ENABLED", False)
+    assert QueryCache().enabled is False
+    monkeypatch.setattr(Config, "QUERY_CACHE_ENABLED", True)
+    monkeypatch.setattr(Config, "QUERY_CACHE_MAX_BYTES", 1234)
+    assert QueryCache().max_bytes == 1234
+
+
+# -------------------------------------------------------------
+# BULK UPDATE (PATCH /cameras)
+# -------------------------------------------------------------
+def test_bulk_patch_cameras_api(client, camera_payload_json):
+    first = client.post("/cameras/", json=camera_payload_json).json()
+    other = dict(camera_payload_json, camera_name="Other")
+    other["network_setup"] = {"ip_address": "10.1.2.3"}
+    second = client.post("/cameras/", json=other).json()
+    body = {"image_settings": {"brightness": 75, "contrast": 40}}
+
+    resp = client.patch("/cameras/?cidr=10.1.0.0/16", json=body)
+    assert resp.status_code == 200
+    assert resp.json() == {"matched": 1, "updated": 1}
+    settings = client.get(f"/cameras/{second['camera_id']}").json()["image_settings"]
+    assert (settings["brightness"], settings["contrast"]) == (75, 40)
+    assert client.get(f"/cameras/{first['camera_id']}").json()["image_settings"][
+        "brightness"
+    ] == 50
+
+    ids = f"ids={first['camera_id']}&ids={second['camera_id']}"
+    assert client.patch(f"/cameras/?{ids}", json=body).json() == {
+        "matched": 2,
+        "updated": 1,
+    }
+
+    assert client.patch("/cameras/", json=body).status_code == 400  # no filter
+    assert client.patch("/cameras/?cidr=nope", json=body).status_code == 400
+    resp = client.patch(f"/cameras/?{ids}", json={"camera_name": "Same"})
+    assert resp.status_code == 409
+
+
+# -------------------------------------------------------------
+# BULK DELETE (DELETE /cameras) + BULK FEEDS (POST /feeds/bulk)
+# -------------------------------------------------------------
+def test_bulk_feeds_and_bulk_delete_api(client, camera_payload_json):
+    first = client.post("/cameras/", json=camera_payload_json).json()
+    other = dict(camera_payload_json, camera_name="Other")
+    other["network_setup"] = {"ip_address": "10.1.2.3"}
+    second = client.post("/cameras/", json=other).json()
+
+    add = {
+        "action": "add",
+        "feed": {"feed_protocol": "http", "feed_port": 80, "feed_path": "/"},
+    }
+    resp = client.post("/feeds/bulk?cidr=0.0.0.0/0", json=add)
+    assert resp.status_code == 200
+    assert resp.json()["counts"] == {"added": 2}
+    assert client.post("/feeds/bulk?cidr=0.0.0.0/0", json=add).json()["counts"] == {
+        "conflict": 2
+    }
+
+    update = {
+        "action": "update",
+        "feed_protocol": "rtsp",
+        "feed_port": 554,
+        "updates": {"feed_port": 8554},
+    }
+    result = client.post("/feeds/bulk?cidr=10.1.0.0/16", json=update).json()
+    assert result["matched"] == 1 and result["counts"] == {"updated": 1}
+    assert result["items"][0]["camera_id"] == second["camera_id"]
+    feeds = client.get(f"/cameras/{second['camera_id']}/feeds").json()
+    assert sorted(f["feed_port"] for f in feeds) == [80, 8554]
+
+    remove = {"action": "remove", "feed_protocol": "http"}
+    assert client.post("/feeds/bulk?cidr=0.0.0.0/0", json=remove).json()["counts"] == {
+        "removed": 2
+    }
+    assert client.post("/feeds/bulk", json=remove).status_code == 400  # no filter
+    resp = client.post("/feeds/bulk?cidr=0.0.0.0/0", json={"action": "add"})
+    assert resp.status_code == 400
+
+    resp = client.delete(f"/cameras/?cidr=10.1.0.0/16&ids={first['camera_id']}")
+    assert resp.status_code == 200
+    assert resp.json()["counts"] == {"not_found": 1}  # first is outside the CIDR
+    resp = client.delete("/cameras/?cidr=10.1.0.0/16")
+    assert resp.json()["counts"] == {"deleted": 1}
+    assert client.get(f"/cameras/{second['camera_id']}").status_code == 404
+    assert client.get(f"/cameras/{first['camera_id']}").status_code == 200
+    assert client.delete("/cameras/").status_code == 400
+
+
+# -------------------------------------------------------------
+# CAMERA TAGS (GET /cameras?tags_any= / tags_all= / tags_none=)
+# -------------------------------------------------------------
+def test_list_cameras_by_tags_api(client, camera_payload_json):
+    first = dict(camera_payload_json, tags=["site:berlin", "floor:1"])
+    client.post("/cameras/", json=first)
+    second = dict(camera_payload_json, camera_name="Other", tags=["site:paris"])
+    second["network_setup"] = {"ip_address": "10.1.2.3"}
+    second_id = client.post("/cameras/", json=second).json()["camera_id"]
+
+    resp = client.get("/cameras/?tags_any=site:paris&tags_any=site:rome")
+    assert resp.headers["X-Total-Count"] == "1"
+    assert resp.json()[0]["tags"] == ["site:paris"]
+    resp = client.get("/cameras/?tags_all=site:berlin&tags_all=floor:1&fields=camera_name")
+    assert resp.json() == [{"camera_name": "TestCam"}]
+    assert client.get("/cameras/?tags_none=site:berlin&online=true").json()[0][
+        "camera_id"
+    ] == second_id
+
+    # retagging invalidates the cached result of the same query
+    client.patch(f"/cameras/{second_id}", json={"tags": ["site:berlin"]})
+    assert client.get("/cameras/?tags_any=site:paris").json() == []
+    assert client.get("/cameras/stats").json()["by_tag"] == {
+        "site:berlin": 2,
+        "floor:1": 1,
+    }
+    lines = client.get("/cameras/export?tags_all=floor:1").text.splitlines()
+    assert len(lines) == 1
+
+
+# -------------------------------------------------------------
+# UPTIME (GET /cameras/{id}/uptime, GET /cameras/uptime)
+# -------------------------------------------------------------
+def test_uptime_endpoints(client, camera_payload_json):
+    from app.core.admission import POINT_READ, SCAN, classify_route
+
+    cam = client.post("/cameras/", json=camera_payload_json).json()
+    client.post(f"/cameras/{cam['camera_id']}/heartbeat")
+
+    resp = client.get(f"/cameras/{cam['camera_id']}/uptime?window=15m")
+    assert resp.status_code == 200
+    body = resp.json()
+    assert body["window_seconds"] == 900 and body["heartbeats"] == 2
+
+    report = client.get("/cameras/uptime?window=1h&worst=5").json()
+    assert (report["cameras"], report["window_seconds"]) == (1, 3600)
+    assert report["sla_target"] == 0.99 and len(report["worst"]) <= 1
+
+    assert client.get(f"/cameras/{cam['camera_id']}/uptime?window=soon").status_code == 400
+    assert client.get("/cameras/uptime?sla=2").status_code == 400
+    assert client.get(f"/cameras/{uuid4()}/uptime").status_code == 404
+
+    assert classify_route("GET", "/cameras/uptime") == SCAN
+    assert classify_route("GET", f"/cameras/{cam['camera_id']}/uptime") == POINT_READ
+
+
+# -------------------------------------------------------------
+# STATUS HYSTERESIS / FLAPPING
+# -------------------------------------------------------------
+def test_status_reports_state_and_online_lists_survive_steady_heartbeats(
+    client, camera_payload_json
+):
+    from app.core.metrics import metrics
+
+    cam_id = client.post("/cameras/", json=camera_payload_json).json()["camera_id"]
+    status = client.get(f"/cameras/{cam_id}/status").json()
+    assert (status["is_online"], status["state"]) == (True, "online")
+    assert client.get("/cameras/stats").json()["flapping"] == 0
+
+    # heartbeats of an already online camera do not change the online set,
+    # so an online-filtered projection stays cached
+    params = {"online": "true", "fields": "camera_id"}
+    client.get("/cameras/", params=params)
+    hits = metrics.get("query_cache.hits")
+    client.post(f"/cameras/{cam_id}/heartbeat")
+    assert client.get("/cameras/", params=params).json() == [{"camera_id": cam_id}]
+    assert metrics.get("query_cache.hits") == hits + 1
+
+
+# -------------------------------------------------------------
+# REQUEST CLOCK (app/core/clock.py)
+# -------------------------------------------------------------
+def test_online_status_and_cached_lists_follow_the_clock(
+    client, camera_payload_json, manual_clock
+):
+    from app.core.config import Config
+
+    cam_id = client.post("/cameras/", json=camera_payload_json).json()["camera_id"]
+    params = {"online": "true", "fields": "camera_id"}
+    assert client.get("/cameras/", params=params).json() == [{"camera_id": cam_id}]
+
+    # no write, only time passes: the cached online list expires with it
+    manual_clock.advance(Config.HEARTBEAT_TIMEOUT + 1)
+    assert client.get(f"/cameras/{cam_id}/status").json()["is_online"] is False
+    assert client.get("/cameras/", params=params).json() == []
+
+    client.post(f"/cameras/{cam_id}/heartbeat")
+    cam = client.get(f"/cameras/{cam_id}").json()
+    assert cam["last_known_checkin"] == cam["last_updated_on"]
+    assert client.get("/cameras/", params=params).json() == [{"camera_id": cam_id}]
+
+
+def test_cached_list_projection_follows_heartbeat_updated_on(
+    client, camera_payload_json, manual_clock
+):
+    cam_id = client.post("/cameras/", json=camera_payload_json).json()["camera_id"]
+    params = {"fields": "camera_id,last_updated_on"}
+    before = client.get("/cameras/", params=params).json()[0]["last_updated_on"]
+
+    manual_clock.advance(30)
+    client.post(f"/cameras/{cam_id}/heartbeat")
+    single = client.get(f"/cameras/{cam_id}", params={"fields": "last_updated_on"})
+    listed = client.get("/cameras/", params=params).json()[0]["last_updated_on"]
+    assert listed == single.json()["last_updated_on"] != before
+
+
+# -------------------------------------------------------------
+# OFFLINE ANALYTICS (columnar snapshot)
+# -------------------------------------------------------------
+def test_offline_analytics_endpoint(client, camera_payload_json, manual_clock, monkeypatch):
+    import sys
+
+    import pytest
+
+    client.post("/cameras/", json=camera_payload_json)
+    manual_clock.advance(3600)
+
+    # NumPy is optional: without it the endpoint answers 501
+    monkeypatch.setitem(sys.modules, "numpy", None)
+    assert client.get("/cameras/analytics/offline").status_code == 501
+    monkeypatch.undo()
+
+    pytest.importorskip("numpy")
+    res = client.get("/cameras/analytics/offline", params={"longer_than": "30m"})
+    assert res.status_code == 200
+    assert res.json()["groups"] == {camera_payload_json["camera_model"]: 1}
+    bad = client.get("/cameras/analytics/offline", params={"longer_than": "soon"})
+    assert bad.status_code == 400
+
+
+# -------------------------------------------------------------
+# READ-ONLY FOLLOWER (replica guard)
+# -------------------------------------------------------------
+def test_follower_refuses_writes_and_stale_reads(client, camera_payload_json):
+    from app.core.replica import replica_state
+
+    cam_id = client.post("/cameras/", json=camera_payload_json).json()["camera_id"]
+    lag = [0.2]
+    replica_state.follow(lambda: lag[0], max_lag_seconds=5)
+    try:
+        assert client.get(f"/cameras/{cam_id}").status_code == 200
+        assert client.get("/cameras/").status_code == 200
+        assert client.post("/cameras/", json=camera_payload_json).status_code == 503
+        assert client.post(f"/cameras/{cam_id}/heartbeat").status_code == 503
+
+        lag[0] = 30  # too far behind the leader → no reads either
+        stale = client.get(f"/cameras/{cam_id}")
+        assert stale.status_code == 503
+        assert stale.headers["retry-after"] == "1"
+        assert client.get("/metrics/").status_code == 200
+    finally:
+        replica_state.reset()
+    assert client.delete(f"/cameras/{cam_id}").status_code == 200
+
+
+# SHARED STORAGE SERVER (REPOSITORY_BACKEND=remote)
+def test_workers_share_one_fleet_through_storage_server(
+    storage_server, monkeypatch, camera_payload_json
+):
+    import app.api.camera_api as api
+    from app.main import app
+    from app.repository.remote_repo import RemoteCameraStorage
+    from app.service.camera_service import CameraService
+    from fastapi.testclient import TestClient
+
+    # two "uvicorn workers": each has its own service + remote repository
+    workers = [CameraService(RemoteCameraStorage(storage_server.path)) for _ in range(2)]
+    client = TestClient(app)
+
+    def serve_with(worker):
+        monkeypatch.setattr(api, "_repo", worker.repo)
+        monkeypatch.setattr(api, "_service", worker)
+
+    serve_with(workers[0])
+    cam_id = client.post("/cameras/", json=camera_payload_json).json()["camera_id"]
+
+    serve_with(workers[1])
+    assert client.get(f"/cameras/{cam_id}").status_code == 200
+    assert client.post("/cameras/", json=camera_payload_json).status_code == 409
+    assert client.post(f"/cameras/{cam_id}/heartbeat").status_code == 200
+
+    serve_with(workers[0])
+    listed = client.get("/cameras/").json()
+    assert [c["camera_id"] for c in listed] == [cam_id]
+
+    storage_server.stop()
+    down = client.get(f"/cameras/{cam_id}")
+    assert down.status_code == 503
+    assert down.headers["retry-after"] == "1"
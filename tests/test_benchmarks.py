@@ -0,0 +1,62 @@
+# Regression gate for the repository/service microbenchmarks.
+#
+# These tests are marked `benchmark` and are SKIPPED by default because timings
+# depend on the machine. Run them explicitly with:
+#   python -m pytest -m benchmark --run-benchmarks
+#
+# A case fails when its median is slower than
+#   stored baseline (benchmarks/baseline.json) × Config.BENCHMARK_REGRESSION_RATIO
+#   + Config.BENCHMARK_REGRESSION_SLACK_US
+# (the absolute slack keeps µs-sized medians from failing on noise alone)
+
+import pytest
+
+from app.core.config import Config
+from app.repository.registry import REPOSITORY_REGISTRY
+from benchmarks import bench_lanes, bench_startup
+from benchmarks.microbench import CASES, load_baseline, run_case
+
+pytestmark = pytest.mark.benchmark
+
+
+@pytest.mark.parametrize("case_name", list(CASES))
+@pytest.mark.parametrize("backend", sorted(REPOSITORY_REGISTRY))
+def test_no_regression_against_baseline(backend, case_name):
+    baseline = load_baseline()
+    if baseline is None:
+        pytest.skip("No baseline file. Run: python -m benchmarks.microbench --update-baseline")
+
+    stored = baseline["results"].get(backend, {}).get(case_name)
+    if stored is None:
+        pytest.skip(f"No baseline for {backend}:{case_name}")
+
+    stats = run_case(backend, case_name, fleet_size=baseline["fleet_size"])
+    ratio = Config.BENCHMARK_REGRESSION_RATIO
+    slack_us = Config.BENCHMARK_REGRESSION_SLACK_US
+    limit = stored * ratio + slack_us * 1e-6
+
+    assert stats.median <= limit, (
+        f"{stats.name} regressed: median {stats.median * 1e6:.2f}µs > "
+        f"{limit * 1e6:.2f}µs (baseline {stored * 1e6:.2f}µs × {ratio} "
+        f"+ {slack_us}µs)"
+    )
+
+
+def test_cold_start_within_budget():
+    summary = bench_startup.measure(runs=3)
+    first_ms = summary["first_request"]["median"] * 1e3
+
+    assert first_ms <= Config.STARTUP_BUDGET_MS, (
+        f"time-to-first-request {first_ms:.1f} ms > budget "
+        f"{Config.STARTUP_BUDGET_MS:.1f} ms"
+    )
+
+
+def test_heartbeat_p99_with_lanes_beats_shared_pool():
+    results = bench_lanes.measure(fleet=2000, scanners=32, heartbeats=40)
+    shared, lanes = results["shared"]["p99"], results["lanes"]["p99"]
+
+    assert lanes < shared, (
+        f"heartbeat p99 with lanes {lanes * 1e3:.1f} ms is not better than "
+        f"one shared pool {shared * 1e3:.1f} ms"
+    )
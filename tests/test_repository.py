@@ -217,3 +217,1028 @@ def test_remove_feed_success(repo, camera_payload):
 def test_remove_feed_not_found(repo, camera_payload):
     cam = repo.add_camera(camera_payload)
     assert repo.remove_feed(cam.camera_id, uuid4()) is False
+
+
+def test_remove_feed_keeps_feed_order(repo, camera_payload):
+    cam = repo.add_camera(camera_payload)
+    added = [
+        repo.add_feed(
+            cam.camera_id,
+            VideoFeedSetup(feed_protocol="rtsp", feed_port=9000 + i, feed_path=f"/{i}"),
+        )
+        for i in range(3)
+    ]
+
+    assert repo.remove_feed(cam.camera_id, added[1].feed_id) is True
+
+    ports = [f.feed_port for f in repo.get_camera(cam.camera_id).available_feeds]
+    assert ports == [554, 9000, 9002]
+    assert repo.get_feed(cam.camera_id, added[1].feed_id) is None
+
+
+def test_feed_exists_follows_updates_and_removal(repo, camera_payload):
+    cam = repo.add_camera(camera_payload)
+    fid = cam.available_feeds[0].feed_id
+
+    assert repo.feed_exists(cam.camera_id, "rtsp", 554) is True
+
+    repo.update_feed(cam.camera_id, fid, FeedUpdate(feed_port=9999))
+    assert repo.feed_exists(cam.camera_id, "rtsp", 554) is False
+    assert repo.feed_exists(cam.camera_id, "rtsp", 9999) is True
+
+    repo.remove_feed(cam.camera_id, fid)
+    assert repo.feed_exists(cam.camera_id, "rtsp", 9999) is False
+
+
+def test_search_feeds_index_follows_feed_mutations(repo, camera_payload):
+    cam = repo.add_camera(camera_payload)
+    fid = cam.available_feeds[0].feed_id
+
+    found = repo.search_feeds(protocol="rtsp", port=554)
+    assert [(f.camera_id, f.feed_id) for f in found] == [(cam.camera_id, fid)]
+
+    repo.update_feed(cam.camera_id, fid, FeedUpdate(feed_protocol="http", feed_port=80))
+    assert repo.search_feeds(protocol="rtsp") == []
+    assert len(repo.search_feeds(protocol="http", port=80)) == 1
+
+    # path only → protocol / port postings unchanged, path trigrams moved
+    repo.update_feed(cam.camera_id, fid, FeedUpdate(feed_path="/moved"))
+    assert len(repo.search_feeds(protocol="http", port=80, q="moved")) == 1
+    assert repo.count_search_feeds(q="main") == 0
+    # port only → the (protocol, port) pair moves, the path stays indexed
+    repo.update_feed(cam.camera_id, fid, FeedUpdate(feed_port=8080))
+    assert repo.search_feeds(port=80) == []
+    assert repo.count_search_feeds("http", 8080, "moved") == 1
+    assert repo.feed_exists(cam.camera_id, "http", 8080) is True
+
+    repo.remove_camera(cam.camera_id)
+    assert repo.search_feeds(port=80) == []
+    assert repo.search_feeds(page_size=-1) == []
+    assert repo.search_feeds() == []
+
+
+def test_search_cameras_follows_update_and_delete(repo, camera_payload):
+    cam = repo.add_camera(camera_payload)  # model "ModelX"
+
+    assert [c.camera_id for c in repo.search_cameras(model="delx")] == [cam.camera_id]
+    assert [c.camera_id for c in repo.search_cameras(model="X")] == [cam.camera_id]
+
+    repo.update_camera(cam.camera_id, CameraUpdate(camera_model="Axis P3245"))
+    assert repo.search_cameras(model="modelx") == []
+    assert len(repo.search_cameras(model="p32")) == 1
+    assert len(repo.search_cameras(name="testc", model="axis")) == 1
+
+    repo.remove_camera(cam.camera_id)
+    assert repo.search_cameras(model="axis") == []
+
+
+def test_trigram_index_verifies_candidates():
+    from app.repository.ngram_index import TrigramIndex
+
+    index = TrigramIndex()
+    index.add("a", "abcXbcd")  # has "abc" and "bcd" but not "abcd"
+    index.add("b", "ABCD-1")
+
+    assert index.search("abcd") == {"b"}
+    assert index.search("d") == {"a", "b"}  # short pattern → scan
+
+    index.update("b", "zzz")
+    assert index.search("abcd") == set()
+
+
+def test_list_feeds_filters_and_paginates(repo, camera_payload):
+    cam = repo.add_camera(camera_payload)
+    repo.add_feed(
+        cam.camera_id,
+        VideoFeedSetup(feed_protocol="http", feed_port=8080, feed_path="/Main/Snap"),
+    )
+
+    assert len(repo.list_feeds(cam.camera_id, q="MAIN")) == 2
+    assert len(repo.list_feeds(cam.camera_id, protocol="http", q="main")) == 1
+    assert len(repo.list_feeds(cam.camera_id, page=2, page_size=1)) == 1
+    assert repo.list_feeds(cam.camera_id, page_size=-1) == []
+
+
+def test_negative_limit_returns_no_cameras(repo, camera_payload):
+    from app.models.schemas import CameraFilter
+    from app.repository.sharded_repo import ShardedCameraStorage
+
+    repo.add_camera(camera_payload)
+    sharded = ShardedCameraStorage(shards=2)
+    sharded.add_camera(camera_payload)
+
+    assert repo.query_cameras(CameraFilter(), limit=-1) == []
+    assert sharded.query_cameras(CameraFilter(), limit=-1) == []
+
+
+def test_fleet_stats_counters_follow_mutations(repo, camera_payload):
+    from datetime import datetime, timedelta, timezone
+
+    from app.models.schemas import CameraNetworkInfo
+
+    cam = repo.add_camera(camera_payload)  # ModelX, 192.168.0.10, one rtsp feed
+    now = datetime.now(timezone.utc)
+
+    stats = repo.fleet_stats(online_since=now - timedelta(seconds=60))
+    assert stats.total_cameras == 1 and stats.total_feeds == 1
+    assert stats.by_model == {"ModelX": 1}
+    assert stats.by_protocol == {"rtsp": 1}
+    assert stats.by_subnet == {"192.168.0.0/24": 1}
+    assert (stats.online, stats.offline) == (0, 1)
+
+    repo.record_checkin(cam.camera_id, now)
+    repo.update_camera(cam.camera_id, CameraUpdate(camera_model="ModelY"))
+    repo.add_feed(
+        cam.camera_id, VideoFeedSetup(feed_protocol="http", feed_port=80, feed_path="/")
+    )
+
+    stats = repo.fleet_stats(online_since=now - timedelta(seconds=60))
+    assert stats.by_model == {"ModelY": 1}
+    assert stats.by_protocol == {"rtsp": 1, "http": 1}
+    assert stats.online == 1
+
+    repo.update_camera(
+        cam.camera_id,
+        CameraUpdate(network_setup=CameraNetworkInfo(ip_address="fd00:1:2:3:4::9")),
+    )
+    stats = repo.fleet_stats(online_since=now - timedelta(seconds=60))
+    assert stats.by_subnet == {"fd00:1:2:3::/64": 1}
+
+    # check-in older than the cut-off → offline
+    stats = repo.fleet_stats(online_since=now + timedelta(seconds=1))
+    assert (stats.online, stats.offline) == (0, 1)
+
+    repo.remove_camera(cam.camera_id)
+    stats = repo.fleet_stats(online_since=now)
+    assert stats.total_cameras == 0 and stats.by_protocol == {} and stats.by_model == {}
+
+
+def test_query_and_count_cameras_ip_range(repo, camera_payload):
+    from ipaddress import ip_address
+
+    from app.models.schemas import CameraFilter, CameraNetworkInfo
+
+    ids = []
+    for i in range(5):
+        payload = camera_payload.model_copy()
+        payload.camera_name = f"Cam{i}"
+        payload.network_setup = CameraNetworkInfo(ip_address=f"10.0.0.{i + 1}")
+        ids.append(repo.add_camera(payload).camera_id)
+
+    flt = CameraFilter(ip_from=ip_address("10.0.0.2"), ip_to=ip_address("10.0.0.4"))
+    assert repo.count_cameras(flt) == 3
+    assert [c.camera_id for c in repo.query_cameras(flt)] == ids[1:4]
+    assert [c.camera_id for c in repo.query_cameras(flt, offset=2, limit=5)] == [
+        ids[3]
+    ]
+
+    # moving a camera out of the range updates the sorted IP index
+    repo.update_camera(
+        ids[2], CameraUpdate(network_setup=CameraNetworkInfo(ip_address="10.0.1.9"))
+    )
+    repo.remove_camera(ids[1])
+    assert repo.count_cameras(flt) == 1
+    in_model = CameraFilter(model="modelx", ip_to=ip_address("10.0.0.4"))
+    assert repo.count_cameras(in_model) == 2
+    assert repo.count_cameras(CameraFilter()) == 4
+
+
+def test_count_cameras_online(repo, camera_payload):
+    from datetime import datetime, timedelta, timezone
+
+    from app.models.schemas import CameraFilter
+
+    cam = repo.add_camera(camera_payload)
+    now = datetime.now(timezone.utc)
+    repo.record_checkin(cam.camera_id, now)
+    since = now - timedelta(seconds=60)
+
+    assert repo.count_cameras(CameraFilter(online=True), online_since=since) == 1
+    assert repo.count_cameras(CameraFilter(online=False), online_since=since) == 0
+    assert repo.count_cameras(CameraFilter(online=True, model="model"), since) == 1
+    assert repo.count_cameras(CameraFilter(online=True), now + timedelta(seconds=1)) == 0
+
+
+def test_count_feeds_and_search_feeds(repo, camera_payload):
+    cam = repo.add_camera(camera_payload)  # rtsp 554 /main
+    repo.add_feed(
+        cam.camera_id,
+        VideoFeedSetup(feed_protocol="http", feed_port=8080, feed_path="/main/snap"),
+    )
+
+    assert repo.count_feeds(cam.camera_id) == 2
+    assert repo.count_feeds(cam.camera_id, protocol="rtsp", port=554) == 1
+    assert repo.count_feeds(cam.camera_id, q="SNAP") == 1
+    assert repo.count_feeds(uuid4()) == 0
+
+    assert repo.count_search_feeds() == 2
+    assert repo.count_search_feeds(protocol="http") == 1
+    assert repo.count_search_feeds(q="main") == 2
+    assert repo.count_search_feeds(protocol="rtsp", q="snap") == 0
+
+
+def test_versions_change_on_writes_and_checkins(repo, camera_payload):
+    from datetime import datetime, timezone
+
+    start = repo.data_version()
+    cam = repo.add_camera(camera_payload)
+    assert repo.data_version() > start
+
+    v, c = repo.data_version(), repo.checkin_version()
+    repo.record_checkin(cam.camera_id, datetime.now(timezone.utc))
+    assert repo.data_version() == v  # a heartbeat is not a data write
+    assert repo.checkin_version() > c
+
+    v = repo.data_version()
+    repo.update_camera(cam.camera_id, CameraUpdate(camera_name="Renamed"))
+    feed = repo.add_feed(
+        cam.camera_id,
+        VideoFeedSetup(feed_protocol="http", feed_port=8080, feed_path="/x"),
+    )
+    repo.remove_feed(cam.camera_id, feed.feed_id)
+    assert repo.data_version() == v + 3
+
+    # an update that changes nothing is not a write
+    v, updated_on = repo.data_version(), cam.last_updated_on
+    repo.update_camera(cam.camera_id, CameraUpdate(camera_name="Renamed"))
+    repo.update_camera(cam.camera_id, CameraUpdate())
+    assert repo.data_version() == v
+    assert repo.get_camera(cam.camera_id).last_updated_on == updated_on
+
+    # clear() never moves a version backwards (cached results stay invalid)
+    v, c = repo.data_version(), repo.checkin_version()
+    repo.clear()
+    assert repo.data_version() > v and repo.checkin_version() > c
+
+
+def test_oldest_online_checkin(repo, camera_payload):
+    from datetime import datetime, timedelta, timezone
+
+    now = datetime.now(timezone.utc)
+    first = repo.add_camera(camera_payload)
+    second = repo.add_camera(camera_payload)
+    assert repo.oldest_online_checkin(now - timedelta(seconds=60)) is None
+
+    repo.record_checkin(first.camera_id, now - timedelta(seconds=30))
+    repo.record_checkin(second.camera_id, now)
+    assert repo.oldest_online_checkin(now - timedelta(seconds=60)) == (
+        now - timedelta(seconds=30)
+    )
+    # the first camera timed out → the second is now the oldest online one
+    assert repo.oldest_online_checkin(now - timedelta(seconds=10)) == now
+
+
+def test_update_cameras_bulk_keeps_indexes_consistent(repo, camera_payload):
+    from datetime import datetime, timezone
+
+    from app.models.schemas import CameraFilter, ImageQuality
+
+    first = repo.add_camera(camera_payload)
+    other = camera_payload.model_copy()
+    other.camera_name = "Other"
+    second = repo.add_camera(other)
+    version = repo.data_version()
+
+    updated = repo.update_cameras(
+        [first.camera_id, second.camera_id, uuid4()],  # unknown ids are skipped
+        CameraUpdate(camera_model="NewModel", image_settings=ImageQuality(brightness=90)),
+    )
+    assert updated == 2
+    assert repo.data_version() == version + 1  # ONE bump for the whole batch
+
+    by_model = repo.query_cameras(CameraFilter(model="newmodel"))
+    assert {c.camera_id for c in by_model} == {first.camera_id, second.camera_id}
+    assert repo.query_cameras(CameraFilter(model=camera_payload.camera_model)) == []
+    stats = repo.fleet_stats(datetime.now(timezone.utc))
+    assert stats.by_model == {"NewModel": 2}
+    assert repo.get_camera(first.camera_id).image_settings.brightness == 90
+
+    # same values again → nothing changes, no version bump
+    assert repo.update_cameras(
+        [first.camera_id], CameraUpdate(camera_model="NewModel")
+    ) == 0
+    assert repo.data_version() == version + 1
+
+
+def test_query_cameras_by_ids(repo, camera_payload):
+    from app.models.schemas import CameraFilter
+
+    first = repo.add_camera(camera_payload)
+    second = repo.add_camera(camera_payload)
+    flt = CameraFilter(camera_ids=[second.camera_id, uuid4()])
+
+    assert [c.camera_id for c in repo.query_cameras(flt)] == [second.camera_id]
+    assert repo.count_cameras(flt) == 1
+    flt = CameraFilter(camera_ids=[first.camera_id], model="nomatch")
+    assert repo.count_cameras(flt) == 0
+
+
+def test_trigram_update_many():
+    from app.repository.ngram_index import TrigramIndex
+
+    index = TrigramIndex()
+    for key, text in [(1, "Axis P32"), (2, "Axis Q60"), (3, "Bosch")]:
+        index.add(key, text)
+
+    index.update_many([1, 2], "Hikvision")
+    assert index.search("hikv") == {1, 2}
+    assert index.search("axis") == set()
+    assert index.search("bosch") == {3}
+    assert "xis" not in index._postings  # emptied posting lists are dropped
+
+
+def _two_cameras(repo, camera_payload):
+    from app.models.schemas import CameraNetworkInfo
+
+    first = repo.add_camera(camera_payload)  # 192.168.0.10, rtsp 554 /main
+    other = camera_payload.model_copy()
+    other.camera_name = "Other"
+    other.network_setup = CameraNetworkInfo(ip_address="10.0.0.7")
+    return first, repo.add_camera(other)
+
+
+def test_remove_cameras_bulk_keeps_indexes_consistent(repo, camera_payload):
+    from datetime import datetime, timezone
+
+    from app.models.schemas import CameraFilter
+
+    first, second = _two_cameras(repo, camera_payload)
+    version = repo.data_version()
+    missing = uuid4()
+
+    outcomes = repo.remove_cameras([first.camera_id, missing])
+    assert outcomes == [(first.camera_id, None, "deleted"), (missing, None, "not_found")]
+    assert repo.data_version() == version + 1
+
+    assert repo.get_camera(first.camera_id) is None
+    assert repo.count_cameras(CameraFilter(ip_from="192.168.0.0")) == 0
+    assert repo.count_cameras(CameraFilter(ip_from="10.0.0.0")) == 1
+    assert repo.count_search_feeds(protocol="rtsp") == 1
+    assert repo.search_cameras(name="testcam") == []
+    stats = repo.fleet_stats(datetime.now(timezone.utc))
+    assert (stats.total_cameras, stats.total_feeds) == (1, 1)
+
+    # the sorted IP index still works for single adds / removes
+    assert repo.remove_camera(second.camera_id) is True
+    assert repo.count_cameras(CameraFilter(ip_from="0.0.0.0")) == 0
+
+
+def test_bulk_feed_operations(repo, camera_payload):
+    first, second = _two_cameras(repo, camera_payload)
+    ids = [first.camera_id, second.camera_id]
+    repo.add_feed(
+        second.camera_id,
+        VideoFeedSetup(feed_protocol="rtsp", feed_port=8554, feed_path="/sub"),
+    )
+
+    # ADD: the second camera already uses rtsp:8554 → conflict
+    added = repo.add_feeds(
+        ids, VideoFeedSetup(feed_protocol="rtsp", feed_port=8554, feed_path="/hq")
+    )
+    assert [o[2] for o in added] == ["added", "conflict"]
+    assert repo.count_feeds(first.camera_id, protocol="rtsp", port=8554) == 1
+
+    # UPDATE: rtsp:554 → port 8554 only where 8554 is still free
+    updated = repo.update_feeds(ids, "rtsp", 554, FeedUpdate(feed_port=8554))
+    assert [o[2] for o in updated] == ["conflict", "conflict"]
+    updated = repo.update_feeds(ids, "rtsp", 554, FeedUpdate(feed_port=1554))
+    assert [o[2] for o in updated] == ["updated", "updated"]
+    assert repo.count_search_feeds(protocol="rtsp", port=554) == 0
+    assert repo.count_search_feeds(protocol="rtsp", port=1554) == 2
+
+    # REMOVE: every rtsp feed of the first camera
+    version = repo.data_version()
+    removed = repo.remove_feeds([first.camera_id], "rtsp", None)
+    assert len(removed) == 2 and {o[2] for o in removed} == {"removed"}
+    assert repo.get_camera(first.camera_id).available_feeds == []
+    assert repo.count_search_feeds(protocol="rtsp") == 2
+    assert repo.data_version() == version + 1
+
+
+def test_bitmap_slots_in_order_with_pagination():
+    from app.repository.bitmap_index import Bitmap, bits_of, iter_slots
+
+    bitmap = Bitmap([3, 0, 17, 3, 1000])
+    assert len(bitmap) == 4 and 17 in bitmap and 4 not in bitmap
+    bitmap.discard(17)
+    bitmap.discard(17)
+    assert len(bitmap) == 3
+    assert list(iter_slots(bitmap.to_int())) == [0, 3, 1000]
+    assert list(iter_slots(bits_of(range(0, 40, 3)), offset=2, limit=3)) == [6, 9, 12]
+    assert list(iter_slots(0)) == []
+
+
+def _tagged_fleet(repo, camera_payload):
+    # five cameras 10.0.0.1 .. 10.0.0.5 with site / floor tags
+    from app.models.schemas import CameraNetworkInfo
+
+    tags = [
+        ["site:berlin", "floor:1"],
+        ["site:berlin", "floor:2"],
+        ["site:berlin", "floor:2", "retired"],
+        ["site:paris", "floor:2"],
+        [],
+    ]
+    cams = []
+    for i, cam_tags in enumerate(tags, start=1):
+        data = camera_payload.model_copy()
+        data.camera_name = f"Cam{i}"
+        data.network_setup = CameraNetworkInfo(ip_address=f"10.0.0.{i}")
+        data.tags = cam_tags
+        cams.append(repo.add_camera(data))
+    return cams
+
+
+def test_tag_filters_combine_with_other_filters(repo, camera_payload):
+    from datetime import datetime, timedelta, timezone
+
+    from app.models.schemas import CameraFilter
+
+    cams = _tagged_fleet(repo, camera_payload)
+
+    def names(**kwargs):
+        flt = CameraFilter(**kwargs)
+        found = [c.camera_name for c in repo.query_cameras(flt, online_since=since)]
+        assert repo.count_cameras(flt, online_since=since) == len(found)
+        return found
+
+    since = datetime.now(timezone.utc) - timedelta(minutes=1)
+    repo.record_checkin(cams[1].camera_id, datetime.now(timezone.utc))
+    repo.record_checkin(cams[3].camera_id, datetime.now(timezone.utc))
+
+    assert names(tags_any=["site:paris", "retired"]) == ["Cam3", "Cam4"]
+    assert names(tags_all=["site:berlin", "floor:2"]) == ["Cam2", "Cam3"]
+    assert names(tags_all=["site:berlin", "unknown"]) == []
+    assert names(tags_none=["site:berlin"]) == ["Cam4", "Cam5"]
+    assert names(tags_all=["floor:2"], tags_none=["retired"], online=True) == [
+        "Cam2",
+        "Cam4",
+    ]
+    assert names(tags_any=["floor:2"], online=False) == ["Cam3"]
+    assert names(tags_any=["site:berlin"], ip_from="10.0.0.2", name="cam") == [
+        "Cam2",
+        "Cam3",
+    ]
+    page = repo.query_cameras(CameraFilter(tags_any=["floor:2"]), offset=1, limit=1)
+    assert [c.camera_name for c in page] == ["Cam3"]
+
+
+def test_tags_follow_updates_removals_and_compaction(repo, camera_payload):
+    from datetime import datetime, timezone
+
+    from app.models.schemas import CameraFilter
+
+    cams = _tagged_fleet(repo, camera_payload)
+    repo.update_camera(cams[4].camera_id, CameraUpdate(tags=["site:paris"]))
+    repo.update_cameras([cams[0].camera_id], CameraUpdate(tags=[]))
+    repo.remove_camera(cams[3].camera_id)
+
+    paris = CameraFilter(tags_any=["site:paris"])
+    assert [c.camera_name for c in repo.query_cameras(paris)] == ["Cam5"]
+    stats = repo.fleet_stats(datetime.now(timezone.utc))
+    assert stats.by_tag == {"site:berlin": 2, "floor:2": 2, "retired": 1, "site:paris": 1}
+
+    # churn: many adds + removes renumber the slots; filters stay correct
+    from app.models.schemas import CameraNetworkInfo
+
+    for i in range(300):
+        data = camera_payload.model_copy()
+        data.camera_name = f"Tmp{i}"
+        data.network_setup = CameraNetworkInfo(ip_address=f"10.9.{i // 200}.{i % 200}")
+        data.tags = ["tmp"]
+        repo.remove_camera(repo.add_camera(data).camera_id)
+    assert len(repo._slot_ids) < 300
+    assert [c.camera_name for c in repo.query_cameras(paris)] == ["Cam5"]
+    berlin = CameraFilter(tags_all=["site:berlin"])
+    assert [c.camera_name for c in repo.query_cameras(berlin)] == ["Cam2", "Cam3"]
+    assert repo.count_cameras(CameraFilter(tags_none=["tmp"])) == 4
+
+
+def test_heartbeat_history_ring_buffer_and_memory_cap():
+    from app.repository.heartbeat_history import HeartbeatHistory
+
+    history = HeartbeatHistory(size=4, max_bytes=8 * 6)
+    for t in range(1, 7):
+        history.record("a", float(t))
+    # full at 4 samples → oldest overwritten, history complete from t=3
+    snap = history.snapshot("a")
+    assert list(snap.epochs) == [3.0, 4.0, 5.0, 6.0]
+    assert snap.complete_since == 3.0
+
+    # only 2 samples left under the cap → "b" wraps at 2
+    for t in range(10, 15):
+        history.record("b", float(t))
+    assert list(history.snapshot("b").epochs) == [13.0, 14.0]
+    history.record("c", 1.0)  # no room at all
+    assert history.snapshot("c") is None
+    assert history.size_bytes == 8 * 6
+
+    history.remove("a")
+    assert history.size_bytes == 8 * 2 and history.snapshot("a") is None
+    assert history.snapshot("unknown") is None
+
+
+def test_checkin_history_follows_the_camera(repo, camera_payload):
+    from datetime import datetime, timedelta, timezone
+
+    cam = repo.add_camera(camera_payload)
+    assert repo.checkin_history(cam.camera_id) is None
+    t0 = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    for minutes in (0, 1, 2):
+        repo.record_checkin(cam.camera_id, t0 + timedelta(minutes=minutes))
+    history = repo.checkin_history(cam.camera_id)
+    assert history.complete_since is None
+    assert list(history.epochs) == [t0.timestamp() + 60 * m for m in (0, 1, 2)]
+
+    repo.remove_camera(cam.camera_id)
+    assert repo.checkin_history(cam.camera_id) is None
+
+
+def _status_config(monkeypatch, misses=1, hits=1, window=600.0, threshold=6):
+    from app.core.config import Config
+
+    monkeypatch.setattr(Config, "HEARTBEAT_TIMEOUT", 60)
+    monkeypatch.setattr(Config, "STATUS_OFFLINE_AFTER_MISSES", misses)
+    monkeypatch.setattr(Config, "STATUS_ONLINE_AFTER_HITS", hits)
+    monkeypatch.setattr(Config, "STATUS_FLAP_WINDOW", window)
+    monkeypatch.setattr(Config, "STATUS_FLAP_THRESHOLD", threshold)
+
+
+def test_status_tracker_hysteresis(monkeypatch):
+    from app.core.clock import seconds_to_ns as s
+    from app.repository.status_tracker import StatusTracker
+
+    _status_config(monkeypatch, misses=3, hits=2)
+    tracker = StatusTracker()
+
+    assert tracker.record("cam", s(0.0)) is False  # 1 hit of 2
+    assert tracker.state("cam", s(10.0)) == "offline"
+    assert tracker.record("cam", s(50.0)) is True  # 2 hits in a row
+    # 2 missed timeouts are tolerated, the 3rd is not
+    assert tracker.state("cam", s(50.0 + 170)) == "online"
+    assert tracker.state("cam", s(50.0 + 181)) == "offline"
+    # back after the outage: needs 2 heartbeats in a row again
+    assert tracker.record("cam", s(400.0)) is False
+    assert tracker.record("cam", s(500.0)) is False  # 100 s gap → starts over
+    assert tracker.record("cam", s(530.0)) is True
+
+
+def test_status_tracker_flapping(monkeypatch):
+    from app.core.clock import seconds_to_ns as s
+    from app.repository.status_tracker import StatusTracker
+
+    _status_config(monkeypatch, window=600.0, threshold=4)
+    tracker = StatusTracker()
+
+    # online at 0, then every heartbeat comes after > 60 s of silence:
+    # offline at 60, online at 100, offline at 160, online at 200 → 4 transitions
+    for t in (0.0, 100.0):
+        assert tracker.record("cam", s(t)) is True
+    assert tracker.record("cam", s(200.0)) is False
+    assert tracker.state("cam", s(210.0)) == "flapping"
+    assert tracker.flapping(s(210.0)) == 1
+
+    # steady heartbeats do not end the flap before a quiet window ...
+    for t in range(230, 800, 30):
+        assert tracker.record("cam", s(t)) is False
+    # ... the first heartbeat after it does
+    assert tracker.record("cam", s(830.0)) is True
+    assert tracker.state("cam", s(830.0)) == "online" and tracker.flapping(s(830.0)) == 0
+
+    # a camera that dies while flapping ends up plain offline
+    for t in (0.0, 100.0, 200.0):
+        tracker.record("dead", s(t))
+    assert tracker.state("dead", s(300.0)) == "flapping"
+    assert tracker.state("dead", s(900.0)) == "offline"
+
+
+def test_online_filters_follow_hysteresis(repo, camera_payload, monkeypatch):
+    from datetime import datetime, timedelta, timezone
+
+    from app.core.clock import to_ns
+    from app.models.schemas import CameraFilter
+
+    _status_config(monkeypatch, hits=2)
+    cam = repo.add_camera(camera_payload)
+    now = datetime.now(timezone.utc)
+    since = now - timedelta(seconds=60)
+    online = CameraFilter(online=True)
+
+    repo.record_checkin(cam.camera_id, now - timedelta(seconds=20))
+    assert repo.count_cameras(online, since) == 0  # only 1 of 2 heartbeats
+    assert repo.query_cameras(online, since) == []
+    assert repo.camera_state(cam.camera_id, to_ns(now)) == "offline"
+    version = repo.status_version()
+
+    repo.record_checkin(cam.camera_id, now)
+    assert repo.count_cameras(online, since) == 1
+    assert [c.camera_id for c in repo.query_cameras(online, since)] == [cam.camera_id]
+    assert repo.fleet_stats(since).online == 1
+    assert repo.camera_state(cam.camera_id, to_ns(now)) == "online"
+    assert repo.status_version() == version + 1
+
+    repo.record_checkin(cam.camera_id, now)  # already online → no status change
+    assert repo.status_version() == version + 1
+    assert repo.camera_state(uuid4(), to_ns(now)) is None
+
+
+def test_fleet_columns_follow_writes_and_checkins(repo, camera_payload):
+    from datetime import datetime, timezone
+
+    import pytest
+
+    pytest.importorskip("numpy")
+    from app.core.clock import to_ns
+    from app.models.schemas import CameraNetworkInfo
+    from app.repository.columnar import NEVER
+
+    first = repo.add_camera(camera_payload)
+    other = camera_payload.model_copy()
+    other.camera_model = "ModelY"
+    other.network_setup = CameraNetworkInfo(ip_address="2001:db8::1")
+    other.available_feeds = []
+    second = repo.add_camera(other)
+
+    columns = repo.fleet_columns()
+    assert columns.camera_ids == [first.camera_id, second.camera_id]
+    assert columns.checkin_ns.tolist() == [NEVER, NEVER]
+    assert columns.models == ["ModelX", "ModelY"]
+    assert columns.feed_count.tolist() == [1, 0]
+    assert columns.ip_version.tolist() == [4, 6]
+    assert columns.ip_between(4, 0xC0A80000, 0xC0A800FF).tolist() == [True, False]
+
+    # a check-in only refreshes the check-in column (structure is reused)
+    at = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    repo.record_checkin(second.camera_id, at)
+    again = repo.fleet_columns()
+    assert again.model_code is columns.model_code
+    assert again.checkin_ns.tolist() == [NEVER, to_ns(at)]
+    assert columns.checkin_ns.tolist() == [NEVER, NEVER]  # snapshots are copies
+
+    # a write rebuilds the structure
+    repo.remove_camera(first.camera_id)
+    columns = repo.fleet_columns()
+    assert columns.camera_ids == [second.camera_id]
+    assert columns.checkin_ns.tolist() == [to_ns(at)]
+    assert columns.count_by("model") == {"ModelY": 1}
+
+
+def test_sharded_repo_matches_single_repo(camera_payload):
+    from datetime import datetime, timezone
+
+    from app.models.schemas import CameraFilter, CameraNetworkInfo
+    from app.repository.memory_repo import SimpleCameraMemoryStorage
+    from app.repository.sharded_repo import ShardedCameraStorage
+
+    single, sharded = SimpleCameraMemoryStorage(), ShardedCameraStorage(shards=4)
+    ids = [uuid4() for _ in range(40)]
+    for i, camera_id in enumerate(ids):
+        data = camera_payload.model_copy()
+        data.camera_name = f"Cam{i}"
+        data.camera_model = "ModelA" if i % 3 else "ModelB"
+        data.network_setup = CameraNetworkInfo(ip_address=f"10.0.0.{i}")
+        data.tags = ["lobby"] if i % 2 else []
+        for repo in (single, sharded):
+            repo.add_camera(data, camera_id)
+    assert len({sharded.shard_of(camera_id) for camera_id in ids}) > 1
+
+    now = datetime.now(timezone.utc)
+    for repo in (single, sharded):
+        repo.record_checkin(ids[5], now)
+        repo.remove_camera(ids[7])
+
+    def listed(cams):
+        return [c.camera_id for c in cams]
+
+    assert listed(sharded.list_cameras()) == listed(single.list_cameras())
+    for flt, offset, limit in [
+        (CameraFilter(), 5, 10),
+        (CameraFilter(model="modelb"), 2, 3),
+        (CameraFilter(ip_from="10.0.0.10", ip_to="10.0.0.30"), 0, None),
+        (CameraFilter(tags_any=["lobby"]), 4, 6),
+        (CameraFilter(online=False), 30, 20),
+    ]:
+        assert listed(sharded.query_cameras(flt, now, offset, limit)) == listed(
+            single.query_cameras(flt, now, offset, limit)
+        )
+        assert sharded.count_cameras(flt, now) == single.count_cameras(flt, now)
+
+    assert sharded.fleet_stats(now) == single.fleet_stats(now)
+    assert sharded.count_search_feeds("rtsp") == 39
+    assert [f.camera_id for f in sharded.search_feeds("rtsp", page=2, page_size=5)] == [
+        camera_id for camera_id in ids[5:11] if camera_id != ids[7]
+    ]
+
+
+def test_sharded_feed_search_pages_follow_camera_order(camera_payload):
+    from app.repository.memory_repo import SimpleCameraMemoryStorage
+    from app.repository.sharded_repo import ShardedCameraStorage
+
+    single, sharded = SimpleCameraMemoryStorage(), ShardedCameraStorage(shards=3)
+    ids = [uuid4() for _ in range(12)]
+    for repo in (single, sharded):
+        for camera_id in ids:
+            repo.add_camera(camera_payload, camera_id)
+        # added newest camera first: feed insertion order != camera order
+        for camera_id in reversed(ids):
+            repo.add_feed(
+                camera_id,
+                VideoFeedSetup(feed_protocol="rtsp", feed_port=8554, feed_path="/x"),
+            )
+
+    def found(repo, page, by_camera):
+        return [
+            (f.camera_id, f.feed_port)
+            for f in repo.search_feeds("rtsp", None, None, page, 5, by_camera)
+        ]
+
+    expected = [(camera_id, port) for camera_id in ids for port in (554, 8554)]
+    for page in (1, 2, 5, 6):
+        want = expected[(page - 1) * 5 : page * 5]
+        assert found(single, page, True) == want
+        assert found(sharded, page, False) == want
+    assert found(single, 1, False)[:2] == [(ids[0], 554), (ids[1], 554)]
+
+
+def test_sharded_repo_bulk_outcomes_keep_input_order(camera_payload):
+    from app.repository.sharded_repo import ShardedCameraStorage
+
+    repo = ShardedCameraStorage(shards=3)
+    cams = [repo.add_camera(camera_payload) for _ in range(6)]
+    unknown = uuid4()
+    ids = [cams[4].camera_id, unknown, cams[0].camera_id, cams[2].camera_id]
+    version = repo.data_version()
+
+    added = repo.add_feeds(ids, VideoFeedSetup(feed_protocol="http", feed_port=80))
+    assert [(o[0], o[2]) for o in added] == [
+        (cams[4].camera_id, "added"),
+        (unknown, "not_found"),
+        (cams[0].camera_id, "added"),
+        (cams[2].camera_id, "added"),
+    ]
+    assert repo.data_version() > version
+
+    removed = repo.remove_cameras(ids)
+    assert [o[2] for o in removed] == ["deleted", "not_found", "deleted", "deleted"]
+    assert [c.camera_id for c in repo.list_cameras()] == [
+        cams[i].camera_id for i in (1, 3, 5)
+    ]
+
+
+def test_add_unique_camera_checks_ip_then_exact_name_and_model(repo, camera_payload):
+    import pytest
+
+    from app.core.exceptions import ConflictError
+    from app.models.schemas import CameraNetworkInfo
+    from app.repository.interface import IP_TAKEN, NAME_TAKEN
+
+    def camera(name, model, ip):
+        data = camera_payload.model_copy()
+        data.camera_name, data.camera_model = name, model
+        data.network_setup = CameraNetworkInfo(ip_address=ip)
+        return data
+
+    first = repo.add_unique_camera(camera("Lobby", "M1", "fd00::1"))
+    assert repo.camera_conflict(camera("Other", "M2", "fd00:0::1")) == IP_TAKEN
+    assert repo.camera_conflict(camera("Lobby", "M1", "fd00::1")) == IP_TAKEN
+    assert repo.camera_conflict(camera("Lobby", "M1", "10.0.0.1")) == NAME_TAKEN
+    # exact name: substrings, other case or another model are no conflict
+    others = (("Lob", "M1"), ("Lobby 2", "M1"), ("lobby", "M1"), ("Lobby", "M2"))
+    for name, model in others:
+        assert repo.camera_conflict(camera(name, model, "10.0.0.1")) is None
+
+    with pytest.raises(ConflictError, match="IP address"):
+        repo.add_unique_camera(camera("Other", "M2", "fd00::1"))
+    assert [c.camera_id for c in repo.list_cameras()] == [first.camera_id]
+    repo.remove_camera(first.camera_id)
+    assert repo.add_unique_camera(camera("Lobby", "M1", "fd00::1")).camera_id
+
+
+def test_sharded_merge_tolerates_camera_removed_during_fan_out(camera_payload):
+    from app.repository.sharded_repo import ShardedCameraStorage
+
+    repo = ShardedCameraStorage(shards=3)
+    cams = [repo.add_camera(camera_payload) for _ in range(6)]
+    parts = [shard.list_cameras() for shard in repo._shards]
+    repo.remove_camera(cams[1].camera_id)  # after its shard answered
+
+    merged = [c.camera_id for c in repo._merge(parts)]
+    assert merged == [c.camera_id for c in repo.list_cameras()]
+    assert merged == [cams[i].camera_id for i in (0, 2, 3, 4, 5)]
+
+
+def test_follower_converges_with_leader_under_write_load(camera_payload):
+    import threading
+
+    from app.models.schemas import CameraNetworkInfo, NewCameraData
+    from app.repository.memory_repo import SimpleCameraMemoryStorage
+    from app.repository.replication import ReplicationFollower, ReplicationLeader
+    from app.service.camera_service import CameraService
+
+    leader_repo, follower_repo = SimpleCameraMemoryStorage(), SimpleCameraMemoryStorage()
+    # a short log: a follower that falls behind is resynced with a snapshot
+    leader = ReplicationLeader(leader_repo, log_size=100, ping_seconds=0.05)
+    address = leader.start()
+    service = CameraService(leader_repo)
+    service.add_camera(camera_payload)  # written BEFORE the follower exists
+    follower = ReplicationFollower(follower_repo, address)
+    follower.start()
+
+    def writer(w):
+        for i in range(40):
+            cam = service.add_camera(
+                NewCameraData(
+                    camera_name=f"W{w}-{i}",
+                    camera_model="ModelX",
+                    network_setup=CameraNetworkInfo(ip_address=f"10.{w}.0.{i}"),
+                    tags=["even"] if i % 2 == 0 else [],
+                )
+            )
+            service.heartbeat(cam.camera_id)
+            if i % 3 == 0:
+                service.update_camera(cam.camera_id, CameraUpdate(camera_model="M2"))
+            if i % 4 == 0:
+                feed = service.add_feed(
+                    cam.camera_id, VideoFeedSetup(feed_protocol="http", feed_port=80)
+                )
+                service.update_feed(cam.camera_id, feed.feed_id, FeedUpdate(feed_port=81))
+            if i % 5 == 0:
+                service.remove_camera(cam.camera_id)
+
+    try:
+        threads = [threading.Thread(target=writer, args=(w,)) for w in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        leader_repo.remove_feeds(
+            [c.camera_id for c in leader_repo.list_cameras()], "http", None
+        )
+
+        assert follower.wait_for(leader.head, timeout=10)
+
+        def by_id(repo):
+            return {c.camera_id: c.model_dump() for c in repo.list_cameras()}
+
+        assert by_id(follower_repo) == by_id(leader_repo)
+        now = leader_repo.list_cameras()[0].last_known_checkin
+        assert follower_repo.fleet_stats(now) == leader_repo.fleet_stats(now)
+        assert follower_repo.count_search_feeds("rtsp") == 1
+        assert follower_repo.count_search_feeds("http") == 0
+        assert follower_repo.count_search_feeds(port=81) == 0
+        assert follower.lag_seconds() < 5
+    finally:
+        follower.stop()
+        leader.stop()
+
+
+def test_remote_repo_matches_server_repo(storage_server, camera_payload):
+    from datetime import datetime, timezone
+
+    import pytest
+
+    from app.core.clock import to_ns
+    from app.core.exceptions import ConflictError
+    from app.models.schemas import CameraFilter, CameraNetworkInfo
+    from app.repository.remote_repo import RemoteCameraStorage
+
+    # every answer must equal what the server's own repository returns
+    remote, local = RemoteCameraStorage(storage_server.path), storage_server.repo
+    ids = [uuid4() for _ in range(12)]
+    for i, camera_id in enumerate(ids):
+        data = camera_payload.model_copy()
+        data.camera_name = f"Cam{i}"
+        data.camera_model = "ModelA" if i % 3 else "ModelB"
+        data.network_setup = CameraNetworkInfo(
+            ip_address=f"10.0.0.{i}" if i % 2 else f"fd00::{i}"
+        )
+        assert remote.add_camera(data, camera_id) == local.get_camera(camera_id)
+
+    now = datetime.now(timezone.utc)
+    assert remote.record_checkin(ids[1], now, updated_on=now).last_updated_on == now
+    remote.update_camera(ids[2], CameraUpdate(camera_name="Renamed"))
+    feed = VideoFeedSetup(feed_protocol="http", feed_port=80)
+    assert [o[2] for o in remote.add_feeds(iter(ids[:4]), feed)] == ["added"] * 4
+    assert remote.remove_camera(ids[3]) is True
+
+    assert remote.list_cameras() == local.list_cameras()
+    assert remote.get_camera(ids[2]).camera_name == "Renamed"
+    flt = CameraFilter(model="modelb")
+    assert remote.query_cameras(flt, now, 1, 2) == local.query_cameras(flt, now, 1, 2)
+    assert remote.count_cameras(flt, now) == local.count_cameras(flt, now) == 3
+    assert remote.search_feeds("http") == local.search_feeds("http")
+    assert remote.fleet_stats(now) == local.fleet_stats(now)
+    assert remote.checkin_history(ids[1]) == local.checkin_history(ids[1])
+    assert remote.camera_state(ids[1], to_ns(now)) == "online"
+    assert remote.oldest_online_checkin(now) == now
+    assert remote.get_camera(uuid4()) is None
+    assert remote.data_version() == local.data_version()
+    assert remote.uptime_inputs() == local.uptime_inputs()
+    assert remote.camera_conflict(data) == local.camera_conflict(data) is not None
+    with pytest.raises(ConflictError):  # the server's ConflictError, raised here
+        remote.add_unique_camera(data)
+
+    with pytest.raises(TypeError):  # raised on the server, raised again here
+        remote.submit("get_camera").result(5)
+
+    remote.clear()
+    assert local.list_cameras() == []
+
+
+def test_remote_repo_pipelines_calls_and_shares_one_fleet(
+    storage_server, camera_payload
+):
+    import threading
+
+    from app.repository.remote_repo import RemoteCameraStorage
+
+    # two "workers"; ONE connection each, so concurrent calls are pipelined
+    workers = [RemoteCameraStorage(storage_server.path, pool_size=1) for _ in range(2)]
+    cam = workers[0].add_camera(camera_payload)
+    assert workers[1].get_camera(cam.camera_id) == cam
+
+    futures = [workers[0].submit("get_camera", cam.camera_id) for _ in range(200)]
+    assert all(f.result(5) == cam for f in futures)
+
+    def heartbeats(worker):
+        from datetime import datetime, timezone
+
+        for _ in range(100):
+            worker.record_checkin(cam.camera_id, datetime.now(timezone.utc))
+
+    threads = [
+        threading.Thread(target=heartbeats, args=(workers[i % 2],)) for i in range(8)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert workers[1].checkin_version() == storage_server.repo.checkin_version()
+    assert len(workers[0].checkin_history(cam.camera_id).epochs) == 800
+
+
+def test_remote_repo_without_server_is_unavailable(tmp_path, camera_payload):
+    import pytest
+
+    from app.core.exceptions import StorageUnavailableError
+    from app.repository.remote_repo import RemoteCameraStorage
+    from app.repository.storage_server import StorageServer
+
+    remote = RemoteCameraStorage(str(tmp_path / "storage.sock"))
+    with pytest.raises(StorageUnavailableError):
+        remote.list_cameras()
+
+    # a server started later (or restarted) is picked up on the next call
+    server = StorageServer(path=remote.socket_path)
+    server.start()
+    try:
+        assert remote.add_camera(camera_payload).camera_name == "TestCam"
+    finally:
+        server.stop()
+    with pytest.raises(StorageUnavailableError):
+        remote.list_cameras()
+
+
+def test_scans_survive_concurrent_adds_and_removes(repo, camera_payload):
+    import sys
+    import threading
+    from datetime import datetime, timezone
+
+    from app.models.schemas import CameraFilter, CameraNetworkInfo
+
+    now = datetime.now(timezone.utc)
+    for i in range(200):
+        data = camera_payload.model_copy()
+        data.network_setup = CameraNetworkInfo(ip_address=f"10.1.{i // 250}.{i % 250}")
+        repo.add_camera(data)
+    stop = threading.Event()
+
+    def churn():
+        i = 0
+        while not stop.is_set():
+            data = camera_payload.model_copy()
+            ip = f"10.9.{i // 250}.{i % 250}"
+            data.network_setup = CameraNetworkInfo(ip_address=ip)
+            repo.remove_camera(repo.add_camera(data).camera_id)
+            i += 1
+
+    # switch threads every few bytecodes so writes land inside the scans
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    writer = threading.Thread(target=churn)
+    writer.start()
+    try:
+        for _ in range(300):
+            repo.query_cameras(CameraFilter(online=False), now)
+            repo.count_cameras(CameraFilter(online=False), now)
+            repo.query_cameras(CameraFilter(model="modelx"))
+            repo.count_cameras(CameraFilter(name="test", ip_to="10.5.0.0"), now)
+            repo.query_cameras(CameraFilter(tags_none=["x"]), now, 0, 50)
+            repo.search_feeds(protocol="rtsp", page=5)
+            repo.search_feeds(port=554, page=5, by_camera=True)
+            repo.search_feeds(q="main", page=5)
+            repo.search_feeds(page=5)
+    finally:
+        stop.set()
+        writer.join()
+        sys.setswitchinterval(interval)
@@ -38,6 +38,30 @@ def test_add_camera_duplicate_name_model(service, camera_payload):
         service.add_camera(dup)
 
 
+def test_concurrent_duplicate_adds_create_one_camera(service, camera_payload):
+    import threading
+
+    # check + insert are one step in the repository: no duplicate slips in
+    # between another request's check and its insert
+    created, conflicts = [], []
+    barrier = threading.Barrier(8)
+
+    def add():
+        barrier.wait()
+        try:
+            created.append(service.add_camera(camera_payload.model_copy()))
+        except ConflictError:
+            conflicts.append(1)
+
+    threads = [threading.Thread(target=add) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert (len(created), len(conflicts)) == (1, 7)
+    assert len(service.repo.list_cameras()) == 1
+
+
 def test_get_camera_success(service, camera_payload):
     cam = service.add_camera(camera_payload)
     retrieved = service.get_camera(cam.camera_id)
@@ -182,6 +206,40 @@ def test_heartbeat_not_found(service):
         service.heartbeat(uuid4())
 
 
+def test_status_with_manual_clock(service, camera_payload, manual_clock):
+    from app.core.clock import to_datetime
+    from app.core.config import Config
+
+    cam = service.add_camera(camera_payload)
+    assert cam.last_known_checkin == cam.last_updated_on == manual_clock.now()
+
+    manual_clock.advance(Config.HEARTBEAT_TIMEOUT)
+    assert service.is_online(cam.camera_id)
+    assert len(service.list_cameras(online=True)) == 1
+    manual_clock.advance(0.001)
+    assert not service.is_online(cam.camera_id)
+    assert service.list_cameras(online=True) == []
+    assert service.fleet_stats().offline == 1
+
+    service.heartbeat(cam.camera_id)
+    checkin = service.get_camera(cam.camera_id).last_known_checkin
+    assert checkin == to_datetime(manual_clock.now_ns())
+    assert service.is_online(cam.camera_id)
+
+
+def test_clock_is_sampled_once_per_block():
+    from app.core.clock import clock, to_datetime, to_ns
+
+    first = clock.now_ns()
+    assert clock.now_ns() >= first  # monotonic
+    with clock.sampled() as now_ns:
+        with clock.sampled() as inner:
+            assert inner == now_ns  # nested blocks keep the outer reading
+        assert clock.now_ns() == now_ns and clock.read_ns() >= now_ns
+    assert clock.now_ns() >= now_ns
+    assert to_ns(to_datetime(now_ns)) == now_ns // 1000 * 1000
+
+
 # FILTERS + PAGINATION
 def test_list_cameras_filter_model(service, camera_payload):
     cam1 = service.add_camera(camera_payload)
@@ -266,3 +324,353 @@ def test_list_cameras_filter_online(service, camera_payload):
 
     assert cam1.camera_id in {c.camera_id for c in online_list}
     assert cam2.camera_id in {c.camera_id for c in offline_list}
+
+
+def test_add_feed_allowed_after_duplicate_port_is_changed(service, camera_payload):
+    cam = service.add_camera(camera_payload)
+    fid = cam.available_feeds[0].feed_id
+
+    service.update_feed(cam.camera_id, fid, FeedUpdate(feed_port=9999))
+
+    # port 554 is free again on this camera
+    feed = service.add_feed(
+        cam.camera_id,
+        VideoFeedSetup(feed_protocol="rtsp", feed_port=554, feed_path="/again"),
+    )
+    assert feed.feed_port == 554
+
+
+def test_search_feeds_across_cameras(service, camera_payload):
+    cam1 = service.add_camera(camera_payload)
+
+    other = camera_payload.model_copy()
+    other.camera_name = "Other"
+    other.network_setup = CameraNetworkInfo(ip_address="10.0.0.2")
+    other.available_feeds = [
+        VideoFeedSetup(feed_protocol="rtsp", feed_port=8554, feed_path="/lq"),
+        VideoFeedSetup(feed_protocol="http", feed_port=8080, feed_path="/snap"),
+    ]
+    cam2 = service.add_camera(other)
+
+    rtsp = service.search_feeds(protocol="RTSP")
+    assert {f.camera_id for f in rtsp} == {cam1.camera_id, cam2.camera_id}
+
+    lq = service.search_feeds(protocol="rtsp", port=8554)
+    assert [f.camera_id for f in lq] == [cam2.camera_id]
+
+    page2 = service.search_feeds(page=2, page_size=2)
+    assert len(page2) == 1
+
+
+def test_count_cameras_matches_unpaginated_list(service, camera_payload):
+    service.add_camera(camera_payload)
+    other = camera_payload.model_copy()
+    other.camera_name = "Other"
+    other.network_setup = CameraNetworkInfo(ip_address="10.0.0.2")
+    service.add_camera(other)
+
+    assert service.count_cameras() == 2
+    assert service.count_cameras(ip_from="10.0.0.0", ip_to="10.0.0.255") == 1
+    assert service.count_cameras(online=True) == 2
+    assert len(service.list_cameras(page=2, page_size=1)) == 1
+
+    with pytest.raises(ConflictError):
+        service.count_cameras(ip_from="not-an-ip")
+
+
+def test_online_filter_expiry(service, camera_payload):
+    from datetime import datetime, timedelta, timezone
+
+    from app.core.config import Config
+
+    before = datetime.now(timezone.utc)
+    cam = service.add_camera(camera_payload)  # adding counts as a check-in
+
+    expiry = service.online_filter_expiry()
+    timeout = timedelta(seconds=Config.HEARTBEAT_TIMEOUT)
+    assert before + timeout <= expiry <= datetime.now(timezone.utc) + timeout
+
+    service.remove_camera(cam.camera_id)
+    assert service.online_filter_expiry() is None
+
+
+def test_bulk_update_cameras(service, camera_payload):
+    from app.core.exceptions import ValidationError
+    from app.models.schemas import CameraUpdate, ImageQuality
+
+    first = service.add_camera(camera_payload)
+    other = camera_payload.model_copy()
+    other.camera_name = "Other"
+    other.network_setup = CameraNetworkInfo(ip_address="10.0.1.5")
+    service.add_camera(other)
+
+    brighter = CameraUpdate(image_settings=ImageQuality(brightness=80))
+    result = service.bulk_update_cameras(brighter, model=camera_payload.camera_model)
+    assert (result.matched, result.updated) == (2, 2)
+    result = service.bulk_update_cameras(brighter, camera_ids=[first.camera_id])
+    assert (result.matched, result.updated) == (1, 0)  # already at 80
+
+    result = service.bulk_update_cameras(brighter, cidr="10.0.1.0/24")
+    assert result.matched == 1
+
+    with pytest.raises(ValidationError):
+        service.bulk_update_cameras(brighter)  # no filter → refused
+    with pytest.raises(ValidationError):
+        service.bulk_update_cameras(brighter, cidr="not-a-cidr")
+    with pytest.raises(ConflictError):
+        service.bulk_update_cameras(
+            CameraUpdate(camera_name="Same"), model=camera_payload.camera_model
+        )
+
+
+def test_bulk_model_change_keeps_name_model_unique(service, camera_payload):
+    from app.models.schemas import CameraUpdate
+
+    service.add_camera(camera_payload)
+    clash = camera_payload.model_copy()
+    clash.camera_model = "Target"
+    clash.network_setup = CameraNetworkInfo(ip_address="10.0.9.9")
+    service.add_camera(clash)  # same name, already has model "Target"
+
+    with pytest.raises(ConflictError):
+        service.bulk_update_cameras(
+            CameraUpdate(camera_model="Target"), model=camera_payload.camera_model
+        )
+
+
+def test_bulk_remove_cameras(service, camera_payload):
+    from app.core.exceptions import ValidationError
+
+    first = service.add_camera(camera_payload)
+    missing = uuid4()
+
+    result = service.bulk_remove_cameras(camera_ids=[first.camera_id, missing])
+    assert result.matched == 1
+    assert result.counts == {"deleted": 1, "not_found": 1}
+    assert service.list_cameras(page_size=10) == []
+
+    with pytest.raises(ValidationError):
+        service.bulk_remove_cameras()  # no filter → refused
+
+
+def test_bulk_feeds_validation_and_outcomes(service, camera_payload):
+    from app.core.exceptions import ValidationError
+    from app.models.schemas import BulkFeedOperation
+
+    cam = service.add_camera(camera_payload)
+    model = camera_payload.camera_model
+
+    for bad in (
+        {"action": "add"},
+        {"action": "remove"},
+        {"action": "update", "feed_protocol": "rtsp"},
+    ):
+        with pytest.raises(ValidationError):
+            service.bulk_feeds(BulkFeedOperation(**bad), model=model)
+
+    op = BulkFeedOperation(
+        action="add", feed={"feed_protocol": "http", "feed_port": 80, "feed_path": "/"}
+    )
+    assert service.bulk_feeds(op, model=model).counts == {"added": 1}
+    op = BulkFeedOperation(action="remove", feed_protocol="http")
+    result = service.bulk_feeds(op, model=model)
+    assert result.counts == {"removed": 1}
+    assert [f.feed_protocol for f in service.get_camera(cam.camera_id).available_feeds] == [
+        "rtsp"
+    ]
+
+
+def test_up_seconds_union_of_heartbeat_intervals():
+    from array import array
+
+    from app.service.camera_service import _up_seconds
+
+    # timeout 10: [0,10] [5,15] [40,50] clipped to [2, 45] → 13 + 5
+    epochs = array("d", [0.0, 5.0, 40.0])
+    assert _up_seconds(epochs, 2.0, 45.0, 10.0) == (18.0, 2)
+    assert _up_seconds(epochs, 100.0, 200.0, 10.0) == (0.0, 0)
+    assert _up_seconds(array("d"), 0.0, 10.0, 10.0) == (0.0, 0)
+
+
+def test_parse_window():
+    from app.core.exceptions import ValidationError
+    from app.service.camera_service import parse_window
+
+    assert parse_window("90") == 90
+    assert parse_window("15m") == 900
+    assert parse_window("24h") == 86400
+    assert parse_window("7d") == 7 * 86400
+    for bad in ("0", "-5m", "abc", "10w"):
+        with pytest.raises(ValidationError):
+            parse_window(bad)
+
+
+def test_camera_and_fleet_uptime(service, camera_payload, monkeypatch):
+    from app.core.config import Config
+
+    monkeypatch.setattr(Config, "HEARTBEAT_TIMEOUT", 60)
+    now = datetime.now(timezone.utc)
+    other = camera_payload.model_copy()
+    other.camera_name = "Flaky"
+    other.network_setup = CameraNetworkInfo(ip_address="10.0.3.3")
+    # added through the repo (no creation heartbeat), one hour ago
+    healthy = service.repo.add_camera(camera_payload)
+    flaky = service.repo.add_camera(other)
+    for cam in (healthy, flaky):
+        cam.added_on = now - timedelta(hours=1)
+
+    # healthy: every minute for the last hour; flaky: only the last 30 minutes
+    for minute in range(60, -1, -1):
+        at = now - timedelta(minutes=minute)
+        service.repo.record_checkin(healthy.camera_id, at)
+        if minute <= 30:
+            service.repo.record_checkin(flaky.camera_id, at)
+
+    up = service.camera_uptime(healthy.camera_id, "1h")
+    assert up.heartbeats == 60 and up.uptime == pytest.approx(1.0, abs=1e-3)
+    half = service.camera_uptime(flaky.camera_id, "1h")
+    assert half.uptime == pytest.approx(0.5, abs=0.01)
+    assert half.observed_seconds == pytest.approx(3600, abs=5)
+
+    report = service.fleet_uptime(window="1h", sla=0.9, worst=1)
+    assert (report.cameras, report.measured, report.below_sla) == (2, 2, 1)
+    assert [u.camera_id for u in report.worst] == [flaky.camera_id]
+    with pytest.raises(NotFoundError):
+        service.camera_uptime(uuid4())
+
+    # without NumPy: same report from the per-camera path
+    from app.core.exceptions import FeatureUnavailableError
+    from app.service import camera_service
+
+    def no_numpy():
+        raise FeatureUnavailableError("no numpy")
+
+    monkeypatch.setattr(camera_service, "numpy_module", no_numpy)
+    fallback = service.fleet_uptime(window="1h", sla=0.9, worst=1)
+    assert (fallback.measured, fallback.below_sla) == (2, 1)
+    assert [u.camera_id for u in fallback.worst] == [flaky.camera_id]
+
+
+def test_fleet_up_seconds_matches_per_camera_path():
+    pytest.importorskip("numpy")
+    import random
+    from array import array
+
+    from app.service.camera_service import _fleet_up_seconds, _up_seconds
+
+    rng = random.Random(7)
+    end, timeout = 1000.0, 30.0
+    windows = [
+        (100.0, None),  # no history
+        (100.0, array("d")),
+        (100.0, array("d", [10.0, 20.0])),  # all before the window
+        (100.0, array("d", [90.0, 95.0, 200.0])),  # lead-in + inside
+        (100.0, array("d", [1100.0])),  # only after the end
+        (1200.0, array("d", [900.0, 950.0])),  # window starts after end
+    ]
+    for _ in range(20):
+        epochs = sorted(rng.uniform(0, 1100) for _ in range(rng.randint(1, 50)))
+        windows.append((rng.uniform(0, 900), array("d", epochs)))
+
+    ups, counts = _fleet_up_seconds(windows, end, timeout)
+    for (start, epochs), up, count in zip(windows, ups, counts):
+        want_up, want_count = (
+            _up_seconds(epochs, start, end, timeout) if epochs else (0.0, 0)
+        )
+        assert up == pytest.approx(want_up) and count == want_count
+
+
+# OFFLINE ANALYTICS (columnar snapshot)
+def test_offline_analytics_groups_by_model(service, manual_clock):
+    pytest.importorskip("numpy")
+    from app.core.config import Config
+    from app.core.exceptions import ValidationError
+
+    def camera(i, model):
+        return service.add_camera(
+            NewCameraData(
+                camera_name=f"Cam{i}",
+                camera_model=model,
+                network_setup=CameraNetworkInfo(ip_address=f"10.0.{i}.1"),
+            )
+        )
+
+    cams = [camera(i, model) for i, model in enumerate(["A", "A", "B", "B", "Cx"])]
+    manual_clock.advance(Config.HEARTBEAT_TIMEOUT + 600)
+    service.heartbeat(cams[1].camera_id)
+    manual_clock.advance(1)  # the others: offline for just over 10 minutes
+
+    report = service.offline_analytics(longer_than="10m")
+    assert (report.cameras, report.offline) == (5, 4)
+    assert report.groups == {"A": 1, "B": 2, "Cx": 1}
+    assert service.offline_analytics(longer_than="11m").offline == 0
+
+    by_feeds = service.offline_analytics(longer_than="10m", group_by="feed_count")
+    assert by_feeds.groups == {"0": 4}
+
+    # filters first: model substring (case-folded) and CIDR
+    report = service.offline_analytics(longer_than="10m", model="x")
+    assert (report.cameras, report.groups) == (1, {"Cx": 1})
+    report = service.offline_analytics(longer_than="10m", cidr="10.0.0.0/23")
+    assert (report.cameras, report.offline, report.groups) == (2, 1, {"A": 1})
+
+    with pytest.raises(ValidationError):
+        service.offline_analytics(group_by="protocol")
+    with pytest.raises(ValidationError):
+        service.offline_analytics(cidr="10.0.0.0/99")
+
+
+# SHARDED REPOSITORY: uniqueness rules hold across shards
+def test_uniqueness_rules_across_shards(camera_payload):
+    from app.repository.sharded_repo import ShardedCameraStorage
+    from app.service.camera_service import CameraService
+
+    service = CameraService(ShardedCameraStorage(shards=8))
+    for i in range(16):  # enough cameras to populate several shards
+        data = camera_payload.model_copy()
+        data.camera_name = f"Cam{i}"
+        data.network_setup = CameraNetworkInfo(ip_address=f"10.1.0.{i}")
+        service.add_camera(data)
+
+    for i in range(16):
+        dup_ip = camera_payload.model_copy()
+        dup_ip.camera_name = f"Other{i}"
+        dup_ip.network_setup = CameraNetworkInfo(ip_address=f"10.1.0.{i}")
+        with pytest.raises(ConflictError):
+            service.add_camera(dup_ip)
+
+        dup_name = camera_payload.model_copy()
+        dup_name.camera_name = f"Cam{i}"
+        dup_name.network_setup = CameraNetworkInfo(ip_address=f"10.2.0.{i}")
+        with pytest.raises(ConflictError):
+            service.add_camera(dup_name)
+
+
+def test_concurrent_duplicate_adds_across_shards(camera_payload):
+    import threading
+
+    from app.repository.sharded_repo import ShardedCameraStorage
+    from app.service.camera_service import CameraService
+
+    # same IP, different names: the new ids land on different shards, so only
+    # the wrapper's check + insert step keeps the IP unique
+    service = CameraService(ShardedCameraStorage(shards=8))
+    barrier = threading.Barrier(16)
+    created, conflicts = [], []
+
+    def add(i):
+        data = camera_payload.model_copy()
+        data.camera_name = f"Cam{i}"
+        barrier.wait()
+        try:
+            created.append(service.add_camera(data))
+        except ConflictError:
+            conflicts.append(i)
+
+    threads = [threading.Thread(target=add, args=(i,)) for i in range(16)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert (len(created), len(conflicts)) == (1, 15)
+    assert len(service.repo.list_cameras()) == 1